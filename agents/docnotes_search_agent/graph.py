@@ -17,6 +17,7 @@ node_module = importlib.util.module_from_spec(node_spec)
 node_spec.loader.exec_module(node_module)
 DocNotesSearchAgent = node_module.DocNotesSearchAgent
 State = node_module.State
+default_agent_mode = node_module.default_agent_mode
 
 # Make sure you populate your .env file with the correct credentials!
 dotenv.load_dotenv()
@@ -34,13 +35,16 @@ class DocNotesSearcher(agentc_langgraph.graph.GraphRunnable):
     """
 
     @staticmethod
-    def build_starting_state(patient_id: str = None, question: str = None) -> State:
+    def build_starting_state(
+        patient_id: str = None, question: str = None, agent_mode: str = None
+    ) -> State:
         """
         Build the initial state for the search workflow.
 
         Args:
             patient_id: Optional patient ID
             question: Optional question about past visits
+            agent_mode: "direct" or "react" (default: DOCNOTES_AGENT_MODE, else direct)
 
         Returns:
             Initial state with empty messages and search fields
@@ -55,6 +59,8 @@ class DocNotesSearcher(agentc_langgraph.graph.GraphRunnable):
             is_complete=False,
             previous_node=None,
             is_last_step=False,
+            agent_mode=agent_mode or default_agent_mode(),
+            token_usage=None,
         )
 
     def compile(self) -> langgraph.graph.StateGraph:
@@ -1,10 +1,53 @@
 import agentc
 import agentc_langgraph.agent
+import concurrent.futures
+import json
+import langchain_core.callbacks
 import langchain_core.messages
 import langchain_core.runnables
 import langchain_openai.chat_models
+import logging
+import os
 import typing
 
+from backend.utils.token_usage import total_usage
+
+logger = logging.getLogger("cko")
+
+TOP_K = 3
+
+DIRECT_INSTRUCTIONS = (
+    "The find_patient_by_id and doc_notes_search results are provided below; do not ask "
+    "for more tools. Answer only from these notes. Set needs_more_search to true only if "
+    "the question cannot be answered without another search (e.g. it asks about several "
+    "separate topics or needs facts these notes do not contain)."
+)
+
+# Direct mode returns the retrieved notes as-is, so the model only writes the answer.
+DIRECT_OUTPUT = {
+    "title": "DocNotesAnswer",
+    "description": "Answer to doctor's question based on the provided notes",
+    "type": "object",
+    "properties": {
+        "patient_name": {"type": "string", "description": "Full name of the patient"},
+        "answer": {
+            "type": "string",
+            "description": "Concise answer based on the notes, 2-3 sentences.",
+        },
+        "needs_more_search": {
+            "type": "boolean",
+            "description": "True if the notes provided are not enough to answer.",
+        },
+    },
+    "required": ["patient_name", "answer", "needs_more_search"],
+}
+
+
+def default_agent_mode() -> str:
+    """DOCNOTES_AGENT_MODE: "direct" (default, ReAct fallback) or "react"."""
+    mode = (os.getenv("DOCNOTES_AGENT_MODE") or "direct").strip().lower()
+    return mode if mode in ("direct", "react") else "direct"
+
 
 class State(agentc_langgraph.agent.State):
     """State for the doc notes search agent"""
@@ -17,6 +60,8 @@ class State(agentc_langgraph.agent.State):
     is_complete: bool
     previous_node: typing.Optional[str]
     is_last_step: bool
+    agent_mode: typing.Optional[str]
+    token_usage: typing.Optional[dict]
 
 
 class DocNotesSearchAgent(agentc_langgraph.agent.ReActAgent):
@@ -24,6 +69,11 @@ class DocNotesSearchAgent(agentc_langgraph.agent.ReActAgent):
     Agent for searching doctor notes and answering questions about past visits.
 
     Uses the docnotes_search_agent prompt and doc_notes_search tool from the catalog.
+
+    In "direct" mode (default) retrieval always runs first: the notes are searched
+    without an LLM planning step and one structured-output call writes the answer.
+    If the model reports that the notes are not enough (multi-hop questions), or the
+    direct path fails, the question is re-run through the ReAct agent.
     """
 
     def __init__(self, catalog: agentc.Catalog, span: agentc.Span):
@@ -40,18 +90,30 @@ class DocNotesSearchAgent(agentc_langgraph.agent.ReActAgent):
 
         Args:
             span: Tracing span for observability
-            state: Current state with patient_id and question
+            state: Current state with patient_id and question (and optional agent_mode)
             config: LangGraph configuration
 
         Returns:
             Updated state with search results
         """
-        # Create the agent and invoke it
-        agent = self.create_react_agent(span)
-        response = agent.invoke(input=state, config=config)
+        mode = state.get("agent_mode") or default_agent_mode()
 
-        # Extract structured response from the prompt output schema
-        structured_response = response.get("structured_response", {})
+        with langchain_core.callbacks.get_usage_metadata_callback() as usage:
+            result = None
+            if mode == "direct":
+                try:
+                    result = self._invoke_direct(span, state, config)
+                except Exception as e:
+                    logger.warning(
+                        f"Doc-notes search agent: direct search failed, using ReAct: {e}",
+                        exc_info=True,
+                    )
+                if result is None:
+                    mode = "react_fallback"
+            if result is None:
+                result = self._invoke_react(span, state, config)
+
+        structured_response, message = result
 
         # Update state with search results
         state["patient_id"] = structured_response.get("patient_id", state.get("patient_id"))
@@ -59,11 +121,115 @@ class DocNotesSearchAgent(agentc_langgraph.agent.ReActAgent):
         state["question"] = structured_response.get("question", state.get("question"))
         state["notes"] = structured_response.get("notes", [])
         state["answer"] = structured_response.get("answer")
+        state["agent_mode"] = mode
+        state["token_usage"] = total_usage(usage.usage_metadata)
         state["is_complete"] = True
         state["is_last_step"] = True
 
         # Append the AI response to messages
-        if response.get("messages"):
-            state["messages"].append(response["messages"][-1])
+        if message is not None:
+            state["messages"].append(message)
 
         return state
+
+    def _invoke_react(self, span: agentc.Span, state: State, config) -> tuple:
+        """Let the ReAct agent decide which tools to call."""
+        # Create the agent and invoke it
+        agent = self.create_react_agent(span)
+        response = agent.invoke(input=state, config=config)
+
+        # Extract structured response from the prompt output schema
+        messages = response.get("messages") or []
+        return response.get("structured_response", {}), (messages[-1] if messages else None)
+
+    def _invoke_direct(self, span: agentc.Span, state: State, config) -> typing.Optional[tuple]:
+        """Search first, then answer in one call; None means "needs the ReAct agent"."""
+        patient_id = state.get("patient_id")
+        question = state.get("question") or ""
+        patient_name = state.get("patient_name")
+
+        search_args = {"query": question, "patient_id": patient_id, "top_k": TOP_K}
+        search = self.catalog.find("tool", name="doc_notes_search")
+        with concurrent.futures.ThreadPoolExecutor(max_workers=2) as pool:
+            span.log(
+                agentc.span.ToolCallContent(
+                    tool_name="doc_notes_search",
+                    tool_args=search_args,
+                    tool_call_id="call_1_doc_notes_search",
+                )
+            )
+            search_future = pool.submit(search.func, **search_args)
+            patient_future = None
+            if not patient_name and patient_id:
+                find_patient = self.catalog.find("tool", name="find_patient_by_id")
+                patient_future = pool.submit(find_patient.func, patient_id=patient_id)
+
+            search_result = search_future.result()
+            patient = patient_future.result() if patient_future is not None else None
+
+        notes = [
+            {
+                "visit_date": str(note.get("visit_date") or ""),
+                "visit_notes": str(note.get("visit_notes") or ""),
+                "doctor_name": str(note.get("doctor_name") or ""),
+            }
+            for note in (search_result or {}).get("docnotes_search_results", [])[:TOP_K]
+        ]
+        span.log(
+            agentc.span.ToolResultContent(
+                tool_call_id="call_1_doc_notes_search", tool_result={"notes": len(notes)}
+            )
+        )
+        if isinstance(patient, dict):
+            patient_name = patient.get("name") or patient.get("patient_name") or patient_name
+
+        if not notes:
+            answer = {
+                "patient_name": patient_name,
+                "answer": "No relevant notes found for this query.",
+            }
+            return {"patient_id": patient_id, "question": question, "notes": [], **answer}, None
+
+        model = self.chat_model.with_structured_output(DIRECT_OUTPUT, include_raw=True)
+        result = model.invoke(
+            [
+                self.prompt_content,
+                langchain_core.messages.SystemMessage(content=DIRECT_INSTRUCTIONS),
+                langchain_core.messages.HumanMessage(
+                    content=json.dumps(
+                        {
+                            "patient_id": patient_id,
+                            "patient_name": patient_name,
+                            "question": question,
+                            "notes": notes,
+                        },
+                        ensure_ascii=False,
+                    )
+                ),
+            ],
+            config=config,
+        )
+        parsed = result.get("parsed")
+        if result.get("parsing_error") or not parsed:
+            raise ValueError(f"Invalid doc notes answer: {result.get('parsing_error')}")
+        span.log(
+            agentc.span.ChatCompletionContent(
+                output=json.dumps(parsed, ensure_ascii=False),
+                meta={
+                    "model": str(getattr(self.chat_model, "model_name", "gpt-4o-mini")),
+                    "tokens": getattr(result.get("raw"), "usage_metadata", None) or {},
+                },
+            )
+        )
+        if parsed.get("needs_more_search"):
+            span.log(agentc.span.SystemContent(value="Notes insufficient; falling back to ReAct"))
+            return None
+
+        structured_response = {
+            "patient_id": patient_id,
+            "patient_name": patient_name or parsed.get("patient_name"),
+            "question": question,
+            "notes": notes,
+            "answer": parsed.get("answer", ""),
+        }
+        return structured_response, result.get("raw")
@@ -5,6 +5,7 @@ import langgraph.graph
 from previsit_edge import out_summary_agent_edge
 from previsit_node import PrevisitSummaryAgent
 from previsit_node import State
+from previsit_node import default_agent_mode
 
 dotenv.load_dotenv()
 
@@ -21,12 +22,13 @@ class PrevisitSummarizer(agentc_langgraph.graph.GraphRunnable):
     """
 
     @staticmethod
-    def build_starting_state(patient_id: str = None) -> State:
+    def build_starting_state(patient_id: str = None, agent_mode: str = None) -> State:
         """
         Build the initial state for the pre-visit summary workflow.
 
         Args:
             patient_id: Patient ID to generate summary for
+            agent_mode: "direct" or "react" (default: PREVISIT_AGENT_MODE, else direct)
 
         Returns:
             Initial state with empty fields
@@ -44,6 +46,8 @@ class PrevisitSummarizer(agentc_langgraph.graph.GraphRunnable):
             is_complete=False,
             previous_node=None,
             is_last_step=False,
+            agent_mode=agent_mode or default_agent_mode(),
+            token_usage=None,
         )
 
     def compile(self) -> langgraph.graph.StateGraph:
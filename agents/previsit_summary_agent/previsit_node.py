@@ -1,10 +1,35 @@
 import agentc
 import agentc_langgraph.agent
+import concurrent.futures
+import json
+import langchain_core.callbacks
+import langchain_core.messages
 import langchain_core.runnables
 import langchain_openai.chat_models
+import logging
 import os
+import time
 import typing
 
+from backend.utils.token_usage import total_usage
+
+logger = logging.getLogger("cko")
+
+# The three fetches every summary needs, in prompt order.
+DIRECT_TOOLS = ("find_patient_by_id", "get_previsit_questionnaire", "docnotes_latest_by_patient_id")
+
+DIRECT_INSTRUCTIONS = (
+    "The results of find_patient_by_id, get_previsit_questionnaire and "
+    "docnotes_latest_by_patient_id are provided below; do not ask for more tools. "
+    "A null result means that data is not available."
+)
+
+
+def default_agent_mode() -> str:
+    """PREVISIT_AGENT_MODE: "direct" (default) or "react"."""
+    mode = (os.getenv("PREVISIT_AGENT_MODE") or "direct").strip().lower()
+    return mode if mode in ("direct", "react") else "direct"
+
 
 class State(agentc_langgraph.agent.State):
     """State for the pre-visit summary agent"""
@@ -20,15 +45,21 @@ class State(agentc_langgraph.agent.State):
     is_complete: bool
     previous_node: typing.Optional[str]
     is_last_step: bool
+    agent_mode: typing.Optional[str]
+    token_usage: typing.Optional[dict]
 
 
 class PrevisitSummaryAgent(agentc_langgraph.agent.ReActAgent):
     """
     Agent for generating pre-visit summaries for doctors.
 
-    Uses OpenAI's GPT-4o-mini with the ReAct pattern to:
-    1. Call tools to gather patient data, questionnaire responses, and recent notes
+    Uses OpenAI's GPT-4o-mini to:
+    1. Gather patient data, questionnaire responses, and recent notes
     2. Generate a structured clinical summary for the physician
+
+    In "direct" mode (default) the three tools are called concurrently without
+    LLM planning, followed by a single structured-output call. "react" mode lets
+    the model drive the tool calls instead.
     """
 
     def __init__(self, catalog: agentc.Catalog, span: agentc.Span):
@@ -53,7 +84,7 @@ class PrevisitSummaryAgent(agentc_langgraph.agent.ReActAgent):
         """
         Execute the pre-visit summary workflow.
 
-        The agent calls three tools to gather data:
+        The summary is built from three tools:
         1. find_patient_by_id - Gets patient demographics and conditions
         2. get_previsit_questionnaire - Gets patient-reported symptoms and concerns
         3. docnotes_latest_by_patient_id - Gets most recent clinical note
@@ -62,29 +93,24 @@ class PrevisitSummaryAgent(agentc_langgraph.agent.ReActAgent):
 
         Args:
             span: Tracing span for observability
-            state: Current state with patient_id
+            state: Current state with patient_id (and optional agent_mode)
             config: LangGraph configuration
 
         Returns:
             Updated state with summary and structured data
         """
+        mode = state.get("agent_mode") or default_agent_mode()
         span.log(
             agentc.span.SystemContent(
-                value=f"Starting pre-visit summary for patient {state.get('patient_id')}"
+                value=f"Starting pre-visit summary for patient {state.get('patient_id')} ({mode})"
             )
         )
 
-        # Create ReAct agent and set recursion limit to prevent infinite loops
-        agent = self.create_react_agent(span)
-        config = (
-            {"recursion_limit": 15}
-            if not isinstance(config, dict)
-            else {**config, "recursion_limit": 15}
-        )
-
-        # Invoke agent to gather data and generate structured response
-        response = agent.invoke(input=state, config=config)
-        structured_response = response.get("structured_response", {})
+        with langchain_core.callbacks.get_usage_metadata_callback() as usage:
+            if mode == "react":
+                structured_response, message = self._invoke_react(span, state, config)
+            else:
+                structured_response, message = self._invoke_direct(span, state, config)
 
         # Update state with extracted data
         state.update(
@@ -99,14 +125,16 @@ class PrevisitSummaryAgent(agentc_langgraph.agent.ReActAgent):
                 "key_symptoms": structured_response.get("key_symptoms", []),
                 "patient_concerns": structured_response.get("patient_concerns", []),
                 "recent_note_summary": structured_response.get("recent_note_summary", ""),
+                "agent_mode": mode,
+                "token_usage": total_usage(usage.usage_metadata),
                 "is_complete": True,
                 "is_last_step": True,
             }
         )
 
         # Append AI response to message history
-        if response.get("messages"):
-            state["messages"].append(response["messages"][-1])
+        if message is not None:
+            state["messages"].append(message)
 
         span.log(
             agentc.span.SystemContent(
@@ -115,3 +143,88 @@ class PrevisitSummaryAgent(agentc_langgraph.agent.ReActAgent):
         )
 
         return state
+
+    def _invoke_react(self, span: agentc.Span, state: State, config) -> tuple:
+        """Let the ReAct agent call the tools and produce the structured response."""
+        # Create ReAct agent and set recursion limit to prevent infinite loops
+        agent = self.create_react_agent(span)
+        config = (
+            {"recursion_limit": 15}
+            if not isinstance(config, dict)
+            else {**config, "recursion_limit": 15}
+        )
+
+        # Invoke agent to gather data and generate structured response
+        response = agent.invoke(input=state, config=config)
+        messages = response.get("messages") or []
+        return response.get("structured_response", {}), (messages[-1] if messages else None)
+
+    def _invoke_direct(self, span: agentc.Span, state: State, config) -> tuple:
+        """Fetch the three inputs concurrently, then make one structured-output call."""
+        patient_id = str(state.get("patient_id"))
+        start = time.time()
+
+        def call(name: str):
+            tool = self.catalog.find("tool", name=name)
+            return tool.func(patient_id=patient_id)
+
+        results = {}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(DIRECT_TOOLS)) as pool:
+            futures = {}
+            for i, name in enumerate(DIRECT_TOOLS, start=1):
+                span.log(
+                    agentc.span.ToolCallContent(
+                        tool_name=name,
+                        tool_args={"patient_id": patient_id},
+                        tool_call_id=f"call_{i}_{name}",
+                    )
+                )
+                futures[name] = pool.submit(call, name)
+            for i, name in enumerate(DIRECT_TOOLS, start=1):
+                try:
+                    results[name] = futures[name].result()
+                except Exception as e:
+                    logger.warning(
+                        f"Pre-visit summary agent: {name} failed for patient {patient_id}: {e}"
+                    )
+                    results[name] = None
+                span.log(
+                    agentc.span.ToolResultContent(
+                        tool_call_id=f"call_{i}_{name}",
+                        tool_result={"found": bool(results[name])},
+                    )
+                )
+        span.log(
+            agentc.span.SystemContent(
+                value=f"Fetched pre-visit inputs in {time.time() - start:.2f}s"
+            )
+        )
+
+        model = self.chat_model.with_structured_output(self.output, include_raw=True)
+        result = model.invoke(
+            [
+                self.prompt_content,
+                langchain_core.messages.SystemMessage(content=DIRECT_INSTRUCTIONS),
+                langchain_core.messages.HumanMessage(
+                    content=json.dumps(
+                        {"patient_id": patient_id, **results}, ensure_ascii=False, default=str
+                    )
+                ),
+            ],
+            config=config,
+        )
+        if result.get("parsing_error"):
+            raise ValueError(f"Invalid pre-visit summary output: {result['parsing_error']}")
+
+        parsed = result.get("parsed") or {}
+        raw = result.get("raw")
+        span.log(
+            agentc.span.ChatCompletionContent(
+                output=json.dumps(parsed, ensure_ascii=False),
+                meta={
+                    "model": str(getattr(self.chat_model, "model_name", "gpt-4o-mini")),
+                    "tokens": getattr(raw, "usage_metadata", None) or {},
+                },
+            )
+        )
+        return parsed, raw
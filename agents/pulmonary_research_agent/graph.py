@@ -43,6 +43,7 @@ class PulmonaryResearcher(agentc_langgraph.graph.GraphRunnable):
             is_complete=False,
             previous_node=None,
             is_last_step=False,
+            token_usage=None,
         )
 
     def compile(self) -> langgraph.graph.StateGraph:
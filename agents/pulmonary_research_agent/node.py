@@ -1,63 +1,42 @@
 import agentc
 import agentc_langgraph.agent
+import concurrent.futures
 import json
+import logging
+import langchain_core.callbacks
 import langchain_core.messages
 import langchain_core.runnables
 import langchain_openai.chat_models
 import typing
 
+logger = logging.getLogger("cko")
 
-def _coerce_tool_result_to_papers(value: typing.Any) -> typing.Optional[list[dict]]:
-    if value is None:
-        return None
-    if isinstance(value, list) and all(isinstance(x, dict) for x in value):
-        return typing.cast(list[dict], value)
-    if isinstance(value, str):
-        s = value.strip()
-        if not s:
-            return None
-        try:
-            parsed = json.loads(s)
-        except Exception:
-            return None
-        if isinstance(parsed, list) and all(isinstance(x, dict) for x in parsed):
-            return typing.cast(list[dict], parsed)
-        return None
-    return None
-
-
-def _extract_paper_search_papers(response: dict) -> typing.Optional[list[dict]]:
-    """Attempt to extract the paper_search tool output from an agent invoke response."""
-
-    intermediate_steps = response.get("intermediate_steps")
-    if isinstance(intermediate_steps, list):
-        for step in reversed(intermediate_steps):
-            if not (isinstance(step, (list, tuple)) and len(step) >= 2):
-                continue
-            action, observation = step[0], step[1]
-            tool_name = getattr(action, "tool", None) or getattr(action, "tool_name", None)
-            if tool_name == "paper_search":
-                papers = _coerce_tool_result_to_papers(observation)
-                if papers is not None:
-                    return papers
-
-    messages = response.get("messages")
-    if isinstance(messages, list):
-        for m in reversed(messages):
-            name = getattr(m, "name", None)
-            m_type = getattr(m, "type", None)
-            if name == "paper_search" or m_type == "tool" and name == "paper_search":
-                papers = _coerce_tool_result_to_papers(getattr(m, "content", None))
-                if papers is not None:
-                    return papers
-
-    tool_results = response.get("tool_results")
-    if isinstance(tool_results, dict) and "paper_search" in tool_results:
-        papers = _coerce_tool_result_to_papers(tool_results.get("paper_search"))
-        if papers is not None:
-            return papers
-
-    return None
+TOP_K = 3
+
+# find_conditions_by_patient_id returns these messages instead of raising; none of
+# them is a condition to put in front of the paper_search query.
+NO_CONDITION = frozenset({"Database connection not available", "Patient not found", "No conditions listed"})
+
+SYNTHESIS_INSTRUCTIONS = (
+    "Steps 1-3 have already been run: the find_patient_by_id, find_conditions_by_patient_id "
+    "and paper_search results are provided below. Do not ask for tools; write the answer "
+    "from the provided papers only. If no papers are provided, say that no relevant research "
+    "was found."
+)
+
+# Patient, condition and papers come straight from the tools; the model only writes the answer.
+SYNTHESIS_OUTPUT = {
+    "title": "MedicalResearchAnswer",
+    "description": "Clinical answer grounded in the provided research papers",
+    "type": "object",
+    "properties": {
+        "answer": {
+            "type": "string",
+            "description": "Concise answer in no more than three paragraphs.",
+        },
+    },
+    "required": ["answer"],
+}
 
 
 class State(agentc_langgraph.agent.State):
@@ -72,19 +51,31 @@ class State(agentc_langgraph.agent.State):
     is_complete: bool
     previous_node: typing.Optional[str]
     is_last_step: bool
+    token_usage: typing.Optional[dict]
 
 
 class PulmonaryResearchAgent(agentc_langgraph.agent.ReActAgent):
     """
     Agent for researching pulmonary conditions and summarizing medical research.
 
-    Uses the pulmonary_research_agent prompt and paper_search tool from the catalog.
+    Uses the pulmonary_research_agent prompt and its tools from the catalog as a fixed
+    pipeline: patient + condition lookup -> paper vector search -> one structured LLM call.
     """
 
     def __init__(self, catalog: agentc.Catalog, span: agentc.Span):
         chat_model = langchain_openai.chat_models.ChatOpenAI(model="gpt-4o-mini", temperature=0)
         super().__init__(chat_model=chat_model, catalog=catalog, span=span, prompt_name="pulmonary_research_agent")
 
+    def _call_tool(self, span: agentc.Span, call_id: str, name: str, **kwargs) -> typing.Any:
+        span.log(agentc.span.ToolCallContent(tool_name=name, tool_args=kwargs, tool_call_id=call_id))
+        try:
+            result = self.catalog.find("tool", name=name).func(**kwargs)
+        except Exception as e:
+            logger.warning(f"Pulmonary research agent: {name} failed: {e}")
+            result = None
+        span.log(agentc.span.ToolResultContent(tool_call_id=call_id, tool_result={"found": bool(result)}))
+        return result
+
     def _invoke(self, span: agentc.Span, state: State, config: langchain_core.runnables.RunnableConfig) -> State:
         """
         Execute the pulmonary research workflow.
@@ -97,30 +88,90 @@ class PulmonaryResearchAgent(agentc_langgraph.agent.ReActAgent):
         Returns:
             Updated state with research results
         """
-        # Create the agent and invoke it
-        agent = self.create_react_agent(span)
-        response = agent.invoke(input=state, config=config)
-
-        # Extract structured response from the prompt output schema
-        structured_response = response.get("structured_response", {})
-
-        tool_papers = None
-        if isinstance(response, dict):
-            tool_papers = _extract_paper_search_papers(response)
+        patient_id = str(state.get("patient_id") or "")
+        question = state.get("question") or ""
+
+        # Steps 1 and 2 are independent: run them concurrently.
+        with concurrent.futures.ThreadPoolExecutor(max_workers=2) as pool:
+            patient_future = pool.submit(
+                self._call_tool, span, "call_1_find_patient", "find_patient_by_id", patient_id=patient_id
+            )
+            condition_future = pool.submit(
+                self._call_tool,
+                span,
+                "call_2_find_conditions",
+                "find_conditions_by_patient_id",
+                patient_id=patient_id,
+            )
+            patient = patient_future.result()
+            condition = condition_future.result()
+
+        patient_name = patient.get("name") if isinstance(patient, dict) and not patient.get("error") else None
+        condition = condition.strip() if isinstance(condition, str) else ""
+        if condition in NO_CONDITION:
+            # Failed or empty lookup: search with the bare question.
+            condition = ""
+
+        # Step 3: the condition is already known, so it goes into the query directly
+        # (passing patient_id would make paper_search look it up again).
+        query = f"{condition}. {question}" if condition else question
+        papers = self._call_tool(span, "call_3_paper_search", "paper_search", query=query, top_k=TOP_K)
+        # ONLY papers from the paper_search tool are returned - never LLM-generated ones.
+        papers = [p for p in papers or [] if isinstance(p, dict) and "error" not in p][:TOP_K]
+
+        # Step 4: a single synthesis call.
+        with langchain_core.callbacks.get_usage_metadata_callback() as usage:
+            model = self.chat_model.with_structured_output(SYNTHESIS_OUTPUT, include_raw=True)
+            result = model.invoke(
+                [
+                    self.prompt_content,
+                    langchain_core.messages.SystemMessage(content=SYNTHESIS_INSTRUCTIONS),
+                    langchain_core.messages.HumanMessage(
+                        content=json.dumps(
+                            {
+                                "patient_id": patient_id,
+                                "patient_name": patient_name,
+                                "condition": condition,
+                                "question": question,
+                                "papers": papers,
+                            },
+                            ensure_ascii=False,
+                            default=str,
+                        )
+                    ),
+                ],
+                config=config,
+            )
+        if result.get("parsing_error"):
+            raise ValueError(f"Invalid research answer: {result['parsing_error']}")
+        answer = (result.get("parsed") or {}).get("answer", "")
+        raw = result.get("raw")
+        span.log(
+            agentc.span.ChatCompletionContent(
+                output=answer,
+                meta={
+                    "model": str(getattr(self.chat_model, "model_name", "gpt-4o-mini")),
+                    "tokens": getattr(raw, "usage_metadata", None) or {},
+                },
+            )
+        )
 
         # Update state with research results
-        state["patient_id"] = structured_response.get("patient_id", state.get("patient_id"))
-        state["patient_name"] = structured_response.get("patient_name")
-        state["condition"] = structured_response.get("condition")
-        state["question"] = structured_response.get("question", state.get("question"))
-        # ONLY use papers from the paper_search tool - never use LLM-generated papers from structured_response
-        state["papers"] = tool_papers if tool_papers is not None else []
-        state["answer"] = structured_response.get("answer")
+        state["patient_id"] = patient_id or state.get("patient_id")
+        state["patient_name"] = patient_name
+        state["condition"] = condition
+        state["question"] = question
+        state["papers"] = papers
+        state["answer"] = answer
+        state["token_usage"] = {
+            key: sum(int(u.get(key) or 0) for u in usage.usage_metadata.values())
+            for key in ("input_tokens", "output_tokens", "total_tokens")
+        }
         state["is_complete"] = True
         state["is_last_step"] = True
 
         # Append the AI response to messages
-        if response.get("messages"):
-            state["messages"].append(response["messages"][-1])
+        if raw is not None:
+            state["messages"].append(raw)
 
         return state
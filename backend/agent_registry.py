@@ -0,0 +1,170 @@
+"""
+Lazy loading of the LangGraph agents and the Agent Catalog.
+
+Agent graph modules (and with them agentc, langchain and the tool catalog) are
+imported on first use instead of when backend.api is imported, so the server
+binds quickly on start and on every --reload. By default (AGENT_WARMUP=true) they
+are loaded in the background right after startup; async routes call load() in a
+worker thread so a request that arrives first never imports on the event loop.
+"""
+
+import importlib.util
+import logging
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger("cko")
+
+AGENTS_DIR = Path(__file__).parent.parent / "agents"
+
+# Class exported by each agent's graph.py -> agent directory.
+AGENT_CLASSES: Dict[str, str] = {
+    "PulmonaryResearcher": "pulmonary_research_agent",
+    "DocNotesSearcher": "docnotes_search_agent",
+    "PrevisitSummarizer": "previsit_summary_agent",
+    "WearableAnalyzer": "wearable_analytics_agent",
+}
+
+_lock = threading.RLock()
+_modules: Dict[str, ModuleType] = {}
+_catalog: Optional[Any] = None
+load_seconds: Dict[str, float] = {}
+
+
+def load_agent_module(agent_name: str, module_file: str = "graph.py") -> ModuleType:
+    """
+    Load an agent module with proper isolation to avoid naming conflicts.
+
+    Modules are loaded once; later calls return the cached module.
+
+    Args:
+        agent_name: Name of the agent directory (e.g., 'pulmonary_research_agent')
+        module_file: Name of the module file to load (default: 'graph.py')
+
+    Returns:
+        Loaded module
+    """
+    # Use unique module name to avoid conflicts
+    unique_module_name = f"{agent_name}_{module_file.replace('.py', '')}"
+    module = _modules.get(unique_module_name)
+    if module is not None:
+        return module
+
+    # Loading temporarily changes sys.path, so only one thread loads at a time.
+    with _lock:
+        module = _modules.get(unique_module_name)
+        if module is not None:
+            return module
+
+        start = time.perf_counter()
+        agent_dir = str(AGENTS_DIR / agent_name)
+        module_path = Path(agent_dir) / module_file
+        spec = importlib.util.spec_from_file_location(unique_module_name, str(module_path))
+        if spec is None or spec.loader is None:
+            raise RuntimeError(f"Unable to load agent module spec from {module_path}")
+
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[unique_module_name] = module
+        original_sys_path = list(sys.path)
+        if agent_dir not in sys.path:
+            sys.path.insert(0, agent_dir)
+        try:
+            spec.loader.exec_module(module)
+        except Exception:
+            sys.modules.pop(unique_module_name, None)
+            raise
+        finally:
+            sys.path = original_sys_path
+
+        _modules[unique_module_name] = module
+        load_seconds[unique_module_name] = time.perf_counter() - start
+        logger.info(
+            "Loaded agent module %s in %.2fs", unique_module_name, load_seconds[unique_module_name]
+        )
+        return module
+
+
+def catalog():
+    """The shared agentc.Catalog, created on first use."""
+    global _catalog
+    if _catalog is None:
+        with _lock:
+            if _catalog is None:
+                start = time.perf_counter()
+                import agentc
+
+                # The Auditor is configured via AGENT_CATALOG_* environment variables;
+                # traces are written to agent-catalog -> agent_activity -> logs.
+                _catalog = agentc.Catalog()
+                load_seconds["catalog"] = time.perf_counter() - start
+    return _catalog
+
+
+def agent_class(name: str):
+    return getattr(load_agent_module(AGENT_CLASSES[name]), name)
+
+
+class LazyAgentClass:
+    """Stands in for an agent class and loads its graph module on first use."""
+
+    def __init__(self, name: str):
+        self._name = name
+
+    def __call__(self, *args, **kwargs):
+        return agent_class(self._name)(*args, **kwargs)
+
+    def __getattr__(self, attr: str):
+        return getattr(agent_class(self._name), attr)
+
+    def __repr__(self) -> str:
+        return f"<LazyAgentClass {self._name}>"
+
+
+def load(name: str) -> None:
+    """Create the catalog and load one agent's module (blocking: run it in a thread)."""
+    catalog()
+    agent_class(name)
+
+
+def human_message(content: str):
+    """A LangChain HumanMessage; langchain_core is imported on first use."""
+    import langchain_core.messages
+
+    return langchain_core.messages.HumanMessage(content=content)
+
+
+def invoke_agent(agent: Any, name: str, state: dict, **kwargs) -> dict:
+    """backend.utils.agent_metrics.invoke_agent, imported on first use (it needs langchain)."""
+    from backend.utils.agent_metrics import invoke_agent as _invoke_agent
+
+    return _invoke_agent(agent, name, state, **kwargs)
+
+
+def warmup() -> dict:
+    """Create the catalog and load every agent module now."""
+    catalog()
+    for name in AGENT_CLASSES:
+        try:
+            agent_class(name)
+        except Exception as e:
+            logger.error(f"✗ Failed to load agent {name}: {e}")
+    return status()
+
+
+def status() -> dict:
+    return {
+        "catalog_loaded": _catalog is not None,
+        "agents": {
+            name: f"{agent_dir}_graph" in _modules for name, agent_dir in AGENT_CLASSES.items()
+        },
+        "load_seconds": {k: round(v, 3) for k, v in load_seconds.items()},
+    }
+
+
+def warmup_enabled() -> bool:
+    return (os.getenv("AGENT_WARMUP") or "true").strip().lower() in ("1", "true", "yes")
@@ -3,6 +3,9 @@
 ## Endpoints
 
 - **GET** `/health`
+- **GET** `/health/ready`
+- **GET** `/health/deep`
+- **GET** `/metrics`
 - **GET** `/api/patients`
 - **GET** `/api/patients/{patient_id}`
 - **POST** `/api/patients/{patient_id}/summary`
@@ -21,6 +24,8 @@
 - **POST** `/api/messages/public`
 - **POST** `/api/messages/private/{message_id}/read`
 - **POST** `/api/messages/public/{message_id}/read`
+- **POST** `/api/messages/private/{doctor_id}/read-all`
+- **POST** `/api/messages/public/read-all`
 - **GET** `/api/appointments/doctor/{doctor_id}`
 - **GET** `/api/appointments/patient/{patient_id}`
 - **POST** `/api/appointments/{appointment_id}/status`
@@ -34,11 +39,18 @@
 - **POST** `/api/research/tavily/search`
 - **POST** `/api/research/pubmed/search`
 - **POST** `/api/research/papers/add`
+- **GET** `/api/admin/query-stats`
+- **GET** `/api/admin/previsit-packets`
+- **POST** `/api/admin/previsit-packets/refresh`
+- **GET** `/api/admin/single-flight`
+- **GET** `/api/admin/write-behind`
+- **GET** `/api/admin/timings`
+- **GET** `/api/admin/timings/{request_id}`
+- **WS** `/api/ws/messages/{doctor_id}`
 """
 
 import json
 import logging
-import sys
 import time
 import uuid
 import os
@@ -51,15 +63,27 @@ import xml.etree.ElementTree as ET
 import warnings
 from contextlib import asynccontextmanager
 from datetime import datetime, timezone
-from pathlib import Path
 from typing import Any, Dict, List, Optional
 
-from fastapi import Body, FastAPI, HTTPException
+from fastapi import Body, FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.exception_handlers import http_exception_handler
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.requests import Request
-from starlette.responses import JSONResponse
+from starlette.responses import JSONResponse, Response
 
+from backend.connection import connection_manager, health_monitor
 from backend.database import db
+from backend.health import health_checker, public_view
+from backend.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from backend.metrics import HTTP_REQUEST_SECONDS, registry as metrics_registry
+from backend.query_stats import query_stats
+from backend.realtime import PUBLIC_CHANNEL, private_channel, publish_message, pubsub
+from backend.previsit_scheduler import PrevisitPacketScheduler
+from backend.questionnaires import questionnaire_index
+from backend.utils.circuit_breaker import CircuitOpenError
+from backend.utils.step_timer import StepTimer, timing_store
+from backend.utils.step_timer import verbose as verbose_timing
+from backend.write_behind import WriteBehindQueue
 from backend.models import (
     Patient,
     WearableData,
@@ -69,49 +93,19 @@ from backend.models import (
     DoctorNotesSummary,
 )
 
-import agentc
-import agentc.span  # For BeginContent, EndContent
-import importlib.util
-import langchain_core.messages
-
+from backend import agent_registry, tracing
+from backend.agent_registry import LazyAgentClass
 from backend.utils.llm_client import chat_completion_text
 from backend.utils.embedding_client import embedding_vector
-from tools._shared import get_nvidia_embedding
-
-
-def _load_agent_module(agent_name: str, module_file: str = "graph.py"):
-    """
-    Load an agent module with proper isolation to avoid naming conflicts.
-
-    Args:
-        agent_name: Name of the agent directory (e.g., 'pulmonary_research_agent')
-        module_file: Name of the module file to load (default: 'graph.py')
-
-    Returns:
-        Loaded module
-    """
-    agent_dir = str(Path(__file__).parent.parent / "agents" / agent_name)
-    module_path = Path(agent_dir) / module_file
-
-    # Use unique module name to avoid conflicts
-    unique_module_name = f"{agent_name}_{module_file.replace('.py', '')}"
-
-    spec = importlib.util.spec_from_file_location(unique_module_name, str(module_path))
-    if spec is None or spec.loader is None:
-        raise RuntimeError(f"Unable to load agent module spec from {module_path}")
-
-    module = importlib.util.module_from_spec(spec)
-    sys.modules[unique_module_name] = module
-    original_sys_path = list(sys.path)
-    if agent_dir not in sys.path:
-        sys.path.insert(0, agent_dir)
-    try:
-        spec.loader.exec_module(module)
-    finally:
-        sys.path = original_sys_path
-        # Don't clean up the unique module - keep it in sys.modules
-
-    return module
+from backend.utils.prompt_packer import (
+    budget_for,
+    log_completion_usage,
+    pack_json,
+    pack_texts,
+    truncate_to_tokens,
+)
+from backend.utils.redaction import redact_pii
+from backend.utils.single_flight import flight_key, single_flight
 
 
 def _trim_to_last_sentence(text: str) -> str:
@@ -130,36 +124,6 @@ def _trim_to_last_sentence(text: str) -> str:
     return text[: last_end + 1].strip()
 
 
-def _redact_pii(value: Any) -> Any:
-    keys_to_drop = {
-        "patient_email",
-        "patient_cell",
-        "email",
-        "phone",
-        "insurance_number",
-        "emergency_contacts",
-    }
-
-    if isinstance(value, dict):
-        out: Dict[str, Any] = {}
-        for k, v in value.items():
-            if str(k) in keys_to_drop:
-                continue
-            out[str(k)] = _redact_pii(v)
-        return out
-
-    if isinstance(value, list):
-        return [_redact_pii(v) for v in value]
-
-    if isinstance(value, str):
-        s = value
-        s = re.sub(r"[A-Z0-9._%+-]+@[A-Z0-9.-]+\.[A-Z]{2,}", "[REDACTED]", s, flags=re.I)
-        s = re.sub(r"\b\d{3}[- .]?\d{3}[- .]?\d{4}\b", "[REDACTED]", s)
-        return s
-
-    return value
-
-
 def _strip_html_to_text(html: str) -> str:
     h = str(html or "")
     if not h.strip():
@@ -202,48 +166,38 @@ def _normalize_research_papers(papers: Any) -> List[Dict[str, Any]]:
     return normalized
 
 
-# Import PulmonaryResearcher from pulmonary_research_agent/graph.py
-pulmonary_graph = _load_agent_module("pulmonary_research_agent", "graph.py")
-PulmonaryResearcher = pulmonary_graph.PulmonaryResearcher
-
-# Import DocNotesSearcher from docnotes_search_agent/graph.py
-docnotes_graph = _load_agent_module("docnotes_search_agent", "graph.py")
-DocNotesSearcher = docnotes_graph.DocNotesSearcher
+# Agent classes; each graph module (and agentc/langchain) is imported on first use.
+PulmonaryResearcher = LazyAgentClass("PulmonaryResearcher")
+DocNotesSearcher = LazyAgentClass("DocNotesSearcher")
+PrevisitSummarizer = LazyAgentClass("PrevisitSummarizer")
+WearableAnalyzer = LazyAgentClass("WearableAnalyzer")
 
-# Import PrevisitSummarizer from previsit_summary_agent/graph.py
-previsit_graph = _load_agent_module("previsit_summary_agent", "graph.py")
-PrevisitSummarizer = previsit_graph.PrevisitSummarizer
+_LAZY_AGENT_INSTANCES = {
+    "_pulmonary_researcher": "PulmonaryResearcher",
+    "_docnotes_searcher": "DocNotesSearcher",
+    "_previsit_summarizer": "PrevisitSummarizer",
+}
 
-# Import WearableAnalyzer from wearable_analytics_agent/graph.py
-wearable_graph = _load_agent_module("wearable_analytics_agent", "graph.py")
-WearableAnalyzer = wearable_graph.WearableAnalyzer
 
-# Initialize catalog and agents at module level
-# Configure Catalog to write traces to Couchbase (not just local files)
-_catalog = agentc.Catalog()
+def __getattr__(name: str):
+    """Keep the former module-level catalog/agent instances importable (loaded lazily)."""
+    if name == "_catalog":
+        return agent_registry.catalog()
+    if name in _LAZY_AGENT_INSTANCES:
+        return agent_registry.agent_class(_LAZY_AGENT_INSTANCES[name])(
+            catalog=agent_registry.catalog()
+        )
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
-def _new_backend_root_span() -> agentc.Span:
-    return _catalog.Span(
+def _new_backend_root_span():
+    return agent_registry.catalog().Span(
         name="CKO-Backend",
         application="cko-healthcare-demo",
         environment=os.getenv("ENVIRONMENT", "production"),
     )
 
 
-# Note: The Auditor is automatically configured via environment variables:
-# - AGENT_CATALOG_CONN_STRING
-# - AGENT_CATALOG_USERNAME
-# - AGENT_CATALOG_PASSWORD
-# - AGENT_CATALOG_BUCKET
-# - AGENT_CATALOG_ACTIVITY (scope for traces)
-#
-# Traces will be written to: agent-catalog → agent_activity → logs
-# after calling _catalog._auditor.flush()
-_pulmonary_researcher = PulmonaryResearcher(catalog=_catalog)
-_docnotes_searcher = DocNotesSearcher(catalog=_catalog)
-_previsit_summarizer = PrevisitSummarizer(catalog=_catalog)
-
 # Suppress non-critical Pydantic warnings
 warnings.filterwarnings(
     "ignore", category=UserWarning, module="pydantic._internal._generate_schema"
@@ -257,6 +211,24 @@ def _now_utc_iso_z() -> str:
     return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
 
 
+# Audit documents (questions asked, answers given) are written off the request path.
+audit_queue = WriteBehindQueue(
+    {
+        "research_question": lambda doc_id, doc: db.save_research_question(doc_id, doc),
+        "doctors_question": lambda doc_id, doc: db.save_doctors_question(doc_id, doc),
+        "answers_doctors": lambda doc_id, doc: db.save_answers_doctors(doc_id, doc),
+    }
+)
+
+
+async def _warm_up_agents() -> None:
+    try:
+        status = await asyncio.to_thread(agent_registry.warmup)
+        logger.info(f"✓ Agents warmed up: {status['load_seconds']}")
+    except Exception as e:
+        logger.error(f"✗ Agent warmup failed: {e}")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
@@ -275,6 +247,9 @@ async def lifespan(app: FastAPI):
     logger.info("FastAPI application starting up...")
     logger.info("=" * 60)
 
+    # Before the database connects, so the cluster and collection handles are traced.
+    tracing.configure()
+
     try:
         # Connect to database before accepting requests
         db.connect()
@@ -283,6 +258,42 @@ async def lifespan(app: FastAPI):
         logger.error(f"✗ Failed to connect to database during startup: {e}")
         # Continue anyway - _ensure_connected() will handle retries
 
+    try:
+        await health_monitor.start()
+        logger.info(f"✓ Couchbase health monitor started (every {health_monitor.interval:.0f}s)")
+    except Exception as e:
+        logger.error(f"✗ Failed to start Couchbase health monitor: {e}")
+
+    try:
+        await audit_queue.start()
+        logger.info("✓ Audit write-behind queue started")
+    except Exception as e:
+        logger.error(f"✗ Failed to start audit write-behind queue: {e}")
+
+    # Off by default: each uvicorn worker that enables it runs the nightly batch.
+    if (os.getenv("PREVISIT_SCHEDULER_ENABLED") or "false").strip().lower() in (
+        "1",
+        "true",
+        "yes",
+    ):
+        await previsit_packets.start()
+        logger.info(f"✓ Pre-visit packet scheduler armed (daily at {previsit_packets.run_at})")
+
+    if (os.getenv("QUESTIONNAIRE_WATCH") or "true").strip().lower() in ("1", "true", "yes"):
+        if questionnaire_index.start_watching():
+            logger.info("✓ Questionnaire index watching for file changes (inotify)")
+
+    try:
+        await pubsub.start()
+        logger.info(f"✓ Message pub/sub started ({type(pubsub).__name__})")
+    except Exception as e:
+        logger.error(f"✗ Failed to start message pub/sub: {e}")
+
+    warmup_task = None
+    if agent_registry.warmup_enabled():
+        # Load agents in the background so startup does not wait for them.
+        warmup_task = asyncio.create_task(_warm_up_agents())
+
     logger.info("=" * 60)
     logger.info("✓ FastAPI application ready to accept requests")
     logger.info("=" * 60)
@@ -294,12 +305,40 @@ async def lifespan(app: FastAPI):
     logger.info("FastAPI application shutting down...")
     logger.info("=" * 60)
 
+    try:
+        await previsit_packets.stop()
+    except Exception as e:
+        logger.warning(f"Warning stopping pre-visit packet scheduler: {e}")
+
+    questionnaire_index.stop_watching()
+
+    if warmup_task is not None and not warmup_task.done():
+        warmup_task.cancel()
+
+    try:
+        await audit_queue.stop()
+        logger.info("✓ Audit write-behind queue drained")
+    except Exception as e:
+        logger.warning(f"Warning draining audit write-behind queue: {e}")
+
+    try:
+        await pubsub.close()
+    except Exception as e:
+        logger.warning(f"Warning closing message pub/sub: {e}")
+
+    try:
+        await health_monitor.stop()
+    except Exception as e:
+        logger.warning(f"Warning stopping Couchbase health monitor: {e}")
+
     try:
         db.close()
         logger.info("✓ Database connections closed")
     except Exception as e:
         logger.warning(f"Warning during shutdown: {e}")
 
+    tracing.shutdown()
+
     logger.info("=" * 60)
     logger.info("✓ FastAPI application shutdown complete")
     logger.info("=" * 60)
@@ -313,50 +352,77 @@ app = FastAPI(
 )
 
 
+def _route_template(request: Request) -> Optional[str]:
+    return getattr(request.scope.get("route"), "path", None)
+
+
+def _observe_request(request: Request, status: int, duration_ms: float) -> None:
+    # Label by route template (/api/patients/{patient_id}), never the raw path.
+    HTTP_REQUEST_SECONDS.observe(
+        duration_ms / 1000,
+        method=request.method,
+        route=_route_template(request) or "unmatched",
+        status=str(status),
+    )
+
+
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
     request_id = request.headers.get("x-request-id") or str(uuid.uuid4())
     request.state.request_id = request_id
     start = time.perf_counter()
-    try:
-        response = await call_next(request)
-    except Exception:
-        duration_ms = (time.perf_counter() - start) * 1000
-        logger.exception(
-            "Unhandled exception request_id=%s method=%s path=%s duration_ms=%.2f",
-            request_id,
-            request.method,
-            request.url.path,
-            duration_ms,
-        )
-        raise
+    with tracing.server_span(
+        request.method, request.url.path, request.headers.items(), request_id
+    ) as span:
+        try:
+            response = await call_next(request)
+        except Exception:
+            duration_ms = (time.perf_counter() - start) * 1000
+            _observe_request(request, 500, duration_ms)
+            tracing.finish_server_span(span, request.method, _route_template(request), 500)
+            logger.exception(
+                "Unhandled exception request_id=%s method=%s path=%s duration_ms=%.2f",
+                request_id,
+                request.method,
+                request.url.path,
+                duration_ms,
+            )
+            raise
 
-    try:
-        response.headers["X-Request-ID"] = request_id
-    except Exception:
-        pass
+        try:
+            response.headers["X-Request-ID"] = request_id
+        except Exception:
+            pass
 
-    duration_ms = (time.perf_counter() - start) * 1000
+        status = getattr(response, "status_code", 0)
+        duration_ms = (time.perf_counter() - start) * 1000
+        _observe_request(request, status, duration_ms)
+        tracing.finish_server_span(span, request.method, _route_template(request), status)
     logger.info(
         "request request_id=%s method=%s path=%s status=%s duration_ms=%.2f",
         request_id,
         request.method,
         request.url.path,
-        getattr(response, "status_code", "?"),
+        status or "?",
         duration_ms,
     )
     return response
 
 
-@app.middleware("http")
-async def require_api_key(request: Request, call_next):
+def _has_api_key(request: Request) -> bool:
+    """True when API_KEY is unset or the request sends it in x-api-key."""
     expected = (os.getenv("API_KEY") or "").strip()
     if not expected:
+        return True
+    return (request.headers.get("x-api-key") or "").strip() == expected
+
+
+@app.middleware("http")
+async def require_api_key(request: Request, call_next):
+    # Health checks stay open for load balancers (they hide details without the key).
+    if request.url.path in ("/health", "/health/ready", "/health/deep"):
         return await call_next(request)
-    if request.url.path == "/health":
-        return await call_next(request)
-    provided = (request.headers.get("x-api-key") or "").strip()
-    if provided != expected:
+    if not _has_api_key(request):
         return JSONResponse({"detail": "Unauthorized"}, status_code=401)
     return await call_next(request)
 
@@ -378,11 +444,77 @@ app.add_middleware(
 )
 
 
+def _circuit_open_response(exc: CircuitOpenError) -> JSONResponse:
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(max(1, int(exc.retry_after + 0.5)))},
+    )
+
+
+@app.exception_handler(CircuitOpenError)
+async def circuit_open_handler(request: Request, exc: CircuitOpenError):
+    return _circuit_open_response(exc)
+
+
+@app.exception_handler(HTTPException)
+async def circuit_aware_http_exception_handler(request: Request, exc: HTTPException):
+    # Endpoints turn any exception into a 500; report an open circuit as 503 instead.
+    if exc.status_code == 500 and isinstance(exc.__context__, CircuitOpenError):
+        return _circuit_open_response(exc.__context__)
+    return await http_exception_handler(request, exc)
+
+
 # Health Check
 @app.get("/health")
-def health():
-    """Health check endpoint."""
-    return {"ok": True, "service": "Healthcare API"}
+def health(request: Request):
+    """Health check endpoint, including the Couchbase circuit and health monitor."""
+    breaker = connection_manager.breaker.snapshot()
+    report = {
+        "ok": True,
+        "service": "Healthcare API",
+        # Still ok (the process is alive); degraded while Couchbase calls fail fast.
+        "degraded": breaker["state"] != "closed",
+        "couchbase": {
+            "circuit": breaker,
+            "connection": connection_manager.stats(),
+            "monitor": health_monitor.status(),
+        },
+    }
+    return report if _has_api_key(request) else public_view(report)
+
+
+@app.get("/health/ready")
+async def health_ready(request: Request):
+    """Readiness probe: 200 while Couchbase answers KV and query probes, else 503."""
+    report = await health_checker.ready()
+    if not _has_api_key(request):
+        report = public_view(report)
+    return JSONResponse(status_code=200 if report["ready"] else 503, content=report)
+
+
+@app.get("/health/deep")
+async def health_deep(request: Request, refresh: bool = False):
+    """
+    Per-dependency status and latency (Couchbase KV/query, embedding, LLM).
+
+    Results are cached for HEALTH_CACHE_SECONDS; ``refresh=true`` probes again and,
+    since that makes paid embedding/LLM calls, requires the API key.
+    Returns 503 when a required dependency is down, 200 (possibly "degraded") otherwise.
+    """
+    authorized = _has_api_key(request)
+    if refresh and not authorized:
+        raise HTTPException(status_code=401, detail="refresh=true requires the API key")
+    report = await health_checker.deep(force=refresh)
+    if not authorized:
+        report = public_view(report)
+    return JSONResponse(status_code=503 if report["status"] == "down" else 200, content=report)
+
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus metrics: HTTP, CouchbaseDB, SQL++, LLM/embedding and agent latency."""
+    return Response(content=metrics_registry.render(), media_type=METRICS_CONTENT_TYPE)
 
 
 # Patient Endpoints
@@ -429,8 +561,16 @@ async def summarize_patient(patient_id: str):
         except Exception:
             questionnaire = None
 
-        patient_redacted = _redact_pii(patient)
-        questionnaire_redacted = _redact_pii(questionnaire) if questionnaire else None
+        patient_redacted = redact_pii(patient)
+        questionnaire_redacted = redact_pii(questionnaire) if questionnaire else None
+
+        # The profile gets a third of the budget; the questionnaire's long free text
+        # is shortened before any short field (names, numbers, dates) is touched.
+        budget = budget_for("patient_summary")
+        patient_packed = pack_json(patient_redacted, budget // 3)
+        questionnaire_packed = pack_json(questionnaire_redacted, budget - patient_packed.tokens_out)
+        patient_packed.log("patient_summary.patient")
+        questionnaire_packed.log("patient_summary.questionnaire")
 
         prompt = (
             "You are a clinical assistant. Write ONE paragraph summarizing the patient's profile and, if available, "
@@ -440,15 +580,16 @@ async def summarize_patient(patient_id: str):
             "If a value is missing, state it is not provided rather than guessing. "
             "Do NOT include any email addresses, phone numbers, insurance numbers, emergency contacts, or other personal contact information. "
             "End with a period.\n\n"
-            f"Patient JSON:\n{json.dumps(patient_redacted, ensure_ascii=False)}\n\n"
-            f"Pre-visit questionnaire JSON (if present):\n{json.dumps(questionnaire_redacted, ensure_ascii=False)}"
+            f"Patient JSON:\n{patient_packed.items[0]}\n\n"
+            f"Pre-visit questionnaire JSON (if present):\n{questionnaire_packed.items[0]}"
         )
 
-        text, _raw = await chat_completion_text(
+        text, raw = await chat_completion_text(
             messages=[{"role": "user", "content": prompt}],
             max_tokens=220,
             temperature=0.0,
         )
+        log_completion_usage("patient_summary", raw)
 
         summary = _trim_to_last_sentence(text)
         return {"patient_id": str(patient_id), "patient": patient_redacted, "summary": summary}
@@ -503,6 +644,50 @@ async def get_patient_wearables(patient_id: str, days: int = 30):
         raise HTTPException(status_code=500, detail=f"Error fetching wearable data: {str(e)}")
 
 
+async def _generate_wearables_summary(patient_id: str, days_i: int = 30) -> dict:
+    wearable_data = db.get_wearables_for_patient(patient_id, days=days_i)
+    patient = None
+    try:
+        patient = db.get_patient(patient_id)
+    except Exception:
+        patient = None
+
+    heart_rate = list((wearable_data or {}).get("heart_rate") or [])
+    step_count = list((wearable_data or {}).get("step_count") or [])
+    timestamps = list((wearable_data or {}).get("timestamps") or [])
+    num_points = min(len(heart_rate), len(step_count), len(timestamps))
+
+    series = []
+    for i in range(num_points):
+        series.append(
+            {
+                "date": str(timestamps[i]),
+                "heart_rate": int(heart_rate[i] or 0),
+                "steps": int(step_count[i] or 0),
+            }
+        )
+
+    patient_name = str((patient or {}).get("name") or "")
+    prompt = (
+        "You are a clinical assistant. Summarize the patient's last "
+        f"{days_i} days of wearable data (heart rate and steps) in ONE paragraph. "
+        "Identify meaningful patterns and trends with concrete examples (e.g., early period vs late period, "
+        "increasing steps over last 5 days, sustained elevation in heart rate). "
+        "Be factual and concise. Do not mention that you are an AI. End with a period.\n\n"
+        f"Patient: {patient_name or patient_id}\n"
+        f"Data points: {num_points}\n"
+        f"Time series JSON (chronological): {json.dumps(series, ensure_ascii=False)}"
+    )
+
+    text, _raw = await chat_completion_text(
+        messages=[{"role": "user", "content": prompt}],
+        max_tokens=220,
+        temperature=0.2,
+    )
+    summary = _trim_to_last_sentence(text)
+    return {"patient_id": str(patient_id), "days": int(days_i), "summary": summary}
+
+
 @app.get("/api/patients/{patient_id}/wearables/summary", response_model=WearablesSummary)
 async def get_patient_wearables_summary(patient_id: str, days: int = 30):
     """Generate a one-paragraph summary of the last N days of wearable data."""
@@ -518,47 +703,16 @@ async def get_patient_wearables_summary(patient_id: str, days: int = 30):
         if days_i > 60:
             days_i = 60
 
-        wearable_data = db.get_wearables_for_patient(patient_id, days=days_i)
-        patient = None
-        try:
-            patient = db.get_patient(patient_id)
-        except Exception:
-            patient = None
-
-        heart_rate = list((wearable_data or {}).get("heart_rate") or [])
-        step_count = list((wearable_data or {}).get("step_count") or [])
-        timestamps = list((wearable_data or {}).get("timestamps") or [])
-        num_points = min(len(heart_rate), len(step_count), len(timestamps))
-
-        series = []
-        for i in range(num_points):
-            series.append(
-                {
-                    "date": str(timestamps[i]),
-                    "heart_rate": int(heart_rate[i] or 0),
-                    "steps": int(step_count[i] or 0),
-                }
+        if days_i == 30:
+            cached = await asyncio.to_thread(
+                previsit_packets.get_fresh, patient_id, "wearables_summary"
             )
-
-        patient_name = str((patient or {}).get("name") or "")
-        prompt = (
-            "You are a clinical assistant. Summarize the patient's last "
-            f"{days_i} days of wearable data (heart rate and steps) in ONE paragraph. "
-            "Identify meaningful patterns and trends with concrete examples (e.g., early period vs late period, "
-            "increasing steps over last 5 days, sustained elevation in heart rate). "
-            "Be factual and concise. Do not mention that you are an AI. End with a period.\n\n"
-            f"Patient: {patient_name or patient_id}\n"
-            f"Data points: {num_points}\n"
-            f"Time series JSON (chronological): {json.dumps(series, ensure_ascii=False)}"
-        )
-
-        text, _raw = await chat_completion_text(
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=220,
-            temperature=0.2,
+            if cached:
+                return cached
+        key = flight_key(
+            "wearables_summary", patient_id, f"days={days_i}", await _data_version(patient_id)
         )
-        summary = _trim_to_last_sentence(text)
-        return {"patient_id": str(patient_id), "days": int(days_i), "summary": summary}
+        return await single_flight.do(key, lambda: _generate_wearables_summary(patient_id, days_i))
     except HTTPException:
         raise
     except Exception as e:
@@ -575,49 +729,50 @@ async def analyze_wearable_data(
     Returns structured alerts, similar patients, and recommendations.
     """
     start_time = time.perf_counter()
-    print(f"\n{'=' * 80}")
-    print(f"⏱️  [ENDPOINT] Starting wearable analysis for patient {patient_id}")
-    print(f"    Question: {payload.question}")
-    print(f"    Days: {payload.days}")
-    print(f"{'=' * 80}\n")
+    request_id = getattr(getattr(request, "state", None), "request_id", None) or str(uuid.uuid4())
+    timer = StepTimer("wearables_analyze", request_id=request_id, agent="wearable_analytics_agent")
+    logger.info(
+        "analyze_wearable_data patient_id=%s days=%s request_id=%s",
+        patient_id,
+        payload.days,
+        request_id,
+    )
 
     try:
         # Override patient_id from path parameter
         payload.patient_id = patient_id
 
-        print(
-            f"⏱️  [ENDPOINT] Building starting state... (elapsed: {time.perf_counter() - start_time:.2f}s)"
-        )
-        # Build starting state for the agent
-        state = WearableAnalyzer.build_starting_state(
-            patient_id=patient_id, question=payload.question, days=payload.days
-        )
-        print(f"✅ [ENDPOINT] State built in {time.perf_counter() - start_time:.2f}s")
+        import agentc.span  # For BeginContent, EndContent
 
-        # Add the request as a human message in JSON format
-        state["messages"].append(
-            langchain_core.messages.HumanMessage(
-                content=f'{{"patient_id": "{patient_id}", "question": "{payload.question}", "days": {payload.days}}}'
+        with timer.step("build_state"):
+            await asyncio.to_thread(agent_registry.load, "WearableAnalyzer")
+            # Build starting state for the agent
+            state = WearableAnalyzer.build_starting_state(
+                patient_id=patient_id, question=payload.question, days=payload.days
             )
-        )
 
-        print(f"⏱️  [ENDPOINT] Invoking agent... (elapsed: {time.perf_counter() - start_time:.2f}s)")
-        agent_start = time.perf_counter()
+            # Add the request as a human message in JSON format
+            state["messages"].append(
+                agent_registry.human_message(
+                    f'{{"patient_id": "{patient_id}", "question": "{payload.question}", "days": {payload.days}}}'
+                )
+            )
 
         # Create a new span for this agent session (required for Agent Tracer UI)
-        request_id = getattr(getattr(request, "state", None), "request_id", None) or str(
-            uuid.uuid4()
-        )
         root_span = _new_backend_root_span()
-        with root_span.new(
-            name="WearableAnalyzer.Session",
-            agent="wearable_analytics_agent",
-            agent_name="wearable_analytics_agent",  # Explicit tag for UI filtering
-            agent_type="wearable_analyzer",
-            endpoint="POST /api/patients/{patient_id}/wearables/analyze",
-            patient_id=str(patient_id),
-            request_id=str(request_id),
-        ) as session_span:
+        with (
+            timer.activate(),
+            timer.step("agent", kind="agent"),
+            root_span.new(
+                name="WearableAnalyzer.Session",
+                agent="wearable_analytics_agent",
+                agent_name="wearable_analytics_agent",  # Explicit tag for UI filtering
+                agent_type="wearable_analyzer",
+                endpoint="POST /api/patients/{patient_id}/wearables/analyze",
+                patient_id=str(patient_id),
+                request_id=str(request_id),
+            ) as session_span,
+        ):
             # Log session start
             session_span.log(
                 agentc.span.BeginContent(
@@ -626,135 +781,116 @@ async def analyze_wearable_data(
             )
 
             # Invoke the wearable analytics agent
-            agent_result = WearableAnalyzer(catalog=_catalog, span=session_span).invoke(input=state)
+            agent_result = agent_registry.invoke_agent(
+                WearableAnalyzer(catalog=agent_registry.catalog(), span=session_span),
+                "wearable_analytics_agent",
+                state,
+                patient_count=lambda r: 1 + len(r.get("similar_patients") or []),
+            )
 
             # Log session end
             session_span.log(agentc.span.EndContent(state=agent_result))
 
-        agent_duration = time.perf_counter() - agent_start
-        print(f"✅ [ENDPOINT] Agent completed in {agent_duration:.2f}s")
-
-        # Calculate analysis duration
-        analysis_duration = time.perf_counter() - start_time
-
-        print(
-            f"⏱️  [ENDPOINT] Extracting and restructuring results... (elapsed: {analysis_duration:.2f}s)"
-        )
-
-        # Get raw results from agent
-        alerts = agent_result.get("alerts", [])
-        similar_patients = agent_result.get("similar_patients", [])
-        recommendations_list = agent_result.get("recommendations", [])
-        trend_analysis = agent_result.get("trend_analysis", {})
-        patient_comparison = agent_result.get("patient_comparison", {})
-        research_papers = agent_result.get("research_papers", [])  # NEW
-
-        # DEBUG: Print patient comparison data
-        print("📊 [DEBUG] Patient Comparison Data:")
-        print(f"    Type: {type(patient_comparison)}")
-        print(
-            f"    Keys: {patient_comparison.keys() if isinstance(patient_comparison, dict) else 'N/A'}"
-        )
-        print(
-            f"    Summary: {patient_comparison.get('summary', 'MISSING') if isinstance(patient_comparison, dict) else 'NOT A DICT'}"
-        )
-        print(
-            f"    Outlier Status: {patient_comparison.get('outlier_status', 'MISSING') if isinstance(patient_comparison, dict) else 'NOT A DICT'}"
-        )
-        print(
-            f"    Comparison Points: {patient_comparison.get('comparison_points', 'MISSING') if isinstance(patient_comparison, dict) else 'NOT A DICT'}"
-        )
-        print(f"📚 [DEBUG] Research Papers: {len(research_papers)} papers found")
-
-        # Extract recommendations from trend_analysis if not in recommendations_list
-        if not recommendations_list and trend_analysis:
-            recommendations_list = trend_analysis.get("recommendations", [])
-
-        # Enrich alerts with clinical context
-        enriched_alerts = []
-        for alert in alerts:
-            enriched_alert = {
-                "severity": alert.get("severity", "unknown").upper(),
-                "metric": alert.get("metric", ""),
-                "message": alert.get("message", ""),
-                "clinical_significance": alert.get("clinical_significance", ""),
-                "threshold": alert.get("threshold"),
-                "values": alert.get("values", []),
-            }
-            enriched_alerts.append(enriched_alert)
-
-        # Enrich similar patients with matching details
-        enriched_similar_patients = []
-        for patient in similar_patients:
-            enriched_patient = {
-                "patient_id": patient.get("patient_id", ""),
-                "patient_name": patient.get("patient_name", "Unknown"),
-                "age": patient.get("age"),
-                "gender": patient.get("gender", ""),
-                "medical_conditions": patient.get("medical_conditions", ""),
-                "similarity_score": 100,  # Frontend expects similarity_score, not match_percentage
-                "matching_criteria": [],
-            }
-
-            # Add matching criteria
-            if patient.get("age"):
-                enriched_patient["matching_criteria"].append(f"Similar age ({patient['age']})")
-            if patient.get("gender"):
-                enriched_patient["matching_criteria"].append(f"Same gender ({patient['gender']})")
-            if patient.get("medical_conditions"):
-                enriched_patient["matching_criteria"].append(
-                    f"Same condition ({patient['medical_conditions']})"
+        with timer.step("format_response"):
+            # Get raw results from agent
+            alerts = agent_result.get("alerts", [])
+            similar_patients = agent_result.get("similar_patients", [])
+            recommendations_list = agent_result.get("recommendations", [])
+            trend_analysis = agent_result.get("trend_analysis", {})
+            patient_comparison = agent_result.get("patient_comparison", {})
+            research_papers = agent_result.get("research_papers", [])  # NEW
+
+            if verbose_timing():
+                logger.info(
+                    "Wearable analysis request_id=%s patient_comparison=%s research_papers=%s",
+                    request_id,
+                    patient_comparison,
+                    len(research_papers),
                 )
 
-            enriched_similar_patients.append(enriched_patient)
-
-        # Structure recommendations properly
-        structured_recommendations = []
-        for rec in recommendations_list:
-            if isinstance(rec, str):
-                structured_recommendations.append({"recommendation": rec, "priority": "medium"})
-            elif isinstance(rec, dict):
-                structured_recommendations.append(rec)
-
-        # Normalize research papers
-        normalized_research_papers = _normalize_research_papers(research_papers)
-
-        # Build clean response without redundant text summary
-        result = {
-            "patient_id": agent_result.get("patient_id", patient_id),
-            "patient_name": agent_result.get("patient_name", "Unknown"),
-            "patient_condition": agent_result.get("patient_condition", ""),
-            "question": agent_result.get("question", payload.question),
-            "answer": agent_result.get("answer", ""),  # LLM-generated conversational summary
-            "alerts": enriched_alerts,
-            "similar_patients": enriched_similar_patients,
-            "patient_comparison": patient_comparison,
-            "research_papers": normalized_research_papers,  # NEW: Add research papers
-            "recommendations": structured_recommendations,
-            "wearable_data_summary": {
-                "data_points": len(agent_result.get("wearable_data", [])),
-                "period_days": payload.days,
-            },
-            "generated_at": datetime.now().isoformat(),
-            "analysis_duration_seconds": round(analysis_duration, 2),
-        }
+            # Extract recommendations from trend_analysis if not in recommendations_list
+            if not recommendations_list and trend_analysis:
+                recommendations_list = trend_analysis.get("recommendations", [])
+
+            # Enrich alerts with clinical context
+            enriched_alerts = []
+            for alert in alerts:
+                enriched_alert = {
+                    "severity": alert.get("severity", "unknown").upper(),
+                    "metric": alert.get("metric", ""),
+                    "message": alert.get("message", ""),
+                    "clinical_significance": alert.get("clinical_significance", ""),
+                    "threshold": alert.get("threshold"),
+                    "values": alert.get("values", []),
+                }
+                enriched_alerts.append(enriched_alert)
+
+            # Enrich similar patients with matching details
+            enriched_similar_patients = []
+            for patient in similar_patients:
+                enriched_patient = {
+                    "patient_id": patient.get("patient_id", ""),
+                    "patient_name": patient.get("patient_name", "Unknown"),
+                    "age": patient.get("age"),
+                    "gender": patient.get("gender", ""),
+                    "medical_conditions": patient.get("medical_conditions", ""),
+                    "similarity_score": 100,  # Frontend expects similarity_score, not match_percentage
+                    "matching_criteria": [],
+                }
 
-        print(f"\n{'=' * 80}")
-        print(f"✨ [ENDPOINT] COMPLETE - Total time: {analysis_duration:.2f}s")
-        print(
-            f"    Agent time: {agent_duration:.2f}s ({agent_duration / analysis_duration * 100:.1f}%)"
-        )
-        print(f"    Alerts: {len(enriched_alerts)}")
-        print(f"    Research Papers: {len(normalized_research_papers)}")
-        print(f"    Similar Patients: {len(enriched_similar_patients)}")
-        print(f"    Recommendations: {len(structured_recommendations)}")
-        print(f"{'=' * 80}\n")
-        print(f"    Similar Patients: {len(enriched_similar_patients)}")
-        print(f"    Recommendations: {len(structured_recommendations)}")
-        print(f"{'=' * 80}\n")
+                # Add matching criteria
+                if patient.get("age"):
+                    enriched_patient["matching_criteria"].append(f"Similar age ({patient['age']})")
+                if patient.get("gender"):
+                    enriched_patient["matching_criteria"].append(
+                        f"Same gender ({patient['gender']})"
+                    )
+                if patient.get("medical_conditions"):
+                    enriched_patient["matching_criteria"].append(
+                        f"Same condition ({patient['medical_conditions']})"
+                    )
+
+                enriched_similar_patients.append(enriched_patient)
+
+            # Structure recommendations properly
+            structured_recommendations = []
+            for rec in recommendations_list:
+                if isinstance(rec, str):
+                    structured_recommendations.append({"recommendation": rec, "priority": "medium"})
+                elif isinstance(rec, dict):
+                    structured_recommendations.append(rec)
+
+            # Normalize research papers
+            normalized_research_papers = _normalize_research_papers(research_papers)
+
+            analysis_duration = time.perf_counter() - start_time
+
+            # Build clean response without redundant text summary
+            result = {
+                "patient_id": agent_result.get("patient_id", patient_id),
+                "patient_name": agent_result.get("patient_name", "Unknown"),
+                "patient_condition": agent_result.get("patient_condition", ""),
+                "question": agent_result.get("question", payload.question),
+                "answer": agent_result.get("answer", ""),  # LLM-generated conversational summary
+                "alerts": enriched_alerts,
+                "similar_patients": enriched_similar_patients,
+                "patient_comparison": patient_comparison,
+                "research_papers": normalized_research_papers,  # NEW: Add research papers
+                "recommendations": structured_recommendations,
+                "wearable_data_summary": {
+                    "data_points": len(agent_result.get("wearable_data", [])),
+                    "period_days": payload.days,
+                },
+                "generated_at": datetime.now().isoformat(),
+                "analysis_duration_seconds": round(analysis_duration, 2),
+            }
 
+        timer.finish(patients=1 + len(similar_patients))
         logger.info(
-            "Wearable analysis completed for patient_id=%s in %.2fs", patient_id, analysis_duration
+            "Wearable analysis completed for patient_id=%s in %.2fs: %s",
+            patient_id,
+            analysis_duration,
+            timer.summary(),
         )
 
         # Agent Tracer logs are automatically flushed when spans close
@@ -766,9 +902,13 @@ async def analyze_wearable_data(
     except HTTPException:
         raise
     except Exception as e:
-        error_time = time.perf_counter() - start_time
-        print(f"\n❌ [ENDPOINT] ERROR after {error_time:.2f}s: {str(e)}\n")
-        logger.exception("Error analyzing wearable data for patient_id=%s: %s", patient_id, str(e))
+        timer.finish()
+        logger.exception(
+            "Error analyzing wearable data for patient_id=%s after %.2fs: %s",
+            patient_id,
+            time.perf_counter() - start_time,
+            str(e),
+        )
         raise HTTPException(status_code=500, detail=f"Error analyzing wearable data: {str(e)}")
 
 
@@ -788,15 +928,85 @@ async def create_or_update_patient(patient: Patient):
 
 # Doctor Notes Endpoints
 @app.get("/api/patients/{patient_id}/doctor-notes")
-async def get_patient_doctor_notes(patient_id: str):
-    """Get all doctor notes for a patient"""
+async def get_patient_doctor_notes(
+    patient_id: str, limit: Optional[int] = None, cursor: Optional[str] = None
+):
+    """
+    Get doctor notes for a patient, newest first.
+
+    All notes unless ``limit`` or ``cursor`` is given; then one page (pass
+    next_cursor back as cursor).
+    """
     try:
-        notes = db.get_doctor_notes_for_patient(patient_id)
-        return {"patient_id": patient_id, "notes": notes, "count": len(notes)}
+        if limit is None and cursor is None:
+            page = {"items": db.get_doctor_notes_for_patient(patient_id), "next_cursor": None}
+        else:
+            page = db.get_doctor_notes_for_patient_page(patient_id, limit, cursor)
+        notes = page["items"]
+        return {
+            "patient_id": patient_id,
+            "notes": notes,
+            "count": len(notes),
+            "next_cursor": page["next_cursor"],
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching doctor notes: {str(e)}")
 
 
+async def _generate_doctor_notes_summary(patient_id: str, max_notes_i: int = 20) -> dict:
+    notes = db.get_doctor_notes_for_patient(patient_id) or []
+    note_count = len(notes)
+
+    patient = None
+    try:
+        patient = db.get_patient(patient_id)
+    except Exception:
+        patient = None
+    patient_name = str((patient or {}).get("name") or "")
+
+    # Most recent notes first, each capped, until the endpoint's token budget is used.
+    packed = pack_texts(
+        (
+            {"date": str(n.get("date") or ""), "content": redact_pii(str(n.get("content") or ""))}
+            for n in notes[:max_notes_i]
+        ),
+        budget_for("doctor_notes_summary"),
+        text_of=lambda n: n["content"],
+        with_text=lambda n, text: {**n, "content": text},
+        rank=lambda n: n["date"],
+        per_item_max=400,
+    )
+    packed.log("doctor_notes_summary")
+    notes_for_prompt = packed.items
+
+    prompt = (
+        "You are a clinical assistant. Summarize the patient's doctor visit notes in ONE paragraph. "
+        "Focus on the most important clinical themes: key symptoms, diagnoses, treatments/med changes, "
+        "test results, plans, and follow-up. Be factual, concise, and avoid speculation. "
+        "Do NOT mention the patient's age unless it appears verbatim in the provided notes content; do not infer or guess it. "
+        "Do NOT add demographic details that are not present in the provided notes. "
+        "Do not mention that you are an AI. End with a period.\n\n"
+        f"Patient: {patient_name or patient_id}\n"
+        f"Total notes available: {note_count}\n"
+        f"Notes JSON (most recent first, truncated): {json.dumps(notes_for_prompt, ensure_ascii=False)}"
+    )
+
+    text, raw = await chat_completion_text(
+        messages=[{"role": "user", "content": prompt}],
+        max_tokens=240,
+        temperature=0.0,
+    )
+    log_completion_usage("doctor_notes_summary", raw)
+    summary = _trim_to_last_sentence(text)
+    return {
+        "patient_id": str(patient_id),
+        "note_count": int(note_count),
+        "summary": summary,
+    }
+
+
 @app.get("/api/patients/{patient_id}/doctor-notes/summary", response_model=DoctorNotesSummary)
 async def get_patient_doctor_notes_summary(patient_id: str, max_notes: int = 20):
     """Generate a one-paragraph summary of a patient's doctor notes."""
@@ -814,46 +1024,13 @@ async def get_patient_doctor_notes_summary(patient_id: str, max_notes: int = 20)
         if max_notes_i > 50:
             max_notes_i = 50
 
-        notes = db.get_doctor_notes_for_patient(patient_id) or []
-        note_count = len(notes)
-
-        patient = None
-        try:
-            patient = db.get_patient(patient_id)
-        except Exception:
-            patient = None
-        patient_name = str((patient or {}).get("name") or "")
-
-        notes_for_prompt = []
-        for n in notes[:max_notes_i]:
-            content = str(n.get("content") or "")
-            if len(content) > 800:
-                content = content[:800].rstrip() + "…"
-            notes_for_prompt.append({"date": str(n.get("date") or ""), "content": content})
-
-        prompt = (
-            "You are a clinical assistant. Summarize the patient's doctor visit notes in ONE paragraph. "
-            "Focus on the most important clinical themes: key symptoms, diagnoses, treatments/med changes, "
-            "test results, plans, and follow-up. Be factual, concise, and avoid speculation. "
-            "Do NOT mention the patient's age unless it appears verbatim in the provided notes content; do not infer or guess it. "
-            "Do NOT add demographic details that are not present in the provided notes. "
-            "Do not mention that you are an AI. End with a period.\n\n"
-            f"Patient: {patient_name or patient_id}\n"
-            f"Total notes available: {note_count}\n"
-            f"Notes JSON (most recent first, truncated): {json.dumps(notes_for_prompt, ensure_ascii=False)}"
-        )
-
-        text, _raw = await chat_completion_text(
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=240,
-            temperature=0.0,
-        )
-        summary = _trim_to_last_sentence(text)
-        return {
-            "patient_id": str(patient_id),
-            "note_count": int(note_count),
-            "summary": summary,
-        }
+        if max_notes_i == 20:
+            cached = await asyncio.to_thread(
+                previsit_packets.get_fresh, patient_id, "doctor_notes_summary"
+            )
+            if cached:
+                return cached
+        return await _generate_doctor_notes_summary(patient_id, max_notes_i)
     except HTTPException:
         raise
     except Exception as e:
@@ -897,10 +1074,7 @@ async def search_patient_doctor_notes(request: Request, patient_id: str, payload
             "doctor_name": doctor_name,
             "timestamp": timestamp,
         }
-        try:
-            db.save_doctors_question(question_id, question_doc)
-        except Exception as e:
-            logger.warning("Warning: Failed to save doctors question: %s", e)
+        audit_queue.enqueue("doctors_question", question_id, question_doc)
 
         logger.info(
             "search_patient_doctor_notes patient_id=%s question_len=%s patient_name=%s",
@@ -910,14 +1084,15 @@ async def search_patient_doctor_notes(request: Request, patient_id: str, payload
         )
 
         # Use the doc notes search agent directly
+        await asyncio.to_thread(agent_registry.load, "DocNotesSearcher")
         state = DocNotesSearcher.build_starting_state(patient_id=patient_id, question=question)
         if patient_name:
             state["patient_name"] = patient_name
 
         # Add the question as a human message in JSON format
         state["messages"].append(
-            langchain_core.messages.HumanMessage(
-                content=f'{{"patient_id": "{patient_id}", "patient_name": "{patient_name or ""}", "question": "{question}"}}'
+            agent_registry.human_message(
+                f'{{"patient_id": "{patient_id}", "patient_name": "{patient_name or ""}", "question": "{question}"}}'
             )
         )
 
@@ -932,7 +1107,11 @@ async def search_patient_doctor_notes(request: Request, patient_id: str, payload
             patient_id=str(patient_id),
             request_id=str(request_id or ""),
         )
-        agent_result = DocNotesSearcher(catalog=_catalog, span=search_span).invoke(input=state)
+        agent_result = agent_registry.invoke_agent(
+            DocNotesSearcher(catalog=agent_registry.catalog(), span=search_span),
+            "docnotes_search_agent",
+            state,
+        )
 
         # Format response
         result = {
@@ -975,10 +1154,7 @@ async def search_patient_doctor_notes(request: Request, patient_id: str, payload
             "answer_provided": str(result.get("answer") or ""),
             "referenced_visit_notes": referenced_visit_notes,
         }
-        try:
-            db.save_answers_doctors(answer_id, answer_doc)
-        except Exception as e:
-            logger.warning("Warning: Failed to save answers_doctors: %s", e)
+        audit_queue.enqueue("answers_doctors", answer_id, answer_doc)
 
         result["referenced_visit_notes"] = referenced_visit_notes
 
@@ -1018,12 +1194,13 @@ async def save_doctor_note(note: dict):
             f"note_{note['patient_id']}_{note['visit_date']}_{int(datetime.now().timestamp())}"
         )
 
-        success = db.save_doctor_note(note_id, note)
-        if success:
+        cas = db.save_doctor_note(note_id, note)
+        if cas is not None:
             try:
                 vec = await embedding_vector(str(note.get("visit_notes") or ""))
                 if vec:
-                    db.upsert_doctor_note_embedding(note_id, vec)
+                    # Skipped if the note was edited meanwhile; that edit embeds its own text.
+                    db.upsert_doctor_note_embedding(note_id, vec, cas=cas)
             except Exception as e:
                 logger.warning(
                     "Warning: Failed to vectorize doctor note note_id=%s patient_id=%s: %s",
@@ -1063,12 +1240,13 @@ async def update_doctor_note(note_id: str, note: dict):
                 status_code=400, detail=f"Missing required fields: {', '.join(missing_fields)}"
             )
 
-        success = db.save_doctor_note(note_id, note)
-        if success:
+        cas = db.save_doctor_note(note_id, note)
+        if cas is not None:
             try:
                 vec = await embedding_vector(str(note.get("visit_notes") or ""))
                 if vec:
-                    db.upsert_doctor_note_embedding(note_id, vec)
+                    # Skipped if the note was edited meanwhile; that edit embeds its own text.
+                    db.upsert_doctor_note_embedding(note_id, vec, cas=cas)
             except Exception as e:
                 logger.warning(
                     "Warning: Failed to vectorize doctor note note_id=%s patient_id=%s: %s",
@@ -1103,22 +1281,43 @@ async def delete_doctor_note(note_id: str):
 
 # Patient Notes Endpoints
 @app.get("/api/patients/{patient_id}/patient-notes")
-async def get_patient_notes(patient_id: str):
-    """Get all patient notes (private notes) for a patient"""
+async def get_patient_notes(
+    patient_id: str, limit: Optional[int] = None, cursor: Optional[str] = None
+):
+    """Get patient notes (private notes) for a patient; paged only with ``limit`` or ``cursor``"""
     try:
-        notes = db.get_patient_notes_for_patient(patient_id)
-        return {"patient_id": patient_id, "notes": notes, "count": len(notes)}
+        if limit is None and cursor is None:
+            page = {"items": db.get_patient_notes_for_patient(patient_id), "next_cursor": None}
+        else:
+            page = db.get_patient_notes_for_patient_page(patient_id, limit, cursor)
+        notes = page["items"]
+        return {
+            "patient_id": patient_id,
+            "notes": notes,
+            "count": len(notes),
+            "next_cursor": page["next_cursor"],
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching patient notes: {str(e)}")
 
 
 # Messages Endpoints
 @app.get("/api/messages/private/{doctor_id}")
-async def get_private_messages(doctor_id: str, limit: int = 50):
-    """Get private messages for a specific doctor"""
+async def get_private_messages(doctor_id: str, limit: int = 50, cursor: str = None):
+    """Get a page of private messages for a specific doctor"""
     try:
-        messages = db.get_private_messages(doctor_id, limit)
-        return {"doctor_id": doctor_id, "messages": messages, "count": len(messages)}
+        page = db.get_private_messages_page(doctor_id, limit, cursor)
+        messages = page["items"]
+        return {
+            "doctor_id": doctor_id,
+            "messages": messages,
+            "count": len(messages),
+            "next_cursor": page["next_cursor"],
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching private messages: {str(e)}")
 
@@ -1156,6 +1355,7 @@ async def send_private_message(payload: dict):
         success = db.save_private_message(message_id, message)
         if not success:
             raise HTTPException(status_code=500, detail="Failed to send private message")
+        await publish_message(pubsub, message)
         return {"message": "Private message sent", "id": message_id}
     except HTTPException:
         raise
@@ -1164,11 +1364,14 @@ async def send_private_message(payload: dict):
 
 
 @app.get("/api/messages/public")
-async def get_public_messages(limit: int = 50):
-    """Get public messages for all Scripps staff"""
+async def get_public_messages(limit: int = 50, cursor: str = None):
+    """Get a page of public messages for all Scripps staff"""
     try:
-        messages = db.get_public_messages(limit)
-        return {"messages": messages, "count": len(messages)}
+        page = db.get_public_messages_page(limit, cursor)
+        messages = page["items"]
+        return {"messages": messages, "count": len(messages), "next_cursor": page["next_cursor"]}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching public messages: {str(e)}")
 
@@ -1200,6 +1403,7 @@ async def send_public_message(payload: dict):
         success = db.save_public_message(message_id, message)
         if not success:
             raise HTTPException(status_code=500, detail="Failed to send public message")
+        await publish_message(pubsub, message)
         return {"message": "Public message sent", "id": message_id}
     except HTTPException:
         raise
@@ -1233,6 +1437,61 @@ async def mark_public_message_read(message_id: str):
         raise HTTPException(status_code=500, detail=f"Error marking message as read: {str(e)}")
 
 
+@app.post("/api/messages/private/{doctor_id}/read-all")
+async def mark_all_private_messages_read(doctor_id: str):
+    """Mark every unread private message addressed to a doctor as read"""
+    updated = db.mark_all_messages_as_read(doctor_id)
+    if updated < 0:
+        raise HTTPException(status_code=500, detail="Failed to mark messages as read")
+    return {"message": "Messages marked as read", "doctor_id": doctor_id, "updated": updated}
+
+
+@app.post("/api/messages/public/read-all")
+async def mark_all_public_messages_read():
+    """Mark every unread public message as read"""
+    updated = db.mark_all_messages_as_read()
+    if updated < 0:
+        raise HTTPException(status_code=500, detail="Failed to mark messages as read")
+    return {"message": "Messages marked as read", "updated": updated}
+
+
+@app.websocket("/api/ws/messages/{doctor_id}")
+async def messages_socket(websocket: WebSocket, doctor_id: str):
+    """
+    Push new private (to/from doctor_id) and public messages as they are sent.
+
+    HTTP middleware does not run for WebSockets, so the API key is checked here
+    (x-api-key header, or ?api_key= since browsers cannot set WebSocket headers).
+    Each event is {"event": "message", "scope": "private"|"public", "message": {...}}.
+    """
+    expected = (os.getenv("API_KEY") or "").strip()
+    if expected:
+        provided = (
+            websocket.headers.get("x-api-key") or websocket.query_params.get("api_key") or ""
+        ).strip()
+        if provided != expected:
+            await websocket.close(code=1008)
+            return
+
+    await websocket.accept()
+    subscription = pubsub.subscribe([private_channel(doctor_id), PUBLIC_CHANNEL])
+
+    async def forward():
+        async for event in subscription:
+            await websocket.send_json(event)
+
+    forward_task = asyncio.create_task(forward())
+    try:
+        # Incoming frames are only keepalives; this returns when the client goes away.
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        forward_task.cancel()
+        subscription.close()
+
+
 # Calendar/Appointments Endpoints
 @app.get("/api/appointments/doctor/{doctor_id}")
 async def get_doctor_appointments(doctor_id: str, start_date: str = None, end_date: str = None):
@@ -1245,11 +1504,24 @@ async def get_doctor_appointments(doctor_id: str, start_date: str = None, end_da
 
 
 @app.get("/api/appointments/patient/{patient_id}")
-async def get_patient_appointments(patient_id: str):
-    """Get appointments for a specific patient"""
+async def get_patient_appointments(
+    patient_id: str, limit: Optional[int] = None, cursor: Optional[str] = None
+):
+    """Get appointments for a patient, latest first; paged only with ``limit`` or ``cursor``"""
     try:
-        appointments = db.get_appointments_for_patient(patient_id)
-        return {"patient_id": patient_id, "appointments": appointments, "count": len(appointments)}
+        if limit is None and cursor is None:
+            page = {"items": db.get_appointments_for_patient(patient_id), "next_cursor": None}
+        else:
+            page = db.get_appointments_for_patient_page(patient_id, limit, cursor)
+        appointments = page["items"]
+        return {
+            "patient_id": patient_id,
+            "appointments": appointments,
+            "count": len(appointments),
+            "next_cursor": page["next_cursor"],
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Error fetching patient appointments: {str(e)}"
@@ -1285,30 +1557,14 @@ async def update_appointment_status(appointment_id: str, status: str):
 async def get_pre_visit_questionnaire(patient_id: str):
     """Fetch the pre-visit questionnaire JSON for a patient."""
     try:
-        root = Path(__file__).resolve().parent.parent
-        path = (
-            root
-            / "data"
-            / "questionnaires"
-            / f"patient_{patient_id}"
-            / "pre_visit_questionnaire.json"
-        )
-
-        if not path.exists():
+        data = await asyncio.to_thread(questionnaire_index.get, patient_id)
+        if data is None:
             raise HTTPException(status_code=404, detail="Pre-visit questionnaire not found")
-
-        data = json.loads(path.read_text(encoding="utf-8"))
-        if isinstance(data, list):
-            if len(data) == 0:
-                raise HTTPException(status_code=404, detail="Pre-visit questionnaire not found")
-            data = data[0]
-
-        if not isinstance(data, dict):
-            raise HTTPException(status_code=500, detail="Invalid questionnaire format")
-
         return data
     except HTTPException:
         raise
+    except ValueError:
+        raise HTTPException(status_code=500, detail="Invalid questionnaire format")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching questionnaire: {str(e)}")
 
@@ -1324,7 +1580,10 @@ async def get_pre_visit_questionnaire_summary(patient_id: str):
         patient_name = str(questionnaire.get("patient_name") or "").strip()
         date_completed = str(questionnaire.get("date_completed") or "").strip()
 
-        questionnaire_redacted = _redact_pii(questionnaire)
+        questionnaire_packed = pack_json(
+            redact_pii(questionnaire), budget_for("questionnaire_summary")
+        )
+        questionnaire_packed.log("questionnaire_summary")
 
         prompt = (
             "You are a clinical assistant. Write ONE paragraph summarizing the patient's pre-visit questionnaire. "
@@ -1334,14 +1593,15 @@ async def get_pre_visit_questionnaire_summary(patient_id: str):
             "End with a period.\n\n"
             f"Patient: {patient_name or patient_id}\n"
             f"Date completed: {date_completed or 'unknown'}\n"
-            f"Questionnaire JSON: {json.dumps(questionnaire_redacted, ensure_ascii=False)}"
+            f"Questionnaire JSON: {questionnaire_packed.items[0]}"
         )
 
-        text, _raw = await chat_completion_text(
+        text, raw = await chat_completion_text(
             messages=[{"role": "user", "content": prompt}],
             max_tokens=240,
             temperature=0.2,
         )
+        log_completion_usage("questionnaire_summary", raw)
 
         summary = _trim_to_last_sentence(text)
         return {"patient_id": str(patient_id), "summary": summary}
@@ -1364,51 +1624,8 @@ async def get_pre_visit_questionnaire_status(payload: Dict[str, Any] = Body(...)
         if not isinstance(patient_ids, list):
             raise HTTPException(status_code=400, detail="patient_ids must be a list")
 
-        root = Path(__file__).resolve().parent.parent
-        statuses = []
-        for pid in patient_ids:
-            patient_id = str(pid)
-            path = (
-                root
-                / "data"
-                / "questionnaires"
-                / f"patient_{patient_id}"
-                / "pre_visit_questionnaire.json"
-            )
-
-            if not path.exists():
-                statuses.append(
-                    {
-                        "patient_id": patient_id,
-                        "exists": False,
-                        "completed": False,
-                        "date_completed": None,
-                    }
-                )
-                continue
-
-            date_completed = None
-            try:
-                data = json.loads(path.read_text(encoding="utf-8"))
-                if isinstance(data, list) and len(data) > 0 and isinstance(data[0], dict):
-                    date_completed = data[0].get("date_completed")
-                elif isinstance(data, dict):
-                    date_completed = data.get("date_completed")
-            except (json.JSONDecodeError, IOError) as e:
-                # Log the specific error e
-                _ = e
-                date_completed = None
-
-            completed = bool(date_completed)
-
-            statuses.append(
-                {
-                    "patient_id": patient_id,
-                    "exists": True,
-                    "completed": completed,
-                    "date_completed": date_completed,
-                }
-            )
+        # One stat (or one USE KEYS query) per id; JSON is only re-read when it changed.
+        statuses = await asyncio.to_thread(questionnaire_index.status, patient_ids)
 
         return {"statuses": statuses}
     except HTTPException:
@@ -1419,6 +1636,68 @@ async def get_pre_visit_questionnaire_status(payload: Dict[str, Any] = Body(...)
         )
 
 
+def _generate_previsit_summary(patient_id: str, request_id: Optional[str] = None) -> dict:
+    """Run the PrevisitSummarizer agent (blocking) and shape its result."""
+    logger.info("Generating pre-visit summary for patient_id=%s", patient_id)
+
+    # Build starting state for the agent
+    state = PrevisitSummarizer.build_starting_state(patient_id=patient_id)
+
+    # Add initial message
+    state["messages"].append(agent_registry.human_message(f'{{"patient_id": "{patient_id}"}}'))
+
+    # Create span for tracing
+    root_span = _new_backend_root_span()
+    summary_span = root_span.new(
+        name="PrevisitSummarizer.invoke",
+        agent="previsit_summary_agent",
+        endpoint="GET /api/patients/{patient_id}/previsit-summary",
+        patient_id=str(patient_id),
+        request_id=str(request_id or ""),
+    )
+
+    # Invoke the agent
+    logger.info("Invoking PrevisitSummarizer agent for patient_id=%s", patient_id)
+    agent_result = agent_registry.invoke_agent(
+        PrevisitSummarizer(catalog=agent_registry.catalog(), span=summary_span),
+        "previsit_summary_agent",
+        state,
+    )
+
+    # Build response
+    result = {
+        "patient_id": agent_result.get("patient_id", patient_id),
+        "patient_name": agent_result.get("patient_name", "Unknown"),
+        "clinical_summary": agent_result.get("clinical_summary", ""),
+        "current_medications": agent_result.get("current_medications", []),
+        "allergies": agent_result.get("allergies", {"drug": [], "food": [], "environmental": []}),
+        "key_symptoms": agent_result.get("key_symptoms", []),
+        "patient_concerns": agent_result.get("patient_concerns", []),
+        "recent_note_summary": agent_result.get("recent_note_summary", ""),
+    }
+
+    logger.info(
+        "PrevisitSummarizer completed - %s medications, %s symptoms, %s concerns",
+        len(result.get("current_medications", [])),
+        len(result.get("key_symptoms", [])),
+        len(result.get("patient_concerns", [])),
+    )
+
+    return result
+
+
+# Pre-visit packets are generated overnight for upcoming appointments and served
+# from Notes.Doctor while their inputs are unchanged.
+previsit_packets = PrevisitPacketScheduler(
+    db,
+    {
+        "previsit_summary": lambda pid: asyncio.to_thread(_generate_previsit_summary, pid),
+        "wearables_summary": lambda pid: _generate_wearables_summary(pid, 30),
+        "doctor_notes_summary": lambda pid: _generate_doctor_notes_summary(pid, 20),
+    },
+)
+
+
 @app.get("/api/patients/{patient_id}/previsit-summary")
 async def get_previsit_summary(request: Request, patient_id: str):
     """
@@ -1435,53 +1714,13 @@ async def get_previsit_summary(request: Request, patient_id: str):
         Structured pre-visit summary with clinical overview, medications, allergies, symptoms, and concerns
     """
     try:
-        logger.info("Generating pre-visit summary for patient_id=%s", patient_id)
-
-        # Build starting state for the agent
-        state = PrevisitSummarizer.build_starting_state(patient_id=patient_id)
-
-        # Add initial message
-        state["messages"].append(
-            langchain_core.messages.HumanMessage(content=f'{{"patient_id": "{patient_id}"}}')
-        )
+        cached = await asyncio.to_thread(previsit_packets.get_fresh, patient_id, "previsit_summary")
+        if cached:
+            logger.info("Serving precomputed pre-visit summary for patient_id=%s", patient_id)
+            return cached
 
-        # Create span for tracing
         request_id = getattr(getattr(request, "state", None), "request_id", None)
-        root_span = _new_backend_root_span()
-        summary_span = root_span.new(
-            name="PrevisitSummarizer.invoke",
-            agent="previsit_summary_agent",
-            endpoint="GET /api/patients/{patient_id}/previsit-summary",
-            patient_id=str(patient_id),
-            request_id=str(request_id or ""),
-        )
-
-        # Invoke the agent
-        logger.info("Invoking PrevisitSummarizer agent for patient_id=%s", patient_id)
-        agent_result = PrevisitSummarizer(catalog=_catalog, span=summary_span).invoke(input=state)
-
-        # Build response
-        result = {
-            "patient_id": agent_result.get("patient_id", patient_id),
-            "patient_name": agent_result.get("patient_name", "Unknown"),
-            "clinical_summary": agent_result.get("clinical_summary", ""),
-            "current_medications": agent_result.get("current_medications", []),
-            "allergies": agent_result.get(
-                "allergies", {"drug": [], "food": [], "environmental": []}
-            ),
-            "key_symptoms": agent_result.get("key_symptoms", []),
-            "patient_concerns": agent_result.get("patient_concerns", []),
-            "recent_note_summary": agent_result.get("recent_note_summary", ""),
-        }
-
-        logger.info(
-            "PrevisitSummarizer completed - %s medications, %s symptoms, %s concerns",
-            len(result.get("current_medications", [])),
-            len(result.get("key_symptoms", [])),
-            len(result.get("patient_concerns", [])),
-        )
-
-        return result
+        return await asyncio.to_thread(_generate_previsit_summary, patient_id, request_id)
 
     except HTTPException:
         raise
@@ -1491,6 +1730,73 @@ async def get_previsit_summary(request: Request, patient_id: str):
 
 
 # Medical Research Agent Endpoints
+async def _data_version(patient_id: str) -> Optional[str]:
+    """Hash of the patient's inputs, so coalescing never spans a data change."""
+    try:
+        return await asyncio.to_thread(previsit_packets.input_hash, patient_id)
+    except Exception:
+        logger.warning("Could not compute data version patient_id=%s", patient_id)
+        return None
+
+
+def _run_patient_research(
+    patient_id: str,
+    question: str,
+    span_name: str,
+    endpoint: str,
+    request_id: Optional[str] = None,
+    question_id: Optional[str] = None,
+) -> dict:
+    """Run the pulmonary research agent and format its result for the API."""
+    # Use the pulmonary research agent directly
+    state = PulmonaryResearcher.build_starting_state(patient_id=patient_id, question=question)
+
+    # Add the question as a human message in JSON format
+    state["messages"].append(
+        agent_registry.human_message(f'{{"patient_id": "{patient_id}", "question": "{question}"}}')
+    )
+
+    # Invoke the agent
+    logger.info(
+        "Invoking PulmonaryResearcher agent for patient_id=%s question_id=%s",
+        patient_id,
+        question_id,
+    )
+    span_attrs = {"question_id": str(question_id)} if question_id else {}
+    root_span = _new_backend_root_span()
+    research_span = root_span.new(
+        name=span_name,
+        agent="pulmonary_research_agent",
+        endpoint=endpoint,
+        patient_id=str(patient_id),
+        request_id=str(request_id or ""),
+        **span_attrs,
+    )
+    agent_result = agent_registry.invoke_agent(
+        PulmonaryResearcher(catalog=agent_registry.catalog(), span=research_span),
+        "pulmonary_research_agent",
+        state,
+    )
+
+    papers = _normalize_research_papers(agent_result.get("papers", []))
+
+    # Format response
+    result = {
+        "patient_id": agent_result.get("patient_id", patient_id),
+        "patient_name": agent_result.get("patient_name"),
+        "condition": agent_result.get("condition", ""),
+        "question": agent_result.get("question", question),
+        "papers": papers,
+        "answer": agent_result.get("answer", ""),
+    }
+    logger.info(
+        "PulmonaryResearcher completed - found %s papers, answer_len=%s",
+        len(result.get("papers", [])),
+        len(result.get("answer", "")),
+    )
+    return result
+
+
 @app.get("/api/patients/{patient_id}/research")
 async def get_patient_research(request: Request, patient_id: str, question: Optional[str] = None):
     """
@@ -1514,44 +1820,18 @@ async def get_patient_research(request: Request, patient_id: str, question: Opti
             len(question),
         )
 
-        # Use the pulmonary research agent directly
-        state = PulmonaryResearcher.build_starting_state(patient_id=patient_id, question=question)
-
-        # Add the question as a human message in JSON format
-        state["messages"].append(
-            langchain_core.messages.HumanMessage(
-                content=f'{{"patient_id": "{patient_id}", "question": "{question}"}}'
-            )
-        )
-
-        # Invoke the agent
-        logger.info("Invoking PulmonaryResearcher agent for patient_id=%s", patient_id)
         request_id = getattr(getattr(request, "state", None), "request_id", None)
-        root_span = _new_backend_root_span()
-        research_span = root_span.new(
-            name="PulmonaryResearcher.invoke",
-            agent="pulmonary_research_agent",
-            endpoint="GET /api/patients/{patient_id}/research",
-            patient_id=str(patient_id),
-            request_id=str(request_id or ""),
-        )
-        agent_result = PulmonaryResearcher(catalog=_catalog, span=research_span).invoke(input=state)
-
-        papers = _normalize_research_papers(agent_result.get("papers", []))
-
-        # Format response
-        result = {
-            "patient_id": agent_result.get("patient_id", patient_id),
-            "patient_name": agent_result.get("patient_name"),
-            "condition": agent_result.get("condition", ""),
-            "question": agent_result.get("question", question),
-            "papers": papers,
-            "answer": agent_result.get("answer", ""),
-        }
-        logger.info(
-            "PulmonaryResearcher completed - found %s papers, answer_len=%s",
-            len(result.get("papers", [])),
-            len(result.get("answer", "")),
+        key = flight_key("research", patient_id, question, await _data_version(patient_id))
+        result = await single_flight.do(
+            key,
+            lambda: asyncio.to_thread(
+                _run_patient_research,
+                patient_id,
+                question,
+                span_name="PulmonaryResearcher.invoke",
+                endpoint="GET /api/patients/{patient_id}/research",
+                request_id=request_id,
+            ),
         )
 
         if "error" in result:
@@ -1594,55 +1874,21 @@ async def ask_research_question(request: Request, patient_id: str, payload: dict
             "timestamp": datetime.now().isoformat(),
         }
 
-        try:
-            db.save_research_question(question_id, question_doc)
-        except Exception as e:
-            # Log but don't fail if question save fails
-            logger.warning("Warning: Failed to save question: %s", e)
-
-        # Use the pulmonary research agent directly with the specific question
-        state = PulmonaryResearcher.build_starting_state(patient_id=patient_id, question=question)
-
-        # Add the question as a human message in JSON format
-        state["messages"].append(
-            langchain_core.messages.HumanMessage(
-                content=f'{{"patient_id": "{patient_id}", "question": "{question}"}}'
-            )
-        )
+        audit_queue.enqueue("research_question", question_id, question_doc)
 
-        # Invoke the agent
-        logger.info(
-            "Invoking PulmonaryResearcher agent for patient_id=%s question_id=%s",
-            patient_id,
-            question_id,
-        )
         request_id = getattr(getattr(request, "state", None), "request_id", None)
-        root_span = _new_backend_root_span()
-        research_span = root_span.new(
-            name="PulmonaryResearcher.ask.invoke",
-            agent="pulmonary_research_agent",
-            endpoint="POST /api/patients/{patient_id}/research/ask",
-            patient_id=str(patient_id),
-            question_id=str(question_id),
-            request_id=str(request_id or ""),
-        )
-        agent_result = PulmonaryResearcher(catalog=_catalog, span=research_span).invoke(input=state)
-
-        papers = _normalize_research_papers(agent_result.get("papers", []))
-
-        # Format response
-        result = {
-            "patient_id": agent_result.get("patient_id", patient_id),
-            "patient_name": agent_result.get("patient_name"),
-            "condition": agent_result.get("condition", ""),
-            "question": agent_result.get("question", question),
-            "papers": papers,
-            "answer": agent_result.get("answer", ""),
-        }
-        logger.info(
-            "PulmonaryResearcher completed - found %s papers, answer_len=%s",
-            len(result.get("papers", [])),
-            len(result.get("answer", "")),
+        key = flight_key("research_ask", patient_id, question, await _data_version(patient_id))
+        result = await single_flight.do(
+            key,
+            lambda: asyncio.to_thread(
+                _run_patient_research,
+                patient_id,
+                question,
+                span_name="PulmonaryResearcher.ask.invoke",
+                endpoint="POST /api/patients/{patient_id}/research/ask",
+                request_id=request_id,
+                question_id=question_id,
+            ),
         )
 
         if "error" in result:
@@ -1784,7 +2030,10 @@ async def search_tavily_research(payload: dict = Body(...)):
             paper = {
                 "title": result.get("title", "Untitled"),
                 "author": domain,
-                "article_text": result.get("raw_content", result.get("content", ""))[:5000],
+                "article_text": truncate_to_tokens(
+                    result.get("raw_content") or result.get("content") or "",
+                    budget_for("research_article"),
+                ),
                 "article_citation": result.get("url", ""),
                 "pmc_link": result.get("url", ""),
                 "source_type": "tavily",
@@ -1933,9 +2182,9 @@ async def search_pubmed_research(payload: dict = Body(...)):
                 except Exception:
                     article_text = abstract_text
 
-            article_text = (article_text or "").strip()
-            if len(article_text) > 5000:
-                article_text = article_text[:5000]
+            article_text = truncate_to_tokens(
+                (article_text or "").strip(), budget_for("research_article")
+            )
 
             pubmed_url = f"https://pubmed.ncbi.nlm.nih.gov/{urllib.parse.quote_plus(str(pmid))}/"
             citation = " ".join([p for p in [source, pubdate, f"PMID:{pmid}"] if p]).strip()
@@ -2006,6 +2255,8 @@ async def add_research_paper(payload: dict = Body(...)):
         vectorized = False
         try:
             logger.info(f"Vectorizing paper: {paper_id}")
+            from tools._shared import get_nvidia_embedding
+
             embedding = get_nvidia_embedding(article_text)
             paper_doc["article_text_vectorized"] = embedding
             vectorized = True
@@ -2031,3 +2282,74 @@ async def add_research_paper(payload: dict = Body(...)):
     except Exception as e:
         logger.exception("Error adding paper")
         raise HTTPException(status_code=500, detail=f"Error adding paper: {str(e)}")
+
+
+# Admin Endpoints
+@app.get("/api/admin/query-stats")
+async def get_query_stats(limit: int = 20, sort_by: str = "total_ms", server: bool = False):
+    """
+    Hottest SQL++ statements with latency and client-side prepared-plan reuse.
+
+    ``server=true`` adds the query service's own plan-cache usage from system:prepareds.
+    """
+    snapshot = query_stats.snapshot(limit=max(1, min(limit, 200)), sort_by=sort_by)
+    if not server:
+        return snapshot
+    try:
+        prepareds = await asyncio.to_thread(db.get_prepared_statements)
+    except Exception as e:
+        logger.warning(f"Could not read system:prepareds: {e}")
+        return {**snapshot, "server_error": "system:prepareds unavailable"}
+    return query_stats.with_server_usage(snapshot, prepareds)
+
+
+@app.get("/api/admin/previsit-packets")
+async def get_previsit_packet_status():
+    """Pre-visit packet scheduler state and the result of the last refresh."""
+    return previsit_packets.status()
+
+
+@app.post("/api/admin/previsit-packets/refresh")
+async def refresh_previsit_packets(start_date: Optional[str] = None, days: Optional[int] = None):
+    """Generate packets for upcoming appointments now (runs in the background)."""
+    if start_date:
+        try:
+            datetime.fromisoformat(start_date)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="start_date must be YYYY-MM-DD")
+    started = previsit_packets.trigger(start_date, days)
+    return {"started": started, **previsit_packets.status()}
+
+
+@app.get("/api/admin/single-flight")
+async def get_single_flight_stats():
+    """Request coalescing counters: calls, executions and coalesced duplicates."""
+    return single_flight.stats()
+
+
+@app.get("/api/admin/write-behind")
+async def get_write_behind_stats():
+    """Audit write-behind queue counters (queued, written, retried, spilled)."""
+    return audit_queue.stats()
+
+
+@app.get("/api/admin/timings")
+async def get_recent_timings(limit: int = 20):
+    """Request ids with a recorded step breakdown, newest first."""
+    return timing_store.recent(limit=max(1, min(limit, 200)))
+
+
+@app.get("/api/admin/timings/{request_id}")
+async def get_request_timings(request_id: str, format: str = "json"):
+    """
+    Per-step timing breakdown for a request (X-Request-ID).
+
+    ``format=folded`` returns folded stacks for flamegraph.pl / speedscope.
+    """
+    reports = timing_store.get(request_id)
+    if reports is None:
+        raise HTTPException(status_code=404, detail=f"No timings recorded for {request_id}")
+    if format == "folded":
+        folded = "\n".join(line for report in reports for line in report["folded"])
+        return Response(content=folded + "\n", media_type="text/plain")
+    return {"request_id": request_id, "timings": reports}
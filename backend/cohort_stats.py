@@ -0,0 +1,268 @@
+"""
+Precomputed cohort aggregates for wearable metrics.
+
+Keeps one sorted array of per-patient averages per metric for every
+(condition, age band, gender) cohort, plus the wider (condition, age band, *),
+(condition, *, *) and (*, *, *) roll-ups. Percentile rankings are bisect
+lookups (O(log n)), mean/std come from running sums, and members are updated
+incrementally when their wearable data is ingested.
+
+Member aggregates are persisted as ``cohort_member`` documents in
+Wearables.Analytics_Results so the API can bootstrap with a single query
+instead of fetching every cohort member's raw wearable data.
+"""
+
+import logging
+import math
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from statistics import mean
+from typing import Optional
+
+logger = logging.getLogger("cko")
+
+COHORT_METRICS = ("heart_rate", "blood_oxygen_level", "steps", "stress_level")
+WILDCARD = "*"
+
+_STRESS_MAP = {"Low": 1, "Medium": 2, "High": 3}
+
+CohortKey = tuple[str, str, str]
+
+
+def age_band(age) -> str:
+    """Bucket an age into a decade band such as '40-49'."""
+    try:
+        a = int(float(age))
+    except Exception:
+        return WILDCARD
+    if a < 0:
+        return WILDCARD
+    lo = (a // 10) * 10
+    return f"{lo}-{lo + 9}"
+
+
+def cohort_key(condition, age, gender) -> CohortKey:
+    cond = str(condition or "").strip().lower() or WILDCARD
+    sex = str(gender or "").strip().lower() or WILDCARD
+    return (cond, age_band(age), sex)
+
+
+def _rollup_keys(key: CohortKey) -> list[CohortKey]:
+    """Most specific first: exact, drop gender, drop age band, everyone."""
+    cond, band, sex = key
+    keys = [key, (cond, band, WILDCARD), (cond, WILDCARD, WILDCARD), (WILDCARD,) * 3]
+    out: list[CohortKey] = []
+    for k in keys:
+        if k not in out:
+            out.append(k)
+    return out
+
+
+def patient_metric_averages(wearable_data: list[dict]) -> dict[str, float]:
+    """Average each cohort metric over a patient's wearable records."""
+    series: dict[str, list[float]] = {m: [] for m in COHORT_METRICS}
+    for record in wearable_data or []:
+        metrics = record.get("metrics") if isinstance(record, dict) else None
+        if not isinstance(metrics, dict):
+            continue
+        for m in ("heart_rate", "blood_oxygen_level", "steps"):
+            if metrics.get(m):
+                try:
+                    series[m].append(float(metrics[m]))
+                except Exception:
+                    pass
+        if metrics.get("stress_level"):
+            series["stress_level"].append(_STRESS_MAP.get(metrics["stress_level"], 2))
+
+    return {m: round(mean(vals), 3) for m, vals in series.items() if vals}
+
+
+class _MetricSketch:
+    """Sorted values with running sums for O(log n) ranks and O(1) moments."""
+
+    __slots__ = ("values", "total", "total_sq")
+
+    def __init__(self):
+        self.values: list[float] = []
+        self.total = 0.0
+        self.total_sq = 0.0
+
+    def add(self, value: float) -> None:
+        insort(self.values, value)
+        self.total += value
+        self.total_sq += value * value
+
+    def remove(self, value: float) -> None:
+        i = bisect_left(self.values, value)
+        if i < len(self.values) and self.values[i] == value:
+            del self.values[i]
+            self.total -= value
+            self.total_sq -= value * value
+
+    def percentile(self, value: float, exclude: Optional[float] = None) -> Optional[int]:
+        """Mid-rank percentile of value, optionally ignoring one member's own value."""
+        n = len(self.values)
+        below = bisect_left(self.values, value)
+        equal = bisect_right(self.values, value) - below
+        if exclude is not None:
+            n -= 1
+            if exclude < value:
+                below -= 1
+            elif exclude == value:
+                equal -= 1
+        if n <= 0:
+            return None
+        return int(round(100.0 * (below + 0.5 * equal) / n))
+
+    def stats(self) -> dict:
+        n = len(self.values)
+        if n == 0:
+            return {}
+        avg = self.total / n
+        var = max(0.0, self.total_sq / n - avg * avg)
+        mid = n // 2
+        median = self.values[mid] if n % 2 else (self.values[mid - 1] + self.values[mid]) / 2
+        return {
+            "mean": round(avg, 2),
+            "std": round(math.sqrt(var), 2),
+            "median": round(median, 2),
+            "min": self.values[0],
+            "max": self.values[-1],
+            "cohort_size": n,
+        }
+
+
+class CohortAggregateService:
+    """In-process cohort sketches, bootstrapped from and refreshed against Couchbase."""
+
+    def __init__(self, min_cohort_size: int = 3, refresh_seconds: Optional[float] = None):
+        self.min_cohort_size = min_cohort_size
+        if refresh_seconds is None:
+            refresh_seconds = float(os.getenv("COHORT_REFRESH_SECONDS", "300"))
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.RLock()
+        self._members: dict[str, dict] = {}
+        self._sketches: dict[CohortKey, dict[str, _MetricSketch]] = {}
+        self._loaded_at: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._members)
+
+    def record_patient(
+        self, patient_id: str, condition, age, gender, metrics: dict[str, float]
+    ) -> dict:
+        """Insert or replace one patient's averages in every cohort they belong to."""
+        pid = str(patient_id)
+        key = cohort_key(condition, age, gender)
+        clean = {m: float(v) for m, v in (metrics or {}).items() if m in COHORT_METRICS}
+        with self._lock:
+            self._remove_locked(pid)
+            for k in _rollup_keys(key):
+                sketches = self._sketches.setdefault(k, {})
+                for m, v in clean.items():
+                    sketches.setdefault(m, _MetricSketch()).add(v)
+            member = {
+                "patient_id": pid,
+                "condition": condition,
+                "age": age,
+                "gender": gender,
+                "metrics": clean,
+            }
+            self._members[pid] = {"key": key, **member}
+        return member
+
+    def remove_patient(self, patient_id: str) -> None:
+        with self._lock:
+            self._remove_locked(str(patient_id))
+
+    def _remove_locked(self, pid: str) -> None:
+        old = self._members.pop(pid, None)
+        if not old:
+            return
+        for k in _rollup_keys(old["key"]):
+            sketches = self._sketches.get(k, {})
+            for m, v in old["metrics"].items():
+                if m in sketches:
+                    sketches[m].remove(v)
+
+    def compare(
+        self,
+        condition,
+        age,
+        gender,
+        metrics: dict[str, float],
+        exclude_patient_id: Optional[str] = None,
+    ) -> dict:
+        """
+        Percentile and cohort stats for each metric, using the most specific
+        cohort that has at least min_cohort_size other members.
+        """
+        key = cohort_key(condition, age, gender)
+        excluded = self._members.get(str(exclude_patient_id)) if exclude_patient_id else None
+
+        with self._lock:
+            for k in _rollup_keys(key):
+                sketches = self._sketches.get(k) or {}
+                self_in = excluded is not None and k in _rollup_keys(excluded["key"])
+                size = max((len(s.values) for s in sketches.values()), default=0)
+                if self_in:
+                    size -= 1
+                if size < self.min_cohort_size:
+                    continue
+
+                out = {}
+                for m, value in (metrics or {}).items():
+                    sketch = sketches.get(m)
+                    if value is None or sketch is None:
+                        continue
+                    own = excluded["metrics"].get(m) if self_in else None
+                    stats = sketch.stats()
+                    if own is not None:
+                        sketch.remove(own)
+                        stats = sketch.stats()
+                        sketch.add(own)
+                    pct = sketch.percentile(float(value), exclude=own)
+                    if pct is None or not stats:
+                        continue
+                    out[m] = {"percentile": pct, **stats}
+
+                return {"cohort_key": list(k), "metrics": out}
+
+        return {"cohort_key": None, "metrics": {}}
+
+    def load_members(self, members: list[dict]) -> int:
+        """Rebuild all sketches from persisted member documents."""
+        with self._lock:
+            self._members.clear()
+            self._sketches.clear()
+            for doc in members or []:
+                if not isinstance(doc, dict) or not doc.get("patient_id"):
+                    continue
+                self.record_patient(
+                    doc.get("patient_id"),
+                    doc.get("condition"),
+                    doc.get("age"),
+                    doc.get("gender"),
+                    doc.get("metrics") or {},
+                )
+            self._loaded_at = time.monotonic()
+            return len(self._members)
+
+    def ensure_loaded(self, db) -> None:
+        """Load from Couchbase on first use and again after refresh_seconds."""
+        now = time.monotonic()
+        if self._loaded_at is not None and now - self._loaded_at < self.refresh_seconds:
+            return
+        try:
+            members = db.get_cohort_members()
+        except Exception as e:
+            logger.warning("Cohort aggregate refresh failed: %s", e)
+            self._loaded_at = now
+            return
+        count = self.load_members(members)
+        logger.info("Cohort aggregates loaded: %s members", count)
+
+
+cohort_service = CohortAggregateService()
@@ -0,0 +1,355 @@
+"""
+One Couchbase cluster connection per process.
+
+The backend (CouchbaseDB), the agent tools (tools/_shared.py) and the scripts
+all get their Cluster from the shared ``connection_manager``, so a process
+bootstraps once and every caller reuses the same KV connections and HTTP pool.
+
+Settings (environment variables):
+
+- CLUSTER_CONNECTION_STRING / CLUSTER_USERNAME / CLUSTER_PASS
+  (CB_CONN_STRING / CB_USERNAME / CB_PASSWORD are accepted for the tools)
+- CLUSTER_TLS_VERIFY=none, CLUSTER_SSL_NO_VERIFY, CLUSTER_DISABLE_TLS
+- CLUSTER_WAIT_UNTIL_READY_SECONDS (default 30)
+- COUCHBASE_PROFILE: SDK config profile applied first (default wan_development)
+- COUCHBASE_MAX_HTTP_CONNECTIONS: per-node HTTP pool for query/search
+- COUCHBASE_NUM_IO_THREADS: SDK I/O threads serving KV and HTTP traffic
+- COUCHBASE_KV_TIMEOUT_MS, COUCHBASE_QUERY_TIMEOUT_MS, COUCHBASE_CONNECT_TIMEOUT_MS
+- COUCHBASE_RECONNECT_SECONDS: wait before retrying a failed connect (default 30)
+- COUCHBASE_BREAKER_FAILURES / COUCHBASE_BREAKER_RESET_SECONDS: circuit breaker
+  threshold (default 3) and open time (default 30s)
+- COUCHBASE_HEALTH_INTERVAL_SECONDS / COUCHBASE_HEALTH_MAX_BACKOFF_SECONDS: ping
+  interval of the HealthMonitor (default 10s) and its reconnect backoff cap (default 60s)
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from datetime import timedelta
+from typing import Callable, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from couchbase.auth import PasswordAuthenticator
+from couchbase.cluster import Cluster
+from couchbase.diagnostics import PingState
+from couchbase.options import ClusterOptions
+
+from backend import tracing
+from backend.utils.circuit_breaker import CircuitBreaker
+
+try:
+    from dotenv import load_dotenv
+
+    load_dotenv()
+except Exception:
+    pass
+
+logger = logging.getLogger("cko")
+
+
+def _env(*names: str, default: Optional[str] = None) -> Optional[str]:
+    for name in names:
+        value = os.getenv(name)
+        if value:
+            return value
+    return default
+
+
+def _env_flag(name: str) -> bool:
+    return (os.getenv(name) or "").strip().lower() in ("1", "true", "yes")
+
+
+def _env_int(name: str) -> Optional[int]:
+    value = os.getenv(name)
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        logger.warning("Ignoring non-integer %s=%r", name, value)
+        return None
+
+
+class ConnectionManager:
+    """Creates the Couchbase Cluster on first use and hands the same one to every caller."""
+
+    def __init__(self, cluster_factory: Callable[..., Cluster] = Cluster):
+        self.cluster_factory = cluster_factory
+        self.endpoint = _env("CLUSTER_CONNECTION_STRING", "CB_CONN_STRING")
+        self.username = _env("CLUSTER_USERNAME", "CB_USERNAME", default="ac")
+        self.password = _env("CLUSTER_PASS", "CB_PASSWORD")
+        self.cert_path = _env("AGENT_CATALOG_CONN_ROOT_CERTIFICATE", "CB_CERTIFICATE")
+
+        self.wait_until_ready_seconds = int(os.getenv("CLUSTER_WAIT_UNTIL_READY_SECONDS", "30"))
+        self.tls_verify = (os.getenv("CLUSTER_TLS_VERIFY") or "").strip().lower()
+        self.ssl_no_verify = _env_flag("CLUSTER_SSL_NO_VERIFY")
+        self.disable_tls = _env_flag("CLUSTER_DISABLE_TLS")
+
+        self.profile = os.getenv("COUCHBASE_PROFILE", "wan_development")
+        self.max_http_connections = _env_int("COUCHBASE_MAX_HTTP_CONNECTIONS")
+        self.num_io_threads = _env_int("COUCHBASE_NUM_IO_THREADS")
+        self.kv_timeout_ms = _env_int("COUCHBASE_KV_TIMEOUT_MS")
+        self.query_timeout_ms = _env_int("COUCHBASE_QUERY_TIMEOUT_MS")
+        self.connect_timeout_ms = _env_int("COUCHBASE_CONNECT_TIMEOUT_MS")
+        self.reconnect_seconds = float(os.getenv("COUCHBASE_RECONNECT_SECONDS", "30"))
+
+        self._cluster: Optional[Cluster] = None
+        self._lock = threading.Lock()
+        self._failed_at: Optional[float] = None
+        self.error: Optional[Exception] = None
+        self.connects = 0
+        # Bumped on every new Cluster so holders of old handles know to re-resolve them.
+        self.generation = 0
+        self.breaker = CircuitBreaker(
+            "couchbase",
+            failure_threshold=int(os.getenv("COUCHBASE_BREAKER_FAILURES", "3")),
+            reset_timeout=float(os.getenv("COUCHBASE_BREAKER_RESET_SECONDS", "30")),
+        )
+
+    def connection_string(self) -> str:
+        connstr = self.endpoint
+        if not connstr:
+            return ""
+
+        # Allow explicitly disabling TLS for local clusters.
+        if self.disable_tls and connstr.startswith("couchbases://"):
+            connstr = "couchbase://" + connstr.removeprefix("couchbases://")
+
+        # If you're using Capella (couchbases://) and don't want to manage certificates locally,
+        # allow opting into no-verify mode.
+        wants_no_verify = self.ssl_no_verify or self.tls_verify == "none"
+        if wants_no_verify and connstr.startswith("couchbases://"):
+            # Normalize by ensuring we have a query string and setting tls_verify=none.
+            parts = urlsplit(connstr)
+            query = dict(parse_qsl(parts.query, keep_blank_values=True))
+            if "tls_verify" not in query and "ssl" not in query:
+                query["tls_verify"] = "none"
+            new_query = urlencode(query)
+
+            # Some examples use a trailing '/?'; ensure urlunsplit doesn't drop the path if missing.
+            path = parts.path or "/"
+            connstr = urlunsplit((parts.scheme, parts.netloc, path, new_query, parts.fragment))
+
+        return connstr
+
+    def cluster_options(self) -> ClusterOptions:
+        auth = PasswordAuthenticator(self.username, self.password, cert_path=self.cert_path)
+        options = ClusterOptions(auth)
+        if self.profile:
+            options.apply_profile(self.profile)
+        # Explicit settings win over the profile.
+        if self.max_http_connections:
+            options["max_http_connections"] = self.max_http_connections
+        if self.num_io_threads:
+            options["num_io_threads"] = self.num_io_threads
+        for key, ms in (
+            ("kv_timeout", self.kv_timeout_ms),
+            ("query_timeout", self.query_timeout_ms),
+            ("connect_timeout", self.connect_timeout_ms),
+        ):
+            if ms:
+                options[key] = timedelta(milliseconds=ms)
+        return options
+
+    def get_cluster(self, force: bool = False) -> Optional[Cluster]:
+        """
+        Return the shared Cluster, connecting on first use.
+
+        Returns None if the connection failed; ``error`` holds the reason. A failed
+        connect is retried on a later call once COUCHBASE_RECONNECT_SECONDS passed
+        (``force`` retries immediately; the HealthMonitor applies its own backoff).
+        """
+        if self._cluster is not None:
+            return self._cluster
+        with self._lock:
+            if self._cluster is not None:
+                return self._cluster
+            if (
+                not force
+                and self._failed_at is not None
+                and time.monotonic() - self._failed_at < self.reconnect_seconds
+            ):
+                return None
+            self._connect()
+            return self._cluster
+
+    def _connect(self) -> None:
+        if not self.endpoint or not self.username or not self.password:
+            self.error = RuntimeError(
+                "Missing required environment variables. "
+                "Please set CLUSTER_CONNECTION_STRING, CLUSTER_USERNAME, and CLUSTER_PASS"
+            )
+            self._failed_at = time.monotonic()
+            return
+        try:
+            start = time.perf_counter()
+            cluster = self.cluster_factory(self.connection_string(), self.cluster_options())
+            cluster.wait_until_ready(timedelta(seconds=self.wait_until_ready_seconds))
+        except Exception as e:
+            self.error = e
+            self._failed_at = time.monotonic()
+            self.breaker.record_failure(e)
+            logger.error(f"✗ Could not connect to Couchbase cluster: {e}")
+            return
+        self._cluster = tracing.trace_cluster(cluster)
+        self.error = None
+        self._failed_at = None
+        self.connects += 1
+        self.generation += 1
+        self.breaker.record_success()
+        logger.info(f"✓ Couchbase cluster connected in {time.perf_counter() - start:.2f}s")
+
+    def reset(self) -> None:
+        """Drop the current Cluster so the next get_cluster() connects again."""
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            cluster, self._cluster = self._cluster, None
+        if cluster is not None:
+            try:
+                cluster.close()
+            except Exception as e:
+                logger.warning(f"Error closing Couchbase cluster: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "connected": self._cluster is not None,
+            "connects": self.connects,
+            "generation": self.generation,
+            "error": str(self.error) if self.error else None,
+            "max_http_connections": self.max_http_connections,
+            "num_io_threads": self.num_io_threads,
+            "kv_timeout_ms": self.kv_timeout_ms,
+            "query_timeout_ms": self.query_timeout_ms,
+            "connect_timeout_ms": self.connect_timeout_ms,
+        }
+
+
+class HealthMonitor:
+    """
+    Background task that pings the cluster and reconnects when it is unreachable.
+
+    Ping results drive the connection manager's circuit breaker. After the breaker
+    opens, the Cluster is dropped and rebuilt with exponential backoff (1s, 2s, 4s,
+    ... up to COUCHBASE_HEALTH_MAX_BACKOFF_SECONDS) until a ping succeeds.
+    """
+
+    def __init__(
+        self,
+        manager: ConnectionManager,
+        interval: Optional[float] = None,
+        max_backoff: Optional[float] = None,
+    ):
+        self.manager = manager
+        self.interval = interval or float(os.getenv("COUCHBASE_HEALTH_INTERVAL_SECONDS", "10"))
+        self.max_backoff = max_backoff or float(
+            os.getenv("COUCHBASE_HEALTH_MAX_BACKOFF_SECONDS", "60")
+        )
+        self._task: Optional[asyncio.Task] = None
+        self.failures = 0
+        self.last_check: Optional[dict] = None
+
+    def check(self) -> bool:
+        """Ping KV and query once (reconnecting first if there is no cluster)."""
+        start = time.perf_counter()
+        cluster = self.manager.get_cluster(force=self.failures > 0)
+        error = None
+        if cluster is None:
+            error = self.manager.error or RuntimeError("Couchbase cluster not available")
+        else:
+            try:
+                result = cluster.ping()
+                bad = [
+                    f"{service}:{report.state}"
+                    for service, reports in (result.endpoints or {}).items()
+                    for report in reports
+                    if report.state != PingState.OK
+                ]
+                if bad:
+                    error = RuntimeError(f"ping failed for {', '.join(bad)}")
+            except Exception as e:
+                error = e
+
+        ok = error is None
+        if ok:
+            self.failures = 0
+            self.manager.breaker.record_success()
+        else:
+            self.failures += 1
+            self.manager.breaker.record_failure(error)
+            if cluster is not None and self.manager.breaker.state != "closed":
+                # Rebuild the connection from scratch on the next check.
+                self.manager.reset()
+        self.last_check = {
+            "ok": ok,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 1),
+            "error": str(error) if error else None,
+            "at": time.time(),
+        }
+        return ok
+
+    def next_delay(self) -> float:
+        if self.failures == 0:
+            return self.interval
+        return min(self.max_backoff, 2 ** (self.failures - 1))
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.check)
+            except Exception as e:
+                logger.error(f"Couchbase health check failed: {e}")
+            await asyncio.sleep(self.next_delay())
+
+    async def stop(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    def status(self) -> dict:
+        return {
+            "running": self._task is not None,
+            "consecutive_failures": self.failures,
+            "next_check_in_s": self.next_delay() if self._task else None,
+            "last_check": self.last_check,
+        }
+
+
+class LazyCluster:
+    """
+    Module-level stand-in for a Cluster (used by tools/_shared.py).
+
+    Connects through the manager on first use; ``bool(cluster)`` is False while
+    no connection is available, matching the old ``cluster = None`` fallback.
+    """
+
+    def __init__(self, manager: ConnectionManager):
+        self._manager = manager
+
+    def __bool__(self) -> bool:
+        return self._manager.get_cluster() is not None
+
+    def __getattr__(self, name: str):
+        cluster = self._manager.get_cluster()
+        if cluster is None:
+            raise RuntimeError(f"Couchbase cluster not available: {self._manager.error}")
+        return getattr(cluster, name)
+
+
+connection_manager = ConnectionManager()
+health_monitor = HealthMonitor(connection_manager)
+
+
+def get_cluster() -> Optional[Cluster]:
+    return connection_manager.get_cluster()
@@ -2,14 +2,22 @@ import logging
 import os
 import re
 import threading
+import time
+from dataclasses import dataclass, fields, replace
 from datetime import date, datetime, timedelta
-from typing import List, Optional
+from typing import Callable, Dict, List, Optional
 
-from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
-from couchbase.auth import PasswordAuthenticator
-from couchbase.cluster import Cluster
-from couchbase.options import ClusterOptions, QueryOptions
-from couchbase.exceptions import DocumentNotFoundException
+from couchbase import subdocument as SD
+from couchbase.collection import Collection
+from couchbase.options import MutateInOptions, QueryOptions
+from couchbase.exceptions import CasMismatchException, DocumentNotFoundException
+
+from backend import tracing
+from backend.connection import ConnectionManager, connection_manager
+from backend.metrics import DB_METHOD_SECONDS, DB_QUERY_SECONDS, timed_methods
+from backend.pagination import cursor_params, decode_cursor, finish_page, page_size
+from backend.queries import reference_patient_statement, similar_patients_query
+from backend.query_stats import PREPAREDS_STATEMENT, query_stats, statement_id
 
 try:
     from dotenv import load_dotenv
@@ -21,7 +29,44 @@ except Exception:
 
 logger = logging.getLogger("cko")
 
-
+# Keyset predicate for "key DESC, META().id DESC" pages; see backend.pagination.
+_KEYSET_DESC = "AND {key} <= $cursor_key AND [{key}, META({alias}).id] < $cursor"
+_APPOINTMENT_KEYSET_DESC = (
+    "AND a.appointment_date <= $cursor_key "
+    "AND [a.appointment_date, a.appointment_time, META(a).id] < $cursor"
+)
+
+
+@dataclass(frozen=True)
+class CollectionRegistry:
+    """Collection handles resolved once in CouchbaseDB.connect() and reused by every call."""
+
+    # Scripps bucket
+    patients: Collection
+    doctors: Collection
+    patient_notes: Collection
+    doctor_notes: Collection
+    doctors_questions: Collection
+    answers_doctors: Collection
+    private_messages: Collection
+    public_messages: Collection
+    appointments: Collection
+    wearables_analytics: Collection
+    pre_visit_questionnaires: Collection
+    # Research bucket (None if it could not be opened)
+    research_questions: Optional[Collection] = None
+    research_answers: Optional[Collection] = None
+    research_papers: Optional[Collection] = None
+
+
+def _research(handle: Optional[Collection]) -> Collection:
+    if handle is None:
+        raise RuntimeError("Research bucket not available")
+    return handle
+
+
+@tracing.traced_methods("CouchbaseDB")
+@timed_methods(DB_METHOD_SECONDS)
 class CouchbaseDB:
     """
     Couchbase database utility for healthcare agent application.
@@ -38,86 +83,106 @@ class CouchbaseDB:
 
     """
 
-    def __init__(self):
-        # Store connection parameters but don't connect yet (lazy initialization)
-        self.endpoint = os.getenv("CLUSTER_CONNECTION_STRING")
-        self.username = os.getenv("CLUSTER_USERNAME", "ac")
-        self.password = os.getenv("CLUSTER_PASS")
+    def __init__(self, connections: Optional[ConnectionManager] = None):
+        # The cluster comes from the process-wide connection manager (lazy initialization)
+        self.connections = connections or connection_manager
         self.bucket_name = os.getenv("COUCHBASE_BUCKET", "Scripps")
         self.research_bucket_name = os.getenv("COUCHBASE_RESEARCH_BUCKET", "Research")
-
-        # Connection tuning
-        self.wait_until_ready_seconds = int(os.getenv("CLUSTER_WAIT_UNTIL_READY_SECONDS", "30"))
-        self.cluster_tls_verify = (os.getenv("CLUSTER_TLS_VERIFY") or "").strip().lower()
-        self.cluster_ssl_no_verify = (os.getenv("CLUSTER_SSL_NO_VERIFY") or "").strip().lower() in (
-            "1",
-            "true",
-            "yes",
-        )
-        self.cluster_disable_tls = (os.getenv("CLUSTER_DISABLE_TLS") or "").strip().lower() in (
-            "1",
-            "true",
-            "yes",
-        )
+        self.questionnaire_keyspace = os.getenv("QUESTIONNAIRE_KEYSPACE", "Questionnaires.PreVisit")
 
         # Connection state
         self.cluster = None
         self.bucket = None
+        self.collections: Optional[CollectionRegistry] = None
         self.patients_collection = None
         self._connection_attempted = False
         self._connection_error = None
         self._is_connected = False
+        # Connection manager generation the handles below were resolved from
+        self._generation = None
 
     def connect(self):
         """Explicitly connect to database - called during FastAPI lifespan startup"""
-        if self._is_connected or self._connection_attempted:
+        if self._is_connected and self._generation == self.connections.generation:
             return
 
+        # Either the first attempt, a retry after a failure, or the HealthMonitor
+        # rebuilt the cluster: (re)resolve every handle from the current one.
         self._connection_attempted = True
-
-        if not self.endpoint or not self.username or not self.password:
-            self._connection_error = RuntimeError(
-                "Missing required environment variables. "
-                "Please set CLUSTER_CONNECTION_STRING, CLUSTER_USERNAME, and CLUSTER_PASS"
-            )
-            print(f"Database connection error: {self._connection_error}")
-            return
+        self._is_connected = False
 
         try:
-            connstr = self._build_connection_string(self.endpoint)
-            auth = PasswordAuthenticator(self.username, self.password)
-            options = ClusterOptions(auth)
-            options.apply_profile("wan_development")
-
-            self.cluster = Cluster(connstr, options)
-            self.cluster.wait_until_ready(timedelta(seconds=self.wait_until_ready_seconds))
+            self.cluster = self.connections.get_cluster()
+            if self.cluster is None:
+                raise self.connections.error or RuntimeError("Couchbase cluster not available")
 
             self.bucket = self.cluster.bucket(self.bucket_name)
 
             # Initialize scopes and collections
             # People scope - for patients and doctors
             self.people_scope = self.bucket.scope("People")
-            self.patients_collection = self.people_scope.collection("Patients")
-            self.doctors_collection = self.people_scope.collection("Doctors")
-
             # Wearables scope - per-patient collections (Patient_1..Patient_5)
             self.wearables_scope = self.bucket.scope("Wearables")
-
             # Notes scope - for patient and doctor notes
             self.notes_scope = self.bucket.scope("Notes")
-            self.patient_notes_collection = self.notes_scope.collection("Patient")
-            self.doctor_notes_collection = self.notes_scope.collection("Doctor")
-
             # Messages scope - for private and public messages
             self.messages_scope = self.bucket.scope("Messages")
-            self.private_messages_collection = self.messages_scope.collection("Private")
-            self.public_messages_collection = self.messages_scope.collection("Public")
-
             # Calendar scope - for appointments
             self.calendar_scope = self.bucket.scope("Calendar")
-            self.appointments_collection = self.calendar_scope.collection("Appointments")
+
+            # Research bucket - opening it must not take down the clinical data
+            research = {}
+            try:
+                pubmed = self.cluster.bucket(self.research_bucket_name).scope("Pubmed")
+                research = {
+                    "research_questions": pubmed.collection("questions"),
+                    "research_answers": pubmed.collection("answers"),
+                    "research_papers": pubmed.collection("Pulmonary"),
+                }
+            except Exception as e:
+                logger.warning(f"Research bucket '{self.research_bucket_name}' not available: {e}")
+
+            questionnaire_scope, questionnaire_collection = self.questionnaire_keyspace.split(
+                ".", 1
+            )
+            self.collections = CollectionRegistry(
+                patients=self.people_scope.collection("Patients"),
+                doctors=self.people_scope.collection("Doctors"),
+                patient_notes=self.notes_scope.collection("Patient"),
+                doctor_notes=self.notes_scope.collection("Doctor"),
+                doctors_questions=self.notes_scope.collection("doctors_questions"),
+                answers_doctors=self.notes_scope.collection("answers_doctors"),
+                private_messages=self.messages_scope.collection("Private"),
+                public_messages=self.messages_scope.collection("Public"),
+                appointments=self.calendar_scope.collection("Appointments"),
+                wearables_analytics=self.wearables_scope.collection("Analytics_Results"),
+                pre_visit_questionnaires=self.bucket.scope(questionnaire_scope).collection(
+                    questionnaire_collection
+                ),
+                **research,
+            )
+            if tracing.enabled():
+                # One span per KV operation on these handles (see backend.tracing).
+                self.collections = replace(
+                    self.collections,
+                    **{
+                        f.name: tracing.trace_collection(getattr(self.collections, f.name), f.name)
+                        for f in fields(self.collections)
+                    },
+                )
+
+            # Attribute names used throughout this class
+            self.patients_collection = self.collections.patients
+            self.doctors_collection = self.collections.doctors
+            self.patient_notes_collection = self.collections.patient_notes
+            self.doctor_notes_collection = self.collections.doctor_notes
+            self.private_messages_collection = self.collections.private_messages
+            self.public_messages_collection = self.collections.public_messages
+            self.appointments_collection = self.collections.appointments
 
             self._is_connected = True
+            self._connection_error = None
+            self._generation = self.connections.generation
             logger.info(
                 "✓ Connected to Couchbase cluster. "
                 f"Scripps bucket: {self.bucket_name}. "
@@ -147,8 +212,7 @@ class CouchbaseDB:
         if self.cluster:
             try:
                 logger.info("Closing Couchbase cluster connection...")
-                # Couchbase SDK doesn't have an explicit close method for cluster
-                # but we can clean up references
+                self.connections.close()
                 self.cluster = None
                 self.bucket = None
                 self.patients_collection = None
@@ -159,37 +223,14 @@ class CouchbaseDB:
 
     def _ensure_connected(self):
         """Lazy initialization - connect to database on first use (fallback for non-lifespan usage)"""
-        if self._is_connected:
+        if self._is_connected and self._generation == self.connections.generation:
             return
         self.connect()
 
-    def _build_connection_string(self, connstr: Optional[str]) -> str:
-        if not connstr:
-            return ""
-
-        # Allow explicitly disabling TLS for local clusters.
-        if self.cluster_disable_tls and connstr.startswith("couchbases://"):
-            connstr = "couchbase://" + connstr.removeprefix("couchbases://")
-
-        # If you're using Capella (couchbases://) and don't want to manage certificates locally,
-        # allow opting into no-verify mode.
-        wants_no_verify = self.cluster_ssl_no_verify or self.cluster_tls_verify == "none"
-        if wants_no_verify and connstr.startswith("couchbases://"):
-            # Normalize by ensuring we have a query string and setting tls_verify=none.
-            parts = urlsplit(connstr)
-            query = dict(parse_qsl(parts.query, keep_blank_values=True))
-            if "tls_verify" not in query and "ssl" not in query:
-                query["tls_verify"] = "none"
-            new_query = urlencode(query)
-
-            # Some examples use a trailing '/?'; ensure urlunsplit doesn't drop the path if missing.
-            path = parts.path or "/"
-            connstr = urlunsplit((parts.scheme, parts.netloc, path, new_query, parts.fragment))
-
-        return connstr
-
     def _check_connection(self):
         """Check if database is connected"""
+        # Fail fast while the cluster is known to be down instead of waiting on timeouts.
+        self.connections.breaker.raise_if_open()
         self._ensure_connected()
 
         if self._connection_error:
@@ -204,6 +245,76 @@ class CouchbaseDB:
                 f"Please verify Scripps bucket exists with proper scopes/collections."
             )
 
+    def _query(
+        self, statement: str, params: Optional[dict] = None, prepared: bool = True
+    ) -> List[dict]:
+        """
+        Run a SQL++ statement and return its rows.
+
+        Statements are prepared (adhoc=False) by default so the query service reuses
+        the cached plan; pass prepared=False for one-off statements. Latency and
+        prepared-plan reuse are recorded in backend.query_stats.
+        """
+        options = QueryOptions(adhoc=not prepared)
+        if params:
+            options = QueryOptions(named_parameters=params, adhoc=not prepared)
+
+        start = time.perf_counter()
+        try:
+            rows = list(self.cluster.query(statement, options))
+        except Exception:
+            elapsed = time.perf_counter() - start
+            query_stats.record(statement, elapsed * 1000, prepared, error=True)
+            DB_QUERY_SECONDS.observe(elapsed, statement=statement_id(statement), outcome="error")
+            raise
+        elapsed = time.perf_counter() - start
+        query_stats.record(statement, elapsed * 1000, prepared, len(rows))
+        DB_QUERY_SECONDS.observe(elapsed, statement=statement_id(statement), outcome="ok")
+        return rows
+
+    def _mutate_fields(self, collection, doc_id: str, fields: dict, cas: Optional[int] = None):
+        """
+        Set top-level fields with a sub-document mutation instead of get + full upsert.
+
+        Only the paths and values go over the wire. Pass cas to fail with
+        CasMismatchException if the document changed since it was read.
+        """
+        specs = [SD.upsert(path, value) for path, value in fields.items()]
+        if cas:
+            return collection.mutate_in(doc_id, specs, MutateInOptions(cas=cas))
+        return collection.mutate_in(doc_id, specs)
+
+    def _update_fields_checked(
+        self,
+        collection,
+        doc_id: str,
+        paths: List[str],
+        derive: Callable[[dict], Optional[dict]],
+        retries: int = 3,
+    ) -> bool:
+        """
+        Read ``paths`` and the CAS, derive the fields to set, and write them only if the
+        document is unchanged; a concurrent write (CasMismatchException) re-reads and retries.
+
+        ``derive(current)`` gets {path: value or None} and returns the fields to set, or
+        None when nothing needs to change.
+        """
+        for attempt in range(retries):
+            result = collection.lookup_in(doc_id, [SD.get(path) for path in paths])
+            current = {
+                path: result.content_as[lambda v: v](i) if result.exists(i) else None
+                for i, path in enumerate(paths)
+            }
+            fields = derive(current)
+            if not fields:
+                return True
+            try:
+                self._mutate_fields(collection, doc_id, fields, result.cas)
+                return True
+            except CasMismatchException:
+                logger.info(f"{doc_id} changed concurrently; retrying ({attempt + 1}/{retries})")
+        raise CasMismatchException(f"{doc_id} kept changing; gave up after {retries} attempts")
+
     def _initials(self, name: str) -> str:
         parts = [p for p in (name or "").split() if p]
         if not parts:
@@ -340,11 +451,7 @@ class CouchbaseDB:
         for keyspace in keyspaces:
             query = query_template.format(keyspace=keyspace)
             try:
-                rows = list(
-                    self.cluster.query(
-                        query, QueryOptions(named_parameters={"patient_id": str(patient_id)})
-                    )
-                )
+                rows = list(self._query(query, {"patient_id": str(patient_id)}))
             except Exception:
                 continue
             if rows and isinstance(rows[0], dict):
@@ -390,10 +497,10 @@ class CouchbaseDB:
                    w.metrics.steps AS steps
             FROM {keyspace} w
             ORDER BY w.timestamp DESC
-            LIMIT {limit}
+            LIMIT $limit
         """
         try:
-            rows = list(self.cluster.query(query))
+            rows = list(self._query(query, {"limit": limit}))
         except Exception:
             rows = []
 
@@ -416,9 +523,7 @@ class CouchbaseDB:
             LIMIT 1
         """
         try:
-            rows = list(
-                self.cluster.query(query, QueryOptions(named_parameters={"patient_id": patient_id}))
-            )
+            rows = list(self._query(query, {"patient_id": patient_id}))
         except Exception:
             return ""
         if not rows:
@@ -433,9 +538,8 @@ class CouchbaseDB:
         """
         try:
             rows = list(
-                self.cluster.query(
-                    query.format(research_bucket=self.research_bucket_name),
-                    QueryOptions(named_parameters={"limit": limit}),
+                self._query(
+                    query.format(research_bucket=self.research_bucket_name), {"limit": limit}
                 )
             )
         except Exception:
@@ -468,9 +572,9 @@ class CouchbaseDB:
         """
         try:
             rows = list(
-                self.cluster.query(
+                self._query(
                     query.format(research_bucket=self.research_bucket_name),
-                    QueryOptions(named_parameters={"pattern": pattern, "limit": int(limit)}),
+                    {"pattern": pattern, "limit": int(limit)},
                 )
             )
         except Exception:
@@ -557,9 +661,7 @@ class CouchbaseDB:
                 WHERE p.patient_id = $patient_id
                 LIMIT 1
             """
-            rows = list(
-                self.cluster.query(query, QueryOptions(named_parameters={"patient_id": patient_id}))
-            )
+            rows = list(self._query(query, {"patient_id": patient_id}))
             if not rows:
                 return None
             return self._patient_doc_to_api(rows[0])
@@ -578,9 +680,7 @@ class CouchbaseDB:
                 WHERE p.patient_id = $patient_id
                 LIMIT 1
             """
-            rows = list(
-                self.cluster.query(query, QueryOptions(named_parameters={"patient_id": patient_id}))
-            )
+            rows = list(self._query(query, {"patient_id": patient_id}))
             if not rows:
                 return None
             if len(rows) == 1 and isinstance(rows[0], dict):
@@ -605,7 +705,7 @@ class CouchbaseDB:
                 SELECT p.*
                 FROM `{self.bucket_name}`.`People`.`Patients` p
             """
-            result = self.cluster.query(query)
+            result = self._query(query)
             return [self._patient_doc_to_api(row) for row in result]
         except Exception as e:
             print(f"Error fetching patients: {e}")
@@ -656,9 +756,7 @@ class CouchbaseDB:
                 AND a.document_type = 'wearable_alert'
                 ORDER BY a.timestamp DESC
             """
-            result = self.cluster.query(
-                query, QueryOptions(named_parameters={"patient_id": patient_id})
-            )
+            result = self._query(query, {"patient_id": patient_id})
             return [row for row in result]
         except Exception as e:
             print(f"Error fetching alerts: {e}")
@@ -688,15 +786,69 @@ class CouchbaseDB:
                 ORDER BY r.generated_at DESC
                 LIMIT 1
             """
-            result = self.cluster.query(
-                query, QueryOptions(named_parameters={"patient_id": patient_id})
-            )
+            result = self._query(query, {"patient_id": patient_id})
             rows = list(result)
             return rows[0] if rows else None
         except Exception as e:
             print(f"Error fetching research: {e}")
             return None
 
+    def save_previsit_packet(self, patient_id: str, packet: dict) -> bool:
+        """Save a precomputed pre-visit packet to Notes.Doctor (one per patient)"""
+        self._check_connection()
+        try:
+            packet["document_type"] = "previsit_packet"
+            packet["patient_id"] = str(patient_id)
+            self.doctor_notes_collection.upsert(f"previsit_packet::{patient_id}", packet)
+            return True
+        except Exception as e:
+            print(f"Error saving previsit packet: {e}")
+            return False
+
+    def get_previsit_packet(self, patient_id: str) -> Optional[dict]:
+        """Get the precomputed pre-visit packet for a patient (KV lookup)"""
+        self._check_connection()
+        try:
+            result = self.doctor_notes_collection.get(f"previsit_packet::{patient_id}")
+            return result.content_as[dict]
+        except DocumentNotFoundException:
+            return None
+        except Exception as e:
+            print(f"Error fetching previsit packet: {e}")
+            return None
+
+    def get_previsit_inputs(self, patient_id: str) -> Optional[dict]:
+        """
+        Fingerprint of everything a pre-visit packet is generated from.
+
+        Returns document ids with their CAS (any edit changes the CAS) for the
+        patient record and notes, plus the newest wearable timestamp.
+        """
+        self._check_connection()
+        try:
+            wearables = self._wearables_keyspace_for_patient_id(patient_id)
+            wearable_expr = (
+                f"(SELECT RAW MAX(w.timestamp) FROM {wearables} w)[0]" if wearables else "NULL"
+            )
+            b = f"`{self.bucket_name}`"
+            query = f"""
+                SELECT
+                  (SELECT RAW META(p).cas FROM {b}.`People`.`Patients` p
+                   WHERE p.patient_id = $patient_id) AS patient,
+                  (SELECT RAW [META(n).id, META(n).cas] FROM {b}.`Notes`.`Doctor` n
+                   WHERE n.patient_id = $patient_id AND n.visit_notes IS VALUED
+                   ORDER BY META(n).id) AS doctor_notes,
+                  (SELECT RAW [META(n).id, META(n).cas] FROM {b}.`Notes`.`Patient` n
+                   WHERE n.patient_id = $patient_id
+                   ORDER BY META(n).id) AS patient_notes,
+                  {wearable_expr} AS wearables_latest
+            """
+            rows = self._query(query, {"patient_id": str(patient_id)})
+            return rows[0] if rows else None
+        except Exception as e:
+            print(f"Error fetching previsit inputs: {e}")
+            return None
+
     # NOTE: Questionnaires scope collection names TBD
     # Temporarily saving to Notes.Doctor until collection is confirmed
 
@@ -733,37 +885,82 @@ class CouchbaseDB:
                 ORDER BY n.generated_at DESC
                 LIMIT 1
             """
-            result = self.cluster.query(
-                query, QueryOptions(named_parameters={"patient_id": patient_id})
-            )
+            result = self._query(query, {"patient_id": patient_id})
             rows = list(result)
             return rows[0] if rows else None
         except Exception as e:
             print(f"Error fetching questionnaire: {e}")
             return None
 
-    def save_doctor_note(self, note_id: str, note_data: dict) -> bool:
-        """Save a doctor note to Notes.Doctor collection"""
+    # Raw pre-visit questionnaires (QUESTIONNAIRE_SOURCE=couchbase), keyed by patient id
+
+    def save_pre_visit_questionnaire(self, patient_id: str, questionnaire: dict) -> bool:
+        """Save a raw pre-visit questionnaire document (id = patient id)"""
         self._check_connection()
         try:
-            note_data.pop("type", None)
-            self.doctor_notes_collection.upsert(note_id, note_data)
+            self.collections.pre_visit_questionnaires.upsert(str(patient_id), questionnaire)
             return True
         except Exception as e:
-            print(f"Error saving doctor note: {e}")
+            print(f"Error saving pre-visit questionnaire: {e}")
             return False
 
-    def upsert_doctor_note_embedding(self, note_id: str, embedding: list[float]) -> bool:
-        """Upsert an embedding vector to a doctor note document (field: all_notes_vectorized)."""
+    def get_pre_visit_questionnaire(self, patient_id: str) -> Optional[dict]:
+        """Get a raw pre-visit questionnaire document (KV lookup)"""
+        self._check_connection()
+        try:
+            result = self.collections.pre_visit_questionnaires.get(str(patient_id))
+            return result.content_as[dict]
+        except DocumentNotFoundException:
+            return None
+        except Exception as e:
+            print(f"Error fetching pre-visit questionnaire: {e}")
+            return None
+
+    def get_pre_visit_questionnaire_versions(self, patient_ids: List[str]) -> Dict[str, int]:
+        """CAS of each existing pre-visit questionnaire, in one USE KEYS query"""
+        self._check_connection()
+        try:
+            scope, collection = self.questionnaire_keyspace.split(".", 1)
+            query = f"""
+                SELECT RAW [META(q).id, META(q).cas]
+                FROM `{self.bucket_name}`.`{scope}`.`{collection}` q
+                USE KEYS $keys
+            """
+            rows = self._query(query, {"keys": [str(pid) for pid in patient_ids]})
+            return {row[0]: row[1] for row in rows}
+        except Exception as e:
+            print(f"Error fetching pre-visit questionnaire versions: {e}")
+            return {}
+
+    def save_doctor_note(self, note_id: str, note_data: dict) -> Optional[int]:
+        """Save a doctor note to Notes.Doctor collection; returns the write's CAS (None on error)"""
+        self._check_connection()
+        try:
+            note_data.pop("type", None)
+            return self.doctor_notes_collection.upsert(note_id, note_data).cas
+        except Exception as e:
+            print(f"Error saving doctor note: {e}")
+            return None
+
+    def upsert_doctor_note_embedding(
+        self, note_id: str, embedding: list[float], cas: Optional[int] = None
+    ) -> bool:
+        """Upsert an embedding vector to a doctor note document (field: all_notes_vectorized).
+
+        Pass the CAS from the note write the embedding was computed from so a
+        vector for stale text never lands on a newer edit.
+        """
         self._check_connection()
         try:
-            existing = self.doctor_notes_collection.get(note_id)
-            doc = existing.content_as[dict]
-            doc["all_notes_vectorized"] = embedding
-            self.doctor_notes_collection.upsert(note_id, doc)
+            self._mutate_fields(
+                self.doctor_notes_collection, note_id, {"all_notes_vectorized": embedding}, cas
+            )
             return True
         except DocumentNotFoundException:
             return False
+        except CasMismatchException:
+            print(f"Skipping stale embedding for doctor note {note_id}: note changed")
+            return False
         except Exception as e:
             print(f"Error upserting doctor note embedding: {e}")
             return False
@@ -795,9 +992,7 @@ class CouchbaseDB:
                   AND TRIM(TOSTRING(n.visit_notes)) != ''
                 ORDER BY n.visit_date DESC
             """
-            result = self.cluster.query(
-                query, QueryOptions(named_parameters={"patient_id": patient_id})
-            )
+            result = self._query(query, {"patient_id": patient_id})
             rows = [row for row in result]
             for r in rows:
                 r["date"] = self._normalize_date_string(r.get("date"))
@@ -807,6 +1002,12 @@ class CouchbaseDB:
             print(f"Error fetching doctor notes: {e}")
             return []
 
+    def get_doctor_notes_for_patient_page(
+        self, patient_id: str, limit: int = 50, cursor: Optional[str] = None
+    ) -> dict:
+        """Get one page of doctor notes for a patient, newest first (keyset on visit_date, id)"""
+        return self._notes_page("Doctor", patient_id, limit, cursor)
+
     def save_patient_note(self, note_id: str, note_data: dict) -> bool:
         """Save a patient note to Notes.Patient collection"""
         self._check_connection()
@@ -835,9 +1036,7 @@ class CouchbaseDB:
                   AND TRIM(TOSTRING(n.visit_notes)) != ''
                 ORDER BY n.visit_date DESC
             """
-            result = self.cluster.query(
-                query, QueryOptions(named_parameters={"patient_id": patient_id})
-            )
+            result = self._query(query, {"patient_id": patient_id})
             rows = [row for row in result]
             for r in rows:
                 r["date"] = self._normalize_date_string(r.get("date"))
@@ -847,43 +1046,96 @@ class CouchbaseDB:
             print(f"Error fetching patient notes: {e}")
             return []
 
+    def get_patient_notes_for_patient_page(
+        self, patient_id: str, limit: int = 50, cursor: Optional[str] = None
+    ) -> dict:
+        """Get one page of patient notes for a patient, newest first (keyset on visit_date, id)"""
+        return self._notes_page("Patient", patient_id, limit, cursor)
+
+    def _notes_page(self, collection: str, patient_id: str, limit, cursor) -> dict:
+        size = page_size(limit)
+        after = decode_cursor(cursor)
+        self._check_connection()
+        try:
+            query = f"""
+                SELECT META(n).id AS id,
+                       n.visit_date AS date,
+                       '' AS time,
+                       n.visit_notes AS content,
+                       [n.visit_date, META(n).id] AS _sort
+                FROM `{self.bucket_name}`.`Notes`.`{collection}` n
+                WHERE n.patient_id = $patient_id
+                  AND n.visit_date IS VALUED
+                  AND TRIM(TOSTRING(n.visit_date)) != ''
+                  AND n.visit_notes IS VALUED
+                  AND TRIM(TOSTRING(n.visit_notes)) != ''
+                  {_KEYSET_DESC.format(key="n.visit_date", alias="n") if after else ""}
+                ORDER BY n.visit_date DESC, META(n).id DESC
+                LIMIT $limit
+            """
+            params = {"patient_id": patient_id, "limit": size + 1, **cursor_params(after)}
+            rows, next_cursor = finish_page(self._query(query, params), size)
+            for r in rows:
+                r["date"] = self._normalize_date_string(r.get("date"))
+            rows = [r for r in rows if r.get("content") and r.get("date")]
+            return {"items": rows, "next_cursor": next_cursor}
+        except Exception as e:
+            print(f"Error fetching {collection.lower()} notes page: {e}")
+            return {"items": [], "next_cursor": None}
+
     # Messages Methods
 
     def get_private_messages(self, doctor_id: str, limit: int = 50) -> List[dict]:
         """Get private messages for a specific doctor from Messages.Private collection"""
+        return self.get_private_messages_page(doctor_id, limit)["items"]
+
+    def get_private_messages_page(
+        self, doctor_id: str, limit: int = 50, cursor: Optional[str] = None
+    ) -> dict:
+        """Get one page of private messages for a doctor, newest first (keyset on timestamp, id)"""
+        size = page_size(limit)
+        after = decode_cursor(cursor)
         self._check_connection()
         try:
             query = f"""
-                SELECT m.*
+                SELECT m.*, [m.timestamp, META(m).id] AS _sort
                 FROM `{self.bucket_name}`.`Messages`.`Private` m
-                WHERE m.to_id = $doctor_id
-                   OR m.from_id = $doctor_id
-                ORDER BY m.timestamp DESC
+                WHERE (m.to_id = $doctor_id OR m.from_id = $doctor_id)
+                  {_KEYSET_DESC.format(key="m.timestamp", alias="m") if after else ""}
+                ORDER BY m.timestamp DESC, META(m).id DESC
                 LIMIT $limit
             """
-            result = self.cluster.query(
-                query, QueryOptions(named_parameters={"doctor_id": doctor_id, "limit": limit})
-            )
-            return [row for row in result]
+            params = {"doctor_id": doctor_id, "limit": size + 1, **cursor_params(after)}
+            rows, next_cursor = finish_page(self._query(query, params), size)
+            return {"items": rows, "next_cursor": next_cursor}
         except Exception as e:
             print(f"Error fetching private messages: {e}")
-            return []
+            return {"items": [], "next_cursor": None}
 
     def get_public_messages(self, limit: int = 50) -> List[dict]:
         """Get public messages for all Scripps staff from Messages.Public collection"""
+        return self.get_public_messages_page(limit)["items"]
+
+    def get_public_messages_page(self, limit: int = 50, cursor: Optional[str] = None) -> dict:
+        """Get one page of public messages, newest first (keyset on timestamp, id)"""
+        size = page_size(limit)
+        after = decode_cursor(cursor)
         self._check_connection()
         try:
             query = f"""
-                SELECT m.*
+                SELECT m.*, [m.timestamp, META(m).id] AS _sort
                 FROM `{self.bucket_name}`.`Messages`.`Public` m
-                ORDER BY m.timestamp DESC
+                WHERE m.timestamp IS NOT MISSING
+                  {_KEYSET_DESC.format(key="m.timestamp", alias="m") if after else ""}
+                ORDER BY m.timestamp DESC, META(m).id DESC
                 LIMIT $limit
             """
-            result = self.cluster.query(query, QueryOptions(named_parameters={"limit": limit}))
-            return [row for row in result]
+            params = {"limit": size + 1, **cursor_params(after)}
+            rows, next_cursor = finish_page(self._query(query, params), size)
+            return {"items": rows, "next_cursor": next_cursor}
         except Exception as e:
             print(f"Error fetching public messages: {e}")
-            return []
+            return {"items": [], "next_cursor": None}
 
     def save_private_message(self, message_id: str, message_data: dict) -> bool:
         """Save a private message to Messages.Private collection"""
@@ -916,15 +1168,43 @@ class CouchbaseDB:
             collection = (
                 self.private_messages_collection if is_private else self.public_messages_collection
             )
-            message = collection.get(message_id)
-            message_data = message.content_as[dict]
-            message_data["read"] = True
-            collection.upsert(message_id, message_data)
+            # Idempotent constant write: no read or CAS needed.
+            self._mutate_fields(collection, message_id, {"read": True})
             return True
         except Exception as e:
             print(f"Error marking message as read: {e}")
             return False
 
+    def mark_all_messages_as_read(self, doctor_id: Optional[str] = None) -> int:
+        """Mark every unread message for a doctor (or all public messages) as read.
+
+        One UPDATE on the query service instead of a get + upsert per message.
+        Returns the number of messages updated, or -1 on error.
+        """
+        self._check_connection()
+        try:
+            if doctor_id is not None:
+                query = f"""
+                    UPDATE `{self.bucket_name}`.`Messages`.`Private` m
+                    SET m.`read` = TRUE
+                    WHERE m.to_id = $doctor_id
+                      AND (m.`read` IS NOT VALUED OR m.`read` = FALSE)
+                    RETURNING RAW META(m).id
+                """
+                rows = self._query(query, {"doctor_id": doctor_id})
+            else:
+                query = f"""
+                    UPDATE `{self.bucket_name}`.`Messages`.`Public` m
+                    SET m.`read` = TRUE
+                    WHERE m.`read` IS NOT VALUED OR m.`read` = FALSE
+                    RETURNING RAW META(m).id
+                """
+                rows = self._query(query)
+            return len(rows)
+        except Exception as e:
+            print(f"Error marking all messages as read: {e}")
+            return -1
+
     # Calendar/Appointments Methods
 
     def get_appointments_for_doctor(
@@ -942,15 +1222,13 @@ class CouchbaseDB:
                     AND a.appointment_date <= $end_date
                     ORDER BY a.appointment_date, a.appointment_time
                 """
-                result = self.cluster.query(
+                result = self._query(
                     query,
-                    QueryOptions(
-                        named_parameters={
-                            "doctor_id": doctor_id,
-                            "start_date": start_date,
-                            "end_date": end_date,
-                        }
-                    ),
+                    {
+                        "doctor_id": doctor_id,
+                        "start_date": start_date,
+                        "end_date": end_date,
+                    },
                 )
             else:
                 query = f"""
@@ -959,9 +1237,7 @@ class CouchbaseDB:
                     WHERE a.doctor_id = $doctor_id
                     ORDER BY a.appointment_date, a.appointment_time
                 """
-                result = self.cluster.query(
-                    query, QueryOptions(named_parameters={"doctor_id": doctor_id})
-                )
+                result = self._query(query, {"doctor_id": doctor_id})
             return [row for row in result]
         except Exception as e:
             print(f"Error fetching appointments: {e}")
@@ -977,14 +1253,51 @@ class CouchbaseDB:
                 WHERE a.patient_id = $patient_id
                 ORDER BY a.appointment_date DESC, a.appointment_time DESC
             """
-            result = self.cluster.query(
-                query, QueryOptions(named_parameters={"patient_id": patient_id})
-            )
+            result = self._query(query, {"patient_id": patient_id})
             return [row for row in result]
         except Exception as e:
             print(f"Error fetching patient appointments: {e}")
             return []
 
+    def get_appointments_for_patient_page(
+        self, patient_id: str, limit: int = 50, cursor: Optional[str] = None
+    ) -> dict:
+        """Get one page of a patient's appointments, latest first (keyset on date, time, id)"""
+        size = page_size(limit)
+        after = decode_cursor(cursor)
+        self._check_connection()
+        try:
+            query = f"""
+                SELECT a.*, [a.appointment_date, a.appointment_time, META(a).id] AS _sort
+                FROM `{self.bucket_name}`.`Calendar`.`Appointments` a
+                WHERE a.patient_id = $patient_id
+                  {_APPOINTMENT_KEYSET_DESC if after else ""}
+                ORDER BY a.appointment_date DESC, a.appointment_time DESC, META(a).id DESC
+                LIMIT $limit
+            """
+            params = {"patient_id": patient_id, "limit": size + 1, **cursor_params(after)}
+            rows, next_cursor = finish_page(self._query(query, params), size)
+            return {"items": rows, "next_cursor": next_cursor}
+        except Exception as e:
+            print(f"Error fetching patient appointments: {e}")
+            return {"items": [], "next_cursor": None}
+
+    def get_upcoming_appointment_patients(self, start_date: str, end_date: str) -> List[str]:
+        """Distinct patient_ids with a scheduled appointment between two YYYY-MM-DD dates"""
+        self._check_connection()
+        try:
+            query = f"""
+                SELECT DISTINCT RAW TOSTRING(a.patient_id)
+                FROM `{self.bucket_name}`.`Calendar`.`Appointments` a
+                WHERE a.appointment_date BETWEEN $start_date AND $end_date
+                  AND (a.status IS MISSING OR a.status = "scheduled")
+                  AND a.patient_id IS VALUED
+            """
+            return self._query(query, {"start_date": start_date, "end_date": end_date})
+        except Exception as e:
+            print(f"Error fetching upcoming appointments: {e}")
+            return []
+
     def save_appointment(self, appointment_id: str, appointment_data: dict) -> bool:
         """Save an appointment to Calendar.Appointments collection"""
         self._check_connection()
@@ -996,15 +1309,31 @@ class CouchbaseDB:
             print(f"Error saving appointment: {e}")
             return False
 
-    def update_appointment_status(self, appointment_id: str, status: str) -> bool:
-        """Update the status of an appointment"""
+    def update_appointment_status(
+        self, appointment_id: str, status: str, cas: Optional[int] = None
+    ) -> bool:
+        """
+        Update the status of an appointment.
+
+        With ``cas`` (from the caller's read) the update fails if the appointment changed
+        since; without it the status is read and written under its current CAS.
+        """
         self._check_connection()
         try:
-            appointment = self.appointments_collection.get(appointment_id)
-            appointment_data = appointment.content_as[dict]
-            appointment_data["status"] = status
-            self.appointments_collection.upsert(appointment_id, appointment_data)
-            return True
+            if cas:
+                self._mutate_fields(
+                    self.appointments_collection, appointment_id, {"status": status}, cas
+                )
+                return True
+            return self._update_fields_checked(
+                self.appointments_collection,
+                appointment_id,
+                ["status"],
+                lambda current: None if current["status"] == status else {"status": status},
+            )
+        except CasMismatchException:
+            print(f"Appointment {appointment_id} changed concurrently; status not updated")
+            return False
         except Exception as e:
             print(f"Error updating appointment status: {e}")
             return False
@@ -1062,13 +1391,13 @@ class CouchbaseDB:
             FROM `{self.bucket_name}`.Wearables.`{collection_name}` w
             WHERE DATE_DIFF_STR(NOW_STR(), w.timestamp, 'day') <= $days
             ORDER BY w.timestamp DESC
-            {f"LIMIT {limit}" if limit else ""}
+            {"LIMIT $limit" if limit else ""}
             """
 
-            result = self.cluster.query(
-                query,
-                QueryOptions(named_parameters={"days": days}),
-            )
+            params = {"days": days}
+            if limit:
+                params["limit"] = int(limit)
+            result = self._query(query, params)
 
             return list(result)
 
@@ -1100,63 +1429,26 @@ class CouchbaseDB:
         self._check_connection()
         try:
             # First get reference patient
-            ref_query = f"""
-            SELECT p.patient_id, p.age, p.gender, p.medical_conditions
-            FROM `{self.bucket_name}`.People.Patients p
-            WHERE p.patient_id = $patient_id
-            LIMIT 1
-            """
-
-            ref_result = self.cluster.query(
-                ref_query,
-                QueryOptions(named_parameters={"patient_id": patient_id}),
+            ref_result = self._query(
+                reference_patient_statement(self.bucket_name), {"patient_id": patient_id}
             )
 
             ref_rows = list(ref_result)
             if not ref_rows:
                 return []
 
-            ref_patient = ref_rows[0]
-            ref_age = int(ref_patient.get("age", 0))
-            ref_gender = ref_patient.get("gender", "")
-            ref_condition = ref_patient.get("medical_conditions", "")
-
-            # Build query conditions
-            conditions = [
-                f"p.patient_id != '{patient_id}'",
-                f"ABS(TO_NUMBER(p.age) - {ref_age}) <= {age_range}",
-            ]
-
-            if same_gender and ref_gender:
-                conditions.append(f"LOWER(p.gender) = '{ref_gender.lower()}'")
-
-            if same_condition and ref_condition:
-                conditions.append(
-                    f"(LOWER(p.medical_conditions) = '{ref_condition.lower()}' OR "
-                    f"ANY c IN p.medical_conditions SATISFIES LOWER(c) = '{ref_condition.lower()}' END)"
-                )
-
-            where_clause = " AND ".join(conditions)
-
-            query = f"""
-            SELECT 
-                p.patient_id,
-                p.patient_name,
-                p.age,
-                p.gender,
-                p.medical_conditions,
-                ABS(TO_NUMBER(p.age) - {ref_age}) AS age_difference
-            FROM `{self.bucket_name}`.People.Patients p
-            WHERE {where_clause}
-            ORDER BY age_difference ASC
-            LIMIT $limit
-            """
-
-            result = self.cluster.query(
-                query,
-                QueryOptions(named_parameters={"limit": limit}),
+            query, params = similar_patients_query(
+                self.bucket_name,
+                ref_rows[0],
+                patient_id,
+                age_range=age_range,
+                same_condition=same_condition,
+                same_gender=same_gender,
+                limit=limit,
             )
 
+            result = self._query(query, params)
+
             return list(result)
 
         except Exception as e:
@@ -1176,22 +1468,47 @@ class CouchbaseDB:
         """
         self._check_connection()
         try:
-            # Save to a new collection for analytics results
-            # You may want to create this collection in your schema
-            analytics_collection = self.bucket.scope("Wearables").collection("Analytics_Results")
-            analytics_collection.upsert(result_id, result_data)
+            self.collections.wearables_analytics.upsert(result_id, result_data)
             return True
         except Exception as e:
             print(f"Error saving wearable analytics result: {e}")
             return False
 
+    def save_cohort_member(self, patient_id: str, member_data: dict) -> bool:
+        """Save a patient's cohort aggregate inputs to Wearables.Analytics_Results"""
+        self._check_connection()
+        try:
+            doc = {
+                **member_data,
+                "type": "cohort_member",
+                "patient_id": str(patient_id),
+                "updated_at": datetime.now().isoformat(),
+            }
+            self.collections.wearables_analytics.upsert(f"cohort_member::{patient_id}", doc)
+            return True
+        except Exception as e:
+            print(f"Error saving cohort member: {e}")
+            return False
+
+    def get_cohort_members(self) -> List[dict]:
+        """Retrieve all cohort aggregate member documents"""
+        self._check_connection()
+        try:
+            query = f"""
+                SELECT r.patient_id, r.`condition`, r.age, r.gender, r.metrics
+                FROM `{self.bucket_name}`.Wearables.Analytics_Results r
+                WHERE r.type = "cohort_member"
+            """
+            return list(self._query(query))
+        except Exception as e:
+            print(f"Error fetching cohort members: {e}")
+            return []
+
     def save_research_question(self, question_id: str, question_data: dict) -> bool:
         """Save a research question to Research.Pubmed.questions collection"""
         self._check_connection()
         try:
-            research_bucket = self.cluster.bucket(self.research_bucket_name)
-            questions_collection = research_bucket.scope("Pubmed").collection("questions")
-            questions_collection.upsert(question_id, question_data)
+            _research(self.collections.research_questions).upsert(question_id, question_data)
             return True
         except Exception as e:
             print(f"Error saving research question: {e}")
@@ -1201,8 +1518,7 @@ class CouchbaseDB:
         """Save a doctor-notes question to Notes.doctors_questions collection"""
         self._check_connection()
         try:
-            doctors_questions_collection = self.notes_scope.collection("doctors_questions")
-            doctors_questions_collection.upsert(question_id, question_data)
+            self.collections.doctors_questions.upsert(question_id, question_data)
             return True
         except Exception as e:
             print(f"Error saving doctors question: {e}")
@@ -1212,9 +1528,7 @@ class CouchbaseDB:
         """Save a research answer to Research.Pubmed.answers collection"""
         self._check_connection()
         try:
-            research_bucket = self.cluster.bucket(self.research_bucket_name)
-            answers_collection = research_bucket.scope("Pubmed").collection("answers")
-            answers_collection.upsert(answer_id, answer_data)
+            _research(self.collections.research_answers).upsert(answer_id, answer_data)
             return True
         except Exception as e:
             print(f"Error saving research answer: {e}")
@@ -1224,8 +1538,7 @@ class CouchbaseDB:
         """Save a doctor-notes answer to Notes.answers_doctors collection"""
         self._check_connection()
         try:
-            answers_doctors_collection = self.notes_scope.collection("answers_doctors")
-            answers_doctors_collection.upsert(answer_id, answer_data)
+            self.collections.answers_doctors.upsert(answer_id, answer_data)
             return True
         except Exception as e:
             print(f"Error saving answers_doctors: {e}")
@@ -1235,13 +1548,14 @@ class CouchbaseDB:
         """Update the rating for a research answer"""
         self._check_connection()
         try:
-            research_bucket = self.cluster.bucket(self.research_bucket_name)
-            answers_collection = research_bucket.scope("Pubmed").collection("answers")
-            answer = answers_collection.get(answer_id)
-            answer_data = answer.content_as[dict]
-            answer_data["answer_rating"] = rating
-            answers_collection.upsert(answer_id, answer_data)
-            return True
+            return self._update_fields_checked(
+                _research(self.collections.research_answers),
+                answer_id,
+                ["answer_rating"],
+                lambda current: (
+                    None if current["answer_rating"] == rating else {"answer_rating": rating}
+                ),
+            )
         except Exception as e:
             print(f"Error updating answer rating: {e}")
             return False
@@ -1250,9 +1564,7 @@ class CouchbaseDB:
         """Save a research paper to Research.Pubmed.Pulmonary collection."""
         self._check_connection()
         try:
-            research_bucket = self.cluster.bucket(self.research_bucket_name)
-            pulmonary_collection = research_bucket.scope("Pubmed").collection("Pulmonary")
-            pulmonary_collection.upsert(paper_id, paper_data)
+            _research(self.collections.research_papers).upsert(paper_id, paper_data)
             logger.info(f"Saved research paper: {paper_id}")
             return True
         except Exception as e:
@@ -1269,9 +1581,7 @@ class CouchbaseDB:
                 WHERE article_citation = $url
                 LIMIT 1
             """
-            result = self.cluster.query(
-                query, QueryOptions(named_parameters={"url": article_citation})
-            )
+            result = self._query(query, {"url": article_citation})
             return len(list(result)) > 0
         except Exception as e:
             logger.error(f"Error checking paper existence: {e}")
@@ -1297,9 +1607,7 @@ class CouchbaseDB:
                     WHERE r.article_citation = $citation
                     LIMIT 1
                 """
-                rows = list(
-                    self.cluster.query(query, QueryOptions(named_parameters={"citation": citation}))
-                )
+                rows = list(self._query(query, {"citation": citation}))
                 if rows and isinstance(rows[0], dict):
                     pmc_link = rows[0].get("pmc_link")
                     if isinstance(pmc_link, str) and pmc_link.strip():
@@ -1312,7 +1620,7 @@ class CouchbaseDB:
                     WHERE r.title = $title
                     LIMIT 1
                 """
-                rows = list(self.cluster.query(query, QueryOptions(named_parameters={"title": t})))
+                rows = list(self._query(query, {"title": t}))
                 if rows and isinstance(rows[0], dict):
                     pmc_link = rows[0].get("pmc_link")
                     if isinstance(pmc_link, str) and pmc_link.strip():
@@ -1323,6 +1631,11 @@ class CouchbaseDB:
             logger.warning(f"Error resolving paper pmc_link: {e}")
             return None
 
+    def get_prepared_statements(self) -> List[dict]:
+        """Prepared plans cached by the query service (system:prepareds, one row per node)."""
+        self._check_connection()
+        return self._query(PREPAREDS_STATEMENT, prepared=False)
+
 
 # Global database instance
 _db_instance = None
@@ -0,0 +1,211 @@
+"""
+Readiness and deep health checks with per-dependency latency.
+
+Each dependency has a probe (a blocking or async callable); its result is cached
+for HEALTH_CACHE_SECONDS (default 15) so load-balancer polling does not hammer
+Couchbase or the model endpoints, and concurrent checks share one probe run.
+
+- couchbase_kv:    KV get of a missing key (a DocumentNotFound reply is a healthy round trip)
+- couchbase_query: ``SELECT 1``
+- embedding:       one embedding of a short string
+- llm:             model listing (no tokens are generated)
+
+A probe slower than HEALTH_SLOW_MS (default 1000) reports "slow"; one that raises
+or exceeds HEALTH_PROBE_TIMEOUT_SECONDS (default 5) reports "down". Couchbase is
+required for readiness; the model endpoints only mark the worker degraded.
+
+The health routes are open to load balancers; callers without the API key get
+public_view() of a report, without exception messages or the worker's host:pid.
+"""
+
+import asyncio
+import inspect
+import logging
+import os
+import socket
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from couchbase.exceptions import DocumentNotFoundException
+
+from backend import agent_registry
+from backend.connection import connection_manager
+from backend.database import db
+
+logger = logging.getLogger("cko")
+
+OK = "ok"
+SLOW = "slow"
+DOWN = "down"
+
+# Report fields only shown to callers with the API key.
+PRIVATE_FIELDS = frozenset({"error", "last_error", "worker"})
+
+
+class DependencyProbe:
+    def __init__(
+        self,
+        name: str,
+        probe: Callable[[], Any],
+        required: bool = False,
+        ttl: Optional[float] = None,
+        timeout: Optional[float] = None,
+        slow_ms: Optional[float] = None,
+    ):
+        self.name = name
+        self.probe = probe
+        self.required = required
+        self.ttl = ttl if ttl is not None else float(os.getenv("HEALTH_CACHE_SECONDS", "15"))
+        self.timeout = timeout or float(os.getenv("HEALTH_PROBE_TIMEOUT_SECONDS", "5"))
+        self.slow_ms = slow_ms or float(os.getenv("HEALTH_SLOW_MS", "1000"))
+        self._result: Optional[dict] = None
+        self._checked_at = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+        self.runs = 0
+
+    def _fresh(self) -> bool:
+        return self._result is not None and time.monotonic() - self._checked_at < self.ttl
+
+    async def check(self, force: bool = False) -> dict:
+        """Return the cached result, probing the dependency when it has expired."""
+        if not force and self._fresh():
+            return {**self._result, "cached": True}
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            # Another caller may have refreshed it while we waited.
+            if not force and self._fresh():
+                return {**self._result, "cached": True}
+            self._result = await self._run()
+            self._checked_at = time.monotonic()
+            self.runs += 1
+        return {**self._result, "cached": False}
+
+    async def _run(self) -> dict:
+        start = time.perf_counter()
+        error = None
+        try:
+            if inspect.iscoroutinefunction(self.probe):
+                await asyncio.wait_for(self.probe(), timeout=self.timeout)
+            else:
+                await asyncio.wait_for(asyncio.to_thread(self.probe), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            error = f"timed out after {self.timeout:.0f}s"
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        latency_ms = round((time.perf_counter() - start) * 1000, 1)
+
+        if error is not None:
+            status = DOWN
+            logger.warning(f"Health probe {self.name} failed: {error}")
+        elif latency_ms > self.slow_ms:
+            status = SLOW
+        else:
+            status = OK
+        return {
+            "status": status,
+            "latency_ms": latency_ms,
+            "required": self.required,
+            "error": error,
+            "checked_at": time.time(),
+        }
+
+
+class HealthChecker:
+    def __init__(self, probes: List[DependencyProbe]):
+        self.probes: Dict[str, DependencyProbe] = {p.name: p for p in probes}
+
+    async def _check(self, names: List[str], force: bool = False) -> Dict[str, dict]:
+        results = await asyncio.gather(*(self.probes[n].check(force=force) for n in names))
+        return dict(zip(names, results))
+
+    @staticmethod
+    def _overall(results: Dict[str, dict]) -> str:
+        if any(r["status"] == DOWN and r["required"] for r in results.values()):
+            return DOWN
+        if any(r["status"] != OK for r in results.values()):
+            return "degraded"
+        return OK
+
+    async def ready(self) -> dict:
+        """Readiness: only the required dependencies (Couchbase)."""
+        names = [n for n, p in self.probes.items() if p.required]
+        results = await self._check(names)
+        return {
+            "ready": self._overall(results) != DOWN,
+            "worker": _worker_id(),
+            "dependencies": results,
+        }
+
+    async def deep(self, force: bool = False) -> dict:
+        """Every dependency with its latency; ``force`` bypasses the result cache."""
+        results = await self._check(list(self.probes), force=force)
+        status = self._overall(results)
+        return {
+            "status": status,
+            "ready": status != DOWN,
+            "worker": _worker_id(),
+            "dependencies": results,
+            # Agents load lazily; this reports what is loaded without loading it.
+            "agents": agent_registry.status(),
+        }
+
+
+def public_view(report: Any) -> Any:
+    """Copy of a health report without the PRIVATE_FIELDS, at any depth."""
+    if isinstance(report, dict):
+        return {k: public_view(v) for k, v in report.items() if k not in PRIVATE_FIELDS}
+    if isinstance(report, list):
+        return [public_view(v) for v in report]
+    return report
+
+
+def _worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _require_circuit_closed() -> None:
+    # Report an open circuit straight away instead of waiting on a dead cluster.
+    connection_manager.breaker.raise_if_open()
+
+
+def probe_couchbase_kv() -> None:
+    _require_circuit_closed()
+    db._ensure_connected()
+    if db.collections is None:
+        raise RuntimeError(f"Couchbase not connected: {db._connection_error}")
+    try:
+        db.collections.patients.get("__health_probe__")
+    except DocumentNotFoundException:
+        pass
+
+
+def probe_couchbase_query() -> None:
+    _require_circuit_closed()
+    db._ensure_connected()
+    if db.cluster is None:
+        raise RuntimeError(f"Couchbase not connected: {db._connection_error}")
+    list(db.cluster.query("SELECT 1 AS ok"))
+
+
+async def probe_embedding() -> None:
+    from backend.utils.embedding_client import embedding_vector
+
+    if not await embedding_vector("health check"):
+        raise RuntimeError("embedding endpoint returned no vector")
+
+
+async def probe_llm() -> None:
+    from backend.utils.llm_client import list_models
+
+    await list_models()
+
+
+health_checker = HealthChecker(
+    [
+        DependencyProbe("couchbase_kv", probe_couchbase_kv, required=True),
+        DependencyProbe("couchbase_query", probe_couchbase_query, required=True),
+        DependencyProbe("embedding", probe_embedding),
+        DependencyProbe("llm", probe_llm),
+    ]
+)
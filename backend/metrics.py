@@ -0,0 +1,290 @@
+"""
+Latency histograms and counters exposed in the Prometheus text format on /metrics.
+
+A small in-process registry (no client library needed): histograms are cumulative
+per label set, safe to update from worker threads, and rendered in exposition
+format 0.0.4. What is measured:
+
+- http_request_duration_seconds{method, route, status}: route is the path template
+- db_method_duration_seconds{method, outcome}: every public CouchbaseDB method
+- db_query_duration_seconds{statement, outcome}: statement id as in /api/admin/query-stats
+- llm_request_duration_seconds{client, model, operation, outcome} and
+  llm_tokens_total{client, model, kind}: backend LLM / embedding clients
+- agent_run_duration_seconds{agent, patients, outcome}, agent_tokens_total{agent, kind}
+- agent_step_duration_seconds{agent, step, kind, patients}: agent steps, tools and LLM calls
+
+``patients`` is a bucket of how many patients an agent call covered
+(see ``patient_bucket``), which keeps label cardinality bounded.
+"""
+
+import bisect
+import functools
+import inspect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; spans a KV get (~1ms) to a multi-step agent run (~1min).
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+_PATIENT_BUCKETS = ((0, "0"), (1, "1"), (5, "2-5"), (20, "6-20"), (100, "21-100"))
+
+
+def patient_bucket(count: Optional[int]) -> str:
+    """Label value for the number of patients a call covered."""
+    if count is None:
+        return "unknown"
+    for upper, label in _PATIENT_BUCKETS:
+        if count <= upper:
+            return label
+    return "100+"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(pairs: Iterable[Tuple[str, str]]) -> str:
+    body = ",".join(f'{name}="{_escape(value)}"' for name, value in pairs)
+    return f"{{{body}}}" if body else ""
+
+
+def _format_number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def render(self):
+        yield from self.header()
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            labels = _format_labels(zip(self.labelnames, key))
+            yield f"{self.name}{labels} {_format_number(value)}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label key -> [per-bucket counts (+Inf last), sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the block; ``outcome`` (if a label) is set to error on raise."""
+        start = time.perf_counter()
+        outcome = "ok"
+        try:
+            yield
+        except BaseException:
+            outcome = "error"
+            raise
+        finally:
+            if "outcome" in self.labelnames:
+                labels = {**labels, "outcome": outcome}
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        series = self._series.get(self._key(labels))
+        return sum(series[0]) if series else 0
+
+    def render(self):
+        yield from self.header()
+        with self._lock:
+            items = sorted((key, (list(s[0]), s[1])) for key, s in self._series.items())
+        for key, (counts, total) in items:
+            pairs = list(zip(self.labelnames, key))
+            cumulative = 0
+            for upper, bucket_count in zip((*self.buckets, math.inf), counts):
+                cumulative += bucket_count
+                labels = _format_labels([*pairs, ("le", _format_number(upper))])
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(pairs)
+            yield f"{self.name}_sum{labels} {_format_number(total)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template.",
+    ("method", "route", "status"),
+)
+DB_METHOD_SECONDS = registry.histogram(
+    "db_method_duration_seconds",
+    "CouchbaseDB method latency.",
+    ("method", "outcome"),
+)
+DB_QUERY_SECONDS = registry.histogram(
+    "db_query_duration_seconds",
+    "SQL++ statement latency by statement id (see /api/admin/query-stats).",
+    ("statement", "outcome"),
+)
+LLM_REQUEST_SECONDS = registry.histogram(
+    "llm_request_duration_seconds",
+    "LLM and embedding endpoint latency.",
+    ("client", "model", "operation", "outcome"),
+)
+LLM_TOKENS = registry.counter(
+    "llm_tokens_total",
+    "Tokens reported by the LLM and embedding endpoints.",
+    ("client", "model", "kind"),
+)
+AGENT_RUN_SECONDS = registry.histogram(
+    "agent_run_duration_seconds",
+    "End-to-end agent invocation latency.",
+    ("agent", "patients", "outcome"),
+)
+AGENT_STEP_SECONDS = registry.histogram(
+    "agent_step_duration_seconds",
+    "Latency of individual agent steps, tool calls and LLM calls.",
+    ("agent", "step", "kind", "patients"),
+)
+AGENT_TOKENS = registry.counter(
+    "agent_tokens_total",
+    "Tokens used by agent runs.",
+    ("agent", "kind"),
+)
+
+
+def record_token_usage(counter: Counter, usage: Optional[dict], **labels) -> None:
+    """Add input/output token counts from a usage dict (OpenAI or LangChain field names)."""
+    if not usage:
+        return
+    for kind, names in (
+        ("input", ("input_tokens", "prompt_tokens")),
+        ("output", ("output_tokens", "completion_tokens")),
+    ):
+        value = next((usage.get(n) for n in names if usage.get(n)), 0)
+        if value:
+            counter.inc(int(value), kind=kind, **labels)
+
+
+def timed_methods(histogram: Histogram, exclude: Sequence[str] = ()):
+    """
+    Class decorator: observe every public method in ``histogram``
+    (labels ``method`` and ``outcome``).
+    """
+
+    def decorate(cls):
+        for name, fn in list(vars(cls).items()):
+            # Plain functions only: staticmethods, classmethods and properties are left as-is.
+            if name.startswith("_") or name in exclude or not inspect.isfunction(fn):
+                continue
+            setattr(cls, name, _timed(histogram, name, fn))
+        return cls
+
+    return decorate
+
+
+def _timed(histogram: Histogram, name: str, fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with histogram.time(method=name):
+            return fn(*args, **kwargs)
+
+    return wrapper
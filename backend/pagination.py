@@ -0,0 +1,73 @@
+"""
+Keyset (cursor) pagination helpers.
+
+A page query orders by its sort keys plus META().id as a tie-breaker and selects
+those values as ``_sort``:
+
+    SELECT ..., [m.timestamp, META(m).id] AS _sort
+    ...
+    WHERE ... AND m.timestamp <= $cursor_key AND [m.timestamp, META(m).id] < $cursor
+    ORDER BY m.timestamp DESC, META(m).id DESC
+    LIMIT $limit
+
+``$limit`` is the page size plus one, so the extra row tells us whether another
+page exists. The cursor handed to clients is the ``_sort`` array of the last row
+on the page, encoded as URL-safe base64 JSON. ``$cursor_key`` is its first
+element; the ``<=`` term on it keeps the leading sort key sargable and the array
+comparison resolves ties.
+"""
+
+import base64
+import binascii
+import json
+from typing import Optional
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def page_size(limit, default: int = DEFAULT_PAGE_SIZE) -> int:
+    try:
+        size = int(limit)
+    except Exception:
+        size = default
+    if size <= 0:
+        size = default
+    return min(size, MAX_PAGE_SIZE)
+
+
+def encode_cursor(sort_values: list) -> str:
+    raw = json.dumps(list(sort_values), separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[list]:
+    """Decode a cursor from encode_cursor(); raises ValueError if it is malformed."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (binascii.Error, UnicodeError, json.JSONDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {e}") from e
+    if not isinstance(values, list) or len(values) < 2:
+        raise ValueError("Invalid cursor: expected sort values")
+    return values
+
+
+def cursor_params(cursor: Optional[list]) -> dict:
+    """Named parameters for the cursor predicate (empty on the first page)."""
+    if not cursor:
+        return {}
+    return {"cursor": cursor, "cursor_key": cursor[0]}
+
+
+def finish_page(rows: list, size: int) -> tuple[list, Optional[str]]:
+    """Trim a size+1 result to one page and build the cursor for the next one."""
+    next_cursor = None
+    if len(rows) > size:
+        rows = rows[:size]
+        next_cursor = encode_cursor(rows[-1].get("_sort") or [])
+    for row in rows:
+        row.pop("_sort", None)
+    return rows, next_cursor
@@ -0,0 +1,206 @@
+"""
+Precomputed pre-visit packets.
+
+Every night (PREVISIT_RUN_AT, local time) the scheduler scans Calendar.Appointments
+for patients seen in the next PREVISIT_LOOKAHEAD_DAYS days and generates their
+pre-visit summary, wearables summary and doctor-notes summary ahead of time,
+with at most PREVISIT_CONCURRENCY patients in flight.
+
+A packet is stored as one Notes.Doctor document (``previsit_packet::<patient_id>``)
+together with the hash of the inputs it was generated from (patient record and
+note CAS values, newest wearable reading, questionnaire version). It is served only
+while that hash still matches and it is younger than PREVISIT_MAX_AGE_HOURS;
+otherwise the API falls back to generating on demand.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime, time as dtime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Optional
+
+from backend.questionnaires import questionnaire_index
+
+logger = logging.getLogger("cko")
+
+Generator = Callable[[str], Awaitable[dict]]
+
+
+def _parse_run_at(value: str) -> dtime:
+    try:
+        hour, minute = (int(x) for x in value.split(":", 1))
+        return dtime(hour, minute)
+    except Exception:
+        return dtime(2, 0)
+
+
+def seconds_until(run_at: dtime, now: Optional[datetime] = None) -> float:
+    now = now or datetime.now()
+    target = datetime.combine(now.date(), run_at)
+    if target <= now:
+        target += timedelta(days=1)
+    return (target - now).total_seconds()
+
+
+def hash_inputs(inputs: dict) -> str:
+    raw = json.dumps(inputs, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class PrevisitPacketScheduler:
+    def __init__(
+        self,
+        db,
+        generators: Dict[str, Generator],
+        concurrency: Optional[int] = None,
+        lookahead_days: Optional[int] = None,
+        max_age_hours: Optional[float] = None,
+        run_at: Optional[str] = None,
+    ):
+        self.db = db
+        self.generators = dict(generators)
+        self.concurrency = concurrency or int(os.getenv("PREVISIT_CONCURRENCY", "3"))
+        self.lookahead_days = lookahead_days or int(os.getenv("PREVISIT_LOOKAHEAD_DAYS", "1"))
+        self.max_age = timedelta(
+            hours=max_age_hours or float(os.getenv("PREVISIT_MAX_AGE_HOURS", "36"))
+        )
+        self.run_at = _parse_run_at(run_at or os.getenv("PREVISIT_RUN_AT", "02:00"))
+        self._task: Optional[asyncio.Task] = None
+        self._running: Optional[asyncio.Task] = None
+        self.last_run: Optional[dict] = None
+
+    # Inputs and freshness
+
+    def input_hash(self, patient_id: str) -> Optional[str]:
+        inputs = self.db.get_previsit_inputs(patient_id)
+        if inputs is None:
+            return None
+        inputs["questionnaire"] = questionnaire_index.version(patient_id)
+        return hash_inputs(inputs)
+
+    def _is_fresh(self, packet: Optional[dict], current_hash: Optional[str]) -> bool:
+        if not packet or not current_hash or packet.get("input_hash") != current_hash:
+            return False
+        try:
+            generated_at = datetime.fromisoformat(packet["generated_at"])
+        except Exception:
+            return False
+        return datetime.now(timezone.utc) - generated_at <= self.max_age
+
+    def get_fresh(self, patient_id: str, part: Optional[str] = None) -> Optional[dict]:
+        """Return the stored packet (or one part of it) if its inputs are unchanged."""
+        packet = self.db.get_previsit_packet(patient_id)
+        if not packet or not self._is_fresh(packet, self.input_hash(patient_id)):
+            return None
+        if part is None:
+            return packet
+        return (packet.get("parts") or {}).get(part)
+
+    # Generation
+
+    async def build_packet(self, patient_id: str, input_hash: Optional[str] = None) -> dict:
+        input_hash = input_hash or await asyncio.to_thread(self.input_hash, patient_id)
+        parts, errors = {}, {}
+        for name, generate in self.generators.items():
+            try:
+                parts[name] = await generate(patient_id)
+            except Exception as e:
+                logger.warning(
+                    "Previsit packet part %s failed patient_id=%s: %s", name, patient_id, e
+                )
+                errors[name] = str(e)
+        packet = {
+            "input_hash": input_hash,
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "parts": parts,
+            "errors": errors,
+        }
+        if parts:
+            await asyncio.to_thread(self.db.save_previsit_packet, patient_id, packet)
+        return packet
+
+    async def refresh_upcoming(self, start: Optional[str] = None, days: Optional[int] = None):
+        """Generate packets for upcoming appointments, skipping ones still fresh."""
+        start_date = datetime.fromisoformat(start).date() if start else datetime.now().date()
+        end_date = start_date + timedelta(days=days or self.lookahead_days)
+        patient_ids = self.db.get_upcoming_appointment_patients(
+            start_date.isoformat(), end_date.isoformat()
+        )
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        stats = {"patients": len(patient_ids), "generated": 0, "fresh": 0, "failed": 0}
+
+        async def one(patient_id: str):
+            async with semaphore:
+                try:
+                    # Blocking SDK calls; keep them off the event loop.
+                    current = await asyncio.to_thread(self.input_hash, patient_id)
+                    stored = await asyncio.to_thread(self.db.get_previsit_packet, patient_id)
+                    if self._is_fresh(stored, current):
+                        stats["fresh"] += 1
+                        return
+                    packet = await self.build_packet(patient_id, current)
+                    stats["generated" if packet["parts"] else "failed"] += 1
+                except Exception as e:
+                    logger.warning("Previsit packet failed patient_id=%s: %s", patient_id, e)
+                    stats["failed"] += 1
+
+        started = datetime.now(timezone.utc)
+        await asyncio.gather(*(one(pid) for pid in patient_ids))
+        self.last_run = {
+            **stats,
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat(),
+            "started_at": started.isoformat(),
+            "duration_s": round((datetime.now(timezone.utc) - started).total_seconds(), 2),
+        }
+        logger.info("Previsit packets refreshed: %s", self.last_run)
+        return self.last_run
+
+    def trigger(self, start: Optional[str] = None, days: Optional[int] = None) -> bool:
+        """Start a refresh in the background; False if one is already running."""
+        if self._running is not None and not self._running.done():
+            return False
+        self._running = asyncio.create_task(self.refresh_upcoming(start, days))
+        return True
+
+    # Nightly loop
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._nightly())
+
+    async def _nightly(self) -> None:
+        while True:
+            await asyncio.sleep(seconds_until(self.run_at))
+            # Same guard as the manual refresh: never two batches at once.
+            if not self.trigger():
+                logger.info("Nightly previsit refresh skipped: a refresh is already running")
+                continue
+            try:
+                await self._running
+            except Exception as e:
+                logger.error("Nightly previsit packet refresh failed: %s", e)
+
+    async def stop(self) -> None:
+        for task in (self._task, self._running):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = None
+        self._running = None
+
+    def status(self) -> dict:
+        return {
+            "scheduled": self._task is not None,
+            "next_run_in_s": round(seconds_until(self.run_at)) if self._task else None,
+            "refresh_running": self._running is not None and not self._running.done(),
+            "concurrency": self.concurrency,
+            "lookahead_days": self.lookahead_days,
+            "last_run": self.last_run,
+        }
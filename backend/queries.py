@@ -0,0 +1,109 @@
+"""
+Shared SQL++ statements for patient cohort lookups.
+
+Statements are static text with named parameters only, so the query service can
+cache one prepared plan per variant (run them with ``QueryOptions(adhoc=False)``).
+The predicates use the same normalized expressions as the covering index in
+``indexes/secondary/patients_similarity.sqlpp``:
+
+    LOWER(medical_conditions), LOWER(gender), TO_NUMBER(age)
+
+``medical_conditions`` is a string on some patients and an array on others, so the
+condition filter matches either form; the array branch is served by the
+``DISTINCT ARRAY LOWER(c) FOR c IN medical_conditions END`` index in the same file
+(the planner combines the two with a UNION scan).
+
+Only the (same_gender, same_condition) switches change the statement text, so
+there are at most four prepared plans per bucket.
+"""
+
+from functools import lru_cache
+from typing import Optional
+
+REFERENCE_PATIENT_QUERY = """
+    SELECT p.patient_id, p.age, p.gender, p.medical_conditions
+    FROM `{bucket}`.People.Patients p
+    WHERE p.patient_id = $patient_id
+    LIMIT 1
+"""
+
+
+@lru_cache(maxsize=None)
+def reference_patient_statement(bucket: str) -> str:
+    return REFERENCE_PATIENT_QUERY.format(bucket=bucket)
+
+
+@lru_cache(maxsize=None)
+def similar_patients_statement(bucket: str, same_gender: bool, same_condition: bool) -> str:
+    """Build one of the four static similar-patient statements."""
+    where = [
+        "TO_NUMBER(p.age) BETWEEN $min_age AND $max_age",
+        "p.patient_id != $patient_id",
+    ]
+    if same_gender:
+        where.append("LOWER(p.gender) = $gender")
+    if same_condition:
+        where.append(
+            "(LOWER(p.medical_conditions) = $condition"
+            " OR ANY c IN p.medical_conditions SATISFIES LOWER(c) = $condition END)"
+        )
+
+    return f"""
+    SELECT p.patient_id, p.patient_name, p.age, p.gender, p.medical_conditions,
+           ABS(TO_NUMBER(p.age) - $ref_age) AS age_difference
+    FROM `{bucket}`.People.Patients p
+    WHERE {" AND ".join(where)}
+    ORDER BY age_difference ASC
+    LIMIT $limit
+    """
+
+
+def primary_condition(value) -> str:
+    """Normalize medical_conditions (string or list) to the lower-cased first entry."""
+    if isinstance(value, list):
+        value = value[0] if value else ""
+    return str(value or "").strip().lower()
+
+
+def similar_patients_query(
+    bucket: str,
+    ref_patient: dict,
+    patient_id: str,
+    age_range: int = 5,
+    same_condition: bool = True,
+    same_gender: bool = True,
+    limit: int = 10,
+) -> tuple[str, dict]:
+    """
+    Return (statement, named_parameters) for a similar-patients lookup.
+
+    A criterion is dropped when the reference patient has no value for it, which
+    mirrors the previous behaviour of the interpolated query.
+    """
+    try:
+        ref_age = int(float(ref_patient.get("age") or 0))
+    except Exception:
+        ref_age = 0
+    try:
+        age_range = abs(int(age_range))
+    except Exception:
+        age_range = 5
+
+    gender: Optional[str] = str(ref_patient.get("gender") or "").strip().lower() or None
+    condition: Optional[str] = primary_condition(ref_patient.get("medical_conditions")) or None
+    use_gender = bool(same_gender and gender)
+    use_condition = bool(same_condition and condition)
+
+    params = {
+        "patient_id": str(patient_id),
+        "ref_age": ref_age,
+        "min_age": ref_age - age_range,
+        "max_age": ref_age + age_range,
+        "limit": int(limit),
+    }
+    if use_gender:
+        params["gender"] = gender
+    if use_condition:
+        params["condition"] = condition
+
+    return similar_patients_statement(bucket, use_gender, use_condition), params
@@ -0,0 +1,181 @@
+"""
+Per-statement SQL++ latency and plan-cache statistics.
+
+CouchbaseDB._query() records every statement it runs here. Statements are keyed
+by their whitespace-normalized text, so the same statement issued with different
+named parameters aggregates into a single row.
+
+``prepared_reuses`` / ``prepared_reuse_rate`` are a client-side estimate, not a
+measurement of the query service's plan cache: a prepared (adhoc=False) execution
+counts as a reuse when the previous run of the same statement in this process
+succeeded. Ad hoc executions and the first (or first after an error) prepared run
+never count.
+
+The server's own numbers come from ``system:prepareds`` (``uses`` and
+``avgServiceTime`` per prepared plan, summed across query nodes); see
+``with_server_usage`` and GET /api/admin/query-stats?server=true.
+"""
+
+import hashlib
+import re
+import threading
+from typing import Optional
+
+_WS = re.compile(r"\s+")
+# system:prepareds stores the PREPARE statement; strip it to match our statement text.
+_PREPARE = re.compile(r"^PREPARE\s+(?:FORCE\s+)?(?:\S+\s+(?:FROM|AS)\s+)?", re.IGNORECASE)
+
+PREPAREDS_STATEMENT = (
+    "SELECT p.statement, p.uses, p.avgServiceTime, p.node FROM system:prepareds AS p"
+)
+
+
+def normalize_statement(statement: str) -> str:
+    return _WS.sub(" ", str(statement or "")).strip()
+
+
+def statement_id(statement: str) -> str:
+    return hashlib.sha1(normalize_statement(statement).encode("utf-8")).hexdigest()[:12]
+
+
+class _StatementStats:
+    __slots__ = (
+        "statement",
+        "prepared",
+        "count",
+        "errors",
+        "reuses",
+        "first_runs",
+        "total_ms",
+        "max_ms",
+        "last_ms",
+        "rows",
+        "_plan_cached",
+    )
+
+    def __init__(self, statement: str, prepared: bool):
+        self.statement = statement
+        self.prepared = prepared
+        self.count = 0
+        self.errors = 0
+        self.reuses = 0
+        self.first_runs = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_ms = 0.0
+        self.rows = 0
+        self._plan_cached = False
+
+    def to_dict(self, sid: str) -> dict:
+        runs = self.reuses + self.first_runs
+        return {
+            "id": sid,
+            "statement": self.statement,
+            "prepared": self.prepared,
+            "count": self.count,
+            "errors": self.errors,
+            "total_ms": round(self.total_ms, 2),
+            "avg_ms": round(self.total_ms / self.count, 2) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 2),
+            "last_ms": round(self.last_ms, 2),
+            "rows": self.rows,
+            "prepared_reuses": self.reuses,
+            "prepared_first_runs": self.first_runs,
+            "prepared_reuse_rate": round(self.reuses / runs, 3) if runs else 0.0,
+        }
+
+
+class QueryStatsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: dict[str, _StatementStats] = {}
+
+    def record(
+        self,
+        statement: str,
+        elapsed_ms: float,
+        prepared: bool,
+        rows: int = 0,
+        error: bool = False,
+    ) -> None:
+        text = normalize_statement(statement)
+        sid = statement_id(text)
+        with self._lock:
+            st = self._stats.get(sid)
+            if st is None:
+                st = _StatementStats(text, prepared)
+                self._stats[sid] = st
+            st.count += 1
+            st.total_ms += elapsed_ms
+            st.last_ms = elapsed_ms
+            st.max_ms = max(st.max_ms, elapsed_ms)
+            st.rows += rows
+            st.prepared = prepared
+            if prepared and st._plan_cached:
+                st.reuses += 1
+            else:
+                st.first_runs += 1
+            if error:
+                st.errors += 1
+                st._plan_cached = False
+            else:
+                st._plan_cached = prepared
+
+    def snapshot(self, limit: Optional[int] = 20, sort_by: str = "total_ms") -> dict:
+        """Hottest statements first (by total_ms, count or avg_ms)."""
+        with self._lock:
+            rows = [st.to_dict(sid) for sid, st in self._stats.items()]
+
+        if sort_by not in ("total_ms", "count", "avg_ms", "max_ms", "errors"):
+            sort_by = "total_ms"
+        rows.sort(key=lambda r: r[sort_by], reverse=True)
+
+        executions = sum(r["count"] for r in rows)
+        reuses = sum(r["prepared_reuses"] for r in rows)
+        runs = reuses + sum(r["prepared_first_runs"] for r in rows)
+        return {
+            "statements_tracked": len(rows),
+            "executions": executions,
+            "prepared_reuse_rate": round(reuses / runs, 3) if runs else 0.0,
+            "statements": rows[:limit] if limit else rows,
+        }
+
+    @staticmethod
+    def with_server_usage(snapshot: dict, prepareds: list) -> dict:
+        """
+        Add the query service's plan-cache counters to a snapshot.
+
+        ``prepareds`` are rows of PREPAREDS_STATEMENT. Each statement gets
+        ``server_plan_uses`` (executions served by its cached plan, all nodes) and
+        ``server_avg_service_time``; the totals cover every prepared plan on the cluster.
+        """
+        by_id: dict[str, dict] = {}
+        for row in prepareds or []:
+            text = _PREPARE.sub("", normalize_statement(row.get("statement")))
+            usage = by_id.setdefault(statement_id(text), {"uses": 0, "avg": None})
+            usage["uses"] += int(row.get("uses") or 0)
+            usage["avg"] = usage["avg"] or row.get("avgServiceTime")
+
+        statements = []
+        for row in snapshot.get("statements", []):
+            usage = by_id.get(row["id"]) or {}
+            statements.append(
+                {
+                    **row,
+                    "server_plan_uses": usage.get("uses", 0),
+                    "server_avg_service_time": usage.get("avg"),
+                }
+            )
+        return {
+            **snapshot,
+            "statements": statements,
+            "server_prepared_plans": len(by_id),
+            "server_plan_uses": sum(u["uses"] for u in by_id.values()),
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+
+query_stats = QueryStatsRegistry()
@@ -0,0 +1,254 @@
+"""
+In-memory index of pre-visit questionnaires, keyed by patient id.
+
+Each entry remembers the version it was parsed from (file mtime/size, or the
+document CAS when QUESTIONNAIRE_SOURCE=couchbase), so a lookup only costs a
+stat (or one USE KEYS query for a whole batch) and the JSON is re-read only
+when it actually changed.
+
+With the optional ``inotify_simple`` package on Linux (QUESTIONNAIRE_WATCH,
+default on), file changes invalidate entries as they happen and cached
+lookups skip the stat entirely.
+"""
+
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+logger = logging.getLogger("cko")
+
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+except ImportError:  # optional; falls back to stat-per-lookup
+    INotify = None
+    inotify_flags = None
+
+QUESTIONNAIRE_DIR = Path(__file__).parent.parent / "data" / "questionnaires"
+QUESTIONNAIRE_FILENAME = "pre_visit_questionnaire.json"
+
+
+def normalize_questionnaire(data: Any) -> Optional[dict]:
+    """Files hold a one-element list; documents hold the object itself."""
+    if isinstance(data, list):
+        data = data[0] if data else None
+    return data if isinstance(data, dict) else None
+
+
+class FileQuestionnaireSource:
+    """data/questionnaires/patient_<id>/pre_visit_questionnaire.json"""
+
+    def __init__(self, root: Optional[Path] = None):
+        self.root = Path(root or QUESTIONNAIRE_DIR)
+
+    def path(self, patient_id: str) -> Path:
+        return self.root / f"patient_{patient_id}" / QUESTIONNAIRE_FILENAME
+
+    def versions(self, patient_ids: List[str]) -> Dict[str, Any]:
+        versions = {}
+        for patient_id in patient_ids:
+            try:
+                st = self.path(patient_id).stat()
+            except OSError:
+                continue
+            versions[patient_id] = (st.st_mtime_ns, st.st_size)
+        return versions
+
+    def load(self, patient_id: str) -> Optional[dict]:
+        return normalize_questionnaire(
+            json.loads(self.path(patient_id).read_text(encoding="utf-8"))
+        )
+
+
+class CouchbaseQuestionnaireSource:
+    """Documents in QUESTIONNAIRE_KEYSPACE, keyed by patient id; version is the CAS."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def versions(self, patient_ids: List[str]) -> Dict[str, Any]:
+        return self.db.get_pre_visit_questionnaire_versions(patient_ids)
+
+    def load(self, patient_id: str) -> Optional[dict]:
+        return normalize_questionnaire(self.db.get_pre_visit_questionnaire(patient_id))
+
+
+class _Entry(NamedTuple):
+    version: Any
+    data: Optional[dict]
+    error: Optional[str]
+
+
+class QuestionnaireIndex:
+    def __init__(self, source=None):
+        self.source = source or FileQuestionnaireSource()
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+        self._watch_stop: Optional[threading.Event] = None
+        self._watch_thread: Optional[threading.Thread] = None
+        self._stats = {"hits": 0, "loads": 0, "invalidations": 0}
+
+    # Lookups
+
+    def _lookup(self, patient_ids: Iterable[Any]) -> Dict[str, Optional[_Entry]]:
+        ids = list(dict.fromkeys(str(pid) for pid in patient_ids))
+        with self._lock:
+            found = {pid: self._entries.get(pid) for pid in ids}
+
+        # While inotify is watching, a cached entry is current until an event drops it.
+        stale = [pid for pid in ids if not self.watching or found[pid] is None]
+        versions = self.source.versions(stale) if stale else {}
+        for pid in stale:
+            version = versions.get(pid)
+            if version is None:
+                found[pid] = None
+                with self._lock:
+                    self._entries.pop(pid, None)
+            elif found[pid] is None or found[pid].version != version:
+                found[pid] = self._load(pid, version)
+            else:
+                self._stats["hits"] += 1
+        self._stats["hits"] += len(ids) - len(stale)
+        return found
+
+    def _load(self, patient_id: str, version: Any) -> _Entry:
+        try:
+            entry = _Entry(version, self.source.load(patient_id), None)
+        except Exception as e:
+            logger.warning("Invalid questionnaire patient_id=%s: %s", patient_id, e)
+            entry = _Entry(version, None, str(e))
+        self._stats["loads"] += 1
+        with self._lock:
+            self._entries[patient_id] = entry
+        return entry
+
+    def get(self, patient_id: Any) -> Optional[dict]:
+        """The parsed questionnaire, or None if there is none; ValueError if unreadable."""
+        entry = self._lookup([patient_id])[str(patient_id)]
+        if entry is None:
+            return None
+        if entry.error:
+            raise ValueError(f"Invalid questionnaire format: {entry.error}")
+        return entry.data
+
+    def version(self, patient_id: Any) -> Any:
+        """Version token (mtime/size or CAS) of the current questionnaire, None if missing."""
+        entry = self._lookup([patient_id])[str(patient_id)]
+        return entry.version if entry is not None else None
+
+    def status(self, patient_ids: Iterable[Any]) -> List[dict]:
+        """Existence/completion for many patients; only changed entries are re-read."""
+        ids = [str(pid) for pid in patient_ids]
+        entries = self._lookup(ids)
+        statuses = []
+        for patient_id in ids:
+            entry = entries[patient_id]
+            date_completed = (entry.data or {}).get("date_completed") if entry else None
+            statuses.append(
+                {
+                    "patient_id": patient_id,
+                    "exists": entry is not None,
+                    "completed": bool(date_completed),
+                    "date_completed": date_completed,
+                }
+            )
+        return statuses
+
+    def invalidate(self, patient_id: Optional[str] = None) -> None:
+        with self._lock:
+            if patient_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(str(patient_id), None)
+        self._stats["invalidations"] += 1
+
+    def stats(self) -> dict:
+        return {
+            **self._stats,
+            "entries": len(self._entries),
+            "source": type(self.source).__name__,
+            "watching": self.watching,
+        }
+
+    # inotify
+
+    @property
+    def watching(self) -> bool:
+        return self._watch_thread is not None and self._watch_thread.is_alive()
+
+    def start_watching(self) -> bool:
+        """Invalidate entries from inotify events; False if unavailable for this source."""
+        if self.watching:
+            return True
+        if INotify is None or not isinstance(self.source, FileQuestionnaireSource):
+            return False
+        try:
+            inotify = INotify()
+            mask = (
+                inotify_flags.CLOSE_WRITE
+                | inotify_flags.MOVED_TO
+                | inotify_flags.MOVED_FROM
+                | inotify_flags.DELETE
+                | inotify_flags.CREATE
+            )
+            root_wd = inotify.add_watch(str(self.source.root), mask)
+            patient_wds = {}
+            for directory in self.source.root.glob("patient_*"):
+                patient_wds[inotify.add_watch(str(directory), mask)] = directory.name[8:]
+        except OSError as e:
+            logger.warning("Questionnaire inotify watch unavailable: %s", e)
+            return False
+
+        # Entries loaded before the watch existed may already be stale.
+        self.invalidate()
+        self._watch_stop = threading.Event()
+        self._watch_thread = threading.Thread(
+            target=self._watch,
+            args=(inotify, mask, root_wd, patient_wds, self._watch_stop),
+            name="questionnaire-inotify",
+            daemon=True,
+        )
+        self._watch_thread.start()
+        return True
+
+    def _watch(self, inotify, mask, root_wd, patient_wds, stop) -> None:
+        try:
+            while not stop.is_set():
+                for event in inotify.read(timeout=500):
+                    if event.mask & inotify_flags.Q_OVERFLOW:
+                        self.invalidate()
+                    elif event.wd == root_wd and event.name.startswith("patient_"):
+                        directory = self.source.root / event.name
+                        if event.mask & (inotify_flags.CREATE | inotify_flags.MOVED_TO):
+                            patient_wds[inotify.add_watch(str(directory), mask)] = event.name[8:]
+                        self.invalidate(event.name[8:])
+                    elif event.wd in patient_wds:
+                        self.invalidate(patient_wds[event.wd])
+        except Exception as e:
+            logger.warning("Questionnaire inotify watch stopped: %s", e)
+        finally:
+            inotify.close()
+            # Back to stat-per-lookup; nothing cached can be trusted blindly any more.
+            self._watch_thread = None
+
+    def stop_watching(self) -> None:
+        thread = self._watch_thread
+        if thread is None:
+            return
+        self._watch_stop.set()
+        thread.join(timeout=2)
+
+
+def create_questionnaire_index() -> QuestionnaireIndex:
+    """Pick the source from QUESTIONNAIRE_SOURCE (files | couchbase)."""
+    source = (os.getenv("QUESTIONNAIRE_SOURCE") or "files").strip().lower()
+    if source == "couchbase":
+        from backend.database import db
+
+        return QuestionnaireIndex(CouchbaseQuestionnaireSource(db))
+    return QuestionnaireIndex(FileQuestionnaireSource())
+
+
+questionnaire_index = create_questionnaire_index()
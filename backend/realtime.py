@@ -0,0 +1,236 @@
+"""
+In-process pub/sub for pushing new messages to connected clients.
+
+The API publishes every message it saves; WebSocket handlers subscribe to the
+channels for one doctor and forward events as they arrive, so the inbox no
+longer has to poll the ORDER BY timestamp DESC queries.
+
+Backends (PUBSUB_BACKEND):
+- ``memory`` (default): fan-out inside one worker process.
+- ``redis``: workers share events through Redis pub/sub (REDIS_URL). Needs the
+  optional ``redis`` package.
+
+BrokeredPubSub works with any broker that has ``publish(channel, payload)`` and
+``listen()``; LocalBroker is an in-process broker that stands in for Redis in
+tests (several BrokeredPubSub instances on one LocalBroker behave like several
+workers).
+"""
+
+import asyncio
+import json
+import logging
+import os
+import uuid
+from typing import AsyncIterator, Iterable, Optional
+
+try:
+    import redis.asyncio as redis_asyncio
+except Exception:
+    redis_asyncio = None
+
+logger = logging.getLogger("cko")
+
+PUBLIC_CHANNEL = "inbox:public"
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+def private_channel(doctor_id: str) -> str:
+    return f"inbox:{doctor_id}"
+
+
+class Subscription:
+    """Async iterator over events published to a set of channels."""
+
+    def __init__(self, pubsub: "InMemoryPubSub", channels: Iterable[str]):
+        self._pubsub = pubsub
+        self.channels = tuple(dict.fromkeys(channels))
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.dropped = 0
+
+    def put(self, event: dict) -> None:
+        # A slow client should not block publishers: drop its oldest event.
+        if self.queue.full():
+            try:
+                self.queue.get_nowait()
+                self.dropped += 1
+            except asyncio.QueueEmpty:
+                pass
+        self.queue.put_nowait(event)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> dict:
+        return await self.queue.get()
+
+    def close(self) -> None:
+        self._pubsub._unsubscribe(self)
+
+
+class InMemoryPubSub:
+    """Single-process fan-out; also the local delivery layer for brokered backends."""
+
+    def __init__(self):
+        self._subscribers: dict[str, set[Subscription]] = {}
+
+    async def start(self) -> None:
+        return None
+
+    async def close(self) -> None:
+        self._subscribers.clear()
+
+    def subscribe(self, channels: Iterable[str]) -> Subscription:
+        sub = Subscription(self, channels)
+        for channel in sub.channels:
+            self._subscribers.setdefault(channel, set()).add(sub)
+        return sub
+
+    def _unsubscribe(self, sub: Subscription) -> None:
+        for channel in sub.channels:
+            subs = self._subscribers.get(channel)
+            if subs is None:
+                continue
+            subs.discard(sub)
+            if not subs:
+                self._subscribers.pop(channel, None)
+
+    def subscriber_count(self, channel: Optional[str] = None) -> int:
+        if channel is not None:
+            return len(self._subscribers.get(channel, ()))
+        return len({sub for subs in self._subscribers.values() for sub in subs})
+
+    def _deliver(self, channel: str, event: dict) -> int:
+        subs = list(self._subscribers.get(channel, ()))
+        for sub in subs:
+            sub.put({**event, "channel": channel})
+        return len(subs)
+
+    async def publish(self, channel: str, event: dict) -> None:
+        self._deliver(channel, event)
+
+
+class LocalBroker:
+    """In-process broker with the same shape as the Redis adapter (for tests)."""
+
+    def __init__(self):
+        self._listeners: list[asyncio.Queue] = []
+
+    async def publish(self, channel: str, payload: str) -> None:
+        for queue in list(self._listeners):
+            queue.put_nowait((channel, payload))
+
+    def listen(self) -> AsyncIterator[tuple[str, str]]:
+        # Register now, not on first iteration, so nothing published after
+        # listen() returns is missed.
+        queue: asyncio.Queue = asyncio.Queue()
+        self._listeners.append(queue)
+        return self._drain(queue)
+
+    async def _drain(self, queue: asyncio.Queue) -> AsyncIterator[tuple[str, str]]:
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self._listeners.remove(queue)
+
+    async def close(self) -> None:
+        return None
+
+
+class RedisBroker:
+    """Redis pub/sub broker; every worker listens on the inbox:* pattern."""
+
+    def __init__(self, url: str, pattern: str = "inbox:*"):
+        if redis_asyncio is None:
+            raise RuntimeError("PUBSUB_BACKEND=redis requires the 'redis' package")
+        self._client = redis_asyncio.from_url(url, decode_responses=True)
+        self._pattern = pattern
+
+    async def publish(self, channel: str, payload: str) -> None:
+        await self._client.publish(channel, payload)
+
+    async def listen(self) -> AsyncIterator[tuple[str, str]]:
+        pubsub = self._client.pubsub()
+        await pubsub.psubscribe(self._pattern)
+        try:
+            async for message in pubsub.listen():
+                if message.get("type") == "pmessage":
+                    yield message["channel"], message["data"]
+        finally:
+            await pubsub.close()
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+class BrokeredPubSub(InMemoryPubSub):
+    """Publishes through a shared broker and delivers what it hears locally."""
+
+    def __init__(self, broker):
+        super().__init__()
+        self.broker = broker
+        self.worker_id = uuid.uuid4().hex[:8]
+        self._listener: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen(self.broker.listen()))
+
+    async def _listen(self, stream) -> None:
+        try:
+            async for channel, payload in stream:
+                try:
+                    self._deliver(channel, json.loads(payload))
+                except Exception as e:
+                    logger.warning("Dropping malformed pub/sub payload on %s: %s", channel, e)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error("Pub/sub listener stopped: %s", e)
+        finally:
+            await stream.aclose()
+
+    async def publish(self, channel: str, event: dict) -> None:
+        await self.broker.publish(channel, json.dumps({**event, "origin": self.worker_id}))
+
+    async def close(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        await self.broker.close()
+        await super().close()
+
+
+def create_pubsub(backend: Optional[str] = None) -> InMemoryPubSub:
+    backend = (backend or os.getenv("PUBSUB_BACKEND") or "memory").strip().lower()
+    if backend == "redis":
+        return BrokeredPubSub(RedisBroker(os.getenv("REDIS_URL") or "redis://localhost:6379/0"))
+    if backend != "memory":
+        logger.warning("Unknown PUBSUB_BACKEND=%s, using in-memory pub/sub", backend)
+    return InMemoryPubSub()
+
+
+def message_event(message: dict) -> dict:
+    return {"event": "message", "scope": message.get("message_type"), "message": message}
+
+
+async def publish_message(pubsub: InMemoryPubSub, message: dict) -> None:
+    """Fan a saved message out to its recipients (and the sender's other sessions)."""
+    event = message_event(message)
+    try:
+        if message.get("message_type") == "public":
+            await pubsub.publish(PUBLIC_CHANNEL, event)
+            return
+        for doctor_id in dict.fromkeys((message.get("to_id"), message.get("from_id"))):
+            if doctor_id:
+                await pubsub.publish(private_channel(str(doctor_id)), event)
+    except Exception as e:
+        # Delivery is best-effort; the message is already persisted.
+        logger.warning("Failed to publish message %s: %s", message.get("id"), e)
+
+
+pubsub = create_pubsub()
@@ -0,0 +1,330 @@
+"""
+OpenTelemetry tracing for the API, Couchbase, outbound HTTP, LLM and agent calls.
+
+Tracing is off unless OTEL_EXPORTER_OTLP_ENDPOINT (e.g. http://localhost:4318 for a
+local collector) or OTEL_TRACING_ENABLED=true is set and the ``otel`` extra is
+installed (``pip install -e .[otel]``). Without it every helper here is a no-op,
+so the instrumented code paths cost one flag check.
+
+What gets a span:
+
+- every HTTP request (server span named "<METHOD> <route template>", continuing an
+  incoming ``traceparent``), tagged with its X-Request-ID as ``cko.request_id``
+- every public CouchbaseDB method, every SQL++ statement run on the shared cluster
+  (backend, tools and health probes) and every KV operation on the registry collections
+- outbound HTTP via requests and httpx (NCBI, Tavily, embedding/LLM endpoints),
+  when the matching opentelemetry-instrumentation packages are installed
+- LLM / embedding client calls, agent runs, agent steps, tools and LLM calls
+
+All spans started while a request is handled carry its ``cko.request_id``, so a
+trace can be found from the X-Request-ID header and /api/admin/timings output.
+"""
+
+import functools
+import inspect
+import logging
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterable, Optional
+
+try:
+    from opentelemetry import propagate, trace
+    from opentelemetry.trace import SpanKind, Status, StatusCode
+except ImportError:  # tracing is optional
+    propagate = None
+    trace = None
+
+logger = logging.getLogger("cko")
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("cko_request_id", default=None)
+
+_enabled = False
+_tracer = None
+_provider = None
+
+KV_OPERATIONS = frozenset(
+    {"get", "exists", "insert", "upsert", "replace", "remove", "mutate_in", "lookup_in"}
+)
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def _wanted() -> bool:
+    flag = (os.getenv("OTEL_TRACING_ENABLED") or "").strip().lower()
+    if flag in ("0", "false", "no"):
+        return False
+    return flag in ("1", "true", "yes") or bool(os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT"))
+
+
+def configure(service_name: Optional[str] = None) -> bool:
+    """
+    Install a tracer provider that exports spans over OTLP/HTTP.
+
+    Returns True if tracing is on. Safe to call more than once.
+    """
+    global _enabled, _tracer, _provider
+    if _enabled:
+        return True
+    if not _wanted():
+        return False
+    if trace is None:
+        logger.warning("Tracing requested but opentelemetry is not installed (pip install .[otel])")
+        return False
+    try:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError as e:
+        logger.warning(f"Tracing requested but the OpenTelemetry SDK is missing: {e}")
+        return False
+
+    name = service_name or os.getenv("OTEL_SERVICE_NAME") or "cko-backend"
+    _provider = TracerProvider(resource=Resource.create({"service.name": name}))
+    # The exporter reads OTEL_EXPORTER_OTLP_ENDPOINT / _HEADERS itself.
+    _provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(_provider)
+    _instrument_http_clients()
+    _tracer = trace.get_tracer("cko")
+    _enabled = True
+    logger.info(f"✓ OpenTelemetry tracing enabled (service.name={name})")
+    return True
+
+
+def _instrument_http_clients() -> None:
+    for module, cls in (
+        ("opentelemetry.instrumentation.requests", "RequestsInstrumentor"),
+        ("opentelemetry.instrumentation.httpx", "HTTPXClientInstrumentor"),
+    ):
+        try:
+            instrumentor = getattr(__import__(module, fromlist=[cls]), cls)
+        except ImportError:
+            logger.warning(f"{module} not installed; those outbound calls are not traced")
+            continue
+        instrumentor().instrument()
+
+
+def shutdown() -> None:
+    """Flush buffered spans (called on application shutdown)."""
+    if _provider is not None:
+        _provider.shutdown()
+
+
+def _attributes(attributes: dict) -> dict:
+    attrs = {k: v for k, v in attributes.items() if v is not None}
+    request_id = request_id_var.get()
+    if request_id:
+        attrs["cko.request_id"] = request_id
+    return attrs
+
+
+@contextmanager
+def span(name: str, client: bool = False, **attributes: Any):
+    """
+    Run the block in a child span of the current one (no-op while tracing is off).
+
+    Exceptions are recorded on the span and re-raised. Yields the span or None.
+    """
+    if not _enabled:
+        yield None
+        return
+    kind = SpanKind.CLIENT if client else SpanKind.INTERNAL
+    with _tracer.start_as_current_span(name, kind=kind, attributes=_attributes(attributes)) as s:
+        yield s
+
+
+def start_span(name: str, client: bool = False, **attributes: Any):
+    """Start a span that is ended later with end_span() (for callback-style hooks)."""
+    if not _enabled:
+        return None
+    kind = SpanKind.CLIENT if client else SpanKind.INTERNAL
+    return _tracer.start_span(name, kind=kind, attributes=_attributes(attributes))
+
+
+def end_span(handle, error: Optional[BaseException] = None, **attributes: Any) -> None:
+    if handle is None:
+        return
+    for key, value in attributes.items():
+        if value is not None:
+            handle.set_attribute(key, value)
+    if error is not None:
+        handle.record_exception(error)
+        handle.set_status(Status(StatusCode.ERROR, str(error)))
+    handle.end()
+
+
+@contextmanager
+def server_span(method: str, path: str, headers: Iterable, request_id: Optional[str]):
+    """
+    Span for an incoming HTTP request, continuing the caller's trace if it sent one.
+
+    Sets request_id_var for the request either way; call finish_server_span once
+    routing is done to name the span after the route template.
+    """
+    token = request_id_var.set(request_id)
+    try:
+        if not _enabled:
+            yield None
+            return
+        parent = propagate.extract(dict(headers))
+        with _tracer.start_as_current_span(
+            f"{method} {path}",
+            context=parent,
+            kind=SpanKind.SERVER,
+            attributes=_attributes({"http.request.method": method, "url.path": path}),
+        ) as s:
+            yield s
+    finally:
+        request_id_var.reset(token)
+
+
+def finish_server_span(handle, method: str, route: Optional[str], status: int) -> None:
+    """Name a server span after its route template and record the response status."""
+    if handle is None:
+        return
+    if route:
+        handle.update_name(f"{method} {route}")
+        handle.set_attribute("http.route", route)
+    handle.set_attribute("http.response.status_code", status)
+    if status >= 500:
+        handle.set_status(Status(StatusCode.ERROR))
+
+
+def traced_methods(prefix: str, exclude: Iterable[str] = ()):
+    """Class decorator: run every public method in a span named "<prefix>.<method>"."""
+
+    def decorate(cls):
+        for name, fn in list(vars(cls).items()):
+            if name.startswith("_") or name in exclude or not inspect.isfunction(fn):
+                continue
+            setattr(cls, name, _traced(f"{prefix}.{name}", fn))
+        return cls
+
+    return decorate
+
+
+def _traced(span_name: str, fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not _enabled:
+            return fn(*args, **kwargs)
+        with span(span_name):
+            return fn(*args, **kwargs)
+
+    return wrapper
+
+
+class TracedCollection:
+    """Couchbase collection whose KV operations each run in a client span."""
+
+    def __init__(self, collection, keyspace: str):
+        self._collection = collection
+        self._keyspace = keyspace
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._collection, name)
+        if name not in KV_OPERATIONS:
+            return attr
+
+        def operation(*args, **kwargs):
+            with span(
+                f"couchbase.{name}",
+                client=True,
+                **{
+                    "db.system": "couchbase",
+                    "db.operation": name,
+                    "db.couchbase.keyspace": self._keyspace,
+                },
+            ):
+                return attr(*args, **kwargs)
+
+        return operation
+
+
+def trace_collection(collection, keyspace: str):
+    """Wrap a collection handle in TracedCollection while tracing is on."""
+    if not _enabled or collection is None:
+        return collection
+    return TracedCollection(collection, keyspace)
+
+
+class TracedQueryResult:
+    """
+    Query result that streams its rows and ends the statement's span once they
+    are exhausted, fail, or the result is dropped before that.
+    """
+
+    def __init__(self, result, handle):
+        self._result = result
+        self._span = handle
+        self._count = 0
+
+    def _end(self, error: Optional[BaseException] = None) -> None:
+        handle, self._span = self._span, None
+        end_span(handle, error=error, **{"db.response.rows": self._count})
+
+    def _stream(self, rows):
+        try:
+            for row in rows:
+                self._count += 1
+                yield row
+        except Exception as e:
+            self._end(error=e)
+            raise
+        finally:
+            # Exhausted, or closed early by the caller (GeneratorExit).
+            self._end()
+
+    def rows(self):
+        return self._stream(self._result.rows())
+
+    def __iter__(self):
+        return self.rows()
+
+    def execute(self):
+        return list(self.rows())
+
+    def __getattr__(self, name: str):
+        return getattr(self._result, name)
+
+    def __del__(self):
+        self._end()
+
+
+class TracedCluster:
+    """
+    Cluster whose ``query`` runs in a client span.
+
+    SDK query results stream lazily, so the span stays open until the rows have
+    been read (otherwise it would only cover dispatching the request) without
+    buffering them.
+    """
+
+    def __init__(self, cluster):
+        self._cluster = cluster
+
+    def query(self, statement: str, *args, **kwargs):
+        handle = start_span(
+            "couchbase.query",
+            client=True,
+            **{"db.system": "couchbase", "db.operation": "query", "db.statement": statement},
+        )
+        try:
+            result = self._cluster.query(statement, *args, **kwargs)
+        except Exception as e:
+            end_span(handle, error=e)
+            raise
+        return TracedQueryResult(result, handle)
+
+    def __getattr__(self, name: str):
+        return getattr(self._cluster, name)
+
+
+def trace_cluster(cluster):
+    """Wrap a Cluster in TracedCluster while tracing is on."""
+    if not _enabled or cluster is None:
+        return cluster
+    return TracedCluster(cluster)
@@ -0,0 +1,134 @@
+"""
+Agent run, step and token metrics (see backend.metrics).
+
+``invoke_agent`` wraps an agent's ``invoke`` with a LangChain callback handler that
+times every tool call, LLM call and graph node. Step timings are buffered and only
+observed once the run finishes, so they carry the run's patient-count bucket
+(the wearable agent, for example, only knows its cohort size at the end).
+
+With tracing on (backend.tracing) the run gets an "agent.<name>" span and every
+tool call, LLM call and graph node a child span.
+"""
+
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from uuid import UUID
+
+import langchain_core.callbacks
+
+from backend import tracing
+from backend.metrics import (
+    AGENT_RUN_SECONDS,
+    AGENT_STEP_SECONDS,
+    AGENT_TOKENS,
+    patient_bucket,
+    record_token_usage,
+)
+
+
+class AgentMetricsCallback(langchain_core.callbacks.BaseCallbackHandler):
+    """Collects (step, kind, seconds) for tools, LLM calls and graph nodes of one run."""
+
+    def __init__(self, agent: str):
+        self.agent = agent
+        self.steps: List[Tuple[str, str, float]] = []
+        self.tokens = {"input_tokens": 0, "output_tokens": 0}
+        self._started: Dict[UUID, Tuple[str, str, float, Any]] = {}
+
+    def _start(self, run_id: UUID, step: str, kind: str) -> None:
+        span = tracing.start_span(
+            f"{self.agent}.{step}", **{"cko.agent": self.agent, "cko.step.kind": kind}
+        )
+        self._started[run_id] = (step, kind, time.perf_counter(), span)
+
+    def _end(self, run_id: UUID, error: Optional[BaseException] = None) -> None:
+        started = self._started.pop(run_id, None)
+        if started is not None:
+            step, kind, start, span = started
+            self.steps.append((step, kind, time.perf_counter() - start))
+            tracing.end_span(span, error=error)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self._start(run_id, (serialized or {}).get("name") or "tool", "tool")
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id, "llm", "llm")
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id, "llm", "llm")
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._end(run_id)
+        usage = (getattr(response, "llm_output", None) or {}).get("token_usage") or {}
+        self.tokens["input_tokens"] += int(usage.get("prompt_tokens") or 0)
+        self.tokens["output_tokens"] += int(usage.get("completion_tokens") or 0)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+    def on_chain_start(self, serialized, inputs, *, run_id, metadata=None, **kwargs):
+        # LangGraph passes the node name in the metadata; other chains are not steps.
+        node = (metadata or {}).get("langgraph_node")
+        if node and kwargs.get("name") == node:
+            self._start(run_id, node, "node")
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+    def flush(self, patients: str) -> None:
+        for step, kind, seconds in self.steps:
+            AGENT_STEP_SECONDS.observe(
+                seconds, agent=self.agent, step=step, kind=kind, patients=patients
+            )
+        self.steps = []
+
+
+def invoke_agent(
+    agent: Any,
+    name: str,
+    state: dict,
+    patient_count: Optional[Callable[[dict], int]] = None,
+) -> dict:
+    """
+    Invoke an agent and record its run, step and token metrics.
+
+    Args:
+        agent: Agent instance (``invoke(input=..., config=...)``)
+        name: Agent label, e.g. "pulmonary_research_agent"
+        state: Starting state
+        patient_count: Returns how many patients the result covers (default 1)
+
+    Returns:
+        The agent's final state
+    """
+    callback = AgentMetricsCallback(name)
+    start = time.perf_counter()
+    result = None
+    try:
+        with tracing.span(f"agent.{name}", **{"cko.agent": name}):
+            result = agent.invoke(input=state, config={"callbacks": [callback]})
+        return result
+    finally:
+        count = 1
+        if result is not None and patient_count is not None:
+            count = patient_count(result)
+        patients = patient_bucket(count)
+        AGENT_RUN_SECONDS.observe(
+            time.perf_counter() - start,
+            agent=name,
+            patients=patients,
+            outcome="ok" if result is not None else "error",
+        )
+        callback.flush(patients)
+        # Agents that total their own usage (across every model they call) win.
+        usage = (result or {}).get("token_usage") or callback.tokens
+        record_token_usage(AGENT_TOKENS, usage, agent=name)
@@ -0,0 +1,121 @@
+"""
+Circuit breaker for an unreliable dependency (the Couchbase cluster).
+
+- closed:    calls go through; consecutive failures are counted.
+- open:      after ``failure_threshold`` consecutive failures calls fail fast with
+             CircuitOpenError instead of waiting on timeouts.
+- half_open: once ``reset_timeout`` seconds have passed one trial call is let
+             through; a success closes the circuit, a failure opens it again.
+"""
+
+import threading
+import time
+from typing import Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a dependency whose circuit is open."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} unavailable (circuit open, retry in {retry_after:.0f}s)")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self.last_error: Optional[str] = None
+        self.times_opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+    def retry_after(self) -> float:
+        if self._opened_at is None:
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def allow(self) -> bool:
+        """True if a call may go ahead now (one trial call while half-open)."""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def check(self) -> None:
+        """Raise CircuitOpenError unless a call may go ahead."""
+        if not self.allow():
+            raise CircuitOpenError(self.name, self.retry_after() or self.reset_timeout)
+
+    def raise_if_open(self) -> None:
+        """
+        Raise CircuitOpenError while the circuit is open.
+
+        Unlike check() this does not claim the half-open trial: callers that do not
+        report their outcome let whoever probes the dependency (the HealthMonitor)
+        decide when the circuit closes.
+        """
+        with self._lock:
+            if self._current_state() != OPEN:
+                return
+            self.rejected += 1
+        raise CircuitOpenError(self.name, self.retry_after() or self.reset_timeout)
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            self._failures += 1
+            if error is not None:
+                self.last_error = str(error)
+            state = self._current_state()
+            if state == HALF_OPEN or (state == CLOSED and self._failures >= self.failure_threshold):
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+                self.times_opened += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            state = self._current_state()
+            return {
+                "name": self.name,
+                "state": state,
+                "consecutive_failures": self._failures,
+                "failure_threshold": self.failure_threshold,
+                "retry_in_s": round(self.retry_after(), 1) if state == OPEN else None,
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+                "last_error": self.last_error,
+            }
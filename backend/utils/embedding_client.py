@@ -1,12 +1,17 @@
 import os
 from functools import lru_cache
-from typing import List
+from typing import TYPE_CHECKING, List
 
-from openai import AsyncOpenAI
+from backend import tracing
+from backend.metrics import LLM_REQUEST_SECONDS, LLM_TOKENS, record_token_usage
+
+# openai takes ~0.5s to import, so it is imported when the first client is built.
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
 
 
 @lru_cache(maxsize=1)
-def _client() -> AsyncOpenAI:
+def _client() -> "AsyncOpenAI":
     endpoint = (os.getenv("EMBEDDING_MODEL_ENDPOINT") or "").rstrip("/")
     token = os.getenv("EMBEDDING_MODEL_TOKEN") or ""
 
@@ -15,6 +20,8 @@ def _client() -> AsyncOpenAI:
     if not token:
         raise RuntimeError("EMBEDDING_MODEL_TOKEN is not set")
 
+    from openai import AsyncOpenAI
+
     return AsyncOpenAI(api_key=token, base_url=f"{endpoint}/v1")
 
 
@@ -30,7 +37,18 @@ async def embedding_vector(text: str) -> List[float]:
     if not t:
         return []
 
-    resp = await _client().embeddings.create(model=_model_name(), input=t)
+    model = _model_name()
+    with (
+        tracing.span(
+            "llm.embedding",
+            client=True,
+            **{"gen_ai.operation.name": "embeddings", "gen_ai.request.model": model},
+        ),
+        LLM_REQUEST_SECONDS.time(client="embedding", model=model, operation="embed"),
+    ):
+        resp = await _client().embeddings.create(model=model, input=t)
+    usage = resp.usage.model_dump() if getattr(resp, "usage", None) else None
+    record_token_usage(LLM_TOKENS, usage, client="embedding", model=model)
 
     try:
         data = resp.data[0].embedding
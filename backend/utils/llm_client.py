@@ -1,12 +1,17 @@
 import os
 from functools import lru_cache
-from typing import Any, Dict, List, Optional, Tuple
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
-from openai import AsyncOpenAI, OpenAI
+from backend import tracing
+from backend.metrics import LLM_REQUEST_SECONDS, LLM_TOKENS, record_token_usage
+
+# openai takes ~0.5s to import, so it is imported when the first client is built.
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI, OpenAI
 
 
 @lru_cache(maxsize=1)
-def _client() -> AsyncOpenAI:
+def _client() -> "AsyncOpenAI":
     endpoint = (os.getenv("LLM_ENDPOINT") or "").rstrip("/")
     token = os.getenv("LLM_TOKEN") or ""
 
@@ -15,11 +20,13 @@ def _client() -> AsyncOpenAI:
     if not token:
         raise RuntimeError("LLM_TOKEN is not set")
 
+    from openai import AsyncOpenAI
+
     return AsyncOpenAI(api_key=token, base_url=f"{endpoint}/v1")
 
 
 @lru_cache(maxsize=1)
-def get_llm_client() -> OpenAI:
+def get_llm_client() -> "OpenAI":
     """
     Get a synchronous OpenAI client instance for tools that need blocking calls.
     Uses the same configuration as the async client.
@@ -32,6 +39,8 @@ def get_llm_client() -> OpenAI:
     if not token:
         raise RuntimeError("OPENAI_API_KEY is not set")
 
+    from openai import OpenAI
+
     return OpenAI(api_key=token, base_url=f"{endpoint}/v1")
 
 
@@ -42,6 +51,12 @@ def _model_name() -> str:
     return model
 
 
+async def list_models() -> List[str]:
+    """Model ids served by LLM_ENDPOINT; a cheap reachability check (no tokens generated)."""
+    page = await _client().models.list()
+    return [m.id for m in page.data]
+
+
 async def chat_completion_text(
     *,
     messages: List[Dict[str, str]],
@@ -50,13 +65,26 @@ async def chat_completion_text(
     model: Optional[str] = None,
 ) -> Tuple[str, Dict[str, Any]]:
     m = model or _model_name()
-    resp = await _client().chat.completions.create(
-        model=m,
-        messages=messages,
-        stream=False,
-        max_tokens=max_tokens,
-        temperature=temperature,
-    )
+    with (
+        tracing.span(
+            "llm.chat",
+            client=True,
+            **{"gen_ai.operation.name": "chat", "gen_ai.request.model": m},
+        ) as span,
+        LLM_REQUEST_SECONDS.time(client="llm", model=m, operation="chat"),
+    ):
+        resp = await _client().chat.completions.create(
+            model=m,
+            messages=messages,
+            stream=False,
+            max_tokens=max_tokens,
+            temperature=temperature,
+        )
+        usage = resp.usage.model_dump() if getattr(resp, "usage", None) else None
+        if span is not None and usage:
+            span.set_attribute("gen_ai.usage.input_tokens", usage.get("prompt_tokens") or 0)
+            span.set_attribute("gen_ai.usage.output_tokens", usage.get("completion_tokens") or 0)
+    record_token_usage(LLM_TOKENS, usage, client="llm", model=m)
 
     text = ""
     try:
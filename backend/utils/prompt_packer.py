@@ -0,0 +1,230 @@
+"""
+Token-budgeted prompt packing.
+
+Fits the most relevant content into a per-endpoint token budget instead of
+fixed character cuts. Counting uses a local tokenizer (tiktoken, if installed
+and its encoding is available) and falls back to a ~4 chars/token estimate.
+
+Budgets come from BUDGETS and can be overridden per endpoint with
+PROMPT_BUDGET_<NAME> (e.g. PROMPT_BUDGET_DOCTOR_NOTES_SUMMARY=2000).
+"""
+
+import json
+import logging
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger("cko")
+
+BUDGETS: Dict[str, int] = {
+    "doctor_notes_summary": 3000,
+    "patient_summary": 2500,
+    "questionnaire_summary": 2500,
+    "research_context": 2400,
+    "research_article": 1200,
+}
+
+ELLIPSIS = "…"
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding(os.getenv("PROMPT_TOKENIZER", "cl100k_base"))
+    except Exception as e:  # not installed, or encoding not cached offline
+        logger.info("Prompt packer using chars/4 token estimate (%s)", e)
+        return None
+
+
+def count_tokens(text: str) -> int:
+    text = text or ""
+    enc = _encoding()
+    if enc is not None:
+        return len(enc.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to at most max_tokens, preferring a sentence or word boundary."""
+    text = text or ""
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    enc = _encoding()
+    if enc is not None:
+        cut = enc.decode(enc.encode(text, disallowed_special=())[: max(max_tokens - 1, 1)])
+    else:
+        cut = text[: max(max_tokens - 1, 1) * 4]
+    boundary = max(cut.rfind(". "), cut.rfind("\n"))
+    if boundary < len(cut) * 0.6:
+        boundary = cut.rfind(" ")
+    if boundary > len(cut) * 0.6:
+        cut = cut[: boundary + 1]
+    return cut.rstrip() + ELLIPSIS
+
+
+def budget_for(name: str, default: Optional[int] = None) -> int:
+    env = os.getenv(f"PROMPT_BUDGET_{name.upper()}")
+    if env:
+        try:
+            return int(env)
+        except ValueError:
+            pass
+    return BUDGETS.get(name, default or 2000)
+
+
+@dataclass
+class PackResult:
+    items: List[Any]
+    tokens_in: int
+    tokens_out: int
+    dropped: int = 0
+    truncated: int = 0
+    budget: int = 0
+
+    def log(self, endpoint: str) -> None:
+        logger.info(
+            "prompt_pack endpoint=%s budget=%s tokens_in=%s tokens_out=%s kept=%s "
+            "dropped=%s truncated=%s",
+            endpoint,
+            self.budget,
+            self.tokens_in,
+            self.tokens_out,
+            len(self.items),
+            self.dropped,
+            self.truncated,
+        )
+
+
+def pack_texts(
+    items: Iterable[Any],
+    budget: int,
+    text_of: Callable[[Any], str],
+    with_text: Callable[[Any, str], Any],
+    rank: Optional[Callable[[Any], Any]] = None,
+    per_item_max: Optional[int] = None,
+    min_item_tokens: int = 40,
+) -> PackResult:
+    """
+    Greedily keep the highest-ranked items whose text fits the budget.
+
+    Items are taken in ``rank`` order (highest first; input order if None). Each
+    text is capped at ``per_item_max`` tokens; an item that no longer fits is cut
+    to the remaining budget if at least ``min_item_tokens`` remain, otherwise it
+    is dropped. Kept items keep their ranked order.
+    """
+    items = list(items)
+    if rank is not None:
+        items.sort(key=rank, reverse=True)
+
+    kept: List[Any] = []
+    tokens_in = tokens_out = truncated = 0
+    for item in items:
+        text = text_of(item) or ""
+        tokens = count_tokens(text)
+        tokens_in += tokens
+        remaining = budget - tokens_out
+        limit = min(per_item_max or tokens, remaining)
+        if limit < min(tokens, min_item_tokens) or remaining <= 0:
+            continue
+        if tokens > limit:
+            text = truncate_to_tokens(text, limit)
+            tokens = count_tokens(text)
+            truncated += 1
+        kept.append(with_text(item, text))
+        tokens_out += tokens
+    return PackResult(
+        items=kept,
+        tokens_in=tokens_in,
+        tokens_out=tokens_out,
+        dropped=len(items) - len(kept),
+        truncated=truncated,
+        budget=budget,
+    )
+
+
+def _prune_empty(value: Any) -> Any:
+    if isinstance(value, dict):
+        pruned = {k: _prune_empty(v) for k, v in value.items()}
+        return {k: v for k, v in pruned.items() if v not in (None, "", [], {})}
+    if isinstance(value, list):
+        pruned = [_prune_empty(v) for v in value]
+        return [v for v in pruned if v not in (None, "", [], {})]
+    return value
+
+
+def _string_leaves(value: Any, path=()):
+    if isinstance(value, dict):
+        for k, v in value.items():
+            yield from _string_leaves(v, path + (k,))
+    elif isinstance(value, list):
+        for i, v in enumerate(value):
+            yield from _string_leaves(v, path + (i,))
+    elif isinstance(value, str):
+        yield path, value
+
+
+def _set_path(value: Any, path, new) -> None:
+    for key in path[:-1]:
+        value = value[key]
+    value[path[-1]] = new
+
+
+def pack_json(value: Any, budget: int, min_leaf_tokens: int = 24) -> PackResult:
+    """
+    Serialize ``value`` as compact JSON within ``budget`` tokens.
+
+    Empty fields are dropped first; if it still does not fit, the longest string
+    values are shortened (longest first) so short facts such as names, numbers and
+    dates are never cut. The result's ``items`` is ``[json_text]``.
+    """
+    original = json.dumps(value, ensure_ascii=False, default=str)
+    tokens_in = count_tokens(original)
+    value = _prune_empty(json.loads(original))
+
+    def dump(v):
+        return json.dumps(v, ensure_ascii=False, separators=(",", ":"))
+
+    text = dump(value)
+    tokens = count_tokens(text)
+    truncated = 0
+    while tokens > budget:
+        leaves = sorted(_string_leaves(value), key=lambda leaf: len(leaf[1]), reverse=True)
+        if not leaves:
+            break
+        path, longest = leaves[0]
+        leaf_tokens = count_tokens(longest)
+        if leaf_tokens <= min_leaf_tokens:
+            break
+        # Cut at least a quarter per step so the loop always makes progress.
+        target = max(min_leaf_tokens, min(leaf_tokens - (tokens - budget), leaf_tokens * 3 // 4))
+        shortened = truncate_to_tokens(longest, target)
+        if len(shortened) >= len(longest):
+            break
+        _set_path(value, path, shortened)
+        truncated += 1
+        text = dump(value)
+        tokens = count_tokens(text)
+    return PackResult(
+        items=[text],
+        tokens_in=tokens_in,
+        tokens_out=tokens,
+        truncated=truncated,
+        budget=budget,
+    )
+
+
+def log_completion_usage(endpoint: str, raw: Dict[str, Any]) -> None:
+    """Log prompt/completion tokens reported by the LLM for an endpoint."""
+    usage = (raw or {}).get("usage") or {}
+    logger.info(
+        "llm_usage endpoint=%s prompt_tokens=%s completion_tokens=%s",
+        endpoint,
+        usage.get("prompt_tokens"),
+        usage.get("completion_tokens"),
+    )
@@ -0,0 +1,141 @@
+"""
+PII redaction for documents sent to LLMs.
+
+Contact fields are dropped, and emails and phone numbers inside free text are
+replaced with [REDACTED] using one precompiled pattern, so each string is
+scanned once. Fields known to hold no free text (ids, dates, numbers, vectors)
+are passed through without being scanned or copied.
+
+Redacted documents are memoized by content hash. A patient or questionnaire
+document that is summarized repeatedly is therefore only walked once. Results
+can be shared between callers and must be treated as read-only.
+"""
+
+import hashlib
+import os
+import pickle
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Iterable, Optional
+
+REDACTED = "[REDACTED]"
+
+DROP_KEYS: FrozenSet[str] = frozenset(
+    {
+        "patient_email",
+        "patient_cell",
+        "email",
+        "phone",
+        "insurance_number",
+        "emergency_contacts",
+    }
+)
+
+# Structured fields that never carry free text.
+SKIP_KEYS: FrozenSet[str] = frozenset(
+    {
+        "id",
+        "patient_id",
+        "doctor_id",
+        "appointment_id",
+        "question_id",
+        "age",
+        "gender",
+        "date",
+        "visit_date",
+        "timestamp",
+        "timestamps",
+        "date_completed",
+        "heart_rate",
+        "step_count",
+        "similarity_score",
+        "relevance_score",
+    }
+)
+SKIP_SUFFIXES = ("vector", "vectorized", "embedding")
+
+PII_PATTERN = re.compile(
+    r"[A-Z0-9._%+-]+@[A-Z0-9.-]+\.[A-Z]{2,}"  # email
+    r"|\b\d{3}[- .]?\d{3}[- .]?\d{4}\b",  # US phone number
+    re.I,
+)
+
+
+class RedactionEngine:
+    """Drop contact fields and mask emails/phone numbers in nested JSON values."""
+
+    def __init__(
+        self,
+        drop_keys: Iterable[str] = DROP_KEYS,
+        skip_keys: Iterable[str] = SKIP_KEYS,
+        cache_size: Optional[int] = None,
+    ):
+        self.drop_keys = frozenset(drop_keys)
+        self.skip_keys = frozenset(skip_keys)
+        self.cache_size = (
+            cache_size if cache_size is not None else int(os.getenv("REDACTION_CACHE_SIZE", "256"))
+        )
+        self._cache: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def redact_text(self, text: str) -> str:
+        return PII_PATTERN.sub(REDACTED, text)
+
+    def _skip(self, key: str) -> bool:
+        return key in self.skip_keys or key.endswith(SKIP_SUFFIXES)
+
+    def _walk(self, value: Any) -> Any:
+        if isinstance(value, str):
+            return PII_PATTERN.sub(REDACTED, value)
+        if isinstance(value, dict):
+            out: Dict[str, Any] = {}
+            for k, v in value.items():
+                k = str(k)
+                if k in self.drop_keys:
+                    continue
+                out[k] = v if self._skip(k) else self._walk(v)
+            return out
+        if isinstance(value, list):
+            return [self._walk(v) for v in value]
+        return value
+
+    def redact(self, value: Any) -> Any:
+        """Redact a document (dict/list) or a single string."""
+        if not isinstance(value, (dict, list)) or not self.cache_size:
+            return self._walk(value)
+
+        # pickle is much cheaper than JSON for large float vectors. Equal documents
+        # that serialize differently only cost a cache miss.
+        try:
+            encoded = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return self._walk(value)
+        digest = hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+        with self._lock:
+            cached = self._cache.get(digest)
+            if cached is not None:
+                self._cache.move_to_end(digest)
+                self.hits += 1
+                return cached
+            self.misses += 1
+
+        redacted = self._walk(value)
+        with self._lock:
+            self._cache[digest] = redacted
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return redacted
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "cached": len(self._cache)}
+
+
+redaction_engine = RedactionEngine()
+
+
+def redact_pii(value: Any) -> Any:
+    return redaction_engine.redact(value)
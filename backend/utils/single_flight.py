@@ -0,0 +1,91 @@
+"""
+Single-flight request coalescing.
+
+Identical concurrent requests (same endpoint, patient, normalized question and
+data version) share one in-flight execution instead of each running the agent
+or LLM call. The first caller starts the work; later callers await the same
+result. Nothing is cached once the call finishes.
+
+The shared work runs in its own task, so a disconnecting client does not
+cancel it for the callers still waiting.
+"""
+
+import asyncio
+import copy
+import logging
+import re
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger("cko")
+
+
+def normalize_question(question: Optional[str]) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation."""
+    text = re.sub(r"\s+", " ", str(question or "")).strip().lower()
+    return text.rstrip(" ?.!")
+
+
+def flight_key(
+    endpoint: str,
+    patient_id: Any,
+    question: Optional[str] = None,
+    data_version: Optional[str] = None,
+) -> Tuple[str, str, str, str]:
+    return (endpoint, str(patient_id), normalize_question(question), str(data_version or ""))
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into one execution."""
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, endpoint: str, field: str) -> None:
+        counters = self._stats.setdefault(
+            endpoint, {"calls": 0, "executions": 0, "coalesced": 0, "errors": 0}
+        )
+        counters[field] += 1
+
+    def _done(self, key: Hashable, endpoint: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Retrieve the exception here so it is never reported as unhandled.
+        if not task.cancelled() and task.exception() is not None:
+            self._count(endpoint, "errors")
+
+    async def do(self, key: Tuple, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run ``fn`` for ``key``, or await the call already in flight for it.
+
+        Every caller receives its own deep copy of the result, so callers can
+        modify it independently. The first element of ``key`` names the endpoint in stats.
+        """
+        endpoint = str(key[0]) if isinstance(key, tuple) and key else "default"
+        self._count(endpoint, "calls")
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self._count(endpoint, "coalesced")
+            logger.info("single_flight coalesced endpoint=%s key=%s", endpoint, key)
+            return copy.deepcopy(await asyncio.shield(task))
+
+        self._count(endpoint, "executions")
+        task = asyncio.ensure_future(fn())
+        self._inflight[key] = task
+        task.add_done_callback(lambda t: self._done(key, endpoint, t))
+        return copy.deepcopy(await asyncio.shield(task))
+
+    def stats(self) -> dict:
+        totals = {"calls": 0, "executions": 0, "coalesced": 0, "errors": 0}
+        for counters in self._stats.values():
+            for field, value in counters.items():
+                totals[field] += value
+        return {
+            **totals,
+            "in_flight": len(self._inflight),
+            "by_endpoint": {name: dict(c) for name, c in sorted(self._stats.items())},
+        }
+
+
+single_flight = SingleFlight()
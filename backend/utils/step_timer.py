@@ -0,0 +1,204 @@
+"""
+Structured per-step timings for a request.
+
+A StepTimer records nested, named steps (``with timer.step("trend_analysis"):``)
+with their start offset and duration. The request handler creates one and
+activates it; code further down (the agent, its tools) picks it up with
+``current_timer()`` and adds its steps to the same tree.
+
+``finish()`` observes every step in agent_step_duration_seconds and keeps a
+flame-style breakdown per request id (the last TIMINGS_MAX_REQUESTS requests),
+served by GET /api/admin/timings/{request_id}. The breakdown includes folded
+stacks ("request;agent;step self_ms") that flamegraph.pl and speedscope read.
+
+Each step also runs in an OpenTelemetry span "<agent>.<step>" when tracing is on
+(see backend.tracing). Verbose per-step debug output is off unless AGENT_VERBOSE=true.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Deque, Dict, List, Optional
+
+from backend import tracing
+from backend.metrics import AGENT_STEP_SECONDS, patient_bucket
+
+_current: ContextVar[Optional["StepTimer"]] = ContextVar("step_timer", default=None)
+
+
+def verbose() -> bool:
+    return (os.getenv("AGENT_VERBOSE") or "false").strip().lower() in ("1", "true", "yes")
+
+
+def current_timer() -> Optional["StepTimer"]:
+    """The StepTimer activated for the current request, if any."""
+    return _current.get()
+
+
+class StepTimer:
+    def __init__(self, name: str, request_id: Optional[str] = None, agent: Optional[str] = None):
+        self.name = name
+        self.request_id = request_id
+        self.agent = agent or name
+        self.steps: List[dict] = []
+        self._stack: List[str] = []
+        self._origin = time.perf_counter()
+        self.finished = False
+
+    def _ms(self, since: float) -> float:
+        return round((time.perf_counter() - since) * 1000, 2)
+
+    @contextmanager
+    def step(self, name: str, kind: str = "step", **attrs):
+        """
+        Time a block as a step nested under the currently open one.
+
+        Yields the step's record; set keys on it (e.g. ``rows``) to keep
+        result sizes next to the timing.
+        """
+        start = time.perf_counter()
+        entry = {
+            "name": name,
+            "kind": kind,
+            "path": ";".join([*self._stack, name]),
+            "depth": len(self._stack),
+            "start_ms": round((start - self._origin) * 1000, 2),
+            "duration_ms": None,
+            "error": False,
+            **attrs,
+        }
+        self.steps.append(entry)
+        self._stack.append(name)
+        try:
+            with tracing.span(f"{self.agent}.{name}", **{"cko.step.kind": kind}):
+                yield entry
+        except BaseException:
+            entry["error"] = True
+            raise
+        finally:
+            self._stack.pop()
+            entry["duration_ms"] = self._ms(start)
+
+    @contextmanager
+    def activate(self):
+        """Make this the current_timer() for the enclosed code."""
+        token = _current.set(self)
+        try:
+            yield self
+        finally:
+            _current.reset(token)
+
+    def total_ms(self) -> float:
+        return self._ms(self._origin)
+
+    def summary(self, since: int = 0) -> str:
+        """
+        One line, e.g. "patient_context=41ms wearable_data=120ms": the steps recorded
+        from index ``since`` on, at the depth of the first of them (children left out).
+        """
+        steps = self.steps[since:]
+        if not steps:
+            return ""
+        depth = steps[0]["depth"]
+        return " ".join(
+            f"{s['name']}={s['duration_ms']:.0f}ms"
+            for s in steps
+            if s["depth"] == depth and s["duration_ms"] is not None
+        )
+
+    def folded(self) -> List[str]:
+        """Folded stacks with self time in ms (a step's time minus its children's)."""
+        child_ms: Dict[str, float] = {}
+        for s in self.steps:
+            if s["depth"] and s["duration_ms"] is not None:
+                parent = s["path"].rsplit(";", 1)[0]
+                child_ms[parent] = child_ms.get(parent, 0.0) + s["duration_ms"]
+        lines = []
+        for s in self.steps:
+            if s["duration_ms"] is None:
+                continue
+            self_ms = max(0.0, s["duration_ms"] - child_ms.get(s["path"], 0.0))
+            lines.append(f"{self.name};{s['path']} {self_ms:.0f}")
+        return lines
+
+    def breakdown(self) -> dict:
+        return {
+            "request_id": self.request_id,
+            "name": self.name,
+            "agent": self.agent,
+            "total_ms": self.total_ms(),
+            "steps": [dict(s) for s in self.steps],
+            "folded": self.folded(),
+        }
+
+    def finish(self, patients: Optional[int] = None) -> dict:
+        """Record step metrics and store the breakdown under the request id."""
+        report = self.breakdown()
+        if self.finished:
+            return report
+        self.finished = True
+        bucket = patient_bucket(patients)
+        for s in self.steps:
+            if s["duration_ms"] is not None:
+                AGENT_STEP_SECONDS.observe(
+                    s["duration_ms"] / 1000,
+                    agent=self.agent,
+                    step=s["name"],
+                    kind=s["kind"],
+                    patients=bucket,
+                )
+        if self.request_id:
+            timing_store.add(self.request_id, report)
+        return report
+
+
+class TimingStore:
+    """
+    Breakdowns of the most recent requests, oldest evicted first.
+
+    Request ids come from the client's X-Request-ID, so a reused id keeps only its
+    last ``max_reports_per_request`` reports (TIMINGS_MAX_REPORTS_PER_REQUEST).
+    """
+
+    def __init__(
+        self, max_requests: Optional[int] = None, max_reports_per_request: Optional[int] = None
+    ):
+        self.max_requests = max_requests or int(os.getenv("TIMINGS_MAX_REQUESTS", "200"))
+        self.max_reports_per_request = max_reports_per_request or int(
+            os.getenv("TIMINGS_MAX_REPORTS_PER_REQUEST", "20")
+        )
+        self._lock = threading.Lock()
+        self._by_request: "OrderedDict[str, Deque[dict]]" = OrderedDict()
+
+    def add(self, request_id: str, report: dict) -> None:
+        with self._lock:
+            reports = self._by_request.get(request_id)
+            if reports is None:
+                reports = self._by_request[request_id] = deque(maxlen=self.max_reports_per_request)
+            reports.append(report)
+            self._by_request.move_to_end(request_id)
+            while len(self._by_request) > self.max_requests:
+                self._by_request.popitem(last=False)
+
+    def get(self, request_id: str) -> Optional[List[dict]]:
+        with self._lock:
+            reports = self._by_request.get(request_id)
+            return list(reports) if reports is not None else None
+
+    def recent(self, limit: int = 20) -> List[dict]:
+        with self._lock:
+            items = list(self._by_request.items())[-limit:]
+        return [
+            {
+                "request_id": request_id,
+                "names": [r["name"] for r in reports],
+                "total_ms": max(r["total_ms"] for r in reports),
+            }
+            for request_id, reports in reversed(items)
+        ]
+
+
+timing_store = TimingStore()
@@ -0,0 +1,15 @@
+from typing import Any, Dict
+
+
+def total_usage(usage_by_model: Dict[str, Any]) -> Dict[str, int]:
+    """
+    Sum LangChain usage metadata across models.
+
+    Takes ``UsageMetadataCallbackHandler.usage_metadata`` ({model_name: usage})
+    and returns {"input_tokens", "output_tokens", "total_tokens"}.
+    """
+    totals = {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0}
+    for usage in (usage_by_model or {}).values():
+        for key in totals:
+            totals[key] += int((usage or {}).get(key) or 0)
+    return totals
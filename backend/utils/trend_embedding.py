@@ -0,0 +1,139 @@
+"""
+Numeric trend embeddings for wearable time series.
+
+Builds fixed-length vectors directly from the normalized (0-1) metric arrays
+produced by ``vectorize_wearable_trends`` so patients can be compared without
+an embedding-model round trip. Everything here is pure Python and runs locally.
+
+Vector layout (per metric, in ``TREND_METRICS`` order):
+    [resampled values x length] + [mean, std, min, max, slope]
+"""
+
+import math
+from typing import Mapping, Optional, Sequence
+
+TREND_METRICS = ("heart_rate", "blood_oxygen_level", "steps", "stress_level")
+DEFAULT_LENGTH = 16
+SUMMARY_FIELDS = ("mean", "std", "min", "max", "slope")
+
+# Value used for a metric that has no readings; mid-range keeps it neutral.
+_MISSING_FILL = 0.5
+
+
+def numeric_vector_dimensions(length: int = DEFAULT_LENGTH) -> int:
+    """Dimension of vectors produced by numeric_trend_vector()."""
+    return len(TREND_METRICS) * (length + len(SUMMARY_FIELDS))
+
+
+def resample(values: Sequence[float], length: int = DEFAULT_LENGTH) -> list[float]:
+    """Linearly interpolate a series onto ``length`` evenly spaced points."""
+    if length <= 0:
+        return []
+    vals = [float(v) for v in values if v is not None]
+    if not vals:
+        return [_MISSING_FILL] * length
+    if len(vals) == 1:
+        return [vals[0]] * length
+    if length == 1:
+        return [sum(vals) / len(vals)]
+
+    step = (len(vals) - 1) / (length - 1)
+    out = []
+    for i in range(length):
+        pos = i * step
+        lo = int(math.floor(pos))
+        hi = min(lo + 1, len(vals) - 1)
+        frac = pos - lo
+        out.append(vals[lo] + (vals[hi] - vals[lo]) * frac)
+    return out
+
+
+def summary_stats(values: Sequence[float]) -> dict[str, float]:
+    """Mean, population std, min, max and least-squares slope per sample."""
+    vals = [float(v) for v in values if v is not None]
+    if not vals:
+        return {
+            "mean": _MISSING_FILL,
+            "std": 0.0,
+            "min": _MISSING_FILL,
+            "max": _MISSING_FILL,
+            "slope": 0.0,
+        }
+
+    n = len(vals)
+    mean = sum(vals) / n
+    std = math.sqrt(sum((v - mean) ** 2 for v in vals) / n)
+
+    slope = 0.0
+    if n > 1:
+        x_mean = (n - 1) / 2
+        denom = sum((i - x_mean) ** 2 for i in range(n))
+        slope = sum((i - x_mean) * (v - mean) for i, v in enumerate(vals)) / denom
+
+    return {"mean": mean, "std": std, "min": min(vals), "max": max(vals), "slope": slope}
+
+
+def numeric_trend_vector(
+    normalized_metrics: Mapping[str, Sequence[float]], length: int = DEFAULT_LENGTH
+) -> list[float]:
+    """
+    Build a fixed-length numeric embedding from normalized metric arrays.
+
+    Missing metrics are filled with a neutral value so every vector has
+    numeric_vector_dimensions(length) entries and can share one vector index.
+    """
+    vector: list[float] = []
+    for metric in TREND_METRICS:
+        series = normalized_metrics.get(metric) or []
+        stats = summary_stats(series)
+        vector.extend(resample(series, length))
+        vector.extend(stats[f] for f in SUMMARY_FIELDS)
+    return [round(v, 6) for v in vector]
+
+
+def dtw_distance(a: Sequence[float], b: Sequence[float], window: Optional[int] = None) -> float:
+    """
+    Dynamic time warping distance between two series (absolute-difference cost).
+
+    ``window`` applies a Sakoe-Chiba band; None means unconstrained.
+    """
+    n, m = len(a), len(b)
+    if n == 0 or m == 0:
+        return math.inf if n != m else 0.0
+
+    w = max(window, abs(n - m)) if window is not None else max(n, m)
+    inf = math.inf
+    prev = [inf] * (m + 1)
+    prev[0] = 0.0
+    for i in range(1, n + 1):
+        curr = [inf] * (m + 1)
+        for j in range(max(1, i - w), min(m, i + w) + 1):
+            cost = abs(float(a[i - 1]) - float(b[j - 1]))
+            curr[j] = cost + min(prev[j], curr[j - 1], prev[j - 1])
+        prev = curr
+    return prev[m]
+
+
+def trend_dtw_distance(
+    metrics_a: Mapping[str, Sequence[float]],
+    metrics_b: Mapping[str, Sequence[float]],
+    window: Optional[int] = 3,
+) -> float:
+    """Mean per-sample DTW distance across the metrics both patients have."""
+    total = 0.0
+    shared = 0
+    for metric in TREND_METRICS:
+        a = metrics_a.get(metric) or []
+        b = metrics_b.get(metric) or []
+        if not a or not b:
+            continue
+        total += dtw_distance(a, b, window) / max(len(a), len(b))
+        shared += 1
+    return total / shared if shared else math.inf
+
+
+def l2_distance(a: Sequence[float], b: Sequence[float]) -> float:
+    """Euclidean distance between two equal-length vectors."""
+    if len(a) != len(b):
+        raise ValueError(f"Vector length mismatch: {len(a)} != {len(b)}")
+    return math.sqrt(sum((float(x) - float(y)) ** 2 for x, y in zip(a, b)))
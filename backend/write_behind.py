@@ -0,0 +1,289 @@
+"""
+Write-behind queue for audit-style documents (questions asked, answers given).
+
+Request handlers call ``enqueue()`` and return immediately; a background task
+drains the queue in batches and runs the (blocking) Couchbase writers in a
+worker thread. Nothing is lost when the queue cannot keep up:
+
+- memory is bounded (``max_size``); overflow goes straight to the spill file
+- a failed write is retried with backoff up to ``max_retries`` times, then spilled
+- on shutdown, whatever is still queued after ``drain_timeout`` is spilled
+- on startup, the spill files are replayed before new work
+
+Spill writes (append + fsync) never run on the event loop: from async code they
+are handed to a worker thread, and start()/stop() wait for those to finish.
+
+Several uvicorn workers share the spill directory, so each process appends to its
+own file (``audit.<pid>.jsonl`` next to the configured ``audit.jsonl``). Replay
+takes every ``audit*.jsonl``, claiming each one by renaming it to a private name
+first; a worker that loses the rename skips the file. Appends hold an flock on
+the file and re-check it was not claimed meanwhile, and the replaying worker takes
+the same lock before reading, so an append in flight is never dropped.
+
+Spill files are JSON lines: {"kind", "doc_id", "doc", "attempts"}.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # not on Windows: claiming by rename only
+    fcntl = None
+
+logger = logging.getLogger("cko")
+
+Writer = Callable[[str, dict], bool]
+
+DEFAULT_SPILL_PATH = Path(__file__).parent.parent / ".write_behind" / "audit.jsonl"
+
+
+class WriteBehindQueue:
+    def __init__(
+        self,
+        writers: Dict[str, Writer],
+        spill_path: Optional[Path] = None,
+        max_size: int = 1000,
+        batch_size: int = 50,
+        flush_interval: float = 0.5,
+        max_retries: int = 3,
+        retry_backoff: float = 1.0,
+        drain_timeout: float = 5.0,
+    ):
+        self.writers = dict(writers)
+        self.spill_path = Path(
+            spill_path or os.getenv("WRITE_BEHIND_SPILL_PATH") or DEFAULT_SPILL_PATH
+        )
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.drain_timeout = drain_timeout
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._retries: Dict[int, tuple] = {}
+        self._spill_lock = threading.Lock()
+        self._pending_spills: set = set()
+        self._stats = {"enqueued": 0, "written": 0, "retried": 0, "spilled": 0, "replayed": 0}
+
+    # Producer side
+
+    def enqueue(self, kind: str, doc_id: str, doc: dict) -> bool:
+        """Queue a write; returns False if it had to be spilled to disk instead."""
+        if kind not in self.writers:
+            raise ValueError(f"No writer registered for {kind!r}")
+        item = {"kind": kind, "doc_id": doc_id, "doc": doc, "attempts": 0}
+        self._stats["enqueued"] += 1
+        if self._queue is None or self._task is None:
+            # Not running (scripts, tests, startup failure): persist for later replay.
+            self._spill_soon([item])
+            return False
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except asyncio.QueueFull:
+            self._spill_soon([item])
+            return False
+
+    # Lifecycle
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        await self._wait_for_spills()
+        replay = await asyncio.to_thread(self._take_spilled)
+        self._task = asyncio.create_task(self._run())
+        for item in replay:
+            try:
+                self._queue.put_nowait(item)
+                self._stats["replayed"] += 1
+            except asyncio.QueueFull:
+                self._spill_soon([item])
+        if replay:
+            logger.info("Write-behind replayed %s spilled item(s)", len(replay))
+
+    async def stop(self) -> None:
+        """Flush what we can within drain_timeout, then spill the rest."""
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=self.drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Write-behind drain timed out; spilling remaining items")
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        leftover = []
+        for handle, item in self._retries.values():
+            handle.cancel()
+            leftover.append(item)
+        self._retries.clear()
+        while not self._queue.empty():
+            leftover.append(self._queue.get_nowait())
+            self._queue.task_done()
+        self._spill_soon(leftover)
+        await self._wait_for_spills()
+        self._queue = None
+
+    def stats(self) -> dict:
+        return {
+            **self._stats,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "retry_pending": len(self._retries),
+            "running": self._task is not None,
+        }
+
+    # Consumer side
+
+    async def _run(self) -> None:
+        while True:
+            batch: list = []
+            try:
+                batch.append(await self._queue.get())
+                deadline = time.monotonic() + self.flush_interval
+                while len(batch) < self.batch_size:
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                failed = await asyncio.to_thread(self._write_batch, batch)
+            except asyncio.CancelledError:
+                # Writes are idempotent upserts, so spilling an in-flight batch is safe.
+                for _ in batch:
+                    self._queue.task_done()
+                self._spill_soon(batch)
+                raise
+
+            for item in failed:
+                item["attempts"] += 1
+                if item["attempts"] > self.max_retries:
+                    self._spill_soon([item])
+                else:
+                    self._stats["retried"] += 1
+                    delay = self.retry_backoff * (2 ** (item["attempts"] - 1))
+                    handle = asyncio.get_running_loop().call_later(delay, self._requeue, item)
+                    self._retries[id(item)] = (handle, item)
+            for _ in batch:
+                self._queue.task_done()
+
+    def _requeue(self, item: dict) -> None:
+        self._retries.pop(id(item), None)
+        if self._queue is None or self._task is None:
+            self._spill_soon([item])
+            return
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self._spill_soon([item])
+
+    def _write_batch(self, batch: list) -> list:
+        failed = []
+        for item in batch:
+            try:
+                ok = self.writers[item["kind"]](item["doc_id"], item["doc"])
+            except Exception as e:
+                logger.warning("Write-behind %s %s failed: %s", item["kind"], item["doc_id"], e)
+                ok = False
+            if ok:
+                self._stats["written"] += 1
+            else:
+                failed.append(item)
+        return failed
+
+    # Spill file
+
+    def _spill_soon(self, items: list) -> None:
+        """Spill from a worker thread when called on the event loop, inline otherwise."""
+        if not items:
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self._spill(items)
+            return
+        task = asyncio.ensure_future(asyncio.to_thread(self._spill, items))
+        self._pending_spills.add(task)
+        task.add_done_callback(self._pending_spills.discard)
+
+    async def _wait_for_spills(self) -> None:
+        while self._pending_spills:
+            results = await asyncio.gather(*list(self._pending_spills), return_exceptions=True)
+            for result in results:
+                if isinstance(result, Exception):
+                    logger.error("Write-behind spill failed: %s", result)
+
+    def _own_spill_path(self) -> Path:
+        path = self.spill_path
+        return path.with_name(f"{path.stem}.{os.getpid()}{path.suffix}")
+
+    def _spill(self, items: list) -> None:
+        if not items:
+            return
+        path = self._own_spill_path()
+        with self._spill_lock:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            while True:
+                with path.open("a", encoding="utf-8") as f:
+                    _lock(f)
+                    if not _is_current(f, path):
+                        continue  # claimed by a replaying worker: append to a new file
+                    for item in items:
+                        f.write(json.dumps(item, default=str) + "\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+                    break
+        self._stats["spilled"] += len(items)
+
+    def _take_spilled(self) -> list:
+        stem, suffix = self.spill_path.stem, self.spill_path.suffix
+        items = []
+        with self._spill_lock:
+            for path in sorted(self.spill_path.parent.glob(f"{stem}*{suffix}")):
+                claimed = path.with_name(f"{path.name}.{os.getpid()}.replaying")
+                try:
+                    os.replace(path, claimed)
+                except FileNotFoundError:
+                    continue  # another worker claimed it first
+                with claimed.open("r", encoding="utf-8") as f:
+                    _lock(f)  # wait for an append that opened the file before the rename
+                    lines = f.read().splitlines()
+                claimed.unlink()
+                for line in lines:
+                    try:
+                        item = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if item.get("kind") in self.writers:
+                        item["attempts"] = 0
+                        items.append(item)
+        return items
+
+
+def _lock(f) -> None:
+    """Exclusive flock until ``f`` is closed (no-op where fcntl is unavailable)."""
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+
+def _is_current(f, path: Path) -> bool:
+    """True while ``path`` still names the file open as ``f`` (not renamed away)."""
+    try:
+        return os.stat(path).st_ino == os.fstat(f.fileno()).st_ino
+    except FileNotFoundError:
+        return False
@@ -203,6 +203,46 @@ export async function sendPublicMessage(payload: {
   });
 }
 
+export interface MessageEvent {
+  event: "message";
+  scope: "private" | "public";
+  channel: string;
+  message: ApiStaffMessage;
+}
+
+export function subscribeToMessages(
+  doctorId: string,
+  onMessage: (event: MessageEvent) => void
+): () => void {
+  const protocol = window.location.protocol === "https:" ? "wss:" : "ws:";
+  const url = `${protocol}//${window.location.host}/api/ws/messages/${encodeURIComponent(doctorId)}`;
+  let socket: WebSocket | null = null;
+  let retryTimer: number | undefined;
+  let closed = false;
+
+  const connect = () => {
+    socket = new WebSocket(url);
+    socket.onmessage = (ev) => {
+      try {
+        const data = JSON.parse(ev.data) as MessageEvent;
+        if (data.event === "message") onMessage(data);
+      } catch {
+        // ignore malformed frames
+      }
+    };
+    socket.onclose = () => {
+      if (!closed) retryTimer = window.setTimeout(connect, 3000);
+    };
+  };
+
+  connect();
+  return () => {
+    closed = true;
+    window.clearTimeout(retryTimer);
+    socket?.close();
+  };
+}
+
 export async function getPatientWearables( 
   patientId: string,
   days: number = 30
@@ -1,12 +1,12 @@
 import { Header } from '@/components/Header';
-import { useState } from 'react';
+import { useEffect, useState } from 'react';
 import { MessageSquare, Pin, Send, User, Search, PinOff } from 'lucide-react';
 import { Button } from '@/components/ui/button';
 import { Input } from '@/components/ui/input';
 import { Textarea } from '@/components/ui/textarea';
 import { cn } from '@/lib/utils';
 import { useMutation, useQuery, useQueryClient } from '@tanstack/react-query';
-import { getPrivateMessages, getPublicMessages, sendPrivateMessage, sendPublicMessage, ApiStaffMessage } from '@/lib/api';
+import { getPrivateMessages, getPublicMessages, sendPrivateMessage, sendPublicMessage, subscribeToMessages, ApiStaffMessage } from '@/lib/api';
 
 interface StaffMember {
   id: string;
@@ -67,6 +67,17 @@ export default function Messages() {
     queryFn: () => getPublicMessages(100),
   });
 
+  // New messages are pushed over a WebSocket instead of re-polling the lists.
+  useEffect(() => {
+    return subscribeToMessages(currentDoctorId, ({ scope, message }) => {
+      const key = scope === 'public' ? ['messages', 'public'] : ['messages', 'private', currentDoctorId];
+      queryClient.setQueryData<ApiStaffMessage[]>(key, (prev) => {
+        const rest = (prev ?? []).filter((m) => m.id !== message.id);
+        return [message, ...rest];
+      });
+    });
+  }, [queryClient]);
+
   const sendPrivateMutation = useMutation({
     mutationFn: sendPrivateMessage,
     onSuccess: async () => {
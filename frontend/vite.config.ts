@@ -11,6 +11,7 @@ export default defineConfig(({ mode }) => ({
       "/api": {
         target: "http://127.0.0.1:8000",
         changeOrigin: true,
+        ws: true,
       },
     },
   },
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+A/B benchmark of agent execution modes: "direct" (fixed tool calls, one
+structured LLM call) vs "react" (the LLM plans its own tool calls).
+
+For every input the agent runs in both modes, alternating which goes first,
+and the script prints wall-clock latency and token usage per mode.
+
+Direct runs that fell back to ReAct (docnotes multi-hop questions) are counted
+in the "fallback" column.
+
+Usage:
+    python scripts/benchmark_agent_modes.py --agent previsit --inputs 1,2,3 --runs 3
+    python scripts/benchmark_agent_modes.py --agent docnotes --inputs 1,2 \
+        --question "What was discussed about inhaler technique?"
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+MODES = ("direct", "react")
+
+
+def _run_previsit(catalog, patient_id: str, mode: str, args) -> dict:
+    import langchain_core.messages
+
+    from backend.agent_registry import load_agent_module
+
+    graph = load_agent_module("previsit_summary_agent")
+    state = graph.PrevisitSummarizer.build_starting_state(patient_id=patient_id, agent_mode=mode)
+    state["messages"].append(
+        langchain_core.messages.HumanMessage(content=f'{{"patient_id": "{patient_id}"}}')
+    )
+    span = catalog.Span(name="benchmark_agent_modes", agent="previsit_summary_agent")
+    return graph.PrevisitSummarizer(catalog=catalog, span=span).invoke(input=state)
+
+
+def _run_docnotes(catalog, patient_id: str, mode: str, args) -> dict:
+    import langchain_core.messages
+
+    from backend.agent_registry import load_agent_module
+
+    graph = load_agent_module("docnotes_search_agent")
+    state = graph.DocNotesSearcher.build_starting_state(
+        patient_id=patient_id, question=args.question, agent_mode=mode
+    )
+    state["messages"].append(
+        langchain_core.messages.HumanMessage(
+            content=f'{{"patient_id": "{patient_id}", "question": "{args.question}"}}'
+        )
+    )
+    span = catalog.Span(name="benchmark_agent_modes", agent="docnotes_search_agent")
+    return graph.DocNotesSearcher(catalog=catalog, span=span).invoke(input=state)
+
+
+AGENTS = {
+    "previsit": _run_previsit,
+    "docnotes": _run_docnotes,
+}
+
+
+def _percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark direct vs ReAct agent modes")
+    parser.add_argument("--agent", choices=sorted(AGENTS), default="previsit")
+    parser.add_argument(
+        "--inputs", default="1,2,3,4,5", help="Comma-separated agent inputs (patient ids)"
+    )
+    parser.add_argument("--runs", type=int, default=3, help="Runs per input and mode")
+    parser.add_argument(
+        "--question",
+        default="What medication changes were made at recent visits?",
+        help="Question for the docnotes agent",
+    )
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(project_root))
+    import agentc
+
+    catalog = agentc.Catalog()
+    runner = AGENTS[args.agent]
+    inputs = [value.strip() for value in args.inputs.split(",") if value.strip()]
+
+    samples = {
+        mode: {"latency": [], "input": [], "output": [], "errors": 0, "fallbacks": 0}
+        for mode in MODES
+    }
+    for run in range(args.runs):
+        for value in inputs:
+            # Alternate order so neither mode always benefits from warm caches.
+            order = MODES if run % 2 == 0 else tuple(reversed(MODES))
+            for mode in order:
+                start = time.perf_counter()
+                try:
+                    result = runner(catalog, value, mode, args)
+                except Exception as e:
+                    print(f"  ✗ {mode} input={value}: {e}")
+                    samples[mode]["errors"] += 1
+                    continue
+                elapsed = time.perf_counter() - start
+                usage = result.get("token_usage") or {}
+                samples[mode]["latency"].append(elapsed)
+                samples[mode]["input"].append(usage.get("input_tokens", 0))
+                samples[mode]["output"].append(usage.get("output_tokens", 0))
+                if result.get("agent_mode") == "react_fallback":
+                    samples[mode]["fallbacks"] += 1
+                print(
+                    f"  {mode:6} input={value} {elapsed:6.2f}s "
+                    f"tokens in/out={usage.get('input_tokens', 0)}/{usage.get('output_tokens', 0)}"
+                )
+
+    print(f"\n{args.agent}: {len(inputs)} input(s) x {args.runs} run(s)")
+    print(
+        f"{'mode':8}{'runs':>6}{'errors':>8}{'mean s':>9}{'p50 s':>8}{'p95 s':>8}"
+        f"{'in tok':>9}{'out tok':>9}{'fallback':>10}"
+    )
+    for mode in MODES:
+        s = samples[mode]
+        if not s["latency"]:
+            print(f"{mode:8}{0:>6}{s['errors']:>8}")
+            continue
+        print(
+            f"{mode:8}{len(s['latency']):>6}{s['errors']:>8}"
+            f"{statistics.mean(s['latency']):>9.2f}"
+            f"{_percentile(s['latency'], 50):>8.2f}{_percentile(s['latency'], 95):>8.2f}"
+            f"{statistics.mean(s['input']):>9.0f}{statistics.mean(s['output']):>9.0f}"
+            f"{s['fallbacks']:>10}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
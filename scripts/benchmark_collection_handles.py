@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of write latency with per-call vs cached collection handles.
+
+For each write path that used to resolve its handles on every call, this
+times --runs upserts of a small scratch document two ways:
+
+- per-call: cluster.bucket(...).scope(...).collection(...) then upsert
+  (what save_research_answer & co. did before the CollectionRegistry)
+- cached:   upsert through the handle resolved once in CouchbaseDB.connect()
+
+Scratch documents are removed afterwards.
+
+Usage:
+    python scripts/benchmark_collection_handles.py
+    python scripts/benchmark_collection_handles.py --runs 200
+"""
+
+import argparse
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+
+
+def _percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def _time_ms(fn, runs: int):
+    samples = []
+    for i in range(runs):
+        start = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-call vs cached collection handles")
+    parser.add_argument("--runs", type=int, default=50, help="Upserts per path and variant")
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(project_root))
+    from backend.database import CouchbaseDB
+
+    db = CouchbaseDB()
+    db._ensure_connected()
+    if db._connection_error:
+        print(f"❌ Database connection failed: {db._connection_error}")
+        return 1
+
+    # (registry field, bucket, scope, collection)
+    paths = [
+        ("research_answers", db.research_bucket_name, "Pubmed", "answers"),
+        ("research_questions", db.research_bucket_name, "Pubmed", "questions"),
+        ("doctors_questions", db.bucket_name, "Notes", "doctors_questions"),
+        ("wearables_analytics", db.bucket_name, "Wearables", "Analytics_Results"),
+    ]
+    doc = {"type": "benchmark", "text": "collection handle benchmark"}
+
+    print(f"{args.runs} upserts per variant")
+    print(f"{'path':22}{'variant':>10}{'mean ms':>9}{'p50 ms':>9}{'p95 ms':>9}")
+    for name, bucket, scope, collection in paths:
+        cached = getattr(db.collections, name)
+        if cached is None:
+            print(f"{name:22}  skipped (bucket not available)")
+            continue
+        prefix = f"bench::handles::{uuid.uuid4().hex[:8]}"
+
+        def per_call(i):
+            handle = db.cluster.bucket(bucket).scope(scope).collection(collection)
+            handle.upsert(f"{prefix}::{i % 5}", doc)
+
+        def via_registry(i):
+            cached.upsert(f"{prefix}::{i % 5}", doc)
+
+        try:
+            per_call(0)  # warm the connection for both variants
+            for variant, fn in (("per-call", per_call), ("cached", via_registry)):
+                samples = _time_ms(fn, args.runs)
+                print(
+                    f"{name:22}{variant:>10}{statistics.mean(samples):>9.2f}"
+                    f"{_percentile(samples, 50):>9.2f}{_percentile(samples, 95):>9.2f}"
+                )
+        finally:
+            for i in range(5):
+                try:
+                    cached.remove(f"{prefix}::{i}")
+                except Exception:
+                    pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
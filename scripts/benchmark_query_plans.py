@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Benchmark plan reuse for the similar-patients query.
+
+Runs the same cohort lookup for every patient three ways:
+1. adhoc, with values interpolated into the SQL text (the old behaviour)
+2. adhoc, parameterized (plan rebuilt each time)
+3. prepared (adhoc=False), parameterized - one cached plan per variant
+
+and prints average server execution time, then shows the prepared statement
+usage counters from system:prepareds and the index chosen by EXPLAIN.
+
+Usage:
+    python scripts/benchmark_query_plans.py --runs 20
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+
+
+def _legacy_statement(bucket: str, params: dict) -> str:
+    """The old interpolated statement, rebuilt from the same parameters."""
+    where = [
+        f"p.patient_id != '{params['patient_id']}'",
+        f"ABS(TO_NUMBER(p.age) - {params['ref_age']}) <= {params['max_age'] - params['ref_age']}",
+    ]
+    if "gender" in params:
+        where.append(f"LOWER(p.gender) = '{params['gender']}'")
+    if "condition" in params:
+        where.append(
+            f"(LOWER(p.medical_conditions) = '{params['condition']}' OR "
+            f"ANY c IN p.medical_conditions SATISFIES LOWER(c) = '{params['condition']}' END)"
+        )
+    return f"""
+    SELECT p.patient_id, p.patient_name, p.age, p.gender, p.medical_conditions,
+           ABS(TO_NUMBER(p.age) - {params["ref_age"]}) AS age_difference
+    FROM `{bucket}`.People.Patients p
+    WHERE {" AND ".join(where)}
+    ORDER BY age_difference ASC
+    LIMIT {params["limit"]}
+    """
+
+
+def _timed(cluster, statement: str, options) -> float:
+    """Run a statement and return server execution time in ms (client time as fallback)."""
+    start = time.perf_counter()
+    result = cluster.query(statement, options)
+    list(result)
+    client_ms = (time.perf_counter() - start) * 1000
+    try:
+        metrics = result.metadata().metrics()
+        return metrics.execution_time().total_seconds() * 1000
+    except Exception:
+        return client_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark prepared plan reuse")
+    parser.add_argument("--runs", type=int, default=10, help="Runs per patient per mode")
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(project_root))
+
+    from couchbase.options import QueryOptions
+
+    from backend.database import CouchbaseDB
+    from backend.queries import reference_patient_statement, similar_patients_query
+
+    db = CouchbaseDB()
+    db._ensure_connected()
+    if db._connection_error:
+        print(f"❌ Database connection failed: {db._connection_error}")
+        return 1
+
+    id_rows = db.cluster.query(f"SELECT RAW p.patient_id FROM `{db.bucket_name}`.People.Patients p")
+    patient_ids = [str(pid) for pid in id_rows if pid] or ["1"]
+
+    cases = []
+    for pid in patient_ids:
+        rows = list(
+            db.cluster.query(
+                reference_patient_statement(db.bucket_name),
+                QueryOptions(named_parameters={"patient_id": pid}),
+            )
+        )
+        if rows:
+            cases.append(similar_patients_query(db.bucket_name, rows[0], pid))
+
+    if not cases:
+        print("⚠️  No patients found")
+        return 1
+
+    timings = {"adhoc_interpolated": [], "adhoc_parameterized": [], "prepared": []}
+    for _ in range(args.runs):
+        for statement, params in cases:
+            timings["adhoc_interpolated"].append(
+                _timed(
+                    db.cluster,
+                    _legacy_statement(db.bucket_name, params),
+                    QueryOptions(metrics=True),
+                )
+            )
+            timings["adhoc_parameterized"].append(
+                _timed(
+                    db.cluster,
+                    statement,
+                    QueryOptions(named_parameters=params, metrics=True),
+                )
+            )
+            timings["prepared"].append(
+                _timed(
+                    db.cluster,
+                    statement,
+                    QueryOptions(named_parameters=params, adhoc=False, metrics=True),
+                )
+            )
+
+    print("=" * 80)
+    print(f"SIMILAR PATIENTS QUERY ({len(cases)} patients x {args.runs} runs)")
+    print("=" * 80)
+    for mode, values in timings.items():
+        print(
+            f"  {mode:<22} mean {statistics.mean(values):7.2f} ms  "
+            f"p50 {statistics.median(values):7.2f} ms  max {max(values):7.2f} ms"
+        )
+
+    print("\nPrepared statements (system:prepareds):")
+    try:
+        rows = db.cluster.query(
+            """
+            SELECT p.name, p.uses, p.avgServiceTime
+            FROM system:prepareds p
+            WHERE CONTAINS(p.statement, "People.Patients")
+            """
+        )
+        for row in rows:
+            print(f"  {row.get('uses', 0):>6} uses  {row.get('avgServiceTime')}  {row.get('name')}")
+    except Exception as e:
+        print(f"  ⚠️  Could not read system:prepareds: {e}")
+
+    print("\nEXPLAIN (first case):")
+    statement, params = cases[0]
+    try:
+        plan = list(db.cluster.query(f"EXPLAIN {statement}", QueryOptions(named_parameters=params)))
+        text = str(plan)
+        for index in ("idx_patients_similarity", "PrimaryScan"):
+            print(f"  {index}: {'yes' if index in text else 'no'}")
+        print(f"  covering: {'yes' if 'covers' in text else 'no'}")
+    except Exception as e:
+        print(f"  ⚠️  EXPLAIN failed: {e}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Benchmark PII redaction on large synthetic notes payloads.
+
+Compares the previous per-string implementation (two uncompiled re.sub calls,
+every field rebuilt) with RedactionEngine on a cold cache (first request for a
+document) and a warm cache (the same document summarized again).
+
+No database is needed: the payload is a patient document with --notes visit
+notes of roughly --note-chars characters each, sprinkled with emails and
+phone numbers, plus a 1024-dim embedding per note.
+
+Usage:
+    python scripts/benchmark_redaction.py
+    python scripts/benchmark_redaction.py --notes 200 --note-chars 4000 --runs 20
+"""
+
+import argparse
+import random
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+
+WORDS = (
+    "patient reports shortness of breath on exertion inhaler technique reviewed "
+    "spirometry stable wheeze cough sputum follow up in two weeks oxygen saturation"
+).split()
+
+
+def legacy_redact(value):
+    """The pre-RedactionEngine implementation, kept here as the baseline."""
+    keys_to_drop = {
+        "patient_email",
+        "patient_cell",
+        "email",
+        "phone",
+        "insurance_number",
+        "emergency_contacts",
+    }
+    if isinstance(value, dict):
+        return {str(k): legacy_redact(v) for k, v in value.items() if str(k) not in keys_to_drop}
+    if isinstance(value, list):
+        return [legacy_redact(v) for v in value]
+    if isinstance(value, str):
+        s = re.sub(r"[A-Z0-9._%+-]+@[A-Z0-9.-]+\.[A-Z]{2,}", "[REDACTED]", value, flags=re.I)
+        return re.sub(r"\b\d{3}[- .]?\d{3}[- .]?\d{4}\b", "[REDACTED]", s)
+    return value
+
+
+def make_payload(notes: int, note_chars: int, seed: int = 7) -> dict:
+    rng = random.Random(seed)
+
+    def text():
+        parts, size = [], 0
+        while size < note_chars:
+            word = rng.choice(WORDS)
+            if rng.random() < 0.01:
+                word = rng.choice(["call 555-201-3344", "email jo.doe@example.org"])
+            parts.append(word)
+            size += len(word) + 1
+        return " ".join(parts)
+
+    return {
+        "patient_id": "1",
+        "name": "Jo Doe",
+        "patient_email": "jo.doe@example.org",
+        "patient_cell": "555-201-3344",
+        "conditions": ["asthma"],
+        "notes": [
+            {
+                "visit_date": f"2025-01-{(i % 28) + 1:02d}",
+                "doctor_name": "Dr. Smith",
+                "visit_notes": text(),
+                "all_notes_vectorized": [rng.random() for _ in range(1024)],
+            }
+            for i in range(notes)
+        ],
+    }
+
+
+def _time_ms(fn, runs: int):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), max(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PII redaction")
+    parser.add_argument("--notes", type=int, default=100, help="Notes in the payload")
+    parser.add_argument("--note-chars", type=int, default=3000, help="Characters per note")
+    parser.add_argument("--runs", type=int, default=10, help="Timed runs per variant")
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(project_root))
+    from backend.utils.redaction import RedactionEngine
+
+    payload = make_payload(args.notes, args.note_chars)
+    engine = RedactionEngine()
+    assert engine.redact(payload) == legacy_redact(payload), "engine output differs from baseline"
+
+    def cold():
+        RedactionEngine(cache_size=0).redact(payload)
+
+    variants = [
+        ("legacy", lambda: legacy_redact(payload)),
+        ("engine (cold)", cold),
+        ("engine (warm)", lambda: engine.redact(payload)),
+    ]
+    print(f"payload: {args.notes} notes x ~{args.note_chars} chars, {args.runs} runs each")
+    print(f"{'variant':16}{'median ms':>11}{'max ms':>9}")
+    for name, fn in variants:
+        median, worst = _time_ms(fn, args.runs)
+        print(f"{name:16}{median:>11.2f}{worst:>9.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
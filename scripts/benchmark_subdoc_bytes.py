@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Benchmark bytes transferred per field update: get + full upsert vs sub-document.
+
+For one sample document of each kind (private message, appointment, research
+answer, doctor note with its embedding) this prints the payload bytes each
+approach moves over the wire:
+
+- full:   the whole document is read (get) and written back (upsert)
+- subdoc: only the path and the new value are sent (mutate_in)
+
+With --timed it also copies each sample to a scratch document, times --runs
+updates both ways against the copy, and removes it afterwards.
+
+Usage:
+    python scripts/benchmark_subdoc_bytes.py
+    python scripts/benchmark_subdoc_bytes.py --timed --runs 50
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+
+
+def _json_bytes(value) -> int:
+    return len(json.dumps(value, separators=(",", ":")).encode("utf-8"))
+
+
+def _sample(db, collection, keyspace: str, where: str = "TRUE"):
+    rows = db._query(
+        f"SELECT RAW META(d).id FROM {keyspace} d WHERE {where} LIMIT 1", prepared=False
+    )
+    if not rows:
+        return None, None
+    return rows[0], collection.get(rows[0]).content_as[dict]
+
+
+def _time_ms(fn, runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sub-document vs full-document updates")
+    parser.add_argument("--timed", action="store_true", help="Also time updates on scratch copies")
+    parser.add_argument("--runs", type=int, default=20, help="Timed updates per approach")
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(project_root))
+
+    from backend.database import CouchbaseDB
+
+    db = CouchbaseDB()
+    db._ensure_connected()
+    if db._connection_error:
+        print(f"❌ Database connection failed: {db._connection_error}")
+        return 1
+
+    answers = db.collections.research_answers
+    b = f"`{db.bucket_name}`"
+    cases = [
+        (
+            "mark_message_as_read",
+            db.private_messages_collection,
+            f"{b}.Messages.Private",
+            "TRUE",
+            "read",
+            True,
+        ),
+        (
+            "update_appointment_status",
+            db.appointments_collection,
+            f"{b}.Calendar.Appointments",
+            "TRUE",
+            "status",
+            "completed",
+        ),
+        (
+            "update_answer_rating",
+            answers,
+            f"`{db.research_bucket_name}`.Pubmed.answers",
+            "TRUE",
+            "answer_rating",
+            5,
+        ),
+        (
+            "upsert_doctor_note_embedding",
+            db.doctor_notes_collection,
+            f"{b}.Notes.Doctor",
+            "d.all_notes_vectorized IS VALUED",
+            "all_notes_vectorized",
+            None,
+        ),
+    ]
+
+    print("=" * 80)
+    print("BYTES PER UPDATE (JSON payload, excluding protocol framing)")
+    print("=" * 80)
+    print(f"  {'operation':<30} {'full (get+upsert)':>18} {'subdoc':>10} {'saved':>8}")
+
+    timings = []
+    for name, collection, keyspace, where, path, value in cases:
+        _, doc = _sample(db, collection, keyspace, where)
+        if doc is None:
+            print(f"  {name:<30} (no sample document)")
+            continue
+        if value is None:
+            value = doc.get(path)
+
+        full = 2 * _json_bytes({**doc, path: value})
+        subdoc = len(path.encode("utf-8")) + _json_bytes(value)
+        saved = 100.0 * (1 - subdoc / full) if full else 0.0
+        print(f"  {name:<30} {full:>18,} {subdoc:>10,} {saved:>7.1f}%")
+
+        if not args.timed:
+            continue
+
+        scratch_id = f"bench_subdoc::{uuid.uuid4().hex}"
+        collection.insert(scratch_id, doc)
+        try:
+
+            def full_update():
+                data = collection.get(scratch_id).content_as[dict]
+                data[path] = value
+                collection.upsert(scratch_id, data)
+
+            def subdoc_update():
+                db._mutate_fields(collection, scratch_id, {path: value})
+
+            timings.append(
+                (name, _time_ms(full_update, args.runs), _time_ms(subdoc_update, args.runs))
+            )
+        finally:
+            collection.remove(scratch_id)
+
+    if timings:
+        print("\nMedian latency per update (scratch copies):")
+        for name, full_ms, subdoc_ms in timings:
+            print(f"  {name:<30} full {full_ms:7.2f} ms   subdoc {subdoc_ms:7.2f} ms")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Index advisor for every SQL++ statement the app runs.
+
+Collects statements from:
+- backend/database.py and backend/queries.py (string / f-string literals)
+- tools/*.py (string / f-string literals)
+- tools/*.sqlpp (statement after the YAML header)
+
+Modes:
+    --list              print the extracted statements (no cluster needed)
+    (default)           run ADVISE on each statement and write a versioned
+                        covering-index pack to indexes/covering/v<N>.sqlpp
+    --check             run EXPLAIN on each statement and exit 1 if any plan
+                        uses a PrimaryScan (except ALLOWED_PRIMARY_SCANS) or if
+                        EXPLAIN fails; dynamic statements are listed as unchecked
+
+Usage:
+    python scripts/index_advisor.py --list
+    python scripts/index_advisor.py --version 2
+    python scripts/index_advisor.py --check
+"""
+
+import argparse
+import ast
+import json
+import re
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+pack_dir = project_root / "indexes" / "covering"
+
+# Placeholder values for f-string / str.format fields, keyed by expression source.
+PLACEHOLDERS = {
+    "self.bucket_name": "Scripps",
+    "db.bucket_name": "Scripps",
+    "bucket": "Scripps",
+    "BUCKET": "Scripps",
+    "self.research_bucket_name": "Research",
+    "research_bucket": "Research",
+    "keyspace": "`Scripps`.`Notes`.`sentiment_analysis`",
+    "collection_name": "Patient_1",
+    "collection": "Doctor",
+    "b": "`Scripps`",
+    "wearable_expr": "(SELECT RAW MAX(w.timestamp) FROM `Scripps`.`Wearables`.`Patient_1` w)[0]",
+    "NUMERIC_VECTOR_FIELD": "wearable_trend_numeric_vector",
+}
+
+# Statements that are expected to scan the whole keyspace, with the reason.
+ALLOWED_PRIMARY_SCANS = {
+    "backend/database.py::get_all_patients": "reads the whole collection by design",
+    "backend/database.py::_get_research_snippets": "unfiltered sample of papers",
+    "backend/database.py::_get_research_snippets_for_condition": "substring LIKE fallback",
+    "tools/paper_search.py::_fallback_text_search": "substring LIKE fallback",
+    "tools/paper_search.py::_fallback_text_search#2": "unfiltered sample of papers",
+    "tools/connect_symptoms_to_research.py::connect_symptoms_to_research#2": (
+        "substring LIKE fallback"
+    ),
+    "tools/doc_notes_search.py::_fallback_keyword_search": "substring LIKE fallback",
+    "tools/doc_notes_search.py::_fallback_keyword_search#2": "substring LIKE fallback",
+    "tools/patients_search_by_name.sqlpp": "substring LIKE on patient_name",
+    "backend/database.py::get_patient_wearable_data": "per-patient collection (~30 docs)",
+    "tools/get_wearable_data_by_patient.py::get_wearable_data_by_patient": (
+        "per-patient collection (~30 docs)"
+    ),
+}
+
+# Statements in this repo use upper-case keywords; that also keeps docstrings out.
+_SQL_START = re.compile(r"^\s*(SELECT|UPDATE|DELETE|FROM)\b")
+
+
+def _is_sql(text: str) -> bool:
+    return bool(_SQL_START.match(text)) and bool(re.search(r"\bFROM\b|^\s*UPDATE\b", text))
+
+
+def _render_joined(node: ast.JoinedStr, source: str):
+    """Render an f-string with placeholders; None if any field is unknown."""
+    out = []
+    for part in node.values:
+        if isinstance(part, ast.Constant):
+            out.append(str(part.value))
+            continue
+        value = part.value
+        # `{"LIMIT $limit" if limit else ""}` -> take the populated branch; optional
+        # clauses built elsewhere (keyset cursors) -> take the constant branch
+        if isinstance(value, ast.IfExp):
+            branch = value.body if isinstance(value.body, ast.Constant) else value.orelse
+            if isinstance(branch, ast.Constant):
+                out.append(str(branch.value))
+                continue
+        expr = ast.get_source_segment(source, value) or ""
+        if expr not in PLACEHOLDERS:
+            return None
+        out.append(PLACEHOLDERS[expr])
+    return "".join(out)
+
+
+def _render_format(text: str):
+    try:
+        return text.format(**{k: v for k, v in PLACEHOLDERS.items() if "." not in k})
+    except (KeyError, IndexError, ValueError):
+        return text
+
+
+def extract_python(path: Path) -> list[dict]:
+    source = path.read_text()
+    tree = ast.parse(source)
+    rel = path.relative_to(project_root).as_posix()
+    found: list[dict] = []
+    counts: dict[str, int] = {}
+
+    def visit(node, func):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            func = node.name
+        text = None
+        dynamic = False
+        if isinstance(node, ast.JoinedStr):
+            text = _render_joined(node, source)
+            if text is None:
+                raw = "".join(
+                    p.value if isinstance(p, ast.Constant) else "{...}" for p in node.values
+                )
+                if _is_sql(raw):
+                    text, dynamic = raw, True
+        elif isinstance(node, ast.Constant) and isinstance(node.value, str):
+            text = _render_format(node.value)
+        if text and _is_sql(text):
+            key = f"{rel}::{func or '<module>'}"
+            counts[key] = counts.get(key, 0) + 1
+            sid = key if counts[key] == 1 else f"{key}#{counts[key]}"
+            found.append({"id": sid, "statement": text.strip(), "dynamic": dynamic})
+            return
+        for child in ast.iter_child_nodes(node):
+            visit(child, func)
+
+    visit(tree, None)
+    return found
+
+
+def extract_sqlpp(path: Path) -> list[dict]:
+    text = path.read_text()
+    body = re.sub(r"/\*.*?\*/", "", text, count=1, flags=re.S).strip().rstrip(";").strip()
+    return [{"id": path.relative_to(project_root).as_posix(), "statement": body, "dynamic": False}]
+
+
+def extract_queries_module() -> list[dict]:
+    """The shared cohort statements are built by functions, so render every variant."""
+    sys.path.insert(0, str(project_root))
+    from backend.queries import reference_patient_statement, similar_patients_statement
+
+    out = [
+        {
+            "id": "backend/queries.py::reference_patient_statement",
+            "statement": reference_patient_statement("Scripps").strip(),
+            "dynamic": False,
+        }
+    ]
+    for gender in (False, True):
+        for condition in (False, True):
+            out.append(
+                {
+                    "id": f"backend/queries.py::similar_patients_statement[{gender},{condition}]",
+                    "statement": similar_patients_statement("Scripps", gender, condition).strip(),
+                    "dynamic": False,
+                }
+            )
+    return out
+
+
+def collect_statements() -> list[dict]:
+    statements = extract_python(project_root / "backend" / "database.py")
+    statements += extract_queries_module()
+    for path in sorted((project_root / "tools").glob("*.py")):
+        statements += extract_python(path)
+    for path in sorted((project_root / "tools").glob("*.sqlpp")):
+        statements += extract_sqlpp(path)
+    return statements
+
+
+def _walk_operators(plan):
+    if isinstance(plan, dict):
+        op = plan.get("#operator")
+        if op:
+            yield op, plan
+        for v in plan.values():
+            yield from _walk_operators(v)
+    elif isinstance(plan, list):
+        for v in plan:
+            yield from _walk_operators(v)
+
+
+def _advise(cluster, statement: str) -> list[str]:
+    rows = list(cluster.query(f"ADVISE {statement}"))
+    indexes: list[str] = []
+    for row in rows:
+        info = (row.get("advice") or {}).get("adviseinfo") or {}
+        recommended = info.get("recommended_indexes") or {}
+        if not isinstance(recommended, dict):
+            continue
+        picks = recommended.get("covering_indexes") or recommended.get("indexes") or []
+        for idx in picks:
+            stmt = idx.get("index_statement") if isinstance(idx, dict) else None
+            if stmt:
+                indexes.append(stmt.strip().rstrip(";"))
+    return indexes
+
+
+def _next_version() -> int:
+    versions = [
+        int(m.group(1)) for p in pack_dir.glob("v*.sqlpp") if (m := re.match(r"v(\d+)", p.stem))
+    ]
+    return max(versions, default=0) + 1
+
+
+def write_pack(cluster, statements: list[dict], version: int) -> Path:
+    by_index: dict[str, list[str]] = {}
+    for st in statements:
+        if st["dynamic"]:
+            print(f"  ⏭️  {st['id']} (dynamic, skipped)")
+            continue
+        try:
+            advice = _advise(cluster, st["statement"])
+        except Exception as e:
+            print(f"  ⚠️  {st['id']}: ADVISE failed: {e}")
+            continue
+        print(f"  ✓ {st['id']}: {len(advice)} recommendation(s)")
+        for idx in advice:
+            by_index.setdefault(idx, []).append(st["id"])
+
+    pack_dir.mkdir(parents=True, exist_ok=True)
+    path = pack_dir / f"v{version}.sqlpp"
+    lines = [
+        "/*",
+        f"Covering index pack v{version}",
+        f"Generated by scripts/index_advisor.py on {datetime.now(timezone.utc).date()}",
+        f"{len(by_index)} index(es) from {len(statements)} statement(s).",
+        "*/",
+        "",
+    ]
+    for idx, sources in sorted(by_index.items()):
+        lines.append("/* " + ", ".join(sorted(set(sources))) + " */")
+        lines.append(idx + ";")
+        lines.append("")
+    path.write_text("\n".join(lines))
+    return path
+
+
+def check(cluster, statements: list[dict]) -> int:
+    failures = []
+    errors = []
+    skipped = []
+    for st in statements:
+        if st["dynamic"]:
+            skipped.append(st["id"])
+            continue
+        try:
+            plan = list(cluster.query(f"EXPLAIN {st['statement']}"))
+        except Exception as e:
+            # A statement the planner rejects is broken; don't let it pass the check.
+            print(f"  ✗ {st['id']}: EXPLAIN failed: {e}")
+            errors.append(st["id"])
+            continue
+        scans = [op for op, _ in _walk_operators(plan) if op.startswith("PrimaryScan")]
+        used = sorted({n["index"] for op, n in _walk_operators(plan) if n.get("index")})
+        if scans and st["id"] in ALLOWED_PRIMARY_SCANS:
+            print(f"  ~ {st['id']}: primary scan allowed ({ALLOWED_PRIMARY_SCANS[st['id']]})")
+        elif scans:
+            print(f"  ✗ {st['id']}: PrimaryScan")
+            failures.append(st["id"])
+        else:
+            print(f"  ✓ {st['id']}: {', '.join(used) or 'no index scan'}")
+
+    print(f"\n{len(failures)} statement(s) fall back to a primary scan")
+    print(f"{len(errors)} statement(s) failed EXPLAIN")
+    if skipped:
+        print(f"{len(skipped)} dynamic statement(s) not checked (text built at runtime):")
+        for sid in skipped:
+            print(f"  - {sid}")
+    return 1 if failures or errors else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ADVISE / EXPLAIN every app statement")
+    parser.add_argument("--list", action="store_true", help="Only list extracted statements")
+    parser.add_argument("--check", action="store_true", help="Fail on primary scans")
+    parser.add_argument("--version", type=int, default=None, help="Pack version to write")
+    args = parser.parse_args()
+
+    statements = collect_statements()
+
+    if args.list:
+        for st in statements:
+            flag = " (dynamic)" if st["dynamic"] else ""
+            print(f"-- {st['id']}{flag}\n{st['statement']}\n")
+        print(f"{len(statements)} statement(s)")
+        return 0
+
+    sys.path.insert(0, str(project_root))
+    from backend.database import CouchbaseDB
+
+    db = CouchbaseDB()
+    db._ensure_connected()
+    if db._connection_error:
+        print(f"❌ Database connection failed: {db._connection_error}")
+        return 1
+
+    if args.check:
+        return check(db.cluster, statements)
+
+    version = args.version or _next_version()
+    path = write_pack(db.cluster, statements, version)
+    print(f"\n✓ Wrote {path.relative_to(project_root)}")
+    print(json.dumps({"version": version, "statements": len(statements)}))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
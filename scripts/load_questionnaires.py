@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Script to copy pre-visit questionnaires from data/questionnaires into Couchbase,
+so the API can serve them with QUESTIONNAIRE_SOURCE=couchbase.
+
+Documents go to QUESTIONNAIRE_KEYSPACE (default Questionnaires.PreVisit) in the
+Scripps bucket, keyed by patient id. The scope and collection must exist.
+"""
+
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+
+
+def main():
+    """Upsert every patient_<id>/pre_visit_questionnaire.json."""
+    sys.path.insert(0, str(project_root))
+
+    from backend.database import CouchbaseDB
+    from backend.questionnaires import FileQuestionnaireSource
+
+    db = CouchbaseDB()
+    db._ensure_connected()
+
+    if db._connection_error:
+        print(f"❌ Database connection failed: {db._connection_error}")
+        return 1
+
+    source = FileQuestionnaireSource()
+    loaded, errors = 0, 0
+    for directory in sorted(source.root.glob("patient_*")):
+        patient_id = directory.name[len("patient_") :]
+        try:
+            questionnaire = source.load(patient_id)
+        except Exception as e:
+            print(f"  ✗ patient {patient_id}: {e}")
+            errors += 1
+            continue
+        if questionnaire is None:
+            continue
+        if db.save_pre_visit_questionnaire(patient_id, questionnaire):
+            print(f"  ✓ patient {patient_id} → {db.questionnaire_keyspace}")
+            loaded += 1
+        else:
+            errors += 1
+
+    print(f"\nLoaded {loaded} questionnaire(s), {errors} error(s)")
+    return 0 if errors == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -54,6 +54,30 @@ def clear_patient_collection(db, patient_id: str, collection_name: str) -> int:
         return 0
 
 
+def refresh_cohort_member(db, patient_id: str, wearable_records: list[dict]) -> bool:
+    """
+    Update the patient's entry in the precomputed cohort aggregates.
+
+    Stores the patient's metric averages with condition/age/gender so the API can
+    rank patients against their cohort without re-reading raw wearable data.
+    """
+    from backend.cohort_stats import cohort_service, patient_metric_averages
+
+    patient = db.get_patient_raw(patient_id) or {}
+    conditions = patient.get("medical_conditions")
+    if isinstance(conditions, list):
+        conditions = conditions[0] if conditions else ""
+
+    member = cohort_service.record_patient(
+        patient_id,
+        conditions,
+        patient.get("age"),
+        patient.get("gender"),
+        patient_metric_averages(wearable_records),
+    )
+    return db.save_cohort_member(patient_id, member)
+
+
 def load_wearable_data_for_patient(db, patient_id: str, json_file: Path) -> tuple[int, int]:
     """
     Load wearable data from JSON file into Couchbase.
@@ -117,6 +141,12 @@ def load_wearable_data_for_patient(db, patient_id: str, json_file: Path) -> tupl
             print(f"  ⚠️  Failed to insert record {i}: {e}")
             error_count += 1
 
+    if success_count:
+        if refresh_cohort_member(db, patient_id, wearable_records):
+            print("  📊 Updated cohort aggregates")
+        else:
+            print("  ⚠️  Failed to update cohort aggregates")
+
     return success_count, error_count
 
 
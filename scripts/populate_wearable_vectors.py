@@ -6,8 +6,15 @@ This script:
 1. Reads existing wearable data for each patient
 2. Vectorizes the 30-day trends using the new vectorization tool
 3. Stores the vectors in Couchbase for vector similarity search
+
+Use --numeric to skip the embedding model and only build the local numeric
+trend vectors (see backend/utils/trend_embedding.py). Numeric vectors are always
+written to Wearables.Analytics_Results for cohort search. A --numeric run sets
+its fields with a sub-document upsert, so a text embedding already stored in
+wearable_trend_vector is kept.
 """
 
+import argparse
 import sys
 from pathlib import Path
 
@@ -15,9 +22,34 @@ from pathlib import Path
 project_root = Path(__file__).parent.parent
 
 
+def _store_trend_doc(collection, key: str, doc: dict, numeric_only: bool) -> None:
+    """Upsert the trend document; numeric_only sets its fields without replacing it."""
+    if not numeric_only:
+        collection.upsert(key, doc)
+        return
+    from couchbase import subdocument as SD
+    from couchbase.options import MutateInOptions
+    from couchbase.subdocument import StoreSemantics
+
+    collection.mutate_in(
+        key,
+        [SD.upsert(path, value) for path, value in doc.items()],
+        MutateInOptions(store_semantics=StoreSemantics.UPSERT),
+    )
+
+
 def main():
     """Populate wearable trend vectors for all patients."""
 
+    parser = argparse.ArgumentParser(description="Populate wearable trend vectors")
+    parser.add_argument(
+        "--numeric",
+        action="store_true",
+        help="Use local numeric trend vectors only (no embedding model calls)",
+    )
+    args = parser.parse_args()
+    mode = "numeric" if args.numeric else "text"
+
     sys.path.insert(0, str(project_root))
     sys.path.insert(0, str(project_root / "tools"))
 
@@ -98,7 +130,7 @@ def main():
             # Step 3: Vectorize the trend
             print("  3. Vectorizing wearable trends...")
             vector_result = vectorize_wearable_trends(
-                wearable_data=wearable_data, patient_condition=condition
+                wearable_data=wearable_data, patient_condition=condition, mode=mode
             )
 
             if "error" in vector_result:
@@ -108,6 +140,7 @@ def main():
 
             trend_text = vector_result.get("trend_text", "")
             trend_vector = vector_result.get("trend_vector", [])
+            numeric_vector = vector_result.get("numeric_vector", [])
             normalized_metrics = vector_result.get("normalized_metrics", {})
             summary = vector_result.get("summary", {})
 
@@ -128,19 +161,30 @@ def main():
                 "patient_name": patient_name,
                 "condition": condition,
                 "trend_summary": trend_text,
-                "wearable_trend_vector": trend_vector,
+                "wearable_trend_numeric_vector": numeric_vector,
                 "normalized_metrics": normalized_metrics,
                 "last_updated": "2026-01-22T00:00:00Z",
                 "days_analyzed": len(wearable_data),
-                "vector_dimensions": len(trend_vector),
                 "metrics_tracked": summary.get("metrics_tracked", []),
             }
+            if mode == "text":
+                trend_doc["wearable_trend_vector"] = trend_vector
+                trend_doc["vector_dimensions"] = len(trend_vector)
 
             # Store in Wearables scope for the patient
             try:
                 collection = db.bucket.scope("Wearables").collection(f"Patient_{patient_id}")
-                collection.upsert("trend_summary", trend_doc)
+                _store_trend_doc(collection, "trend_summary", trend_doc, args.numeric)
                 print(f"     ✓ Stored in Wearables.Patient_{patient_id}")
+
+                # Cross-patient copy for the numeric cohort vector index
+                _store_trend_doc(
+                    db.collections.wearables_analytics,
+                    f"trend_vector::{patient_id}",
+                    {**trend_doc, "type": "wearable_trend_vector"},
+                    args.numeric,
+                )
+                print("     ✓ Stored numeric trend vector in Wearables.Analytics_Results")
                 success_count += 1
             except Exception as e:
                 print(f"     ⚠️  Failed to store in patient collection: {e}")
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Report where backend start-up time goes and enforce a cold-start budget.
+
+1. Runs ``python -X importtime -c "import backend.api"`` in a fresh interpreter
+   and prints the slowest imports (cumulative time) and the total per top-level
+   package, so a heavy module that sneaks back into the import path shows up.
+2. Times --runs cold imports of backend.api (no -X importtime overhead) and
+   exits with status 1 if the median exceeds --budget-ms
+   (default STARTUP_BUDGET_MS or 1500).
+
+With --warmup it also times agent_registry.warmup() (catalog + agent graph
+modules), i.e. the work that is deferred to the first agent request.
+
+Usage:
+    python scripts/startup_report.py
+    python scripts/startup_report.py --top 30 --runs 5 --budget-ms 1200 --warmup
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+
+
+def _run(code: str, *flags: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *flags, "-c", code],
+        cwd=str(project_root),
+        capture_output=True,
+        text=True,
+    )
+
+
+def import_times(module: str):
+    """Return [(module, self_us, cumulative_us, depth)] from -X importtime."""
+    proc = _run(f"import {module}", "-X", "importtime")
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr else "import failed")
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        # "import time:   self |   cumulative | <indent>name"
+        try:
+            self_part, cumulative_part, name = line.split("|", 2)
+            self_us = int(self_part.split(":", 1)[1])
+            cumulative_us = int(cumulative_part)
+        except ValueError:
+            continue
+        name = name[1:]
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), self_us, cumulative_us, depth))
+    return rows
+
+
+def cold_start_ms(code: str, runs: int):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        proc = _run(code)
+        elapsed = (time.perf_counter() - start) * 1000
+        if proc.returncode != 0:
+            raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr else "failed")
+        samples.append(elapsed)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backend start-up import report")
+    parser.add_argument("--module", default="backend.api", help="Module the server imports")
+    parser.add_argument("--top", type=int, default=20, help="Slowest imports to list")
+    parser.add_argument("--runs", type=int, default=3, help="Cold-start samples")
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=float(os.getenv("STARTUP_BUDGET_MS", "1500")),
+        help="Fail if the median cold import takes longer",
+    )
+    parser.add_argument("--warmup", action="store_true", help="Also time agent warmup")
+    args = parser.parse_args()
+
+    try:
+        rows = import_times(args.module)
+    except RuntimeError as e:
+        print(f"✗ import {args.module} failed: {e}")
+        return 2
+
+    print(f"Slowest imports under {args.module} (cumulative ms):")
+    print(f"{'cumulative':>11}{'self':>9}  module")
+    for name, self_us, cumulative_us, depth in sorted(rows, key=lambda r: r[2], reverse=True)[
+        : args.top
+    ]:
+        print(f"{cumulative_us / 1000:>11.1f}{self_us / 1000:>9.1f}  {'  ' * depth}{name}")
+
+    per_package = defaultdict(int)
+    for name, self_us, _, _ in rows:
+        per_package[name.split(".")[0]] += self_us
+    print("\nSelf time per top-level package (ms):")
+    for package, total in sorted(per_package.items(), key=lambda kv: kv[1], reverse=True)[:10]:
+        print(f"{total / 1000:>11.1f}  {package}")
+
+    samples = cold_start_ms(f"import {args.module}", args.runs)
+    median = statistics.median(samples)
+    print(
+        f"\nCold import of {args.module}: median {median:.0f} ms over {args.runs} run(s) "
+        f"(budget {args.budget_ms:.0f} ms)"
+    )
+
+    if args.warmup:
+        try:
+            warm = cold_start_ms(
+                f"import {args.module}; from backend import agent_registry; "
+                "agent_registry.warmup()",
+                1,
+            )[0]
+            print(f"Import + agent warmup: {warm:.0f} ms (deferred to first agent use)")
+        except RuntimeError as e:
+            print(f"Agent warmup failed: {e}")
+
+    if median > args.budget_ms:
+        print(f"✗ Cold start over budget by {median - args.budget_ms:.0f} ms")
+        return 1
+    print("✓ Cold start within budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Unit tests for lazy agent module loading.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend import agent_registry  # noqa: E402
+
+
+def _fake_agents(tmp_path, monkeypatch):
+    agent_dir = tmp_path / "fake_agent"
+    agent_dir.mkdir()
+    (agent_dir / "helper.py").write_text("GREETING = 'hi'\n")
+    (agent_dir / "graph.py").write_text(
+        "import helper\n"
+        "LOADS = []\n"
+        "LOADS.append(1)\n"
+        "class FakeAgent:\n"
+        "    def __init__(self, catalog=None):\n"
+        "        self.catalog = catalog\n"
+        "    @staticmethod\n"
+        "    def build_starting_state(patient_id):\n"
+        "        return {'patient_id': patient_id, 'greeting': helper.GREETING}\n"
+    )
+    monkeypatch.setattr(agent_registry, "AGENTS_DIR", tmp_path)
+    monkeypatch.setitem(agent_registry.AGENT_CLASSES, "FakeAgent", "fake_agent")
+    monkeypatch.setattr(agent_registry, "_modules", {})
+
+
+def test_agent_module_loads_on_first_use_only(tmp_path, monkeypatch):
+    _fake_agents(tmp_path, monkeypatch)
+    lazy = agent_registry.LazyAgentClass("FakeAgent")
+    assert agent_registry.status()["agents"]["FakeAgent"] is False
+
+    assert lazy.build_starting_state("7") == {"patient_id": "7", "greeting": "hi"}
+    agent = lazy(catalog="catalog")
+    assert agent.catalog == "catalog"
+
+    module = agent_registry.load_agent_module("fake_agent")
+    assert module.LOADS == [1]
+    assert agent_registry.status()["agents"]["FakeAgent"] is True
+    assert str(tmp_path / "fake_agent") not in sys.path
+
+
+def test_failed_load_is_retried(tmp_path, monkeypatch):
+    _fake_agents(tmp_path, monkeypatch)
+    graph = tmp_path / "fake_agent" / "graph.py"
+    source = graph.read_text()
+    graph.write_text("raise ImportError('missing dependency')\n")
+
+    with pytest.raises(ImportError):
+        agent_registry.agent_class("FakeAgent")
+    assert "fake_agent_graph" not in sys.modules
+
+    graph.write_text(source)
+    assert agent_registry.agent_class("FakeAgent").__name__ == "FakeAgent"
+
+
+def test_load_off_the_event_loop_and_warmup_default(tmp_path, monkeypatch):
+    import asyncio
+    import threading
+
+    _fake_agents(tmp_path, monkeypatch)
+    monkeypatch.setattr(agent_registry, "_catalog", "catalog")
+    loop_thread = threading.get_ident()
+    loaded_in = []
+    real_load = agent_registry.load_agent_module
+
+    def load_agent_module(name, module_file="graph.py"):
+        loaded_in.append(threading.get_ident())
+        return real_load(name, module_file)
+
+    monkeypatch.setattr(agent_registry, "load_agent_module", load_agent_module)
+    asyncio.run(asyncio.to_thread(agent_registry.load, "FakeAgent"))
+    assert loaded_in and loop_thread not in loaded_in
+    assert agent_registry.status()["agents"]["FakeAgent"] is True
+
+    monkeypatch.delenv("AGENT_WARMUP", raising=False)
+    assert agent_registry.warmup_enabled()
+    monkeypatch.setenv("AGENT_WARMUP", "false")
+    assert not agent_registry.warmup_enabled()
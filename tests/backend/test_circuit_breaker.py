@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the Couchbase circuit breaker and health monitor.
+"""
+
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from couchbase.diagnostics import PingState  # noqa: E402
+
+from backend.connection import ConnectionManager, HealthMonitor  # noqa: E402
+from backend.database import CouchbaseDB  # noqa: E402
+from backend.utils.circuit_breaker import CircuitBreaker, CircuitOpenError  # noqa: E402
+
+
+class FakeBucket:
+    def scope(self, name):
+        return self
+
+    def collection(self, name):
+        return name
+
+
+class FakeCluster:
+    healthy = True
+    created = []
+
+    def __init__(self, connstr, options):
+        self.closed = False
+        FakeCluster.created.append(self)
+
+    def wait_until_ready(self, timeout):
+        if not FakeCluster.healthy:
+            raise TimeoutError("unambiguous_timeout")
+
+    def bucket(self, name):
+        return FakeBucket()
+
+    def ping(self):
+        state = PingState.OK if FakeCluster.healthy and not self.closed else PingState.TIMEOUT
+        return SimpleNamespace(endpoints={"kv": [SimpleNamespace(state=state)]})
+
+    def close(self):
+        self.closed = True
+
+
+def _manager(monkeypatch):
+    monkeypatch.setenv("CLUSTER_CONNECTION_STRING", "couchbase://localhost")
+    monkeypatch.setenv("CLUSTER_USERNAME", "user")
+    monkeypatch.setenv("CLUSTER_PASS", "secret")
+    monkeypatch.setenv("COUCHBASE_BREAKER_FAILURES", "2")
+    monkeypatch.setenv("COUCHBASE_BREAKER_RESET_SECONDS", "30")
+    FakeCluster.healthy = True
+    FakeCluster.created = []
+    return ConnectionManager(cluster_factory=FakeCluster)
+
+
+def test_breaker_opens_after_threshold_and_half_opens_after_timeout():
+    breaker = CircuitBreaker("cb", failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure(RuntimeError("down"))
+    assert breaker.state == "closed"
+    breaker.record_failure(RuntimeError("down"))
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+    time.sleep(0.06)
+    assert breaker.state == "half_open"
+    assert breaker.allow() is True
+    assert breaker.allow() is False  # only one trial call
+    breaker.record_failure(RuntimeError("still down"))
+    assert breaker.state == "open"
+
+    time.sleep(0.06)
+    assert breaker.allow() is True
+    breaker.record_success()
+    snapshot = breaker.snapshot()
+    assert snapshot["state"] == "closed"
+    assert snapshot["times_opened"] == 2
+    assert snapshot["last_error"] == "still down"
+
+
+def test_monitor_opens_circuit_and_backs_off_during_outage(monkeypatch):
+    manager = _manager(monkeypatch)
+    monitor = HealthMonitor(manager, interval=10, max_backoff=4)
+    assert monitor.check() is True
+    assert monitor.next_delay() == 10
+
+    FakeCluster.healthy = False
+    delays = []
+    for _ in range(4):
+        assert monitor.check() is False
+        delays.append(monitor.next_delay())
+    assert delays == [1, 2, 4, 4]
+    assert manager.breaker.state == "open"
+    assert manager.stats()["connected"] is False
+    assert FakeCluster.created[0].closed is True
+
+    FakeCluster.healthy = True
+    assert monitor.check() is True
+    assert manager.breaker.state == "closed"
+    assert manager.generation == 2
+    assert monitor.status()["last_check"]["ok"] is True
+
+
+def test_database_fails_fast_while_open_and_reresolves_after_reconnect(monkeypatch):
+    manager = _manager(monkeypatch)
+    database = CouchbaseDB(connections=manager)
+    database.connect()
+    assert database._generation == 1
+
+    for _ in range(2):
+        manager.breaker.record_failure(RuntimeError("down"))
+    with pytest.raises(CircuitOpenError) as excinfo:
+        database._check_connection()
+    assert excinfo.value.retry_after > 0
+
+    manager.reset()
+    manager.get_cluster(force=True)
+    database._check_connection()
+    assert database._generation == 2
+    assert database.cluster is FakeCluster.created[-1]
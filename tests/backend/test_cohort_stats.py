@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the precomputed cohort aggregates (no Couchbase needed).
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.cohort_stats import (  # noqa: E402
+    CohortAggregateService,
+    age_band,
+    patient_metric_averages,
+)
+
+
+def _service():
+    svc = CohortAggregateService(min_cohort_size=3, refresh_seconds=3600)
+    for i, hr in enumerate([70, 75, 80, 85, 90]):
+        svc.record_patient(str(i), "Asthma", 44, "Female", {"heart_rate": hr})
+    return svc
+
+
+def test_age_band():
+    assert age_band(44) == "40-49"
+    assert age_band("n/a") == "*"
+
+
+def test_percentile_and_stats():
+    result = _service().compare("asthma", 41, "female", {"heart_rate": 82})
+    hr = result["metrics"]["heart_rate"]
+    assert result["cohort_key"] == ["asthma", "40-49", "female"]
+    assert hr["percentile"] == 60
+    assert hr["mean"] == 80
+    assert hr["cohort_size"] == 5
+
+
+def test_exclude_self_and_incremental_update():
+    svc = _service()
+    result = svc.compare("Asthma", 44, "Female", {"heart_rate": 90}, exclude_patient_id="4")
+    assert result["metrics"]["heart_rate"]["percentile"] == 100
+    assert result["metrics"]["heart_rate"]["cohort_size"] == 4
+
+    svc.record_patient("4", "Asthma", 44, "Female", {"heart_rate": 60})
+    result = svc.compare("Asthma", 44, "Female", {"heart_rate": 65})
+    assert result["metrics"]["heart_rate"]["percentile"] == 20
+    assert len(svc) == 5
+
+
+def test_falls_back_to_wider_cohort():
+    svc = _service()
+    svc.record_patient("9", "Asthma", 44, "Male", {"heart_rate": 100})
+    result = svc.compare("Asthma", 44, "Male", {"heart_rate": 100}, exclude_patient_id="9")
+    assert result["cohort_key"] == ["asthma", "40-49", "*"]
+
+
+def test_patient_metric_averages():
+    records = [
+        {"metrics": {"heart_rate": 80, "stress_level": "High"}},
+        {"metrics": {"heart_rate": 90, "stress_level": "Low"}},
+    ]
+    assert patient_metric_averages(records) == {"heart_rate": 85.0, "stress_level": 2.0}
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the collection handle registry built in CouchbaseDB.connect().
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.database import CouchbaseDB  # noqa: E402
+from backend.utils.circuit_breaker import CircuitBreaker  # noqa: E402
+
+
+class FakeCollection:
+    def __init__(self, keyspace):
+        self.keyspace = keyspace
+        self.upserts = []
+
+    def upsert(self, doc_id, doc):
+        self.upserts.append(doc_id)
+
+
+class FakeScope:
+    def __init__(self, path):
+        self.path = path
+
+    def collection(self, name):
+        return FakeCollection(f"{self.path}.{name}")
+
+
+class FakeBucket:
+    def __init__(self, name):
+        self.name = name
+
+    def scope(self, name):
+        return FakeScope(f"{self.name}.{name}")
+
+
+class FakeCluster:
+    def __init__(self, missing=()):
+        self.opened = []
+        self.missing = set(missing)
+
+    def bucket(self, name):
+        if name in self.missing:
+            raise RuntimeError(f"bucket {name} not found")
+        self.opened.append(name)
+        return FakeBucket(name)
+
+
+class FakeConnections:
+    def __init__(self, cluster):
+        self.cluster = cluster
+        self.error = None
+        self.generation = 1
+        self.breaker = CircuitBreaker("couchbase")
+
+    def get_cluster(self):
+        return self.cluster
+
+
+def _connected_db(monkeypatch, cluster):
+    monkeypatch.setenv("COUCHBASE_BUCKET", "Scripps")
+    monkeypatch.setenv("COUCHBASE_RESEARCH_BUCKET", "Research")
+    db = CouchbaseDB(FakeConnections(cluster))
+    db.connect()
+    return db
+
+
+def test_writes_reuse_handles_resolved_in_connect(monkeypatch):
+    cluster = FakeCluster()
+    db = _connected_db(monkeypatch, cluster)
+    assert cluster.opened == ["Scripps", "Research"]
+
+    for i in range(3):
+        assert db.save_research_question(f"q{i}", {})
+        assert db.save_research_answer(f"a{i}", {})
+        assert db.save_research_paper(f"p{i}", {})
+        assert db.save_doctors_question(f"dq{i}", {})
+        assert db.save_answers_doctors(f"ad{i}", {})
+        assert db.save_wearable_analytics_result(f"w{i}", {})
+
+    assert cluster.opened == ["Scripps", "Research"]
+    assert db.collections.research_answers.keyspace == "Research.Pubmed.answers"
+    assert db.collections.research_answers.upserts == ["a0", "a1", "a2"]
+    assert db.collections.wearables_analytics.keyspace == "Scripps.Wearables.Analytics_Results"
+    assert db.patients_collection is db.collections.patients
+
+
+def test_missing_research_bucket_only_fails_research_writes(monkeypatch):
+    db = _connected_db(monkeypatch, FakeCluster(missing={"Research"}))
+
+    assert db.save_doctors_question("dq", {}) is True
+    assert db.save_research_answer("a", {}) is False
+    assert db.collections.research_answers is None
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the shared Couchbase connection manager.
+"""
+
+import sys
+import threading
+from datetime import timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.connection import ConnectionManager, LazyCluster  # noqa: E402
+from backend.database import CouchbaseDB  # noqa: E402
+
+
+class FakeBucket:
+    def scope(self, name):
+        return self
+
+    def collection(self, name):
+        return name
+
+
+class FakeCluster:
+    created = []
+
+    def __init__(self, connstr, options):
+        self.connstr = connstr
+        self.options = options
+        self.closed = False
+        FakeCluster.created.append(self)
+
+    def wait_until_ready(self, timeout):
+        self.ready_timeout = timeout
+
+    def bucket(self, name):
+        return FakeBucket()
+
+    def query(self, statement, *args):
+        return [statement]
+
+    def close(self):
+        self.closed = True
+
+
+def _manager(monkeypatch, factory=FakeCluster, **env):
+    settings = {
+        "CLUSTER_CONNECTION_STRING": "couchbases://cb.example.com",
+        "CLUSTER_USERNAME": "user",
+        "CLUSTER_PASS": "secret",
+        **env,
+    }
+    for name, value in settings.items():
+        monkeypatch.setenv(name, value)
+    FakeCluster.created = []
+    return ConnectionManager(cluster_factory=factory)
+
+
+def test_backend_and_tools_share_one_cluster(monkeypatch):
+    manager = _manager(monkeypatch)
+    clusters = []
+    threads = [
+        threading.Thread(target=lambda: clusters.append(manager.get_cluster())) for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    first_db, second_db = CouchbaseDB(manager), CouchbaseDB(manager)
+    first_db.connect()
+    second_db.connect()
+    tools_cluster = LazyCluster(manager)
+
+    assert len(FakeCluster.created) == 1
+    assert {id(c) for c in clusters} == {id(FakeCluster.created[0])}
+    assert first_db.cluster is second_db.cluster is FakeCluster.created[0]
+    assert first_db.patients_collection == "Patients"
+    assert bool(tools_cluster) and tools_cluster.query("SELECT 1") == ["SELECT 1"]
+    assert manager.stats()["connects"] == 1
+
+
+def test_pool_sizes_and_timeouts_override_profile(monkeypatch):
+    manager = _manager(
+        monkeypatch,
+        CLUSTER_TLS_VERIFY="none",
+        COUCHBASE_MAX_HTTP_CONNECTIONS="16",
+        COUCHBASE_NUM_IO_THREADS="4",
+        COUCHBASE_KV_TIMEOUT_MS="2500",
+        COUCHBASE_QUERY_TIMEOUT_MS="30000",
+    )
+    cluster = manager.get_cluster()
+
+    assert cluster.connstr == "couchbases://cb.example.com/?tls_verify=none"
+    options = cluster.options
+    assert options["max_http_connections"] == 16
+    assert options["num_io_threads"] == 4
+    assert options["kv_timeout"] == timedelta(milliseconds=2500)
+    assert options["query_timeout"] == timedelta(seconds=30)
+    # Untouched settings keep the wan_development profile values.
+    assert options["connect_timeout"] == timedelta(seconds=20)
+
+
+def test_failed_connect_is_retried_after_backoff(monkeypatch):
+    attempts = []
+
+    def flaky(connstr, options):
+        attempts.append(connstr)
+        if len(attempts) == 1:
+            raise TimeoutError("unambiguous_timeout")
+        return FakeCluster(connstr, options)
+
+    manager = _manager(monkeypatch, factory=flaky, COUCHBASE_RECONNECT_SECONDS="60")
+    assert manager.get_cluster() is None
+    assert not LazyCluster(manager)
+    assert "unambiguous_timeout" in manager.stats()["error"]
+    assert len(attempts) == 1
+
+    manager.reconnect_seconds = 0
+    assert manager.get_cluster() is FakeCluster.created[0]
+    assert manager.stats()["error"] is None
+
+    manager.close()
+    assert FakeCluster.created[0].closed
+    assert not manager.stats()["connected"]
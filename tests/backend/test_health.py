@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the readiness / deep health checks.
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.health import DependencyProbe, HealthChecker, public_view  # noqa: E402
+
+
+def _counting_probe(fail=False, delay=0.0):
+    calls = []
+
+    def probe():
+        calls.append(1)
+        if delay:
+            time.sleep(delay)
+        if fail:
+            raise RuntimeError("connection refused")
+
+    return probe, calls
+
+
+def test_probe_results_are_cached_and_shared():
+    probe, calls = _counting_probe(delay=0.02)
+    dep = DependencyProbe("kv", probe, required=True, ttl=60)
+
+    async def scenario():
+        first = await asyncio.gather(*(dep.check() for _ in range(5)))
+        again = await dep.check()
+        forced = await dep.check(force=True)
+        return first, again, forced
+
+    first, again, forced = asyncio.run(scenario())
+    assert len(calls) == 2  # five concurrent checks shared one probe, then one forced run
+    assert all(r["status"] == "ok" for r in first)
+    assert again["cached"] is True
+    assert forced["cached"] is False
+    assert first[0]["latency_ms"] >= 20
+
+
+def test_slow_timeout_and_failure_statuses():
+    async def hangs():
+        await asyncio.sleep(1)
+
+    slow, _ = _counting_probe(delay=0.02)
+    failing, _ = _counting_probe(fail=True)
+    checker = HealthChecker(
+        [
+            DependencyProbe("slow", slow, ttl=0, slow_ms=1),
+            DependencyProbe("hangs", hangs, ttl=0, timeout=0.05),
+            DependencyProbe("failing", failing, ttl=0),
+        ]
+    )
+    report = asyncio.run(checker.deep())
+    deps = report["dependencies"]
+    assert deps["slow"]["status"] == "slow"
+    assert deps["hangs"]["status"] == "down"
+    assert "timed out" in deps["hangs"]["error"]
+    assert deps["failing"]["error"] == "connection refused"
+    # None of them is required, so the worker is degraded but still ready.
+    assert report["status"] == "degraded"
+    assert report["ready"] is True
+
+
+def test_required_dependency_down_fails_readiness():
+    ok, _ = _counting_probe()
+    failing, failing_calls = _counting_probe(fail=True)
+    optional, optional_calls = _counting_probe()
+    checker = HealthChecker(
+        [
+            DependencyProbe("couchbase_kv", ok, required=True, ttl=0),
+            DependencyProbe("couchbase_query", failing, required=True, ttl=0),
+            DependencyProbe("llm", optional, ttl=0),
+        ]
+    )
+    ready = asyncio.run(checker.ready())
+    assert ready["ready"] is False
+    assert set(ready["dependencies"]) == {"couchbase_kv", "couchbase_query"}
+    assert optional_calls == []  # readiness does not probe the model endpoints
+
+    deep = asyncio.run(checker.deep())
+    assert deep["status"] == "down"
+    assert len(failing_calls) == 2
+
+
+def test_public_view_hides_errors_and_worker():
+    failing, _ = _counting_probe(fail=True)
+    checker = HealthChecker([DependencyProbe("couchbase_kv", failing, required=True, ttl=0)])
+    report = asyncio.run(checker.deep())
+    assert report["dependencies"]["couchbase_kv"]["error"] == "connection refused"
+
+    public = public_view({**report, "circuit": {"last_error": "host db1 refused"}})
+    assert "worker" not in public and "last_error" not in public["circuit"]
+    assert public["dependencies"]["couchbase_kv"] == {
+        k: v for k, v in report["dependencies"]["couchbase_kv"].items() if k != "error"
+    }
+    assert public["status"] == "down" and "worker" in report
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the Prometheus metrics registry.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.metrics import (  # noqa: E402
+    MetricsRegistry,
+    patient_bucket,
+    record_token_usage,
+    timed_methods,
+)
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    latency = registry.histogram("op_seconds", "Op latency.", ("op",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        latency.observe(value, op="get")
+
+    lines = registry.render().splitlines()
+    assert lines[:2] == ["# HELP op_seconds Op latency.", "# TYPE op_seconds histogram"]
+    assert 'op_seconds_bucket{op="get",le="0.1"} 1' in lines
+    assert 'op_seconds_bucket{op="get",le="1"} 3' in lines
+    assert 'op_seconds_bucket{op="get",le="+Inf"} 4' in lines
+    assert 'op_seconds_sum{op="get"} 4.05' in lines
+    assert 'op_seconds_count{op="get"} 4' in lines
+
+
+def test_time_sets_outcome_and_labels_are_checked():
+    registry = MetricsRegistry()
+    latency = registry.histogram("call_seconds", "Call latency.", ("name", "outcome"))
+    with latency.time(name="a"):
+        pass
+    with pytest.raises(KeyError):
+        with latency.time(name="a"):
+            raise KeyError("boom")
+    assert latency.count(name="a", outcome="ok") == 1
+    assert latency.count(name="a", outcome="error") == 1
+
+    with pytest.raises(ValueError):
+        latency.observe(1.0, name="a")
+    with pytest.raises(ValueError):
+        registry.histogram("call_seconds", "Duplicate.")
+
+
+def test_counter_escapes_label_values_and_counts_tokens():
+    registry = MetricsRegistry()
+    tokens = registry.counter("tokens_total", "Tokens.", ("model", "kind"))
+    record_token_usage(tokens, {"prompt_tokens": 12, "completion_tokens": 3}, model='gpt "4"')
+    record_token_usage(tokens, {"input_tokens": 8, "output_tokens": 0}, model='gpt "4"')
+    record_token_usage(tokens, None, model="x")
+
+    assert tokens.value(model='gpt "4"', kind="input") == 20
+    assert tokens.value(model='gpt "4"', kind="output") == 3
+    assert 'tokens_total{model="gpt \\"4\\"",kind="input"} 20' in registry.render()
+
+
+def test_timed_methods_wraps_public_methods_only():
+    registry = MetricsRegistry()
+    latency = registry.histogram("method_seconds", "Method latency.", ("method", "outcome"))
+
+    @timed_methods(latency)
+    class Store:
+        def get(self, key):
+            return self._lookup(key)
+
+        def _lookup(self, key):
+            return key.upper()
+
+        @staticmethod
+        def version():
+            return 2
+
+    store = Store()
+    assert store.get("a") == "A"
+    assert Store.version() == 2
+    assert Store.get.__name__ == "get"
+    assert latency.count(method="get", outcome="ok") == 1
+    assert "_lookup" not in registry.render()
+
+
+def test_patient_bucket():
+    assert [patient_bucket(n) for n in (None, 0, 1, 3, 11, 50, 500)] == [
+        "unknown",
+        "0",
+        "1",
+        "2-5",
+        "6-20",
+        "21-100",
+        "100+",
+    ]
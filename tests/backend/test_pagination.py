@@ -0,0 +1,47 @@
+import pytest
+
+from backend.pagination import (
+    MAX_PAGE_SIZE,
+    cursor_params,
+    decode_cursor,
+    encode_cursor,
+    finish_page,
+    page_size,
+)
+
+
+def test_cursor_round_trip():
+    values = ["2025-12-11T10:30:00-08:00", "msg_private_1"]
+    cursor = encode_cursor(values)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == values
+    assert decode_cursor(None) is None
+
+
+@pytest.mark.parametrize("bad", ["not-base64!", encode_cursor(["only-one"]), "e30"])
+def test_decode_cursor_rejects_malformed(bad):
+    with pytest.raises(ValueError):
+        decode_cursor(bad)
+
+
+def test_page_size_bounds():
+    assert page_size(None) == 50
+    assert page_size(0) == 50
+    assert page_size("10") == 10
+    assert page_size(10_000) == MAX_PAGE_SIZE
+
+
+def test_finish_page_builds_next_cursor_from_last_row():
+    rows = [{"id": str(i), "_sort": [f"t{i}", str(i)]} for i in range(4)]
+    page, next_cursor = finish_page(rows, 3)
+    assert [r["id"] for r in page] == ["0", "1", "2"]
+    assert all("_sort" not in r for r in page)
+    assert decode_cursor(next_cursor) == ["t2", "2"]
+    assert cursor_params(decode_cursor(next_cursor)) == {"cursor": ["t2", "2"], "cursor_key": "t2"}
+
+
+def test_finish_page_last_page_has_no_cursor():
+    page, next_cursor = finish_page([{"id": "1", "_sort": ["t", "1"]}], 3)
+    assert page == [{"id": "1"}]
+    assert next_cursor is None
+    assert cursor_params(None) == {}
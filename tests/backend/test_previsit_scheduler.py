@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Unit tests for precomputed pre-visit packets.
+"""
+
+import asyncio
+import sys
+from datetime import datetime, time, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.previsit_scheduler import PrevisitPacketScheduler, seconds_until  # noqa: E402
+
+
+class FakeDB:
+    def __init__(self, patients):
+        self.patients = patients
+        self.inputs = {pid: {"patient": 1, "doctor_notes": [["n1", 1]]} for pid in patients}
+        self.packets = {}
+
+    def get_upcoming_appointment_patients(self, start_date, end_date):
+        self.range = (start_date, end_date)
+        return list(self.patients)
+
+    def get_previsit_inputs(self, patient_id):
+        return dict(self.inputs[patient_id])
+
+    def get_previsit_packet(self, patient_id):
+        return self.packets.get(patient_id)
+
+    def save_previsit_packet(self, patient_id, packet):
+        self.packets[patient_id] = packet
+        return True
+
+
+def _scheduler(db, calls, concurrency=2):
+    in_flight = {"now": 0, "max": 0}
+
+    async def summary(pid):
+        in_flight["now"] += 1
+        in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        await asyncio.sleep(0.01)
+        in_flight["now"] -= 1
+        calls.append(pid)
+        return {"patient_id": pid, "summary": f"summary {pid}"}
+
+    sched = PrevisitPacketScheduler(
+        db, {"previsit_summary": summary}, concurrency=concurrency, lookahead_days=1
+    )
+    return sched, in_flight
+
+
+def test_refresh_generates_with_bounded_concurrency_and_skips_fresh():
+    db = FakeDB(["1", "2", "3", "4", "5"])
+    calls = []
+    sched, in_flight = _scheduler(db, calls)
+
+    first = asyncio.run(sched.refresh_upcoming(start="2026-01-05"))
+    assert first["generated"] == 5 and first["fresh"] == 0
+    assert in_flight["max"] <= 2
+    assert db.range == ("2026-01-05", "2026-01-06")
+
+    second = asyncio.run(sched.refresh_upcoming(start="2026-01-05"))
+    assert second["fresh"] == 5 and second["generated"] == 0
+    assert len(calls) == 5
+
+
+def test_packet_served_only_while_inputs_unchanged_and_young():
+    db = FakeDB(["1"])
+    sched, _ = _scheduler(db, [])
+    asyncio.run(sched.build_packet("1"))
+
+    assert sched.get_fresh("1", "previsit_summary") == {"patient_id": "1", "summary": "summary 1"}
+    assert sched.get_fresh("1", "wearables_summary") is None
+
+    db.inputs["1"]["doctor_notes"].append(["n2", 7])
+    assert sched.get_fresh("1") is None
+
+    asyncio.run(sched.build_packet("1"))
+    old = datetime.now(timezone.utc) - sched.max_age - timedelta(minutes=1)
+    db.packets["1"]["generated_at"] = old.isoformat()
+    assert sched.get_fresh("1") is None
+
+
+def test_seconds_until_rolls_over_to_tomorrow():
+    now = datetime(2026, 1, 5, 3, 0)
+    assert seconds_until(time(2, 0), now) == 23 * 3600
+    assert seconds_until(time(4, 30), now) == 90 * 60
+
+
+def test_nightly_run_skips_while_a_refresh_is_running(monkeypatch):
+    import backend.previsit_scheduler as previsit_scheduler
+
+    db = FakeDB(["1"])
+    sched, _ = _scheduler(db, [])
+    monkeypatch.setattr(previsit_scheduler, "seconds_until", lambda run_at: 0)
+    started = []
+
+    async def refresh(start=None, days=None):
+        started.append(start)
+        await asyncio.sleep(0.05)
+
+    sched.refresh_upcoming = refresh
+
+    async def run():
+        assert sched.trigger(start="manual")
+        nightly = asyncio.create_task(sched._nightly())
+        await asyncio.sleep(0.02)
+        assert started == ["manual"]
+        await asyncio.sleep(0.05)
+        nightly.cancel()
+        await sched.stop()
+
+    asyncio.run(run())
+    assert started[0] == "manual" and started.count("manual") == 1
+    assert len(started) >= 2
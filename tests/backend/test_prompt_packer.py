@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the token-budgeted prompt packer.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.utils.prompt_packer import (  # noqa: E402
+    budget_for,
+    count_tokens,
+    pack_json,
+    pack_texts,
+    truncate_to_tokens,
+)
+
+
+def test_truncate_respects_budget_and_marks_cut():
+    text = "First sentence here. " * 200
+    cut = truncate_to_tokens(text, 50)
+    assert count_tokens(cut) <= 52
+    assert cut.endswith("…")
+    assert truncate_to_tokens("short", 50) == "short"
+
+
+def test_pack_texts_keeps_most_recent_within_budget():
+    notes = [{"date": f"2025-01-{day:02d}", "content": "note text. " * 100} for day in range(1, 11)]
+    packed = pack_texts(
+        notes,
+        600,
+        text_of=lambda n: n["content"],
+        with_text=lambda n, text: {**n, "content": text},
+        rank=lambda n: n["date"],
+        per_item_max=200,
+    )
+    assert packed.tokens_out <= 600
+    assert packed.tokens_in > packed.tokens_out
+    assert [n["date"] for n in packed.items][0] == "2025-01-10"
+    assert packed.dropped + len(packed.items) == 10
+    assert all(n["date"] > "2025-01-05" for n in packed.items)
+
+
+def test_pack_json_drops_empties_and_keeps_short_facts():
+    patient = {
+        "name": "James Smith",
+        "age": 45,
+        "email": "",
+        "allergies": [],
+        "history": "Long narrative about prior exacerbations. " * 300,
+    }
+    packed = pack_json(patient, 200)
+    data = json.loads(packed.items[0])
+    assert packed.tokens_out <= 200
+    assert data["name"] == "James Smith" and data["age"] == 45
+    assert "email" not in data and "allergies" not in data
+    assert data["history"].endswith("…")
+
+
+def test_budget_env_override(monkeypatch):
+    monkeypatch.setenv("PROMPT_BUDGET_DOCTOR_NOTES_SUMMARY", "1234")
+    assert budget_for("doctor_notes_summary") == 1234
+    assert budget_for("unknown_endpoint", 77) == 77
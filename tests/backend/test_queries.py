@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the shared parameterized cohort statements.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.queries import similar_patients_query, similar_patients_statement  # noqa: E402
+
+REF = {"patient_id": "1", "age": "32", "gender": "Male", "medical_conditions": "Asthma"}
+
+
+def test_statement_has_no_literal_values():
+    statement, params = similar_patients_query("Scripps", REF, "1'; DROP", age_range=5)
+    for literal in ("32", "male", "asthma", "DROP"):
+        assert literal not in statement
+    assert params["patient_id"] == "1'; DROP"
+    assert (params["min_age"], params["max_age"]) == (27, 37)
+    assert params["gender"] == "male"
+    assert params["condition"] == "asthma"
+
+
+def test_statement_text_is_stable_across_patients():
+    a, _ = similar_patients_query("Scripps", REF, "1")
+    b, _ = similar_patients_query(
+        "Scripps", {"age": 70, "gender": "female", "medical_conditions": ["COPD"]}, "2"
+    )
+    assert a == b
+
+
+def test_missing_criteria_select_other_variant():
+    statement, params = similar_patients_query("Scripps", {"age": 40}, "3")
+    assert statement == similar_patients_statement("Scripps", False, False)
+    assert "gender" not in params and "condition" not in params
+
+
+def test_condition_filter_matches_string_and_array_values():
+    statement, params = similar_patients_query("Scripps", REF, "1")
+    assert "LOWER(p.medical_conditions) = $condition" in statement
+    assert "ANY c IN p.medical_conditions SATISFIES LOWER(c) = $condition END" in statement
+    assert params["condition"] == "asthma"
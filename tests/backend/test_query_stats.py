@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the SQL++ statement stats registry.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.query_stats import QueryStatsRegistry  # noqa: E402
+
+
+def test_same_statement_aggregates_and_counts_prepared_reuse():
+    reg = QueryStatsRegistry()
+    reg.record("SELECT 1\n  FROM x", 10.0, prepared=True, rows=1)
+    reg.record("SELECT 1 FROM x", 4.0, prepared=True, rows=1)
+    reg.record("SELECT 1 FROM x", 2.0, prepared=True, rows=1)
+
+    snap = reg.snapshot()
+    assert snap["statements_tracked"] == 1
+    row = snap["statements"][0]
+    assert row["count"] == 3
+    assert row["prepared_first_runs"] == 1
+    assert row["prepared_reuses"] == 2
+    assert row["max_ms"] == 10.0
+
+
+def test_adhoc_and_errors_are_not_reuses():
+    reg = QueryStatsRegistry()
+    reg.record("SELECT a", 1.0, prepared=False)
+    reg.record("SELECT a", 1.0, prepared=False)
+    reg.record("SELECT b", 1.0, prepared=True)
+    reg.record("SELECT b", 1.0, prepared=True, error=True)
+    reg.record("SELECT b", 1.0, prepared=True)
+
+    rows = {r["statement"]: r for r in reg.snapshot(sort_by="count")["statements"]}
+    assert rows["SELECT a"]["prepared_reuse_rate"] == 0.0
+    assert rows["SELECT b"]["errors"] == 1
+    assert rows["SELECT b"]["prepared_first_runs"] == 2
+
+
+def test_server_usage_merged_from_system_prepareds():
+    reg = QueryStatsRegistry()
+    reg.record("SELECT p.name FROM x p WHERE p.id = $id", 3.0, prepared=True)
+    prepareds = [
+        # One row per query node; the statement is stored as the PREPARE text.
+        {"statement": "PREPARE SELECT p.name\n FROM x p WHERE p.id = $id", "uses": 7, "node": "a"},
+        {"statement": "PREPARE SELECT p.name FROM x p WHERE p.id = $id", "uses": 5, "node": "b"},
+        {"statement": "PREPARE SELECT 1", "uses": 2, "avgServiceTime": "1ms"},
+    ]
+
+    snap = reg.with_server_usage(reg.snapshot(), prepareds)
+    assert snap["statements"][0]["server_plan_uses"] == 12
+    assert snap["server_prepared_plans"] == 2
+    assert snap["server_plan_uses"] == 14
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the in-memory pre-visit questionnaire index.
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.questionnaires import (  # noqa: E402
+    CouchbaseQuestionnaireSource,
+    FileQuestionnaireSource,
+    QuestionnaireIndex,
+)
+
+
+class CountingSource(FileQuestionnaireSource):
+    def __init__(self, root):
+        super().__init__(root)
+        self.loads = []
+
+    def load(self, patient_id):
+        self.loads.append(patient_id)
+        return super().load(patient_id)
+
+
+def _write(root, patient_id, payload, mtime=None):
+    path = root / f"patient_{patient_id}" / "pre_visit_questionnaire.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(payload if isinstance(payload, str) else json.dumps(payload))
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_get_reloads_only_when_file_changes(tmp_path):
+    _write(tmp_path, "1", [{"patient_id": "1", "date_completed": "2025-01-10"}], mtime=1000)
+    source = CountingSource(tmp_path)
+    index = QuestionnaireIndex(source)
+
+    assert index.get("1")["date_completed"] == "2025-01-10"
+    assert index.get(1)["date_completed"] == "2025-01-10"
+    assert source.loads == ["1"]
+
+    _write(tmp_path, "1", [{"patient_id": "1", "date_completed": "2025-02-01"}], mtime=2000)
+    assert index.get("1")["date_completed"] == "2025-02-01"
+    assert source.loads == ["1", "1"]
+
+    (tmp_path / "patient_1" / "pre_visit_questionnaire.json").unlink()
+    assert index.get("1") is None
+
+
+def test_status_matches_endpoint_shape_and_flags_bad_files(tmp_path):
+    _write(tmp_path, "1", [{"date_completed": "2025-01-10"}])
+    _write(tmp_path, "2", {"date_completed": ""})
+    _write(tmp_path, "3", "{not json")
+    index = QuestionnaireIndex(FileQuestionnaireSource(tmp_path))
+
+    statuses = index.status(["1", 2, "3", "4"])
+    assert [(s["patient_id"], s["exists"], s["completed"]) for s in statuses] == [
+        ("1", True, True),
+        ("2", True, False),
+        ("3", True, False),
+        ("4", False, False),
+    ]
+    with pytest.raises(ValueError):
+        index.get("3")
+
+
+def test_couchbase_source_uses_cas_versions():
+    class FakeDB:
+        def __init__(self):
+            self.docs = {"7": {"date_completed": "2025-03-01"}}
+            self.cas = {"7": 1}
+            self.gets = 0
+
+        def get_pre_visit_questionnaire_versions(self, patient_ids):
+            return {pid: self.cas[pid] for pid in patient_ids if pid in self.cas}
+
+        def get_pre_visit_questionnaire(self, patient_id):
+            self.gets += 1
+            return self.docs.get(patient_id)
+
+    fake = FakeDB()
+    index = QuestionnaireIndex(CouchbaseQuestionnaireSource(fake))
+
+    assert index.status(["7", "8"])[0]["completed"] is True
+    assert index.get("7") == {"date_completed": "2025-03-01"}
+    assert fake.gets == 1
+
+    fake.cas["7"] = 2
+    fake.docs["7"] = {"date_completed": None}
+    assert index.get("7") == {"date_completed": None}
+    assert fake.gets == 2
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Unit tests for message pub/sub fan-out.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.realtime import (  # noqa: E402
+    PUBLIC_CHANNEL,
+    BrokeredPubSub,
+    InMemoryPubSub,
+    LocalBroker,
+    private_channel,
+    publish_message,
+)
+
+
+def _private(msg_id, from_id="1", to_id="nurse_1"):
+    return {"id": msg_id, "message_type": "private", "from_id": from_id, "to_id": to_id}
+
+
+async def _next(sub, timeout=1.0):
+    return await asyncio.wait_for(sub.__anext__(), timeout)
+
+
+def test_private_message_reaches_sender_and_recipient_only():
+    async def run():
+        ps = InMemoryPubSub()
+        sender = ps.subscribe([private_channel("1"), PUBLIC_CHANNEL])
+        recipient = ps.subscribe([private_channel("nurse_1"), PUBLIC_CHANNEL])
+        bystander = ps.subscribe([private_channel("lab_1"), PUBLIC_CHANNEL])
+
+        await publish_message(ps, _private("m1"))
+
+        assert (await _next(sender))["message"]["id"] == "m1"
+        event = await _next(recipient)
+        assert event["scope"] == "private"
+        assert event["channel"] == private_channel("nurse_1")
+        assert bystander.queue.empty()
+
+    asyncio.run(run())
+
+
+def test_public_message_fans_out_and_close_unsubscribes():
+    async def run():
+        ps = InMemoryPubSub()
+        a = ps.subscribe([private_channel("1"), PUBLIC_CHANNEL])
+        b = ps.subscribe([private_channel("2"), PUBLIC_CHANNEL])
+        b.close()
+        assert ps.subscriber_count(PUBLIC_CHANNEL) == 1
+
+        await publish_message(ps, {"id": "p1", "message_type": "public"})
+        assert (await _next(a))["message"]["id"] == "p1"
+        assert b.queue.empty()
+
+    asyncio.run(run())
+
+
+def test_slow_subscriber_drops_oldest(monkeypatch):
+    monkeypatch.setattr("backend.realtime.SUBSCRIBER_QUEUE_SIZE", 2)
+
+    async def run():
+        ps = InMemoryPubSub()
+        sub = ps.subscribe([PUBLIC_CHANNEL])
+        for i in range(3):
+            await ps.publish(PUBLIC_CHANNEL, {"n": i})
+        assert sub.dropped == 1
+        assert [(await _next(sub))["n"] for _ in range(2)] == [1, 2]
+
+    asyncio.run(run())
+
+
+def test_brokered_workers_see_each_others_messages():
+    async def run():
+        broker = LocalBroker()
+        worker_a, worker_b = BrokeredPubSub(broker), BrokeredPubSub(broker)
+        await worker_a.start()
+        await worker_b.start()
+        sub = worker_b.subscribe([private_channel("nurse_1")])
+
+        await publish_message(worker_a, _private("m2"))
+
+        event = await _next(sub)
+        assert event["message"]["id"] == "m2"
+        assert event["origin"] == worker_a.worker_id
+
+        await worker_a.close()
+        await worker_b.close()
+
+    asyncio.run(run())
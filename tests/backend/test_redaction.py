@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the PII redaction engine.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.utils.redaction import RedactionEngine  # noqa: E402
+
+
+def test_drops_contact_fields_and_masks_free_text():
+    engine = RedactionEngine()
+    doc = {
+        "name": "Jo Doe",
+        "patient_email": "jo@example.org",
+        "emergency_contacts": [{"phone": "555-201-3344"}],
+        "notes": ["Call 555 201 3344 or mail JO.DOE@Example.ORG today."],
+        "age": 52,
+    }
+    assert engine.redact(doc) == {
+        "name": "Jo Doe",
+        "notes": ["Call [REDACTED] or mail [REDACTED] today."],
+        "age": 52,
+    }
+
+
+def test_skips_structured_fields_and_vectors():
+    engine = RedactionEngine()
+    vector = [0.1, 0.2]
+    doc = {"patient_id": "5552013344", "all_notes_vectorized": vector, "text": "5552013344"}
+    out = engine.redact(doc)
+    assert out["patient_id"] == "5552013344"
+    assert out["all_notes_vectorized"] is vector
+    assert out["text"] == "[REDACTED]"
+
+
+def test_memoizes_by_content_and_evicts_oldest():
+    engine = RedactionEngine(cache_size=2)
+    first = engine.redact({"note": "a@b.co"})
+    assert engine.redact({"note": "a@b.co"}) is first
+    assert (engine.hits, engine.misses) == (1, 1)
+
+    assert engine.redact({"note": "c@d.co"})["note"] == "[REDACTED]"
+    engine.redact({"note": "e@f.co"})
+    assert engine.stats()["cached"] == 2
+    engine.redact({"note": "a@b.co"})
+    assert engine.misses == 4
+
+
+def test_strings_and_uncached_engine():
+    engine = RedactionEngine(cache_size=0)
+    assert engine.redact("reach me at 555.201.3344") == "reach me at [REDACTED]"
+    assert engine.redact({"x": "plain"}) == {"x": "plain"}
+    assert engine.stats() == {"hits": 0, "misses": 0, "cached": 0}
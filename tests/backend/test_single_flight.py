@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Unit tests for single-flight request coalescing.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.utils.single_flight import SingleFlight, flight_key  # noqa: E402
+
+
+def test_concurrent_duplicates_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"answer": "ok"}
+
+    async def main():
+        key = flight_key("research", "1", "What now?", "v1")
+        same = flight_key("research", 1, "  what   NOW ", "v1")
+        results = await asyncio.gather(*(flight.do(k, work) for k in (key, same, key)))
+        results[0]["answer"] = "changed"
+        return results
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert [r["answer"] for r in results] == ["changed", "ok", "ok"]
+    stats = flight.stats()
+    assert (stats["calls"], stats["executions"], stats["coalesced"]) == (3, 1, 2)
+    assert stats["in_flight"] == 0
+
+
+def test_different_data_version_or_finished_call_runs_again():
+    flight = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return len(calls)
+
+    async def main():
+        await asyncio.gather(
+            flight.do(flight_key("research", "1", "q", "v1"), work),
+            flight.do(flight_key("research", "1", "q", "v2"), work),
+        )
+        await flight.do(flight_key("research", "1", "q", "v1"), work)
+
+    asyncio.run(main())
+    assert len(calls) == 3
+    assert flight.stats()["coalesced"] == 0
+
+
+def test_errors_propagate_to_every_waiter():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    async def main():
+        key = flight_key("wearables_summary", "2")
+        return await asyncio.gather(
+            flight.do(key, fail), flight.do(key, fail), return_exceptions=True
+        )
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert flight.stats()["by_endpoint"]["wearables_summary"]["errors"] == 1
+
+
+def test_cancelled_caller_does_not_cancel_shared_work():
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def main():
+        key = flight_key("research", "3", "q")
+        first = asyncio.ensure_future(flight.do(key, work))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(flight.do(key, work))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == "done"
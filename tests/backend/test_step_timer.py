@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Unit tests for per-request step timings.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.metrics import AGENT_STEP_SECONDS  # noqa: E402
+from backend.utils.step_timer import StepTimer, TimingStore, current_timer, timing_store  # noqa: E402
+
+
+def _agent_steps(timer):
+    # What an agent does with the request's timer (see the wearable agent).
+    with timer.step("patient_context"):
+        with timer.step("find_patient_by_id", kind="tool"):
+            time.sleep(0.01)
+    with timer.step("summary"):
+        with timer.step("summary_llm", kind="llm"):
+            time.sleep(0.02)
+
+
+def test_nested_steps_and_folded_self_time():
+    timer = StepTimer("wearables_analyze", request_id="req-nested", agent="test_agent")
+    with timer.step("agent", kind="agent"):
+        first = len(timer.steps)
+        _agent_steps(timer)
+
+    by_name = {s["name"]: s for s in timer.steps}
+    assert by_name["agent"]["depth"] == 0
+    assert by_name["find_patient_by_id"]["path"] == "agent;patient_context;find_patient_by_id"
+    assert by_name["summary_llm"]["kind"] == "llm"
+    assert by_name["summary_llm"]["start_ms"] > by_name["find_patient_by_id"]["start_ms"]
+    assert by_name["agent"]["duration_ms"] >= 30
+
+    assert timer.summary(since=first).split()[0].startswith("patient_context=")
+    assert len(timer.summary(since=first).split()) == 2
+
+    folded = dict(line.rsplit(" ", 1) for line in timer.folded())
+    assert int(folded["wearables_analyze;agent;summary;summary_llm"]) >= 20
+    # Parents only keep the time not spent in their children.
+    assert int(folded["wearables_analyze;agent"]) < 5
+
+
+def test_activate_and_finish_store_breakdown_and_metrics():
+    timer = StepTimer("wearables_analyze", request_id="req-finish", agent="test_agent")
+    assert current_timer() is None
+    with timer.activate():
+        assert current_timer() is timer
+        _agent_steps(current_timer())
+    assert current_timer() is None
+
+    report = timer.finish(patients=4)
+    timer.finish(patients=4)  # idempotent
+    assert timing_store.get("req-finish") == [report]
+    assert [s["name"] for s in report["steps"]][:2] == ["patient_context", "find_patient_by_id"]
+    assert (
+        AGENT_STEP_SECONDS.count(agent="test_agent", step="summary_llm", kind="llm", patients="2-5")
+        == 1
+    )
+
+
+def test_failed_step_is_marked_and_store_is_bounded():
+    timer = StepTimer("job")
+    try:
+        with timer.step("flaky"):
+            raise ValueError("boom")
+    except ValueError:
+        pass
+    assert timer.steps[0]["error"] is True
+    assert timer.steps[0]["duration_ms"] is not None
+
+    store = TimingStore(max_requests=2)
+    for i in range(3):
+        store.add(f"r{i}", {"name": "job", "total_ms": float(i)})
+    assert store.get("r0") is None
+    assert [r["request_id"] for r in store.recent()] == ["r2", "r1"]
+
+
+def test_reused_request_id_keeps_only_the_latest_reports():
+    store = TimingStore(max_requests=2, max_reports_per_request=3)
+    for i in range(10):
+        store.add("reused", {"name": f"job{i}", "total_ms": float(i)})
+    assert [r["name"] for r in store.get("reused")] == ["job7", "job8", "job9"]
+    assert store.recent() == [
+        {"request_id": "reused", "names": ["job7", "job8", "job9"], "total_ms": 9.0}
+    ]
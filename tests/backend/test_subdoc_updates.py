@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Unit tests for sub-document field updates in CouchbaseDB.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from couchbase.exceptions import CasMismatchException  # noqa: E402
+
+from backend.database import CouchbaseDB  # noqa: E402
+
+
+class _ContentAs:
+    def __init__(self, values):
+        self.values = values
+
+    def __getitem__(self, type_):
+        return lambda index: type_(self.values[index])
+
+
+class FakeLookupResult:
+    def __init__(self, values, cas):
+        self.values = values
+        self.cas = cas
+        self.content_as = _ContentAs(values)
+
+    def exists(self, index):
+        return self.values[index] is not None
+
+
+class FakeCollection:
+    def __init__(self, fail_with=None, doc=None, conflicts=0):
+        self.calls = []
+        self.lookups = []
+        self.fail_with = fail_with
+        self.doc = doc or {}
+        self.cas = 100
+        # Number of writes that lose a race with a concurrent writer.
+        self.conflicts = conflicts
+
+    def get(self, *args, **kwargs):
+        raise AssertionError("full-document get should not be used")
+
+    def upsert(self, *args, **kwargs):
+        raise AssertionError("full-document upsert should not be used")
+
+    def lookup_in(self, doc_id, specs):
+        self.lookups.append(doc_id)
+        return FakeLookupResult([self.doc.get(spec[1]) for spec in specs], self.cas)
+
+    def mutate_in(self, doc_id, specs, *options):
+        if self.fail_with:
+            raise self.fail_with
+        if self.conflicts:
+            self.conflicts -= 1
+            self.cas += 1
+            raise CasMismatchException()
+        self.calls.append((doc_id, [(spec[1], spec[-1]) for spec in specs], options))
+
+
+def _db(monkeypatch, **collections):
+    db = CouchbaseDB()
+    monkeypatch.setattr(db, "_check_connection", lambda: None)
+    for name, collection in collections.items():
+        setattr(db, name, collection)
+    return db
+
+
+def test_mark_message_as_read_sends_only_the_flag(monkeypatch):
+    private = FakeCollection()
+    db = _db(monkeypatch, private_messages_collection=private)
+
+    assert db.mark_message_as_read("msg_1") is True
+    doc_id, fields, options = private.calls[0]
+    assert (doc_id, fields, options) == ("msg_1", [("read", True)], ())
+    assert private.lookups == []
+
+
+def test_checked_update_retries_with_fresh_cas(monkeypatch):
+    appointments = FakeCollection(doc={"status": "scheduled"}, conflicts=1)
+    db = _db(monkeypatch, appointments_collection=appointments)
+
+    assert db.update_appointment_status("appt_1", "completed") is True
+    doc_id, fields, options = appointments.calls[0]
+    assert fields == [("status", "completed")]
+    assert dict(options[0]) == {"cas": 101}
+
+
+def test_checked_update_gives_up_after_retries(monkeypatch):
+    appointments = FakeCollection(doc={"status": "scheduled"}, conflicts=5)
+    db = _db(monkeypatch, appointments_collection=appointments)
+
+    assert db.update_appointment_status("appt_1", "completed") is False
+    assert appointments.calls == []
+
+
+def test_update_appointment_status_passes_cas(monkeypatch):
+    appointments = FakeCollection()
+    db = _db(monkeypatch, appointments_collection=appointments)
+
+    assert db.update_appointment_status("appt_1", "completed", cas=42) is True
+    doc_id, fields, options = appointments.calls[0]
+    assert (doc_id, fields) == ("appt_1", [("status", "completed")])
+    assert dict(options[0]) == {"cas": 42}
+
+
+def test_cas_mismatch_returns_false(monkeypatch):
+    notes = FakeCollection(fail_with=CasMismatchException())
+    db = _db(monkeypatch, doctor_notes_collection=notes)
+
+    assert db.upsert_doctor_note_embedding("note_1", [0.1, 0.2], cas=7) is False
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Unit tests for OpenTelemetry tracing helpers.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend import tracing  # noqa: E402
+
+
+class FakeQueryResult:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def rows(self):
+        return iter(self._rows)
+
+    def metadata(self):
+        return {"status": "success"}
+
+
+class FakeCluster:
+    def __init__(self):
+        self.closed = False
+
+    def query(self, statement, *args, **kwargs):
+        return FakeQueryResult([{"ok": 1}, {"ok": 2}])
+
+    def close(self):
+        self.closed = True
+
+
+class FakeCollection:
+    name = "Patients"
+
+    def get(self, key):
+        return {"id": key}
+
+
+@tracing.traced_methods("Fake")
+class FakeDB:
+    def lookup(self, key):
+        return key.upper()
+
+    def _private(self):
+        return "private"
+
+
+def test_disabled_helpers_are_no_ops():
+    assert not tracing.enabled()
+    with tracing.span("anything", attr="value") as s:
+        assert s is None
+    assert tracing.start_span("callback") is None
+    tracing.end_span(None, error=RuntimeError("ignored"))
+    tracing.finish_server_span(None, "GET", "/health", 200)
+
+    cluster, collection = FakeCluster(), FakeCollection()
+    assert tracing.trace_cluster(cluster) is cluster
+    assert tracing.trace_collection(collection, "patients") is collection
+    assert FakeDB().lookup("abc") == "ABC"
+    assert FakeDB.lookup.__name__ == "lookup"
+
+
+def test_server_span_scopes_request_id():
+    with tracing.server_span("GET", "/api/patients/1", [], "req-1") as s:
+        assert s is None
+        assert tracing.request_id_var.get() == "req-1"
+    assert tracing.request_id_var.get() is None
+
+
+def test_traced_wrappers_forward_to_the_sdk_objects():
+    cluster = tracing.TracedCluster(FakeCluster())
+    result = cluster.query("SELECT 1")
+    assert list(result.rows()) == [{"ok": 1}, {"ok": 2}]
+    assert result.metadata() == {"status": "success"}
+    cluster.close()
+    assert cluster._cluster.closed
+
+    collection = tracing.TracedCollection(FakeCollection(), "patients")
+    assert collection.get("p1") == {"id": "p1"}
+    assert collection.name == "Patients"
+
+
+class FakeSpan:
+    def __init__(self):
+        self.attributes = {}
+        self.ended = 0
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def end(self):
+        self.ended += 1
+
+
+def test_query_span_ends_when_rows_are_exhausted_or_abandoned():
+    handle = FakeSpan()
+    result = tracing.TracedQueryResult(FakeQueryResult([{"ok": 1}, {"ok": 2}]), handle)
+    rows = iter(result)
+    assert next(rows) == {"ok": 1}
+    assert handle.ended == 0  # still streaming: the span covers the fetch
+    assert list(rows) == [{"ok": 2}]
+    assert handle.ended == 1 and handle.attributes["db.response.rows"] == 2
+
+    handle = FakeSpan()
+    result = tracing.TracedQueryResult(FakeQueryResult([{"ok": 1}, {"ok": 2}]), handle)
+    for _ in result:
+        break
+    assert handle.ended == 1 and handle.attributes["db.response.rows"] == 1
+    del result
+    assert handle.ended == 1
+
+
+def test_spans_recorded_with_sdk(monkeypatch):
+    pytest.importorskip("opentelemetry.sdk")
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    monkeypatch.setattr(tracing, "_tracer", provider.get_tracer("test"))
+    monkeypatch.setattr(tracing, "_enabled", True)
+
+    with tracing.server_span("GET", "/api/patients/1", [], "req-2") as server:
+        assert len(list(tracing.trace_cluster(FakeCluster()).query("SELECT 1"))) == 2
+        tracing.trace_collection(FakeCollection(), "patients").get("p1")
+        FakeDB().lookup("x")
+        tracing.finish_server_span(server, "GET", "/api/patients/{patient_id}", 200)
+
+    spans = {s.name: s for s in exporter.get_finished_spans()}
+    assert set(spans) == {
+        "GET /api/patients/{patient_id}",
+        "couchbase.query",
+        "couchbase.get",
+        "Fake.lookup",
+    }
+    root = spans["GET /api/patients/{patient_id}"]
+    for name in ("couchbase.query", "couchbase.get", "Fake.lookup"):
+        assert spans[name].parent.span_id == root.context.span_id
+        assert spans[name].attributes["cko.request_id"] == "req-2"
+    assert spans["couchbase.query"].attributes["db.response.rows"] == 2
+    assert root.attributes["http.response.status_code"] == 200
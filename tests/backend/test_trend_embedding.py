@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the local numeric trend embeddings (no Couchbase / LLM needed).
+"""
+
+import math
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.utils.trend_embedding import (  # noqa: E402
+    dtw_distance,
+    l2_distance,
+    numeric_trend_vector,
+    numeric_vector_dimensions,
+    resample,
+    summary_stats,
+    trend_dtw_distance,
+)
+
+
+def test_resample_endpoints_and_length():
+    out = resample([0.0, 1.0], 5)
+    assert out == [0.0, 0.25, 0.5, 0.75, 1.0]
+    assert len(resample(list(range(30)), 16)) == 16
+
+
+def test_summary_stats_slope():
+    stats = summary_stats([0.0, 0.1, 0.2, 0.3])
+    assert math.isclose(stats["slope"], 0.1)
+    assert math.isclose(stats["mean"], 0.15)
+
+
+def test_vector_has_fixed_dimensions_with_missing_metrics():
+    vec = numeric_trend_vector({"heart_rate": [0.5] * 30})
+    assert len(vec) == numeric_vector_dimensions()
+
+
+def test_dtw_tolerates_time_shift():
+    a = [0, 0, 1, 2, 1, 0, 0]
+    b = [0, 1, 2, 1, 0, 0, 0]
+    assert dtw_distance(a, b) == 0
+    assert l2_distance(a, b) > 0
+
+
+def test_similar_trends_are_closer():
+    rising = {"heart_rate": [i / 30 for i in range(30)], "steps": [0.3] * 30}
+    rising2 = {"heart_rate": [i / 30 + 0.02 for i in range(30)], "steps": [0.31] * 30}
+    falling = {"heart_rate": [1 - i / 30 for i in range(30)], "steps": [0.8] * 30}
+
+    v1, v2, v3 = (numeric_trend_vector(m) for m in (rising, rising2, falling))
+    assert l2_distance(v1, v2) < l2_distance(v1, v3)
+    assert trend_dtw_distance(rising, rising2) < trend_dtw_distance(rising, falling)
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the audit write-behind queue.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.write_behind import WriteBehindQueue  # noqa: E402
+
+
+class FlakyWriter:
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.written = {}
+
+    def __call__(self, doc_id, doc):
+        if self.failures > 0:
+            self.failures -= 1
+            return False
+        self.written[doc_id] = doc
+        return True
+
+
+def _queue(tmp_path, writer, **kwargs):
+    kwargs.setdefault("flush_interval", 0.01)
+    kwargs.setdefault("retry_backoff", 0.01)
+    return WriteBehindQueue({"q": writer}, spill_path=tmp_path / "spill.jsonl", **kwargs)
+
+
+def _spilled(tmp_path):
+    return [
+        json.loads(line)
+        for path in sorted(tmp_path.glob("spill*.jsonl"))
+        for line in path.read_text().splitlines()
+    ]
+
+
+def test_batches_are_written_in_background(tmp_path):
+    writer = FlakyWriter()
+
+    async def run():
+        q = _queue(tmp_path, writer, batch_size=10)
+        await q.start()
+        for i in range(25):
+            assert q.enqueue("q", f"d{i}", {"n": i}) is True
+        await q.stop()
+        return q.stats()
+
+    stats = asyncio.run(run())
+    assert len(writer.written) == 25
+    assert stats["written"] == 25 and stats["spilled"] == 0
+    assert _spilled(tmp_path) == []
+
+
+def test_failed_writes_are_retried_then_spilled(tmp_path):
+    writer = FlakyWriter(failures=1)
+    always_fails = FlakyWriter(failures=100)
+
+    async def run():
+        q = WriteBehindQueue(
+            {"q": writer, "bad": always_fails},
+            spill_path=tmp_path / "spill.jsonl",
+            flush_interval=0.01,
+            retry_backoff=0.01,
+            max_retries=2,
+        )
+        await q.start()
+        q.enqueue("q", "ok", {})
+        q.enqueue("bad", "nope", {})
+        await asyncio.sleep(0.2)
+        await q.stop()
+
+    asyncio.run(run())
+    assert "ok" in writer.written
+    assert [item["doc_id"] for item in _spilled(tmp_path)] == ["nope"]
+
+
+def test_overflow_and_shutdown_spill_then_replay_on_start(tmp_path):
+    writer = FlakyWriter()
+    gate = threading.Event()
+
+    async def run():
+        q = _queue(tmp_path, writer, max_size=2, drain_timeout=0.05)
+        # Not started yet: enqueue persists to disk.
+        assert q.enqueue("q", "early", {}) is False
+
+        original = q._write_batch
+        q._write_batch = lambda batch: gate.wait(2) and []  # stuck until released
+        await q.start()
+        await asyncio.sleep(0.05)
+        for i in range(4):
+            q.enqueue("q", f"d{i}", {})
+        await q.stop()
+        gate.set()
+        spilled = {item["doc_id"] for item in _spilled(tmp_path)}
+
+        q._write_batch = original
+        q.max_size = 10
+        await q.start()
+        await q.stop()
+        return spilled, q.stats()
+
+    spilled, stats = asyncio.run(run())
+    assert {"early", "d0", "d1", "d2", "d3"} <= spilled
+    assert set(writer.written) >= spilled
+    assert stats["replayed"] >= len(spilled)
+    assert _spilled(tmp_path) == []
+
+
+def test_spills_from_async_code_run_off_the_event_loop(tmp_path):
+    writer = FlakyWriter()
+    spill_threads = []
+
+    async def run():
+        q = _queue(tmp_path, writer)
+        original = q._spill
+        q._spill = lambda items: (spill_threads.append(threading.get_ident()), original(items))
+        # Not started: the enqueue from a coroutine must not fsync on the loop thread.
+        assert q.enqueue("q", "early", {}) is False
+        await q.start()
+        await q.stop()
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(run())
+    assert spill_threads and loop_thread not in spill_threads
+    assert "early" in writer.written
+
+
+def test_replay_claims_every_worker_file_once(tmp_path):
+    # Spill files left by two other workers and the pre-per-worker shared file.
+    for name, doc_id in (
+        ("spill.jsonl", "legacy"),
+        ("spill.101.jsonl", "a"),
+        ("spill.202.jsonl", "b"),
+    ):
+        (tmp_path / name).write_text(json.dumps({"kind": "q", "doc_id": doc_id, "doc": {}}) + "\n")
+
+    first = _queue(tmp_path, FlakyWriter())
+    second = _queue(tmp_path, FlakyWriter())
+    replayed = first._take_spilled()
+    assert sorted(item["doc_id"] for item in replayed) == ["a", "b", "legacy"]
+    assert second._take_spilled() == []
+    assert list(tmp_path.iterdir()) == []
+
+    first._spill([{"kind": "q", "doc_id": "mine", "doc": {}}])
+    assert [p.name for p in tmp_path.iterdir()] == [f"spill.{os.getpid()}.jsonl"]
+    assert [item["doc_id"] for item in second._take_spilled()] == ["mine"]
@@ -5,37 +5,23 @@ This module provides common resources like database connections and helper funct
 that are used across multiple tools. It's prefixed with _ to avoid being indexed as a tool.
 """
 
-import couchbase.auth
-import couchbase.cluster
-import couchbase.exceptions
-import couchbase.options
 import dotenv
 import os
 import requests
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from backend import tracing  # noqa: E402
+from backend.connection import LazyCluster, connection_manager  # noqa: E402
 
 dotenv.load_dotenv()
 
 # Shared Couchbase cluster connection
-# Agent Catalog imports tool files, so this connection is reused across tools
-try:
-    cluster = couchbase.cluster.Cluster(
-        os.getenv("CLUSTER_CONNECTION_STRING") or os.getenv("CB_CONN_STRING"),
-        couchbase.options.ClusterOptions(
-            authenticator=couchbase.auth.PasswordAuthenticator(
-                username=os.getenv("CLUSTER_USERNAME") or os.getenv("CB_USERNAME"),
-                password=os.getenv("CLUSTER_PASS") or os.getenv("CB_PASSWORD"),
-                certpath=os.getenv("AGENT_CATALOG_CONN_ROOT_CERTIFICATE")
-                or os.getenv("CB_CERTIFICATE"),
-            )
-        ),
-    )
-except couchbase.exceptions.CouchbaseException as e:
-    print(f"""
-        Could not connect to Couchbase cluster!
-        Make sure environment variables are set correctly.
-        {str(e)}
-    """)
-    cluster = None
+# Agent Catalog imports tool files, so this connection is reused across tools. It is the
+# same Cluster the backend uses (backend.connection) and connects on first use;
+# ``if not cluster`` is True while the cluster is unavailable.
+cluster = LazyCluster(connection_manager)
 
 
 def get_nvidia_embedding(text: str) -> list[float]:
@@ -64,8 +50,13 @@ def get_nvidia_embedding(text: str) -> list[float]:
 
     ssl_verify_raw = (os.getenv("EMBEDDING_SSL_VERIFY") or "").strip().lower()
     ssl_verify = ssl_verify_raw not in ("0", "false", "no")
-    res = requests.post(url, headers=headers, json=payload, timeout=30, verify=ssl_verify)
-    res.raise_for_status()
+    with tracing.span(
+        "llm.embedding",
+        client=True,
+        **{"gen_ai.operation.name": "embeddings", "gen_ai.request.model": model_name},
+    ):
+        res = requests.post(url, headers=headers, json=payload, timeout=30, verify=ssl_verify)
+        res.raise_for_status()
     data = res.json()
 
     embedding = data["data"][0]["embedding"]
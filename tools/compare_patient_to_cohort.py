@@ -9,12 +9,24 @@ import agentc
 from statistics import mean
 from typing import Optional
 
+from backend.cohort_stats import cohort_service
+from backend.database import db
+
+# Tool metric key -> cohort aggregate metric name
+_AGGREGATE_METRICS = {
+    "avg_heart_rate": "heart_rate",
+    "avg_oxygen": "blood_oxygen_level",
+    "avg_steps": "steps",
+    "avg_stress": "stress_level",
+}
+
 
 @agentc.catalog.tool
 def compare_patient_to_cohort(
     patient_wearable_data: list[dict],
     cohort_patient_ids: list[str],
     get_cohort_data_func: Optional[callable] = None,
+    patient_profile: Optional[dict] = None,
 ) -> dict:
     """
     Compare a patient's wearable metrics against a demographically similar cohort.
@@ -22,10 +34,17 @@ def compare_patient_to_cohort(
     Calculates percentile rankings and identifies outliers by comparing the patient's
     average metrics to those of similar patients (same age range, condition, gender).
 
+    When patient_profile is given, percentiles are real rank lookups against the
+    precomputed (condition, age band, gender) cohort aggregates; no cohort member's
+    raw wearable data is fetched. Without it (or with too few members) the tool
+    falls back to typical reference ranges and a z-score approximation.
+
     Args:
         patient_wearable_data: Wearable data for the target patient
         cohort_patient_ids: List of similar patient IDs to compare against
         get_cohort_data_func: Function to retrieve cohort data (if not embedded)
+        patient_profile: Optional {"patient_id", "condition", "age", "gender"} for
+            aggregate lookups
 
     Returns:
         Dictionary containing:
@@ -120,12 +139,23 @@ def compare_patient_to_cohort(
         "data_points": len(valid_patient_data),
     }
 
-    # For this demo, we'll simulate cohort data since we don't have easy access
-    # to all cohort wearable data without making multiple queries
-    # In production, you'd query each cohort patient's wearable data
+    # Real cohort aggregates (precomputed sketches) when we know who the patient is
+    aggregate = {"cohort_key": None, "metrics": {}}
+    if patient_profile:
+        cohort_service.ensure_loaded(db)
+        aggregate = cohort_service.compare(
+            patient_profile.get("condition"),
+            patient_profile.get("age"),
+            patient_profile.get("gender"),
+            {
+                name: patient_metrics.get(key)
+                for key, name in _AGGREGATE_METRICS.items()
+                if patient_metrics.get(key) is not None
+            },
+            exclude_patient_id=patient_profile.get("patient_id"),
+        )
 
-    # Simulated cohort statistics (would be calculated from actual cohort data)
-    # These represent typical healthy ranges for the condition
+    # Typical reference ranges, used for metrics the aggregates don't cover
     cohort_metrics = {
         "avg_heart_rate": {
             "mean": 85.0,
@@ -169,6 +199,17 @@ def compare_patient_to_cohort(
         },
     }
 
+    aggregate_percentiles = {}
+    cohort_size = len(cohort_patient_ids)
+    for key, name in _AGGREGATE_METRICS.items():
+        agg = aggregate["metrics"].get(name)
+        if agg:
+            aggregate_percentiles[key] = agg["percentile"]
+            cohort_metrics[key] = {k: v for k, v in agg.items() if k != "percentile"}
+    if aggregate_percentiles:
+        # Members of the aggregate cohort actually ranked against, not the id list.
+        cohort_size = max(cohort_metrics[key]["cohort_size"] for key in aggregate_percentiles)
+
     # Calculate percentile rankings and identify outliers
     percentile_rankings = {}
     outliers = []
@@ -195,9 +236,11 @@ def compare_patient_to_cohort(
         if cohort_std > 0:
             z_score = (patient_value - cohort_mean) / cohort_std
 
+            if metric_key in aggregate_percentiles:
+                percentile = aggregate_percentiles[metric_key]
             # Approximate percentile from z-score
             # Using simplified normal distribution approximation
-            if z_score <= -2:
+            elif z_score <= -2:
                 percentile = 2
             elif z_score <= -1:
                 percentile = 16
@@ -275,7 +318,9 @@ def compare_patient_to_cohort(
         "percentile_rankings": percentile_rankings,
         "outliers": outliers,
         "comparison_summary": comparison_summary,
-        "cohort_size": len(cohort_patient_ids),
+        "cohort_size": cohort_size,
+        "cohort_source": "aggregates" if aggregate_percentiles else "reference_ranges",
+        "cohort_key": aggregate["cohort_key"],
         "analysis_date": "2025-01-20",  # Would be dynamic
     }
 
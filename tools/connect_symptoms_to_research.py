@@ -11,6 +11,8 @@ import couchbase.options
 from _shared import cluster, get_nvidia_embedding
 from typing import Optional
 
+from backend.utils.prompt_packer import budget_for, pack_texts
+
 
 @agentc.catalog.tool
 def connect_symptoms_to_research(
@@ -165,10 +167,7 @@ def connect_symptoms_to_research(
                 {
                     "title": row.get("title", "Untitled"),
                     "author": row.get("author", "Unknown"),
-                    "article_text": article_text[:500] + "..."
-                    if len(article_text) > 500
-                    else article_text,
-                    "full_article_text": article_text,  # Full text for agent processing
+                    "article_text": article_text,
                     "article_citation": row.get("article_citation", "Citation not available"),
                     "pmc_link": row.get("pmc_link", ""),
                     "relevance_score": round(row.get("relevance_score", 0), 3),
@@ -177,6 +176,19 @@ def connect_symptoms_to_research(
                 }
             )
 
+        # One shared token budget for the article excerpts, most relevant paper first.
+        budget = budget_for("research_context")
+        packed = pack_texts(
+            papers,
+            budget,
+            text_of=lambda p: p["article_text"],
+            with_text=lambda p, text: {**p, "article_text": text},
+            rank=lambda p: p["relevance_score"],
+            per_item_max=budget // len(papers),
+        )
+        packed.log("connect_symptoms_to_research")
+        papers = packed.items
+
         return papers
 
     except Exception as e:
@@ -11,9 +11,19 @@ import logging
 from typing import Optional
 from _shared import cluster, get_nvidia_embedding
 
+from backend.utils.redaction import redaction_engine
+
 logger = logging.getLogger(__name__)
 
 
+def _redact_notes(results: list) -> list:
+    """Mask emails and phone numbers in note text before it reaches the LLM."""
+    for row in results:
+        if isinstance(row.get("visit_notes"), str):
+            row["visit_notes"] = redaction_engine.redact_text(row["visit_notes"])
+    return results
+
+
 @agentc.catalog.tool
 def doc_notes_search(query: str, patient_id: Optional[str] = None, top_k: int = 3) -> dict:
     """
@@ -89,7 +99,7 @@ def doc_notes_search(query: str, patient_id: Optional[str] = None, top_k: int =
         )
         results = list(result_query.rows())
         logger.info(f"✓ Vector search completed: found {len(results)} notes")
-        return {"docnotes_search_results": results}
+        return {"docnotes_search_results": _redact_notes(results)}
 
     except Exception as e:
         # Fallback to keyword search if vector search fails
@@ -134,7 +144,7 @@ def _fallback_keyword_search(query: str, patient_id: Optional[str], top_k: int)
         )
         results = list(result_query.rows())
         logger.info(f"Keyword search completed: found {len(results)} notes")
-        return {"docnotes_search_results": results}
+        return {"docnotes_search_results": _redact_notes(results)}
 
     except Exception as e:
         logger.error(f"Keyword search failed: {str(e)}")
@@ -6,7 +6,11 @@ Uses SQL++ queries to find patients matching age range, gender, and medical cond
 
 import agentc
 import couchbase.options
+import os
 from _shared import cluster
+from backend.queries import primary_condition, reference_patient_statement, similar_patients_query
+
+BUCKET = os.getenv("COUCHBASE_BUCKET", "Scripps")
 
 
 @agentc.catalog.tool
@@ -60,16 +64,11 @@ def find_similar_patients_demographics(
 
     try:
         # First, get the reference patient's demographics
-        ref_query = """
-        SELECT p.patient_id, p.age, p.gender, p.medical_conditions
-        FROM `Scripps`.People.Patients p
-        WHERE p.patient_id = $patient_id
-        LIMIT 1
-        """
-
         ref_result = cluster.query(
-            ref_query,
-            couchbase.options.QueryOptions(named_parameters={"patient_id": patient_id}),
+            reference_patient_statement(BUCKET),
+            couchbase.options.QueryOptions(
+                named_parameters={"patient_id": patient_id}, adhoc=False
+            ),
         )
 
         ref_rows = list(ref_result.rows())
@@ -79,44 +78,22 @@ def find_similar_patients_demographics(
         ref_patient = ref_rows[0]
         ref_age = int(ref_patient.get("age", 0))
         ref_gender = ref_patient.get("gender", "")
-        ref_condition = ref_patient.get("medical_conditions", "")
-
-        # Build dynamic query based on criteria
-        conditions = [
-            f"p.patient_id != '{patient_id}'",  # Exclude reference patient
-            f"ABS(TO_NUMBER(p.age) - {ref_age}) <= {age_range}",  # Age range
-        ]
-
-        if same_gender and ref_gender:
-            conditions.append(f"LOWER(p.gender) = '{ref_gender.lower()}'")
-
-        if same_condition and ref_condition:
-            # Handle both string and array conditions
-            conditions.append(
-                f"(LOWER(p.medical_conditions) = '{ref_condition.lower()}' OR "
-                f"ANY c IN p.medical_conditions SATISFIES LOWER(c) = '{ref_condition.lower()}' END)"
-            )
-
-        where_clause = " AND ".join(conditions)
-
-        # Query for similar patients
-        query = f"""
-        SELECT 
-            p.patient_id,
-            p.patient_name,
-            p.age,
-            p.gender,
-            p.medical_conditions,
-            ABS(TO_NUMBER(p.age) - {ref_age}) AS age_difference
-        FROM `Scripps`.People.Patients p
-        WHERE {where_clause}
-        ORDER BY age_difference ASC
-        LIMIT $limit
-        """
+        ref_condition = primary_condition(ref_patient.get("medical_conditions"))
+
+        # Fully parameterized statement (one cached plan per criteria combination)
+        query, params = similar_patients_query(
+            BUCKET,
+            ref_patient,
+            patient_id,
+            age_range=age_range,
+            same_condition=same_condition,
+            same_gender=same_gender,
+            limit=limit,
+        )
 
         result = cluster.query(
             query,
-            couchbase.options.QueryOptions(named_parameters={"limit": limit}),
+            couchbase.options.QueryOptions(named_parameters=params, adhoc=False),
         )
 
         rows = list(result.rows())
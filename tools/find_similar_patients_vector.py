@@ -12,7 +12,11 @@ import os
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
-from backend.database import CouchbaseDB
+from backend.database import CouchbaseDB, db as shared_db
+from backend.utils.trend_embedding import numeric_vector_dimensions
+from couchbase.options import QueryOptions
+
+NUMERIC_VECTOR_FIELD = "wearable_trend_numeric_vector"
 
 
 @agentc.catalog.tool
@@ -29,6 +33,10 @@ def find_similar_patients_vector(
     are most similar to the query vector. Much faster than statistical comparison
     and finds true pattern similarity, not just demographic similarity.
 
+    Numeric trend vectors (vectorize_wearable_trends(mode="numeric")) are matched
+    against the wearable_trend_numeric_vector index in Wearables.Analytics_Results
+    with L2 distance; no embedding call is made on either side.
+
     Args:
         trend_vector: The embedding vector from vectorize_wearable_trends
         patient_condition: Optional filter to only compare patients with same condition
@@ -74,7 +82,8 @@ def find_similar_patients_vector(
             "search_method": "none",
         }
 
-    db = CouchbaseDB()
+    # Reuse the process-wide CouchbaseDB (and its cluster) instead of bootstrapping per call.
+    db = shared_db
     db._ensure_connected()
 
     if db._connection_error:
@@ -84,6 +93,11 @@ def find_similar_patients_vector(
             "search_method": "none",
         }
 
+    if len(trend_vector) == numeric_vector_dimensions():
+        return _numeric_vector_search(
+            db, trend_vector, patient_condition, patient_id_to_exclude, top_k
+        )
+
     try:
         # NOTE: This requires a vector index on wearable trend data
         # For now, we'll return a placeholder response and log a warning
@@ -149,3 +163,65 @@ def find_similar_patients_vector(
             "similar_patients": [],
             "search_method": "error",
         }
+
+
+def _numeric_vector_search(
+    db: CouchbaseDB,
+    trend_vector: list[float],
+    patient_condition: Optional[str],
+    patient_id_to_exclude: Optional[str],
+    top_k: int,
+) -> dict:
+    """Nearest neighbours over locally computed numeric trend vectors."""
+    where = ["t.type = 'wearable_trend_vector'"]
+    params = {"query_vector": trend_vector, "limit": max(1, min(top_k, 50))}
+    if patient_condition:
+        where.append("LOWER(t.`condition`) = $condition")
+        params["condition"] = patient_condition.lower()
+    if patient_id_to_exclude:
+        where.append("t.patient_id != $exclude_id")
+        params["exclude_id"] = str(patient_id_to_exclude)
+
+    query = f"""
+        SELECT t.patient_id, t.patient_name, t.`condition`, t.trend_summary,
+               APPROX_VECTOR_DISTANCE(t.{NUMERIC_VECTOR_FIELD}, $query_vector, "L2") AS distance
+        FROM `{db.bucket_name}`.Wearables.Analytics_Results t
+        WHERE {" AND ".join(where)}
+        ORDER BY APPROX_VECTOR_DISTANCE(t.{NUMERIC_VECTOR_FIELD}, $query_vector, "L2")
+        LIMIT $limit
+    """
+
+    try:
+        rows = list(db.cluster.query(query, QueryOptions(named_parameters=params)).rows())
+    except Exception as e:
+        print(f"Error in numeric vector search: {str(e)}")
+        return {
+            "error": f"Numeric vector search failed: {str(e)}",
+            "similar_patients": [],
+            "search_method": "error",
+        }
+
+    similar = []
+    for row in rows:
+        distance = float(row.get("distance") or 0.0)
+        similar.append(
+            {
+                "patient_id": row.get("patient_id"),
+                "patient_name": row.get("patient_name"),
+                "condition": row.get("condition"),
+                "similarity_score": round(1.0 / (1.0 + distance), 4),
+                "distance": distance,
+                "trend_summary": row.get("trend_summary", ""),
+            }
+        )
+
+    return {
+        "similar_patients": similar,
+        "search_method": "numeric_vector_search",
+        "search_stats": {
+            "total_candidates": len(rows),
+            "returned": len(similar),
+            "condition_filtered": bool(patient_condition),
+        },
+        "vector_search_ready": True,
+    }
@@ -13,6 +13,7 @@ import os
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 from backend.utils.embedding_client import embedding_vector
+from backend.utils.trend_embedding import numeric_trend_vector
 import asyncio
 
 
@@ -164,7 +165,7 @@ def _create_trend_text(wearable_data: list[dict], patient_condition: Optional[st
 
 @agentc.catalog.tool
 def vectorize_wearable_trends(
-    wearable_data: list[dict], patient_condition: Optional[str] = None
+    wearable_data: list[dict], patient_condition: Optional[str] = None, mode: str = "text"
 ) -> dict:
     """
     Vectorize wearable time-series data for similarity search.
@@ -177,15 +178,21 @@ def vectorize_wearable_trends(
     This enables fast vector similarity search to find patients with similar
     wearable patterns instead of slow statistical analysis.
 
+    With mode="numeric" the embedding model is skipped entirely: trend_vector is
+    built locally from the normalized metrics (resampled series + summary stats),
+    so there is no network call and the vector is comparable across patients.
+
     Args:
         wearable_data: List of wearable data records (from get_wearable_data_by_patient)
         patient_condition: Patient's medical condition for context
+        mode: "text" (embed the trend description) or "numeric" (local shape embedding)
 
     Returns:
         Dictionary containing:
         - trend_text: Natural language description of the trend
         - trend_vector: Embedding vector (1024-dim) for similarity search
         - normalized_metrics: Normalized time-series arrays for each metric
+        - numeric_vector: Local shape embedding (always computed, 84-dim)
         - summary: Quick statistics
 
     Example:
@@ -223,20 +230,18 @@ def vectorize_wearable_trends(
             "normalized_metrics": {},
         }
 
+    if mode not in ("text", "numeric"):
+        return {
+            "error": f"Unknown mode: {mode}",
+            "trend_text": "",
+            "trend_vector": [],
+            "normalized_metrics": {},
+        }
+
     # Step 1: Create clinical trend description
     trend_text = _create_trend_text(valid_data, patient_condition)
 
-    # Step 2: Generate embedding vector for the trend
-    # Run async function in sync context
-    try:
-        loop = asyncio.get_event_loop()
-    except RuntimeError:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-
-    trend_vector = loop.run_until_complete(embedding_vector(trend_text))
-
-    # Step 3: Extract and normalize time-series metrics
+    # Step 2: Extract and normalize time-series metrics
     normalized_metrics = {}
 
     # Extract raw metrics
@@ -305,13 +310,30 @@ def vectorize_wearable_trends(
         if clean_cal:
             normalized_metrics["calories_burned"] = _normalize_metric(clean_cal, "calories_burned")
 
+    # Step 3: Build the trend vector
+    numeric_vector = numeric_trend_vector(normalized_metrics)
+
+    if mode == "numeric":
+        trend_vector = numeric_vector
+    else:
+        # Run async function in sync context
+        try:
+            loop = asyncio.get_event_loop()
+        except RuntimeError:
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+
+        trend_vector = loop.run_until_complete(embedding_vector(trend_text))
+
     return {
         "trend_text": trend_text,
         "trend_vector": trend_vector,
+        "numeric_vector": numeric_vector,
         "normalized_metrics": normalized_metrics,
         "summary": {
             "days_analyzed": len(valid_data),
             "metrics_tracked": list(normalized_metrics.keys()),
             "vector_dimensions": len(trend_vector),
+            "mode": mode,
         },
     }